@@ -1,11 +1,34 @@
-from flask import Flask, jsonify, render_template, request
+from flask import Flask, Response, g, jsonify, render_template, request
 import subprocess
 import json
 import datetime
 import logging
 import os
 import time
-from threading import Lock
+import atexit
+import contextlib
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from threading import BoundedSemaphore, Lock
+
+from assets import CODINGS, IMMUTABLE, REVALIDATE, AssetBundle, encode_asset
+from cache import FRESH, NEGATIVE, STALE, CachePolicy, ResponseCache, SingleFlight
+from cli_parser import parse_sections
+from cli_session import CliSession
+from collector import StatsCollector
+from commands import CommandQueue, QueueFull, RemoteCommandQueue
+import export
+from events import SEVERITIES, EventEngine, FileSink, WebhookSink, load_rules
+from fleet import FleetAggregator, parse_peers
+from history import METRICS, MetricHistory
+from metrics_store import MetricsStore
+import profiler
+from sampler import FAST, IDLE, SLOW, AdaptiveSampler
+from snapshot_broker import SnapshotBroker, SnapshotClient
+from status_delta import StatusRevisions, merge_patch
+import status_feed
+from status_feed import StatusBroadcaster, compact_status, parse_address
+from usage import UsageTracker
+import telemetry
 
 # Configure logging
 logging.basicConfig(
@@ -15,41 +38,593 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # Configuration
-SPEEDIFY_CLI_PATH = '/usr/share/speedify/speedify_cli'
+SPEEDIFY_CLI_PATH = os.getenv('SPEEDIFY_CLI_PATH', '/usr/share/speedify/speedify_cli')
 CACHE_TTL_SECONDS = 2  # Cache CLI results for 2 seconds
+CACHE_STALE_SECONDS = 10  # Serve expired results this much longer while refreshing in the background
+CACHE_NEGATIVE_SECONDS = 5  # Serve a failed CLI result this long before retrying
+CACHE_MAX_ENTRIES = 256
+# Per key class TTLs: (fresh seconds, extra stale seconds, failure seconds)
+CACHE_POLICIES = {
+    "cli:stats": CachePolicy(CACHE_TTL_SECONDS, CACHE_STALE_SECONDS, 2),
+    "settings": CachePolicy(30, 300, CACHE_NEGATIVE_SECONDS),  # Invalidated on mode change
+    "server": CachePolicy(60, 600, CACHE_NEGATIVE_SECONDS),
+    "cli:show:servers": CachePolicy(300, 3600, CACHE_NEGATIVE_SECONDS),
+}
+COLLECTOR_ENABLED = os.getenv('SPEEDIFY_COLLECTOR', 'true').lower() == 'true'
+COLLECTOR_MAX_AGE_SECONDS = 5  # Fall back to a direct CLI call if the stream is older
+SAMPLER_ENABLED = os.getenv('ADAPTIVE_SAMPLING', 'true').lower() == 'true'
+SAMPLER_SLOW_INTERVAL_SECONDS = 10  # One-shot `stats 1` interval while the link is stable
+SAMPLER_CALM_SECONDS = 120  # All connections good this long before sampling slows down
+SAMPLER_IDLE_SECONDS = int(os.getenv('SAMPLER_IDLE_SECONDS', '300'))  # Stop sampling without viewers (0 = never)
+# One-shot sample interval while idle, if the store, sinks or usage file still need data (0 = none)
+SAMPLER_IDLE_INTERVAL_SECONDS = int(os.getenv('SAMPLER_IDLE_INTERVAL_SECONDS', '3600'))
+SSE_RETRY_MS = 3000  # EventSource reconnect delay
+SSE_HEARTBEAT_SECONDS = 15  # Keepalive comment interval on an unchanged stream
+SSE_MIN_INTERVAL_SECONDS = 0.25  # Coalesce sections of one stats cycle into one push
+SSE_FALLBACK_POLL_SECONDS = 2  # Rebuild interval when the collector is disabled
+# Open status streams per process; more get a 503 and poll instead (0 = no limit, set by gunicorn.conf.py)
+SSE_MAX_STREAMS = int(os.getenv('SSE_MAX_STREAMS', '0'))
+STATUS_HISTORY_SIZE = 64  # Past status revisions kept for ?since= deltas
+HISTORY_SECONDS = int(os.getenv('HISTORY_SECONDS', '86400'))  # Per-adapter metric history at 1s resolution
+HISTORY_MAX_ADAPTERS = 8  # Bounds history memory to ~3 MB per adapter per 24h
+METRICS_STORE_ENABLED = os.getenv('METRICS_STORE', 'true').lower() == 'true'
+METRICS_DB_PATH = os.getenv('METRICS_DB_PATH', 'metrics.db')  # SQLite file, relative to WorkingDirectory
+SNAPSHOT_WORKERS = 4  # CLI commands one /api/snapshot request runs at once
+PROMETHEUS_ENABLED = os.getenv('PROMETHEUS_METRICS', 'true').lower() == 'true'  # Instrumentation for /metrics
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+FLEET_PEERS = os.getenv('FLEET_PEERS', '')  # "name=http://host:5000,..." enables /api/fleet
+FLEET_POLL_SECONDS = float(os.getenv('FLEET_POLL_SECONDS', '2'))  # Per-peer poll interval
+FLEET_TIMEOUT_SECONDS = 2  # Connect/read timeout per peer request
+FLEET_FAILURE_THRESHOLD = 3  # Failures in a row before a peer's circuit opens
+FLEET_RETRY_SECONDS = 30  # Open circuit wait before probing the peer again
+EVENTS_LOG_SIZE = 500  # Detected events kept in memory for /api/events
+EVENT_RULES_PATH = os.getenv('EVENT_RULES_PATH')  # JSON list of rules replacing events.DEFAULT_RULES
+EVENTS_WEBHOOK_URL = os.getenv('EVENTS_WEBHOOK_URL')  # POST each event here as JSON
+EVENTS_LOG_FILE = os.getenv('EVENTS_LOG_FILE')  # Append each event here as a JSON line
+PROFILING_ENABLED = os.getenv('PROFILING', 'false').lower() == 'true'  # /debug/profile and phase timings
+PROFILE_MAX_SECONDS = 60
+USAGE_STATE_PATH = os.getenv('USAGE_STATE_PATH', 'usage.json')  # Usage rates kept across restarts ('' = memory only)
+USAGE_RATE_SECONDS = 300  # Time constant of the per-adapter usage rate average
+USAGE_WARN_PERCENT = 90  # Flag plans this full in /api/usage warnings
+COMMAND_TIMEOUT_SECONDS = 10  # Per state-changing CLI command (mode, ...)
+COMMAND_MAX_PENDING = 16  # Queued commands before /api/change-mode answers 503
+SNAPSHOT_SOCKET = os.getenv('SNAPSHOT_SOCKET')  # Set by gunicorn.conf.py: subscribe to the broker's collector
+BROKER_STATUS_WAIT_SECONDS = 3  # Longest a worker's status request waits on a CLI fallback (workers give up after 5)
+STATUS_MULTICAST = os.getenv('STATUS_MULTICAST', '')  # "group:port" (e.g. 239.255.77.77:5077) gets the binary status
+STATUS_MULTICAST_INTERVAL = float(os.getenv('STATUS_MULTICAST_INTERVAL', '1'))
+STATUS_MULTICAST_TTL = 1  # Keep packets on the local network
+EXPORT_DEFAULT_SECONDS = 86400  # /api/export range when from is not given
+EXPORT_DATASETS = ("samples", "sessions", "historic")
+SESSION_COLUMNS = ["ts", "bytesReceived", "bytesSent", "failovers", "connectedMinutes"]
+
+# Prometheus metrics served at /metrics
+_registry = telemetry.Registry()
+CLI_SECONDS = _registry.histogram(
+    "speedify_cli_duration_seconds", "Wall time of speedify_cli calls", ("command",))
+CLI_TIMEOUTS = _registry.counter(
+    "speedify_cli_timeouts", "speedify_cli calls killed after the timeout", ("command",))
+CLI_ERRORS = _registry.counter(
+    "speedify_cli_nonzero_exits", "speedify_cli calls that exited non-zero", ("command",))
+PARSE_SECONDS = _registry.histogram(
+    "speedify_cli_parse_seconds", "Time to parse speedify_cli output", ("command",),
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1))
+STATUS_BUILD_SECONDS = _registry.histogram(
+    "dashboard_status_build_seconds", "Time to build and serialize the status payload",
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1))
+REQUEST_SECONDS = _registry.histogram(
+    "dashboard_request_duration_seconds", "HTTP request latency by route", ("route", "method"))
+REQUESTS = _registry.counter(
+    "dashboard_requests", "HTTP requests by route and status code", ("route", "method", "code"))
+
+# Response cache with per key class TTLs and an LRU size cap
+_cache = ResponseCache(
+    CACHE_POLICIES,
+    default=CachePolicy(CACHE_TTL_SECONDS, CACHE_STALE_SECONDS, CACHE_NEGATIVE_SECONDS),
+    max_entries=CACHE_MAX_ENTRIES)
+
+# Coalesces concurrent CLI calls for the same cache key
+_inflight = SingleFlight()
+
+# Revisioned status payloads, plus the collector revision the newest was built from
+_status_revisions = StatusRevisions(history=STATUS_HISTORY_SIZE)
+_status_source = None
+_status_lock = Lock()
+
+# (revision, compact_status() list) of the newest revision and its binary encodings (see binary_status)
+_status_compact = None
+_binary_status = {}
+
+# One background status build for broker requests while the collector is stale (see serve_broker_status)
+_status_refresher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="status-refresh")
+_status_refresh = None
 
-# Response cache with thread safety
-_cache = {}
-_cache_lock = Lock()
+# Each open /api/status/stream holds a server thread until it closes
+_stream_slots = BoundedSemaphore(SSE_MAX_STREAMS) if SSE_MAX_STREAMS else None
+
+# UDP sender of the binary status (see start_status_broadcast)
+_broadcaster = None
+
+# Peer dashboards polled in fleet mode (see start_fleet)
+_fleet = None
+
+# Per-phase timings, recorded only with PROFILING enabled (see phase)
+_phases = profiler.PhaseTimings()
+_profile_lock = Lock()
+_NO_PHASE = contextlib.nullcontext()
+
+# Rendered dashboard page and static assets (see get_assets)
+_assets = None
+_assets_lock = Lock()
 
 
 def get_cached_result(cache_key):
     """Get cached result if not expired."""
-    with _cache_lock:
-        if cache_key in _cache:
-            cached_data, timestamp = _cache[cache_key]
-            if time.time() - timestamp < CACHE_TTL_SECONDS:
-                logger.debug(f"Cache hit for {cache_key}")
-                return cached_data
-            else:
-                # Expired, remove from cache
-                del _cache[cache_key]
-    return None
+    return _cache.get(cache_key)
 
 
 def set_cached_result(cache_key, data):
     """Store result in cache with current timestamp."""
-    with _cache_lock:
-        _cache[cache_key] = (data, time.time())
+    _cache.set(cache_key, data)
 
 
 def clear_cache():
     """Clear all cached results."""
-    with _cache_lock:
-        _cache.clear()
+    global _status_source
+    _cache.clear()
+    with _status_lock:
+        _status_source = None
+
+
+def invalidate_cache(*key_classes):
+    """Drop the cached results of the given key classes (see CACHE_POLICIES)."""
+    global _status_source
+    _cache.invalidate(*key_classes)
+    with _status_lock:
+        _status_source = None
+
+
+def store_fetch_result(cache_key, data, cacheable, generation=None):
+    """Cache a fetch() result; failures are cached briefly so a broken CLI isn't hammered.
+
+    generation is _cache.generation from before the fetch started; results
+    that a command has made stale in the meantime are not stored.
+    """
+    if cacheable:
+        _cache.set(cache_key, data, generation=generation)
+    else:
+        _cache.set_failure(cache_key, data, generation=generation)
+
+
+def cached_fetch(cache_key, fetch):
+    """Get a cached result, calling fetch() at most once at a time per key.
+
+    fetch() returns (data, cacheable). A fresh cached value, or a recent
+    failure, is returned as-is. A recently expired value is returned
+    immediately while a single background refresh runs
+    (stale-while-revalidate). On a miss, concurrent callers wait for one
+    shared fetch() instead of each running the CLI.
+    """
+    state, cached = _cache.lookup(cache_key)
+    if state in (FRESH, NEGATIVE):
+        return cached
+
+    def refresh():
+        # Another caller may have refreshed the key while this one was queued
+        state, cached = _cache.lookup(cache_key, count=False)
+        if state in (FRESH, NEGATIVE):
+            return cached
+        generation = _cache.generation
+        data, cacheable = fetch()
+        store_fetch_result(cache_key, data, cacheable, generation)
+        return data
+
+    if state == STALE:
+        _inflight.do_async(cache_key, refresh)
+        return cached
+    return _inflight.do(cache_key, refresh)
+
+
+# Background stats collector (started by start_collector())
+_collector = None
+
+# Answers stream-backed commands from the collector and counts CLI spawns
+_cli = CliSession()
+
+# Runs state-changing CLI commands one at a time (reads do not wait for it)
+_commands = CommandQueue(lambda args: run_cli(args, timeout=COMMAND_TIMEOUT_SECONDS), invalidate_cache,
+                         max_pending=COMMAND_MAX_PENDING)
+
+# Per-adapter metric history, fed from connection_stats
+_history = MetricHistory(capacity=HISTORY_SECONDS, max_adapters=HISTORY_MAX_ADAPTERS)
+_history_source = None  # Last stats dict recorded by the non-collector path
+
+
+def event_sinks():
+    """Sinks configured by EVENTS_WEBHOOK_URL / EVENTS_LOG_FILE."""
+    sinks = []
+    if EVENTS_WEBHOOK_URL:
+        sinks.append(WebhookSink(EVENTS_WEBHOOK_URL))
+    if EVENTS_LOG_FILE:
+        sinks.append(FileSink(EVENTS_LOG_FILE))
+    return sinks
+
+
+# Rule engine fed with every stats section, from the collector or one-shot CLI calls
+_events = EventEngine(load_rules(EVENT_RULES_PATH) if EVENT_RULES_PATH else None,
+                      log_size=EVENTS_LOG_SIZE, sinks=event_sinks())
+
+# Per-adapter data usage rates, fed like the event rules (see start_usage)
+_usage = UsageTracker(time_constant=USAGE_RATE_SECONDS)
+
+# Persistent metrics store (started by start_collector())
+_store = None
+
+# Adapts the collector's sampling rate (started by start_collector())
+_sampler = None
+
+# Multi-worker serving: the broker process's SnapshotBroker, or a worker's SnapshotClient
+_broker = None
+_snapshot_client = None
+
+
+def start_services():
+    """Start the background services of a serving process.
+
+    A worker under gunicorn (SNAPSHOT_SOCKET set) subscribes to the
+    broker's collector instead of running the CLI. The broker owns the
+    status revisions, metrics store, event rules and usage rates, so the
+    worker only keeps in-memory state for its responses.
+    """
+    get_assets()
+    if SNAPSHOT_SOCKET:
+        _events.sinks = []
+    else:
+        _events.start()
+        atexit.register(_events.stop)
+        start_usage()
+    start_collector()
+    start_fleet()
+    if not SNAPSHOT_SOCKET:
+        start_status_broadcast()
+
+
+def stop_services():
+    """Stop what start_services() started, saving the usage rates."""
+    stop_status_broadcast()
+    stop_fleet()
+    stop_collector()
+    if not SNAPSHOT_SOCKET:
+        _events.stop()
+        _usage.save()
+
+
+def start_collector():
+    """Start the background `speedify_cli stats` collector if enabled.
+
+    The collector feeds the in-memory history and, if enabled, the on-disk
+    metrics store. With adaptive sampling, its rate follows link conditions
+    and client demand.
+    """
+    global _collector, _store, _sampler
+    if not COLLECTOR_ENABLED or _collector is not None:
+        return _collector
+    if SNAPSHOT_SOCKET:
+        return start_snapshot_client()
+    _collector = StatsCollector(SPEEDIFY_CLI_PATH)
+    _collector.add_listener(record_history)
+    _collector.add_listener(_events.observe)
+    _collector.add_listener(_usage.record)
+    if METRICS_STORE_ENABLED:
+        _store = MetricsStore(METRICS_DB_PATH)
+        _store.start()
+        _collector.add_listener(_store.record)
+    if SAMPLER_ENABLED:
+        idle_interval = 0
+        consumers = standing_demand()
+        if SAMPLER_IDLE_SECONDS and consumers:
+            idle_interval = SAMPLER_IDLE_INTERVAL_SECONDS
+            logger.info(f"Idle sampling every {idle_interval}s for {', '.join(consumers)}")
+        _sampler = AdaptiveSampler(
+            _collector, calculate_status_level,
+            slow_interval=SAMPLER_SLOW_INTERVAL_SECONDS,
+            calm_seconds=SAMPLER_CALM_SECONDS,
+            idle_seconds=SAMPLER_IDLE_SECONDS,
+            idle_interval=idle_interval)
+        _collector.add_listener(_sampler.observe)
+    _collector.start()
+    _cli.attach(_collector)
+    if _sampler is not None:
+        _sampler.start()
+    atexit.register(stop_collector)
+    return _collector
+
+
+def standing_demand():
+    """Consumers that need samples even when no client reads status.
+
+    While any is enabled, idle mode still takes a one-shot sample every
+    SAMPLER_IDLE_INTERVAL_SECONDS, so the metrics store, event sinks and
+    persisted usage rates (and exports built from them) keep getting data.
+    """
+    consumers = []
+    if METRICS_STORE_ENABLED:
+        consumers.append("metrics store")
+    if _events.sinks:
+        consumers.append("event sinks")
+    if USAGE_STATE_PATH:
+        consumers.append("usage tracking")
+    return consumers
+
+
+def start_snapshot_client():
+    """Subscribe to the broker's collector at SNAPSHOT_SOCKET (gunicorn workers).
+
+    Sections feed the in-memory history. Status payloads, events and
+    usage come from the broker (see broker_status and broker_query), the
+    metrics store is opened for queries only, and commands go to the
+    broker's queue so they stay serialized across workers.
+    """
+    global _collector, _store, _snapshot_client, _commands
+    _collector = _snapshot_client = SnapshotClient(SNAPSHOT_SOCKET, on_invalidate=invalidate_cache)
+    _collector.add_listener(record_history)
+    if METRICS_STORE_ENABLED:
+        _store = MetricsStore(METRICS_DB_PATH)
+    _commands = RemoteCommandQueue(_snapshot_client.request)
+    _collector.start()
+    _cli.attach(_collector)
+    atexit.register(stop_collector)
+    return _collector
+
+
+def start_broker(path):
+    """Run the collector for gunicorn workers and serve it on a Unix socket.
+
+    Called by snapshot_broker.py. Besides the collector, this process runs
+    the sampler, metrics store, event sinks, usage file and command queue.
+    """
+    global _broker
+    get_assets()
+    _events.start()
+    atexit.register(_events.stop)
+    start_usage()
+    collector = start_collector()
+    _broker = SnapshotBroker(path, collector, max_age=collector_max_age, handlers={
+        "demand": lambda message: record_demand(),
+        "status": serve_broker_status,
+        "events": lambda message: dict(zip(("body", "status"), query_events(message["args"]))),
+        "usage": lambda message: {"body": usage_report()},
+        "submit": broker_submit,
+        "job": lambda message: {"job": _commands.get(message["id"])},
+        "stats": lambda message: {"cli": _cli.stats()},
+    })
+    _commands.invalidate = broadcast_invalidation
+    _broker.start()
+    start_status_broadcast()
+    return _broker
+
+
+def broker_submit(message):
+    """Broker handler: queue a worker's command."""
+    try:
+        job = _commands.submit(message["args"], message.get("invalidates", ()), message.get("message"))
+    except QueueFull as e:
+        return {"full": str(e)}
+    return {"job": _commands.get(job.id)}
+
+
+def broadcast_invalidation(*key_classes):
+    """After a command, drop the affected cache classes here and in every worker."""
+    invalidate_cache(*key_classes)
+    if _broker is not None:
+        _broker.broadcast({"type": "invalidate", "classes": list(key_classes)})
+
+
+def collector_max_age():
+    """Oldest collector snapshot still served instead of a direct CLI call."""
+    sampler_age = _sampler.max_age() if _sampler is not None else None
+    if _snapshot_client is not None:
+        sampler_age = _snapshot_client.max_age
+    return max(COLLECTOR_MAX_AGE_SECONDS, sampler_age or 0)
+
+
+def record_demand():
+    """Note that a client asked for current status (resumes idle sampling)."""
+    if _sampler is not None:
+        _sampler.touch()
+    elif _snapshot_client is not None:
+        _snapshot_client.touch()
+
+
+def record_history(section_name, section_data):
+    """Collector listener that feeds connection_stats into the metric history."""
+    if section_name == "connection_stats":
+        _history.record(section_data)
+
+
+def stop_collector():
+    """Stop the background collector and flush the metrics store, if running."""
+    global _collector, _store, _sampler, _snapshot_client
+    _snapshot_client = None
+    if _sampler is not None:
+        _sampler.stop()
+        _sampler = None
+    if _collector is not None:
+        _cli.detach()
+        _collector.stop()
+        _collector = None
+    if _store is not None:
+        _store.stop()
+        _store = None
+
+
+def start_status_broadcast():
+    """Send the binary status to STATUS_MULTICAST every interval, if configured.
+
+    Under gunicorn the broker sends it, so the LAN gets one packet per
+    interval however many workers run.
+    """
+    global _broadcaster
+    if not STATUS_MULTICAST or _broadcaster is not None:
+        return _broadcaster
+    try:
+        address = parse_address(STATUS_MULTICAST)
+    except ValueError as e:
+        logger.error(f"Ignoring STATUS_MULTICAST: {e}")
+        return None
+    _broadcaster = StatusBroadcaster(status_packet, address, interval=STATUS_MULTICAST_INTERVAL,
+                                     ttl=STATUS_MULTICAST_TTL)
+    _broadcaster.start()
+    atexit.register(stop_status_broadcast)
+    return _broadcaster
+
+
+def stop_status_broadcast():
+    global _broadcaster
+    if _broadcaster is not None:
+        _broadcaster.stop()
+        _broadcaster = None
+
+
+def status_packet():
+    """The newest status as CBOR, for the UDP broadcast.
+
+    Counts as demand like any other status reader, so the displays keep
+    the sampler from going idle.
+    """
+    get_status_payload()
+    return binary_status(status_feed.CBOR)[1]
+
+
+def start_usage():
+    """Restore usage rates saved by the previous run and save them again at exit."""
+    if USAGE_STATE_PATH and _usage.path is None:
+        _usage.load(USAGE_STATE_PATH)
+        atexit.register(_usage.save)
+
+
+def start_fleet():
+    """Start polling the FLEET_PEERS dashboards, if any are configured."""
+    global _fleet
+    peers = parse_peers(FLEET_PEERS)
+    if not peers or _fleet is not None:
+        return _fleet
+    _fleet = FleetAggregator(
+        peers, summarize_fleet_node,
+        poll_interval=FLEET_POLL_SECONDS,
+        timeout=FLEET_TIMEOUT_SECONDS,
+        failure_threshold=FLEET_FAILURE_THRESHOLD,
+        retry_seconds=FLEET_RETRY_SECONDS)
+    _fleet.start()
+    atexit.register(stop_fleet)
+    logger.info(f"Fleet mode: polling {len(peers)} peer dashboards")
+    return _fleet
+
+
+def stop_fleet():
+    global _fleet
+    if _fleet is not None:
+        _fleet.stop()
+        _fleet = None
+
+
+def summarize_fleet_node(payload):
+    """Per-node fields of the fleet view, scored with this dashboard's thresholds.
+
+    Peer payloads carry averages with loss as a percentage. A node with no
+    active connections scores 0 rather than the "no data" 100.
+    """
+    overall = payload.get("overall", {})
+    performance = payload.get("performance", {})
+    active = performance.get("activeConnections", 0)
+    metrics = (performance.get("latency", 0), performance.get("jitter", 0), performance.get("mos", 0),
+               performance.get("lossSend", 0) / 100, performance.get("lossReceive", 0) / 100)
+    return {
+        "state": overall.get("state", "UNKNOWN"),
+        "healthScore": calculate_health_score(*metrics) if active else 0,
+        "status": calculate_status_level(*metrics) if active else "bad",
+        "bondingMode": overall.get("bondingMode", "unknown"),
+        "activeConnections": active,
+        "adapters": len(payload.get("adapters", [])),
+        "failovers": payload.get("session", {}).get("failovers", 0),
+        "latency": performance.get("latency", 0),
+        "lossSend": performance.get("lossSend", 0),
+        "lossReceive": performance.get("lossReceive", 0),
+        "revision": payload.get("revision"),
+    }
+
 
+app = Flask(__name__, static_folder=None)  # static/ is served precompressed by static_asset()
+
+def cli_command_label(cmd_args):
+    """Metric label for a CLI call: the subcommand without its arguments."""
+    if cmd_args[:1] == ["show"] and len(cmd_args) > 1:
+        return f"show {cmd_args[1]}"
+    return cmd_args[0] if cmd_args else ""
+
+
+def record_cli_call(cmd_args, seconds, returncode=None, timed_out=False):
+    """Record one speedify_cli execution in the spawn counts and /metrics counters."""
+    command = cli_command_label(cmd_args)
+    _cli.record_spawn(command)
+    if not PROMETHEUS_ENABLED:
+        return
+    CLI_SECONDS.observe(seconds, command)
+    if timed_out:
+        CLI_TIMEOUTS.inc(command)
+    elif returncode:
+        CLI_ERRORS.inc(command)
+
+
+def phase(name):
+    """Context manager timing one phase of request handling for /debug/profile.
+
+    A shared no-op unless PROFILING is enabled.
+    """
+    if not PROFILING_ENABLED:
+        return _NO_PHASE
+    return _phases.time(name)
+
+
+def run_cli(cmd_args, timeout=10):
+    """subprocess.run() speedify_cli with cmd_args, recording its duration and outcome."""
+    start = time.perf_counter()
+    try:
+        if PROFILING_ENABLED:
+            result = run_cli_phases(cmd_args, timeout)
+        else:
+            result = subprocess.run([SPEEDIFY_CLI_PATH] + cmd_args,
+                                  stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+                                  timeout=timeout)
+    except subprocess.TimeoutExpired:
+        record_cli_call(cmd_args, time.perf_counter() - start, timed_out=True)
+        raise
+    record_cli_call(cmd_args, time.perf_counter() - start, result.returncode)
+    return result
+
+
+def run_cli_phases(cmd_args, timeout):
+    """subprocess.run() split into the "cli.spawn" and "cli.read" phases."""
+    with phase("cli.spawn"):
+        process = subprocess.Popen([SPEEDIFY_CLI_PATH] + cmd_args,
+                                   stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    with process, phase("cli.read"):
+        try:
+            stdout, stderr = process.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.communicate()
+            raise
+    return subprocess.CompletedProcess(process.args, process.returncode, stdout, stderr)
+
+
+def timed_parse(cmd_args, parse, text):
+    """Run parse(text), recording its duration under the command's label."""
+    with phase("parse"):
+        if not PROMETHEUS_ENABLED:
+            return parse(text)
+        with PARSE_SECONDS.time(cli_command_label(cmd_args)):
+            return parse(text)
 
-app = Flask(__name__)
 
 def run_speedify_cli(cmd_args, use_cache=True):
     """Run Speedify CLI command with optional caching.
@@ -63,58 +638,18 @@ def run_speedify_cli(cmd_args, use_cache=True):
     """
     cache_key = f"cli:{':'.join(cmd_args)}"
 
-    # Check cache first
-    if use_cache:
-        cached = get_cached_result(cache_key)
-        if cached is not None:
-            return cached
+    def fetch():
+        try:
+            result = run_cli(cmd_args)
+            # The output contains multiple JSON arrays, one per section
+            return timed_parse(cmd_args, parse_sections, result.stdout), True
+        except Exception as e:
+            logger.error(f"Error running Speedify CLI: {e}")
+            return {}, False
 
-    try:
-        result = subprocess.run([SPEEDIFY_CLI_PATH] + cmd_args,
-                              stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
-                              timeout=10)
-        # Parse the complex JSON structure returned by Speedify CLI
-        raw_output = result.stdout.strip()
-
-        # The output contains multiple JSON arrays, we need to parse each section
-        sections = {}
-        lines = raw_output.split('\n')
-        current_json = ""
-
-        for line in lines:
-            if line.strip():
-                current_json += line
-            else:
-                if current_json.strip():
-                    try:
-                        parsed = json.loads(current_json)
-                        if isinstance(parsed, list) and len(parsed) >= 2:
-                            section_name = parsed[0]
-                            section_data = parsed[1]
-                            sections[section_name] = section_data
-                    except json.JSONDecodeError:
-                        pass
-                    current_json = ""
-
-        # Handle the last section if no trailing newline
-        if current_json.strip():
-            try:
-                parsed = json.loads(current_json)
-                if isinstance(parsed, list) and len(parsed) >= 2:
-                    section_name = parsed[0]
-                    section_data = parsed[1]
-                    sections[section_name] = section_data
-            except json.JSONDecodeError:
-                pass
-
-        # Cache the result
-        if use_cache:
-            set_cached_result(cache_key, sections)
-
-        return sections
-    except Exception as e:
-        logger.error(f"Error running Speedify CLI: {e}")
-        return {}
+    if not use_cache:
+        return fetch()[0]
+    return cached_fetch(cache_key, fetch)
 
 def calculate_health_score(latency, jitter, mos, loss_send, loss_receive):
     """Calculate health score 0-100 based on connection metrics.
@@ -225,38 +760,172 @@ def format_bytes(bytes_val):
     else:
         return f"{bytes_val} B"
 
+def header_weights(value):
+    """{token: q} from an Accept or Accept-Encoding header value."""
+    weights = {}
+    for part in (value or "").split(","):
+        name, *params = part.split(";")
+        q = 1.0
+        for param in params:
+            key, _, value = param.strip().partition("=")
+            if key.lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[name.strip().lower()] = q
+    return weights
+
+
+def accepts_encoding(accept_encoding, coding):
+    """Whether an Accept-Encoding header value allows coding (q > 0)."""
+    weights = header_weights(accept_encoding)
+    return weights.get(coding, weights.get("*", 0.0)) > 0
+
+
+def preferred_media_type(accept, offered):
+    """The media type in offered that an Accept header value ranks highest.
+
+    Ties go to the earlier offer, and offered[0] is the answer when the
+    header is missing or accepts none of them.
+    """
+    weights = header_weights(accept)
+
+    def weight(media_type):
+        wildcard = f"{media_type.partition('/')[0]}/*"
+        return weights.get(media_type, weights.get(wildcard, weights.get("*/*", 0.0)))
+
+    best = max(offered, key=weight)
+    return best if weight(best) > 0 else offered[0]
+
+
+def etag_matches(if_none_match, *etags):
+    """Whether an If-None-Match header value matches any of etags (weak comparison)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return any(etag in candidates for etag in etags)
+
+
+def negotiated_response(representations, content_type, if_none_match, accept_encoding, headers=None):
+    """Choose between pre-encoded representations of one resource.
+
+    representations maps a content coding ("identity", "gzip", "br") to
+    (etag, bytes). Returns (status, body, headers): 304 with no body when the
+    client's ETag matches any representation, otherwise the best coding the
+    client accepts.
+    """
+    coding = next((c for c in CODINGS if c in representations and accepts_encoding(accept_encoding, c)),
+                  "identity")
+    etag, body = representations[coding]
+    headers = dict(headers or {}, ETag=etag)
+    headers.setdefault("Vary", "Accept-Encoding")
+    if etag_matches(if_none_match, *(tag for tag, _ in representations.values())):
+        return 304, b"", headers
+    headers["Content-Type"] = content_type
+    if coding != "identity":
+        headers["Content-Encoding"] = coding
+    return 200, body, headers
+
+
+def get_assets():
+    """Return (bundle, page): the static assets and the rendered dashboard page.
+
+    Built on first use (and at startup by __main__). The page is rendered
+    once with versioned asset URLs and kept precompressed like the assets.
+    """
+    global _assets
+    if _assets is None:
+        with _assets_lock:
+            if _assets is None:
+                bundle = AssetBundle(STATIC_DIR)
+                with app.app_context():
+                    html = render_template("index.html", asset_url=bundle.url)
+                page = encode_asset("index.html", "/", html.encode(), "text/html; charset=utf-8")
+                _assets = bundle, page
+                logger.info(f"Loaded dashboard page and {len(bundle)} static assets")
+    return _assets
+
+
+def asset_response(asset, cache_control):
+    status, body, headers = negotiated_response(
+        asset.representations, asset.content_type, request.headers.get("If-None-Match"),
+        request.headers.get("Accept-Encoding"), {"Cache-Control": cache_control})
+    return Response(body, status=status, headers=headers)
+
+
 @app.route("/")
 def index():
-    return render_template("index.html")
+    """Dashboard page: rendered once, precompressed and revalidated by ETag."""
+    return asset_response(get_assets()[1], REVALIDATE)
+
+
+@app.route("/static/<path:filename>")
+def static_asset(filename):
+    """Static files; versioned (content-hashed) names are cached forever."""
+    asset, immutable = get_assets()[0].get(filename)
+    if asset is None:
+        return jsonify({"success": False, "error": "Not found"}), 404
+    return asset_response(asset, IMMUTABLE if immutable else REVALIDATE)
+
 
 def get_speedify_settings():
     """Get Speedify settings with caching."""
-    cache_key = "settings"
-    cached = get_cached_result(cache_key)
-    if cached is not None:
-        return cached
+    def fetch():
+        try:
+            result = run_cli(['show', 'settings'])
+            return parse_settings(result.returncode, result.stdout)
+        except Exception as e:
+            logger.error(f"Error getting settings: {e}")
+        return {}, False
 
-    try:
-        result = subprocess.run([SPEEDIFY_CLI_PATH, 'show', 'settings'],
-                              stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
-                              timeout=10)
-        if result.returncode == 0:
-            settings = json.loads(result.stdout.strip())
-            set_cached_result(cache_key, settings)
-            return settings
-    except (json.JSONDecodeError, Exception) as e:
-        logger.error(f"Error getting settings: {e}")
-    return {}
+    return cached_fetch("settings", fetch)
 
 
-@app.route("/api/status")
-def get_status():
-    # Get comprehensive stats
-    stats_data = run_speedify_cli(["stats", "1"])
+def parse_settings(returncode, stdout):
+    """Parse `show settings` output into (settings, cacheable)."""
+    if returncode == 0:
+        try:
+            return timed_parse(['show', 'settings'], json.loads, stdout.strip()), True
+        except json.JSONDecodeError as e:
+            logger.error(f"Error getting settings: {e}")
+    return {}, False
 
-    # Get current settings for accurate bonding mode (cached)
-    current_settings = get_speedify_settings()
-    
+
+def get_stats_data():
+    """Get the newest stats sections.
+
+    Reads the background collector's snapshot when it is fresh, otherwise
+    falls back to a one-shot `stats 1` CLI call.
+    """
+    sections = _cli.streamed(["stats", "1"], collector_max_age(), "stats")
+    if sections is not None:
+        return sections
+    sections = run_speedify_cli(["stats", "1"])
+    record_stats_result(sections)
+    return sections
+
+
+def record_stats_result(sections):
+    """Record a one-shot `stats 1` result into the metric history, event rules and usage.
+
+    Each fresh CLI result is recorded once; cache hits return the same dict.
+    """
+    global _history_source
+    if sections is not _history_source and "connection_stats" in sections:
+        _history_source = sections
+        _history.record(sections["connection_stats"])
+        if _snapshot_client is not None:
+            return  # The broker's rules and usage rates see its own sections
+        for section_name, section_data in sections.items():
+            _events.observe(section_name, section_data)
+            _usage.record(section_name, section_data)
+
+
+def build_status(stats_data, current_settings):
+    """Build the /api/status payload from parsed stats sections and settings."""
     # Extract different sections
     state = stats_data.get("state", {})
     connection_stats = stats_data.get("connection_stats", {})
@@ -344,6 +1013,11 @@ def get_status():
         "badMemory": streaming_stats.get("badMemory", False)
     }
     
+    # Index connections by adapter (first connection wins, as before)
+    connections_by_adapter = {}
+    for conn in detailed_connections:
+        connections_by_adapter.setdefault(conn["adapterID"], conn)
+
     # Process adapters with enhanced info
     processed_adapters = []
     for adapter in adapters_data:
@@ -352,8 +1026,7 @@ def get_status():
             adapter_status = "bad"
         
         # Find matching connection data
-        matching_conn = next((conn for conn in detailed_connections 
-                             if conn["adapterID"] == adapter.get("adapterID")), None)
+        matching_conn = connections_by_adapter.get(adapter.get("adapterID"))
         
         processed_adapters.append({
             "adapterID": adapter.get("adapterID", "Unknown"),
@@ -370,7 +1043,7 @@ def get_status():
             "connectionStats": matching_conn
         })
     
-    return jsonify({
+    return {
         "overall": {
             "state": overall_state,
             "status": overall_status,
@@ -396,104 +1069,1009 @@ def get_status():
         },
         "adapters": processed_adapters,
         "connections": detailed_connections
+    }
+
+
+def get_status_payload():
+    """Return (revision, payload, json_text) for the newest stats snapshot.
+
+    With the collector running, the payload is built once per collector
+    revision and shared by every /api/status and stream client. The status
+    revision only advances when the payload content changes.
+    """
+    record_demand()
+    source = collector_source()
+    current = memoized_status(source)
+    if current is not None:
+        return current
+    if _snapshot_client is not None:
+        current = broker_status(source)
+        if current is not None:
+            return current
+    return publish_status(get_stats_data(), get_speedify_settings(), source)
+
+
+def collector_source():
+    """Collector revision the next payload would be built from, or None if it is stale."""
+    if _collector is not None and _collector.latest(collector_max_age()) is not None:
+        return _collector.revision
+    return None
+
+
+def memoized_status(source):
+    """The published status if it was already built from source.
+
+    source is a collector revision, or the (stats, settings) objects for
+    payloads built from cached CLI results.
+    """
+    if source is None:
+        return None
+    with _status_lock:
+        current = _status_revisions.current()
+        if current is not None and _status_source == source:
+            return current
+    return None
+
+
+def publish_status(stats_data, current_settings, source):
+    """Build and publish a status payload, remembering the source it came from.
+
+    Without a collector revision the inputs themselves are the source, so
+    requests answered from the same cached CLI results reuse the payload
+    instead of rebuilding it.
+    """
+    global _status_source, _status_compact
+    if source is None:
+        source = (stats_data, current_settings)
+        current = memoized_status(source)
+        if current is not None:
+            return current
+    start = time.perf_counter()
+    with phase("aggregate"):
+        payload = build_status(stats_data, current_settings)
+    # The revision swap and its source tag change together, so a concurrent
+    # publish cannot pair this payload with another build's source
+    with _status_lock, phase("serialize"):
+        current = _status_revisions.publish(payload)
+        _status_source = source
+        if _status_compact is None or _status_compact[0] != current[0]:
+            _status_compact = (current[0], compact_status(current[0], current[1], stats_data, time.time()))
+    if PROMETHEUS_ENABLED:
+        STATUS_BUILD_SECONDS.observe(time.perf_counter() - start)
+    return current
+
+
+def broker_status(source):
+    """Take the newest status from the snapshot broker (gunicorn workers).
+
+    The broker builds and numbers every payload, so revisions, ETags,
+    ?since= deltas and SSE ids agree whichever worker a client reaches.
+    Returns None if the broker cannot answer; the worker then builds the
+    payload itself.
+    """
+    global _status_source, _status_compact
+    current = _status_revisions.current()
+    try:
+        reply = _snapshot_client.request("status", since=current[0] if current is not None else None)
+    except OSError:
+        return None  # The client logs losing the broker
+    if reply.get("revision") is None:
+        return None
+    with _status_lock:
+        if "payload" in reply:
+            current = _status_revisions.adopt(reply["revision"], reply["payload"])
+            if reply.get("compact") is not None:
+                _status_compact = (current[0], reply["compact"])
+        _status_source = source
+    return _status_revisions.current()
+
+
+def serve_broker_status(message):
+    """Broker handler: the newest status, or only its revision if the worker has it.
+
+    Built from the collector's snapshot when it is fresh. While it is stale
+    (idle sampling, a restarting CLI) one shared background build runs the
+    CLI fallback, and requests wait for it at most BROKER_STATUS_WAIT_SECONDS
+    before getting the newest published status instead.
+    """
+    if collector_source() is not None:
+        current = get_status_payload()
+    else:
+        record_demand()
+        try:
+            current = refresh_status().result(BROKER_STATUS_WAIT_SECONDS)
+        except FutureTimeout:
+            current = _status_revisions.current()
+            if current is None:
+                return {"revision": None}  # The worker builds the payload itself
+    revision, payload, _ = current
+    if message.get("since") == revision:
+        return {"revision": revision}
+    with _status_lock:
+        compact = _status_compact[1] if _status_compact is not None and _status_compact[0] == revision else None
+    return {"revision": revision, "payload": payload, "compact": compact}
+
+
+def refresh_status():
+    """Future of a background get_status_payload(), shared by concurrent callers."""
+    global _status_refresh
+    with _status_lock:
+        if _status_refresh is None or _status_refresh.done():
+            _status_refresh = _status_refresher.submit(get_status_payload)
+        return _status_refresh
+
+
+def binary_status(media_type):
+    """(revision, bytes): the newest revision in a status_feed media type.
+
+    Encoded on first use and kept until the next revision, so polling
+    displays and the UDP broadcast share one encoding.
+    """
+    with _status_lock:
+        newest = _status_compact
+        if newest is None:
+            return None, None
+        revision = newest[0]
+        cached = _binary_status.get(media_type)
+        if cached is not None and cached[0] == revision:
+            return cached
+    body = status_feed.encode(newest[1], media_type)
+    with _status_lock:
+        if _status_compact is newest:
+            _binary_status[media_type] = (revision, body)
+    return revision, body
+
+
+def status_view(since=None):
+    """Resolve an /api/status request against the published revisions.
+
+    Returns (revision, body, is_patch): body is None when the client is
+    already at the newest revision, a merge-patch when is_patch is set and
+    the full payload otherwise.
+    """
+    revision, payload, _ = _status_revisions.current()
+    if since is not None:
+        revision, patch = _status_revisions.delta(since)
+        if patch == {}:
+            return revision, None, False
+        if patch is not None:
+            return revision, patch, True
+        # Unknown or expired revision: fall through to the full payload
+        revision, payload, _ = _status_revisions.current()
+    return revision, payload, False
+
+
+def status_event(revision, payload, json_text, last_revision, last_payload):
+    """Format one SSE status event: a merge-patch against the previous event when possible."""
+    if last_payload is not None:
+        event, data = "patch", json.dumps(merge_patch(last_payload, payload), separators=(",", ":"))
+    else:
+        _, patch = _status_revisions.delta(last_revision)
+        if patch is not None:
+            event, data = "patch", json.dumps(patch, separators=(",", ":"))
+        else:
+            event, data = "status", json_text
+    return f"id: {revision}\nevent: {event}\ndata: {data}\n\n"
+
+
+def encoded_status_response(encoded, if_none_match, accept_encoding):
+    """Pick the pre-encoded representation of the full status payload.
+
+    Returns (status, body, headers) as negotiated_response() does, with the
+    plain or gzip bytes as they were serialized at publish time.
+    """
+    representations = {"identity": (encoded.etag, encoded.body), "gzip": (encoded.gzip_etag, encoded.gzip_body)}
+    return negotiated_response(representations, "application/json", if_none_match, accept_encoding,
+                               {"Cache-Control": REVALIDATE, "X-Status-Revision": str(encoded.revision),
+                                "Vary": "Accept, Accept-Encoding"})
+
+
+def status_media_type(accept):
+    """JSON, or the binary status_feed encoding an Accept header asks for."""
+    return preferred_media_type(accept, ("application/json",) + status_feed.media_types())
+
+
+def binary_status_response(media_type, if_none_match):
+    """The newest full status in a binary media type, as (status, body, headers).
+
+    The compact form has no merge-patch deltas and is small enough that it
+    is not compressed.
+    """
+    revision, body = binary_status(media_type)
+    etag = f'"{revision}-{media_type.rpartition("/")[2]}"'
+    return negotiated_response({"identity": (etag, body)}, media_type, if_none_match, None,
+                               {"Cache-Control": REVALIDATE, "X-Status-Revision": str(revision),
+                                "Vary": "Accept, Accept-Encoding"})
+
+
+@app.route("/api/status")
+def get_status():
+    """Full status payload, or a JSON merge-patch when called with ?since=<revision>.
+
+    Full payloads are served from bytes encoded once per revision, with a
+    strong ETag for If-None-Match and gzip when the client accepts it.
+    `Accept: application/cbor` (or application/msgpack, with msgpack
+    installed) gets the compact binary form instead (see status_feed).
+    """
+    get_status_payload()
+    status, body, headers = query_status(
+        request.args.get("since", type=int), request.headers.get("Accept"),
+        request.headers.get("If-None-Match"), request.headers.get("Accept-Encoding"))
+    return Response(body, status=status, headers=headers)
+
+
+def query_status(since, accept, if_none_match, accept_encoding):
+    """Answer an /api/status request from the published revisions.
+
+    Returns (status, body, headers) as negotiated_response() does; the
+    caller has already run get_status_payload().
+    """
+    media_type = status_media_type(accept)
+    if media_type != "application/json":
+        return binary_status_response(media_type, if_none_match)
+    if since is None:
+        return encoded_status_response(_status_revisions.encoded(), if_none_match, accept_encoding)
+    revision, body, is_patch = status_view(since)
+    headers = {"X-Status-Revision": str(revision)}
+    if body is None:
+        return 304, b"", headers
+    headers["Content-Type"] = "application/merge-patch+json" if is_patch else "application/json"
+    with phase("serialize"):
+        return 200, json.dumps(body, separators=(",", ":")).encode(), headers
+
+
+@app.route("/api/status/stream")
+def stream_status():
+    """Server-Sent Events feed that pushes status changes.
+
+    The first event is the full payload ("status"); later events are JSON
+    merge-patches ("patch") against the previous event. A reconnecting
+    EventSource resumes from its Last-Event-ID with a patch when possible.
+
+    Every stream holds a server thread, so past SSE_MAX_STREAMS streams the
+    request gets a 503; the page then polls /api/status and retries later.
+    """
+    if _stream_slots is not None and not _stream_slots.acquire(blocking=False):
+        return {"success": False, "error": f"Too many status streams ({SSE_MAX_STREAMS}), poll /api/status"}, 503, {
+            "Retry-After": "5"}
+    last_event_id = request.headers.get("Last-Event-ID", type=int)
+
+    def generate():
+        # Ask EventSource to reconnect after 3s if the stream drops
+        yield f"retry: {SSE_RETRY_MS}\n\n"
+        source_revision = None
+        last_payload = None
+        last_revision = last_event_id
+        last_sent = time.time()
+        while True:
+            revision, payload, json_text = get_status_payload()
+            if revision != last_revision:
+                event = status_event(revision, payload, json_text, last_revision, last_payload)
+                last_payload = payload
+                last_revision = revision
+                last_sent = time.time()
+                yield event
+            elif time.time() - last_sent >= SSE_HEARTBEAT_SECONDS:
+                # Comment line keeps proxies from closing an idle stream
+                last_sent = time.time()
+                yield ": keepalive\n\n"
+
+            if _collector is not None:
+                source_revision = _collector.wait_for_update(source_revision, timeout=SSE_HEARTBEAT_SECONDS)
+                # Let the rest of the stats cycle arrive before rebuilding
+                time.sleep(SSE_MIN_INTERVAL_SECONDS)
+            else:
+                time.sleep(SSE_FALLBACK_POLL_SECONDS)
+
+    response = Response(generate(), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
     })
+    if _stream_slots is not None:
+        response.call_on_close(_stream_slots.release)
+    return response
 
-# Add route to get current server info
-@app.route("/api/server")
-def get_server():
-    cache_key = "server"
-    cached = get_cached_result(cache_key)
-    if cached is not None:
-        return jsonify(cached)
+@app.route("/api/history")
+def get_history():
+    """Downsampled per-adapter metric history.
+
+    Query parameters (all optional):
+        adapter: Adapter ID (default: all adapters)
+        metric: One of METRICS (default: all metrics)
+        from, to: Unix timestamps (default: the last hour)
+        step: Bucket size in seconds (default: at most 1000 points)
+
+    Ranges older than the in-memory ring are served from the on-disk store.
+    """
+    body, status = query_history(request.args)
+    return jsonify(body), status
+
+
+def query_history(args):
+    """Run an /api/history query from a mapping of query parameters.
+
+    Returns (response_data, http_status).
+    """
+    try:
+        now = time.time()
+        end = float(args.get("to", now))
+        start = float(args.get("from", end - 3600))
+        step = args.get("step")
+        step = float(step) if step is not None else None
+    except ValueError:
+        return {
+            "success": False,
+            "error": "from, to and step must be numbers"
+        }, 400
+
+    if end <= start or (step is not None and step <= 0):
+        return {
+            "success": False,
+            "error": "Require from < to and step > 0"
+        }, 400
+
+    metric = args.get("metric")
+    if metric is not None and metric not in METRICS:
+        return {
+            "success": False,
+            "error": f"Invalid metric. Must be one of: {', '.join(METRICS)}"
+        }, 400
+
+    adapter = args.get("adapter")
+    source = _history
+    if _store is not None:
+        oldest = _history.oldest_timestamp()
+        if oldest is None or start < oldest:
+            _store.flush()
+            source = _store
+    series, step = source.query(
+        start, end, step,
+        adapters=[adapter] if adapter else None,
+        metrics=[metric] if metric else None)
+
+    return {
+        "from": start,
+        "to": end,
+        "step": step,
+        "series": series
+    }, 200
+
+@app.route("/api/export")
+def export_history():
+    """Stream stored history as a download, chunk by chunk.
 
+    Query parameters (all optional):
+        dataset: samples (per-adapter metrics, default), sessions (session
+            totals) or historic (`speedify_cli stats historic`, flattened)
+        format: csv (default) or columns (see export.py)
+        from, to: Unix timestamps (default: the last EXPORT_DEFAULT_SECONDS)
+        adapter: Comma-separated adapter IDs (default: all adapters)
+        metric: Comma-separated METRICS (default: all metrics)
+        step: Bucket size in seconds; aggregates samples per adapter and bucket
+        agg: Comma-separated aggregates per bucket (default: min,avg,p95,max)
+    """
+    body, status = prepare_export(request.args)
+    if status != 200:
+        return jsonify(body), status
+    content_type, filename, chunks = body
+    return Response(chunks, content_type=content_type,
+                    headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+
+def split_list(value):
+    """Parse a comma-separated query parameter into a list without duplicates."""
+    return list(dict.fromkeys(item.strip() for item in (value or "").split(",") if item.strip()))
+
+
+def prepare_export(args):
+    """Validate an /api/export query and start its download.
+
+    Returns ((content_type, filename, chunks), 200), where chunks lazily
+    yields the encoded bytes, or (response_data, http_status) on error.
+    """
+    dataset = args.get("dataset", "samples")
+    fmt = args.get("format", "csv")
+    if dataset not in EXPORT_DATASETS:
+        return {"success": False, "error": f"Invalid dataset. Must be one of: {', '.join(EXPORT_DATASETS)}"}, 400
+    if fmt not in export.FORMATS:
+        return {"success": False, "error": f"Invalid format. Must be one of: {', '.join(export.FORMATS)}"}, 400
+    if dataset == "historic":
+        return export_historic(fmt)
+
+    try:
+        now = time.time()
+        end = float(args.get("to", now))
+        start = float(args.get("from", end - EXPORT_DEFAULT_SECONDS))
+        step = args.get("step")
+        step = float(step) if step is not None else None
+    except ValueError:
+        return {"success": False, "error": "from, to and step must be numbers"}, 400
+    if end <= start or (step is not None and step < 1):
+        return {"success": False, "error": "Require from < to and step >= 1"}, 400
+
+    metrics = split_list(args.get("metric")) or list(METRICS)
+    if any(metric not in METRICS for metric in metrics):
+        return {"success": False, "error": f"Invalid metric. Must be one of: {', '.join(METRICS)}"}, 400
+    aggregates = split_list(args.get("agg")) or list(export.AGGREGATES)
+    if any(name not in export.AGGREGATES for name in aggregates):
+        return {"success": False,
+                "error": f"Invalid agg. Must be one of: {', '.join(export.AGGREGATES)}"}, 400
+    if step is None and "agg" in args:
+        return {"success": False, "error": "agg requires step"}, 400
+    if dataset == "sessions" and step is not None:
+        return {"success": False, "error": "step only applies to dataset=samples"}, 400
+
+    if _store is None:
+        return {"success": False, "error": "Metrics store is disabled"}, 503
+    _store.flush()
+    if dataset == "sessions":
+        columns, rows = SESSION_COLUMNS, _store.iter_sessions(start, end)
+    else:
+        resolution, rows = _store.iter_samples(start, end, split_list(args.get("adapter")) or None, metrics)
+        if step is None:
+            columns = ["adapter", "ts", "n"] + metrics
+        else:
+            step = max(int(step), resolution)
+            rows = export.aggregate(rows, int(start), step, metrics, aggregates)
+            columns = export.aggregate_columns(metrics, aggregates)
+    return (export.FORMATS[fmt][0], export.filename(dataset, fmt, start, end),
+            export.render(fmt, columns, rows)), 200
+
+
+def export_historic(fmt):
+    """Run `stats historic` and export its sections as (section, key, value) rows."""
+    try:
+        result = run_cli(["stats", "historic"])
+    except subprocess.TimeoutExpired:
+        return {"success": False, "error": "CLI timed out"}, 500
+    except OSError as e:
+        logger.error(f"Error running Speedify CLI: {e}")
+        return {"success": False, "error": str(e)}, 500
+    if result.returncode != 0:
+        logger.warning(f"Speedify CLI error: {result.stderr}")
+        return {"success": False, "error": f"CLI error: {result.stderr.strip()}"}, 500
+    sections = timed_parse(["stats", "historic"], parse_sections, result.stdout)
+    rows = ((section, key, value) for section, data in sections.items() for key, value in export.flatten(data))
+    return (export.FORMATS[fmt][0], export.filename("historic", fmt),
+            export.render(fmt, ["section", "key", "value"], rows)), 200
+
+
+def fetch_server_info():
+    """Run `show currentserver` and return (response_data, cacheable)."""
     try:
         # Get current server info - this returns direct JSON, not sectioned like stats
-        result = subprocess.run([SPEEDIFY_CLI_PATH, 'show', 'currentserver'],
-                              stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
-                              timeout=10)
+        result = run_cli(['show', 'currentserver'])
+        return parse_server_info(result.returncode, result.stdout, result.stderr)
+    except Exception as e:
+        logger.error(f"Error getting server info: {e}")
+        return {
+            "location": "Error",
+            "publicIP": "Error"
+        }, False
 
-        if result.returncode == 0:
-            current_server = json.loads(result.stdout.strip())
+
+def parse_server_info(returncode, stdout, stderr):
+    """Parse `show currentserver` output into (response_data, cacheable)."""
+    try:
+        if returncode == 0:
+            current_server = timed_parse(['show', 'currentserver'], json.loads, stdout.strip())
 
             # Extract location and IP from the known structure
             location = current_server.get("friendlyName", "Unknown")
             public_ips = current_server.get("publicIP", [])
             public_ip = public_ips[0] if public_ips and len(public_ips) > 0 else "Unknown"
 
-            response_data = {
+            return {
                 "location": location,
                 "publicIP": public_ip
-            }
-            set_cached_result(cache_key, response_data)
-            return jsonify(response_data)
+            }, True
         else:
-            logger.warning(f"Speedify CLI error: {result.stderr}")
-            return jsonify({
+            logger.warning(f"Speedify CLI error: {stderr}")
+            return {
                 "location": "CLI Error",
                 "publicIP": "CLI Error"
-            })
+            }, False
 
     except json.JSONDecodeError as e:
         logger.error(f"JSON decode error: {e}")
-        return jsonify({
+        return {
             "location": "Parse Error",
             "publicIP": "Parse Error"
-        })
-    except Exception as e:
-        logger.error(f"Error getting server info: {e}")
+        }, False
+
+
+@app.route("/api/events")
+def get_events():
+    """Detected events, oldest first.
+
+    Query parameters (all optional):
+        since: Only events with a greater id (poll with the last id seen)
+        severity: Minimum severity (info, warning, critical)
+        limit: Newest events returned (default 100, at most EVENTS_LOG_SIZE)
+    """
+    body, status = query_events(request.args)
+    return jsonify(body), status
+
+
+def query_events(args):
+    """Run an /api/events query; returns (response_data, http_status).
+
+    A gunicorn worker asks the broker, whose rules see every section and
+    whose log numbers the events, so ids mean the same in every worker.
+    """
+    if _snapshot_client is not None:
+        return broker_query("events", args=dict(args))
+    try:
+        since = int(args["since"]) if "since" in args else None
+        limit = int(args.get("limit", 100))
+    except ValueError:
+        return {"success": False, "error": "since and limit must be integers"}, 400
+    if not 0 < limit <= EVENTS_LOG_SIZE:
+        return {"success": False, "error": f"limit must be between 1 and {EVENTS_LOG_SIZE}"}, 400
+    severity = args.get("severity")
+    if severity is not None and severity not in SEVERITIES:
+        return {"success": False, "error": f"Invalid severity. Must be one of: {', '.join(SEVERITIES)}"}, 400
+    return {
+        "events": _events.log.query(since, severity, limit),
+        "lastId": _events.log.last_id,
+        "active": _events.active(),
+    }, 200
+
+
+@app.route("/debug/profile")
+def debug_profile():
+    """Sample every thread's stack for a while; 404 unless PROFILING=true.
+
+    Query parameters (all optional):
+        seconds: How long to sample (default 5, at most PROFILE_MAX_SECONDS)
+        interval_ms: Time between samples (default 5)
+        format: "collapsed" (default; flamegraph.pl / speedscope input) or
+            "json", which adds per-phase timings for the same window
+    """
+    body, status = run_profile(request.args)
+    if status == 200 and isinstance(body, str):
+        return Response(body, mimetype="text/plain")
+    return jsonify(body), status
+
+
+def run_profile(args):
+    """Run a /debug/profile request; returns (collapsed text or response data, http_status)."""
+    if not PROFILING_ENABLED:
+        return {"success": False, "error": "Profiling is disabled (set PROFILING=true)"}, 404
+    try:
+        seconds = float(args.get("seconds", 5))
+        interval = float(args.get("interval_ms", 5)) / 1000
+    except ValueError:
+        return {"success": False, "error": "seconds and interval_ms must be numbers"}, 400
+    if not 0 < seconds <= PROFILE_MAX_SECONDS or not 0.001 <= interval <= 1:
+        return {
+            "success": False,
+            "error": f"Require 0 < seconds <= {PROFILE_MAX_SECONDS} and 1 <= interval_ms <= 1000"
+        }, 400
+    output = args.get("format", "collapsed")
+    if output not in ("collapsed", "json"):
+        return {"success": False, "error": "format must be collapsed or json"}, 400
+
+    if not _profile_lock.acquire(blocking=False):
+        return {"success": False, "error": "A profile is already running"}, 409
+    try:
+        before = _phases.snapshot()
+        stacks, samples = profiler.sample(seconds, interval)
+        phases = profiler.phase_delta(before, _phases.snapshot())
+    finally:
+        _profile_lock.release()
+
+    if output == "collapsed":
+        return profiler.render_collapsed(stacks), 200
+    return {
+        "seconds": seconds,
+        "interval_ms": interval * 1000,
+        "samples": samples,
+        "phases": phases,
+        "stacks": dict(stacks.most_common()),
+    }, 200
+
+
+@app.route("/api/usage")
+def get_usage():
+    """Per-adapter data usage with rates and projected plan exhaustion.
+
+    Rates are an exponentially weighted average over about
+    USAGE_RATE_SECONDS; projections assume the current rate continues.
+    """
+    body, status = query_usage()
+    return jsonify(body), status
+
+
+def query_usage():
+    """The /api/usage body and status; from the broker in a gunicorn worker."""
+    if _snapshot_client is not None:
+        return broker_query("usage")
+    return usage_report(), 200
+
+
+def broker_query(op, **fields):
+    """Ask the snapshot broker for a response body it owns; returns (body, status)."""
+    try:
+        reply = _snapshot_client.request(op, **fields)
+    except OSError as e:
+        return {"success": False, "error": f"Snapshot broker unavailable: {e}"}, 503
+    if "body" not in reply:
+        return {"success": False, "error": reply.get("error", "No reply from the snapshot broker")}, 502
+    return reply["body"], reply.get("status", 200)
+
+
+def usage_report(now=None):
+    """The /api/usage body: adapters plus warnings for plans close to their limit."""
+    adapters = _usage.report(now)
+    warnings = []
+    for adapter in adapters:
+        for period in ("daily", "monthly"):
+            entry = adapter[period]
+            if entry.get("exhaustsBeforeReset"):
+                warnings.append({
+                    "adapterID": adapter["adapterID"],
+                    "period": period,
+                    "message": f"{adapter['name'] or adapter['adapterID']} {period} plan projected to run out"
+                               f" before it resets ({entry['percentUsed']}% used)",
+                })
+            elif entry.get("percentUsed", 0) >= USAGE_WARN_PERCENT:
+                warnings.append({
+                    "adapterID": adapter["adapterID"],
+                    "period": period,
+                    "message": f"{adapter['name'] or adapter['adapterID']} {period} plan"
+                               f" {entry['percentUsed']}% used",
+                })
+    return {"adapters": adapters, "warnings": warnings}
+
+
+@app.route("/api/fleet")
+def get_fleet():
+    """Merged status of the FLEET_PEERS dashboards, served from the last polls."""
+    if _fleet is None:
+        return jsonify({"success": False, "error": "Fleet mode is not enabled (set FLEET_PEERS)"}), 404
+    return jsonify(_fleet.view())
+
+
+@app.route("/api/cache")
+def get_cache_stats():
+    """Response cache size and per key class hit/miss/eviction counters."""
+    return jsonify(cache_stats())
+
+
+@app.route("/api/cli")
+def get_cli_stats():
+    """CLI processes spawned and commands answered from the stats stream, per command.
+
+    A gunicorn worker also reports the broker's counts, which is where its CLI runs.
+    """
+    return jsonify(cli_stats())
+
+
+def cli_stats():
+    stats = _cli.stats()
+    if _snapshot_client is not None:
+        try:
+            stats["broker"] = _snapshot_client.request("stats")["cli"]
+        except OSError as e:
+            stats["broker"] = {"error": str(e)}
+    return stats
+
+
+def cache_stats():
+    return {
+        "entries": len(_cache),
+        "maxEntries": _cache.max_entries,
+        "policies": {name: policy._asdict() for name, policy in CACHE_POLICIES.items()},
+        "classes": _cache.stats()
+    }
+
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+
+@app.after_request
+def record_request_metrics(response):
+    start = g.pop("request_start", None)
+    if PROMETHEUS_ENABLED and start is not None:
+        # Streaming responses are timed to the first byte
+        route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        REQUEST_SECONDS.observe(time.perf_counter() - start, route, request.method)
+        REQUESTS.inc(route, request.method, str(response.status_code))
+    return response
+
+
+def collect_cache_metrics():
+    """Scrape-time families for the response cache counters."""
+    events, entries = [], []
+    for key_class, counters in _cache.stats().items():
+        entries.append(("dashboard_cache_entries", {"class": key_class}, counters.pop("entries")))
+        events.extend(("dashboard_cache_events_total", {"class": key_class, "event": event}, value)
+                      for event, value in counters.items())
+    return [
+        telemetry.MetricFamily("dashboard_cache_events", "counter",
+                               "Response cache hits, misses, evictions, ... by key class", events),
+        telemetry.MetricFamily("dashboard_cache_entries", "gauge", "Response cache entries by key class", entries),
+    ]
+
+
+# Per-connection gauges: (metric name, help, field in the status payload's connections)
+CONNECTION_GAUGES = (
+    ("speedify_connection_latency_ms", "Connection latency in milliseconds", "latency"),
+    ("speedify_connection_jitter_ms", "Connection jitter in milliseconds", "jitter"),
+    ("speedify_connection_mos", "Connection mean opinion score (1-5)", "mos"),
+    ("speedify_connection_loss_send_ratio", "Connection send loss (0-1)", "loss_send"),
+    ("speedify_connection_loss_receive_ratio", "Connection receive loss (0-1)", "loss_receive"),
+)
+
+
+def collect_status_metrics():
+    """Scrape-time gauges from the newest status payload.
+
+    Uses the collector's snapshot when it is fresh; never runs the CLI. A
+    scrape counts as client demand, so idle sampling resumes and the next
+    scrape sees current values.
+    """
+    record_demand()
+    if collector_source() is not None:
+        get_status_payload()
+    current = _status_revisions.current()
+    if current is None:
+        return []
+    revision, payload, _ = current
+    connections = payload.get("connections", [])
+    families = [
+        telemetry.MetricFamily(name, "gauge", help, [
+            (name, {"adapter": conn["adapterID"]}, conn.get(field, 0)) for conn in connections])
+        for name, help, field in CONNECTION_GAUGES
+    ]
+    families.append(telemetry.MetricFamily("speedify_health_score", "gauge", "Overall health score (0-100)", [
+        ("speedify_health_score", {}, payload["overall"]["healthScore"])]))
+    families.append(telemetry.MetricFamily("speedify_active_connections", "gauge", "Connections with valid latency", [
+        ("speedify_active_connections", {}, payload["performance"]["activeConnections"])]))
+    families.append(telemetry.MetricFamily("dashboard_status_revision", "gauge", "Current status payload revision", [
+        ("dashboard_status_revision", {}, revision)]))
+    return families
+
+
+def collect_sampler_metrics():
+    """Scrape-time gauges for the adaptive sampler."""
+    if _sampler is None:
+        return []
+    return [
+        telemetry.MetricFamily("dashboard_sampling_mode", "gauge", "Current adaptive sampling mode", [
+            ("dashboard_sampling_mode", {"mode": mode}, int(_sampler.mode == mode)) for mode in (FAST, SLOW, IDLE)]),
+        telemetry.MetricFamily("dashboard_sampling_mode_changes", "counter", "Adaptive sampling mode changes", [
+            ("dashboard_sampling_mode_changes_total", {}, _sampler.mode_changes)]),
+    ]
+
+
+def collect_cli_metrics():
+    """Scrape-time counters for CLI spawns and the stats stream's process exits."""
+    stats = _cli.stats()
+    families = [
+        telemetry.MetricFamily("dashboard_cli_spawns", "counter", "One-shot speedify_cli processes spawned", [
+            ("dashboard_cli_spawns_total", {"command": command}, count)
+            for command, count in stats["spawns"]["byCommand"].items()]),
+        telemetry.MetricFamily("dashboard_cli_streamed", "counter", "CLI commands answered from the stats stream", [
+            ("dashboard_cli_streamed_total", {"command": command}, count)
+            for command, count in stats["streamed"]["byCommand"].items()]),
+    ]
+    stream = stats["stream"]
+    if stream is not None:
+        families.append(telemetry.MetricFamily(
+            "dashboard_collector_spawns", "counter", "Stats collector CLI processes spawned", [
+                ("dashboard_collector_spawns_total", {}, stream["spawns"])]))
+        families.append(telemetry.MetricFamily(
+            "dashboard_collector_exits", "counter", "Stats collector CLI process exits by reason", [
+                ("dashboard_collector_exits_total", {"reason": reason}, count)
+                for reason, count in stream["exits"].items()]))
+    return families
+
+
+def collect_fleet_metrics():
+    """Scrape-time gauges for fleet peers."""
+    if _fleet is None:
+        return []
+    nodes = _fleet.view()["nodes"]
+    return [
+        telemetry.MetricFamily("dashboard_fleet_node_up", "gauge", "Whether a fleet peer answered recently", [
+            ("dashboard_fleet_node_up", {"node": node["name"]}, int(node["reachable"])) for node in nodes]),
+        telemetry.MetricFamily("dashboard_fleet_node_health_score", "gauge", "Fleet peer health score (0-100)", [
+            ("dashboard_fleet_node_health_score", {"node": node["name"]}, node["healthScore"])
+            for node in nodes if "healthScore" in node]),
+    ]
+
+
+_registry.add_collector(collect_cache_metrics)
+_registry.add_collector(collect_status_metrics)
+_registry.add_collector(collect_sampler_metrics)
+_registry.add_collector(collect_fleet_metrics)
+_registry.add_collector(collect_cli_metrics)
+
+
+@app.route("/metrics")
+def get_metrics():
+    """Prometheus text exposition of CLI, cache, request and connection metrics."""
+    return Response(_registry.render(), content_type=telemetry.CONTENT_TYPE)
+
+
+# /api/snapshot sources backed by a single JSON-printing CLI command
+SNAPSHOT_COMMANDS = {
+    "state": ["state"],
+    "adapters": ["show", "adapters"],
+    "disconnect": ["show", "disconnect"],
+    "captiveportal": ["captiveportal", "check"],
+    "servers": ["show", "servers"],
+}
+SNAPSHOT_INCLUDES = ("status", "server", "settings") + tuple(SNAPSHOT_COMMANDS)
+SNAPSHOT_DEFAULT_INCLUDES = ("state", "adapters", "server", "settings")
+
+_snapshot_pool = ThreadPoolExecutor(max_workers=SNAPSHOT_WORKERS, thread_name_prefix="snapshot")
+
+
+def parse_cli_json(cmd_args, returncode, stdout, stderr):
+    """Parse the output of a JSON-printing CLI command into (data, cacheable)."""
+    if returncode != 0:
+        logger.warning(f"Speedify CLI error: {stderr}")
+        return {"error": f"CLI error: {stderr.strip()}"}, False
+    try:
+        return timed_parse(cmd_args, json.loads, stdout.strip()), True
+    except json.JSONDecodeError as e:
+        logger.error(f"JSON decode error: {e}")
+        return {"error": "Parse error"}, False
+
+
+def run_cli_json(cmd_args):
+    """Result of a JSON-printing CLI command such as `show adapters`.
+
+    Served from the collector's stream when it carries the answer, otherwise
+    from the cache or a CLI call.
+    """
+    streamed = _cli.streamed(cmd_args, collector_max_age(), cli_command_label(cmd_args))
+    if streamed is not None:
+        return streamed
+
+    def fetch():
+        try:
+            result = run_cli(cmd_args)
+            return parse_cli_json(cmd_args, result.returncode, result.stdout, result.stderr)
+        except Exception as e:
+            logger.error(f"Error running Speedify CLI: {e}")
+            return {"error": str(e)}, False
+
+    return cached_fetch(f"cli:{':'.join(cmd_args)}", fetch)
+
+
+def get_snapshot_item(name):
+    if name == "status":
+        return get_status_payload()[1]
+    if name == "server":
+        return cached_fetch("server", fetch_server_info)
+    if name == "settings":
+        return get_speedify_settings()
+    return run_cli_json(SNAPSHOT_COMMANDS[name])
+
+
+def parse_snapshot_includes(include):
+    """Parse ?include=a,b,c into (names, error_message)."""
+    if include is None:
+        return list(SNAPSHOT_DEFAULT_INCLUDES), None
+    names = list(dict.fromkeys(name.strip() for name in include.split(",") if name.strip()))
+    unknown = [name for name in names if name not in SNAPSHOT_INCLUDES]
+    if unknown or not names:
+        return None, f"Invalid include. Must be a comma-separated list of: {', '.join(SNAPSHOT_INCLUDES)}"
+    return names, None
+
+
+def get_snapshot(names):
+    """Fetch several sources concurrently; wall time is that of the slowest one.
+
+    Each source goes through the response cache, and concurrent requests for
+    the same CLI command share one process.
+    """
+    futures = {name: _snapshot_pool.submit(get_snapshot_item, name) for name in names[1:]}
+    # The request thread fetches the first source itself instead of idling
+    result = {names[0]: get_snapshot_item(names[0])}
+    for name, future in futures.items():
+        result[name] = future.result()
+    return result
+
+
+@app.route("/api/snapshot")
+def get_snapshot_route():
+    """Several read-only sources in one response, e.g. ?include=state,adapters,server,settings."""
+    names, error = parse_snapshot_includes(request.args.get("include"))
+    if error is not None:
         return jsonify({
-            "location": "Error",
-            "publicIP": "Error"
-        })
+            "success": False,
+            "error": error
+        }), 400
+    return jsonify(get_snapshot(names))
+
+
+# Add route to get current server info
+@app.route("/api/server")
+def get_server():
+    return jsonify(cached_fetch("server", fetch_server_info))
+
+def validate_mode_request(data):
+    """Validate a change-mode request body; returns (mode, error_message)."""
+    if data is None or not isinstance(data, dict):
+        return None, "Request body must be valid JSON"
+
+    mode = data.get('mode', '').lower()
+    if mode not in ['speed', 'streaming', 'redundant']:
+        return None, "Invalid mode. Must be 'speed', 'streaming', or 'redundant'"
+    return mode, None
+
+
+def submit_mode_change(mode):
+    """Queue `mode <mode>`; returns (body, status), 202 with the job id once accepted."""
+    try:
+        # Settings and stats (bondingMode) change with the mode
+        job = _commands.submit(['mode', mode], invalidates=("settings", "cli:stats"),
+                               message=f"Mode changed to {mode}")
+    except QueueFull as e:
+        return {"success": False, "error": f"Too many pending commands ({e})"}, 503
+    return {
+        "success": True,
+        "message": f"Mode change to {mode} accepted",
+        "mode": mode,
+        "jobId": job.id,
+    }, 202
+
+
+def job_url(job_id):
+    return f"/api/jobs/{job_id}"
+
+
+def query_job(job_id):
+    """A submitted command's state; returns (body, status)."""
+    job = _commands.get(job_id)
+    if job is None:
+        return {"success": False, "error": f"Unknown job {job_id}"}, 404
+    return job, 200
+
 
 # Add route to change bonding mode
 @app.route("/api/change-mode", methods=["POST"])
 def change_mode():
+    """Queue a bonding mode change; poll the returned job for the outcome."""
+    # Use silent=True to return None for invalid JSON instead of raising
+    # Use force=True to parse regardless of Content-Type header
+    body, status, headers = query_change_mode(request.get_json(silent=True, force=True))
+    return jsonify(body), status, headers
+
+
+def query_change_mode(data):
+    """Run a change-mode request body; returns (body, status, headers).
+
+    Blocks while the command is handed to the queue (a socket round trip
+    to the broker under gunicorn).
+    """
     try:
-        # Use silent=True to return None for invalid JSON instead of raising
-        # Use force=True to parse regardless of Content-Type header
-        data = request.get_json(silent=True, force=True)
-        if data is None or not isinstance(data, dict):
-            return jsonify({
-                "success": False,
-                "error": "Request body must be valid JSON"
-            }), 400
-
-        mode = data.get('mode', '').lower()
-
-        # Validate mode
-        if mode not in ['speed', 'streaming', 'redundant']:
-            return jsonify({
-                "success": False,
-                "error": "Invalid mode. Must be 'speed', 'streaming', or 'redundant'"
-            }), 400
-        
-        # Execute the mode change command
-        result = subprocess.run([SPEEDIFY_CLI_PATH, 'mode', mode],
-                              stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
-                              timeout=10)
-        
-        if result.returncode == 0:
-            # Clear cache since settings have changed
-            clear_cache()
-            return jsonify({
-                "success": True,
-                "message": f"Mode changed to {mode}",
-                "mode": mode
-            })
-        else:
-            return jsonify({
-                "success": False,
-                "error": f"CLI error: {result.stderr}"
-            }), 500
-            
+        mode, error = validate_mode_request(data)
+        if error is not None:
+            return {"success": False, "error": error}, 400, {}
+        body, status = submit_mode_change(mode)
+        return body, status, {"Location": job_url(body["jobId"])} if status == 202 else {}
     except Exception as e:
         logger.error(f"Error changing mode: {e}")
-        return jsonify({
-            "success": False,
-            "error": str(e)
-        }), 500
+        return {"success": False, "error": str(e)}, 500, {}
+
+@app.route("/api/jobs/<int:job_id>")
+def get_job(job_id):
+    """State of a command submitted by a control endpoint such as /api/change-mode."""
+    body, status = query_job(job_id)
+    return jsonify(body), status
+
 
 if __name__ == "__main__":
     debug_mode = os.getenv('FLASK_DEBUG', 'false').lower() == 'true'
-    app.run(host="0.0.0.0", port=5000, debug=debug_mode)
+    # With the debug reloader only the child process (WERKZEUG_RUN_MAIN) serves requests
+    if not debug_mode or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_services()
+    app.run(host="0.0.0.0", port=int(os.getenv('PORT', '5000')), debug=debug_mode)
@@ -0,0 +1,518 @@
+"""ASGI entry point serving the dashboard routes with async handlers.
+
+The Flask app in app.py runs every request on a thread, so an SSE client or
+a request waiting on a slow CLI call holds a thread for its whole duration.
+This module serves the same routes on an event loop instead: CLI calls go
+through AsyncCliRunner, and idle SSE clients are parked coroutines woken by
+the stats collector.
+
+Run with any ASGI server, e.g.:
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5000
+
+`python3 app.py` keeps serving the blocking Flask version. Under gunicorn
+with uvicorn workers (`-k uvicorn.workers.UvicornWorker`), gunicorn.conf.py
+sets SNAPSHOT_SOCKET and each worker is a snapshot broker client, as with
+wsgi.py.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from urllib.parse import parse_qs
+
+import app as dashboard
+from assets import IMMUTABLE, REVALIDATE
+from async_cli import AsyncCliRunner
+from cache import FRESH, NEGATIVE, STALE
+from cli_parser import parse_sections
+
+logger = logging.getLogger(__name__)
+
+CLI_MAX_CONCURRENCY = int(os.getenv('CLI_MAX_CONCURRENCY', '4'))  # CLI processes running at once
+CLI_TIMEOUT_SECONDS = 10
+STATIC_PREFIX = "/static/"
+STATIC_RULE = "/static/<path:filename>"  # Metric label, as Flask's url_rule
+JOBS_PREFIX = "/api/jobs/"
+JOBS_RULE = "/api/jobs/<int:job_id>"
+
+_runner = None
+_refreshing = {}  # cache key -> background refresh task
+_notifier = None
+
+
+def get_runner():
+    """The shared AsyncCliRunner, created on first use for the configured CLI path."""
+    global _runner
+    if _runner is None or _runner.cli_path != dashboard.SPEEDIFY_CLI_PATH:
+        _runner = AsyncCliRunner(dashboard.SPEEDIFY_CLI_PATH,
+                                 max_concurrency=CLI_MAX_CONCURRENCY, timeout=CLI_TIMEOUT_SECONDS,
+                                 on_complete=dashboard.record_cli_call)
+    return _runner
+
+
+class UpdateNotifier:
+    """Wakes coroutines on the event loop when the collector publishes a section."""
+
+    def __init__(self, loop, collector):
+        self.loop = loop
+        self.collector = collector
+        self._event = asyncio.Event()
+
+    def notify(self, section_name=None, section_data=None):
+        """Collector listener; runs on the collector thread."""
+        try:
+            self.loop.call_soon_threadsafe(self._wake)
+        except RuntimeError:
+            pass  # Loop already closed during shutdown
+
+    def _wake(self):
+        event, self._event = self._event, asyncio.Event()
+        event.set()
+
+    async def wait(self, timeout):
+        """Wait for the next collector update; returns False on timeout."""
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+def get_notifier():
+    """Notifier attached to the running collector, or None without one."""
+    global _notifier
+    collector = dashboard._collector
+    if collector is None:
+        return None
+    if _notifier is None or _notifier.collector is not collector:
+        _notifier = UpdateNotifier(asyncio.get_running_loop(), collector)
+        collector.add_listener(_notifier.notify)
+    return _notifier
+
+
+# CLI fetches, sharing app.py's cache
+
+async def cached_fetch(cache_key, fetch):
+    """Async counterpart of app.cached_fetch() over the same cache entries.
+
+    Concurrent misses share one CLI process through the runner.
+    """
+    state, cached = dashboard._cache.lookup(cache_key)
+    if state in (FRESH, NEGATIVE):
+        return cached
+
+    async def refresh():
+        generation = dashboard._cache.generation
+        data, cacheable = await fetch()
+        dashboard.store_fetch_result(cache_key, data, cacheable, generation)
+        return data
+
+    if state == STALE:
+        if cache_key not in _refreshing:
+            task = asyncio.ensure_future(refresh())
+            _refreshing[cache_key] = task
+            task.add_done_callback(lambda t: _finish_refresh(cache_key, t))
+        return cached
+    return await refresh()
+
+
+def _finish_refresh(cache_key, task):
+    _refreshing.pop(cache_key, None)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Background refresh of {cache_key} failed: {task.exception()}")
+
+
+async def fetch_stats():
+    try:
+        _, stdout, _ = await get_runner().run(["stats", "1"])
+        return dashboard.timed_parse(["stats", "1"], parse_sections, stdout), True
+    except Exception as e:
+        logger.error(f"Error running Speedify CLI: {e}")
+        return {}, False
+
+
+async def fetch_settings():
+    try:
+        returncode, stdout, _ = await get_runner().run(["show", "settings"])
+        return dashboard.parse_settings(returncode, stdout)
+    except Exception as e:
+        logger.error(f"Error getting settings: {e}")
+        return {}, False
+
+
+async def fetch_server_info():
+    try:
+        returncode, stdout, stderr = await get_runner().run(["show", "currentserver"])
+        return dashboard.parse_server_info(returncode, stdout, stderr)
+    except Exception as e:
+        logger.error(f"Error getting server info: {e}")
+        return {
+            "location": "Error",
+            "publicIP": "Error"
+        }, False
+
+
+async def fetch_cli_json(cmd_args):
+    streamed = dashboard._cli.streamed(cmd_args, dashboard.collector_max_age(),
+                                       dashboard.cli_command_label(cmd_args))
+    if streamed is not None:
+        return streamed
+
+    async def fetch():
+        try:
+            returncode, stdout, stderr = await get_runner().run(cmd_args)
+            return dashboard.parse_cli_json(cmd_args, returncode, stdout, stderr)
+        except Exception as e:
+            logger.error(f"Error running Speedify CLI: {e}")
+            return {"error": str(e)}, False
+
+    return await cached_fetch(f"cli:{':'.join(cmd_args)}", fetch)
+
+
+async def get_snapshot_item(name):
+    if name == "status":
+        return (await get_status_payload())[1]
+    if name == "server":
+        return await cached_fetch("server", fetch_server_info)
+    if name == "settings":
+        return await cached_fetch("settings", fetch_settings)
+    return await fetch_cli_json(dashboard.SNAPSHOT_COMMANDS[name])
+
+
+async def get_status_payload():
+    """Async app.get_status_payload(): (revision, payload, json_text)."""
+    dashboard.record_demand()
+    source = dashboard.collector_source()
+    current = dashboard.memoized_status(source)
+    if current is not None:
+        return current
+    if dashboard._snapshot_client is not None:
+        current = await asyncio.to_thread(dashboard.broker_status, source)
+        if current is not None:
+            return current
+
+    stats_data = dashboard._cli.streamed(["stats", "1"], dashboard.collector_max_age(), "stats")
+    if stats_data is None:
+        stats_data, current_settings = await asyncio.gather(
+            cached_fetch("cli:stats:1", fetch_stats), cached_fetch("settings", fetch_settings))
+        dashboard.record_stats_result(stats_data)
+    else:
+        current_settings = await cached_fetch("settings", fetch_settings)
+    return dashboard.publish_status(stats_data, current_settings, source)
+
+
+# Responses
+
+def _encode_json(body):
+    return json.dumps(body, separators=(",", ":"), sort_keys=True).encode()
+
+
+async def send_response(send, status, body=b"", content_type="application/json", headers=()):
+    raw_headers = [(b"content-type", content_type.encode()),
+                   (b"content-length", str(len(body)).encode())]
+    raw_headers.extend((name.lower().encode(), value.encode()) for name, value in headers)
+    await send({"type": "http.response.start", "status": status, "headers": raw_headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def send_json(send, body, status=200, headers=()):
+    await send_response(send, status, _encode_json(body), headers=headers)
+
+
+async def read_body(receive):
+    body = b""
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return None
+        body += message.get("body", b"")
+        if not message.get("more_body", False):
+            return body
+
+
+class Request:
+    """The parts of an ASGI HTTP scope the handlers use."""
+
+    def __init__(self, scope, receive):
+        self.scope = scope
+        self.receive = receive
+        self.method = scope["method"]
+        self.path = scope["path"]
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"), keep_blank_values=True)
+        self.args = {name: values[0] for name, values in query.items()}
+        self.headers = {name.decode("latin-1").lower(): value.decode("latin-1")
+                        for name, value in scope.get("headers", [])}
+
+    def int_arg(self, name):
+        try:
+            return int(self.args[name])
+        except (KeyError, ValueError):
+            return None
+
+
+# Routes
+
+async def send_negotiated(send, status, body, headers):
+    """Send a dashboard.negotiated_response() result."""
+    if status == 304:
+        await send({"type": "http.response.start", "status": 304, "headers": [
+            (name.lower().encode(), value.encode()) for name, value in headers.items()]})
+        await send({"type": "http.response.body", "body": b""})
+        return
+    content_type = headers.pop("Content-Type")
+    await send_response(send, status, body, content_type=content_type, headers=headers.items())
+
+
+async def send_asset(request, send, asset, cache_control):
+    status, body, headers = dashboard.negotiated_response(
+        asset.representations, asset.content_type, request.headers.get("if-none-match"),
+        request.headers.get("accept-encoding"), {"Cache-Control": cache_control})
+    await send_negotiated(send, status, body, headers)
+
+
+async def index(request, send):
+    await send_asset(request, send, dashboard.get_assets()[1], REVALIDATE)
+
+
+async def get_static(request, send):
+    asset, immutable = dashboard.get_assets()[0].get(request.path[len(STATIC_PREFIX):])
+    if asset is None:
+        await send_json(send, {"success": False, "error": "Not found"}, 404)
+        return
+    await send_asset(request, send, asset, IMMUTABLE if immutable else REVALIDATE)
+
+
+async def get_status(request, send):
+    """Full status payload, or a JSON merge-patch when called with ?since=<revision>."""
+    await get_status_payload()
+    await send_negotiated(send, *dashboard.query_status(
+        request.int_arg("since"), request.headers.get("accept"), request.headers.get("if-none-match"),
+        request.headers.get("accept-encoding")))
+
+
+async def stream_status(request, send):
+    """Server-Sent Events feed, as app.stream_status() but on the event loop."""
+    try:
+        last_event_id = int(request.headers["last-event-id"])
+    except (KeyError, ValueError):
+        last_event_id = None
+
+    await send({"type": "http.response.start", "status": 200, "headers": [
+        (b"content-type", b"text/event-stream; charset=utf-8"),
+        (b"cache-control", b"no-cache"),
+        (b"x-accel-buffering", b"no"),
+    ]})
+    events = asyncio.ensure_future(_send_status_events(send, last_event_id))
+    disconnect = asyncio.ensure_future(_wait_for_disconnect(request.receive))
+    done, pending = await asyncio.wait({events, disconnect}, return_when=asyncio.FIRST_COMPLETED)
+    for task in pending:
+        task.cancel()
+    if events in done:
+        events.result()
+
+
+async def _wait_for_disconnect(receive):
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+async def _send_status_events(send, last_event_id):
+    async def push(text):
+        await send({"type": "http.response.body", "body": text.encode(), "more_body": True})
+
+    await push(f"retry: {dashboard.SSE_RETRY_MS}\n\n")
+    last_payload = None
+    last_revision = last_event_id
+    last_sent = time.time()
+    while True:
+        revision, payload, json_text = await get_status_payload()
+        if revision != last_revision:
+            await push(dashboard.status_event(revision, payload, json_text, last_revision, last_payload))
+            last_payload = payload
+            last_revision = revision
+            last_sent = time.time()
+        elif time.time() - last_sent >= dashboard.SSE_HEARTBEAT_SECONDS:
+            last_sent = time.time()
+            await push(": keepalive\n\n")
+
+        notifier = get_notifier()
+        if notifier is not None:
+            if await notifier.wait(dashboard.SSE_HEARTBEAT_SECONDS):
+                # Let the rest of the stats cycle arrive before rebuilding
+                await asyncio.sleep(dashboard.SSE_MIN_INTERVAL_SECONDS)
+        else:
+            await asyncio.sleep(dashboard.SSE_FALLBACK_POLL_SECONDS)
+
+
+async def get_snapshot(request, send):
+    """Several read-only sources in one response; the runner bounds CLI concurrency."""
+    names, error = dashboard.parse_snapshot_includes(request.args.get("include"))
+    if error is not None:
+        await send_json(send, {"success": False, "error": error}, 400)
+        return
+    values = await asyncio.gather(*(get_snapshot_item(name) for name in names))
+    await send_json(send, dict(zip(names, values)))
+
+
+async def get_history(request, send):
+    body, status = await asyncio.to_thread(dashboard.query_history, request.args)
+    await send_json(send, body, status)
+
+
+async def export_history(request, send):
+    """Streamed download, as app.export_history(); each chunk is read on a worker thread."""
+    body, status = await asyncio.to_thread(dashboard.prepare_export, request.args)
+    if status != 200:
+        await send_json(send, body, status)
+        return
+    content_type, filename, chunks = body
+    await send({"type": "http.response.start", "status": 200, "headers": [
+        (b"content-type", content_type.encode()),
+        (b"content-disposition", f'attachment; filename="{filename}"'.encode()),
+    ]})
+    try:
+        while True:
+            chunk = await asyncio.to_thread(next, chunks, None)
+            if chunk is None:
+                break
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+    finally:
+        await asyncio.to_thread(chunks.close)
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def get_server(request, send):
+    await send_json(send, await cached_fetch("server", fetch_server_info))
+
+
+async def get_metrics(request, send):
+    # Scrape-time collectors may run the CLI for status or ask the broker for its counts
+    text = await asyncio.to_thread(dashboard._registry.render)
+    await send_response(send, 200, text.encode(), content_type=dashboard.telemetry.CONTENT_TYPE)
+
+
+async def get_events(request, send):
+    body, status = await asyncio.to_thread(dashboard.query_events, request.args)
+    await send_json(send, body, status)
+
+
+async def debug_profile(request, send):
+    # Samples from a worker thread, so the event loop's own stack shows up
+    body, status = await asyncio.to_thread(dashboard.run_profile, request.args)
+    if status == 200 and isinstance(body, str):
+        await send_response(send, 200, body.encode(), content_type="text/plain; charset=utf-8")
+    else:
+        await send_json(send, body, status)
+
+
+async def get_usage(request, send):
+    body, status = await asyncio.to_thread(dashboard.query_usage)
+    await send_json(send, body, status)
+
+
+async def get_fleet(request, send):
+    if dashboard._fleet is None:
+        await send_json(send, {"success": False, "error": "Fleet mode is not enabled (set FLEET_PEERS)"}, 404)
+        return
+    await send_json(send, dashboard._fleet.view())
+
+
+async def get_job(request, send):
+    job_id = request.path[len(JOBS_PREFIX):]
+    if not job_id.isdigit():
+        await send_response(send, 404, b"Not Found", content_type="text/plain")
+        return
+    body, status = await asyncio.to_thread(dashboard.query_job, int(job_id))
+    await send_json(send, body, status)
+
+
+async def get_cli_stats(request, send):
+    await send_json(send, await asyncio.to_thread(dashboard.cli_stats))
+
+
+async def get_cache_stats(request, send):
+    await send_json(send, dashboard.cache_stats())
+
+
+async def change_mode(request, send):
+    body = await read_body(request.receive)
+    try:
+        data = json.loads(body) if body else None
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        data = None
+    # Queued on the same CommandQueue as the Flask app, so writes stay serialized
+    body, status, headers = await asyncio.to_thread(dashboard.query_change_mode, data)
+    await send_json(send, body, status, headers=headers.items())
+
+
+ROUTES = {
+    "/": ("GET", index),
+    "/api/status": ("GET", get_status),
+    "/api/status/stream": ("GET", stream_status),
+    "/api/history": ("GET", get_history),
+    "/api/export": ("GET", export_history),
+    "/api/snapshot": ("GET", get_snapshot),
+    "/api/server": ("GET", get_server),
+    "/api/events": ("GET", get_events),
+    "/api/usage": ("GET", get_usage),
+    "/api/fleet": ("GET", get_fleet),
+    "/debug/profile": ("GET", debug_profile),
+    "/api/cli": ("GET", get_cli_stats),
+    "/api/cache": ("GET", get_cache_stats),
+    "/metrics": ("GET", get_metrics),
+    "/api/change-mode": ("POST", change_mode),
+}
+
+
+# Application
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            # As wsgi.py; with SNAPSHOT_SOCKET set this process is a broker client
+            await asyncio.to_thread(dashboard.start_services)
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await asyncio.to_thread(dashboard.stop_services)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        return
+
+    path = scope["path"]
+    route = ROUTES.get(path)
+    if route is None and path.startswith(STATIC_PREFIX):
+        path, route = STATIC_RULE, ("GET", get_static)
+    elif route is None and path.startswith(JOBS_PREFIX):
+        path, route = JOBS_RULE, ("GET", get_job)
+    if route is None:
+        await send_response(send, 404, b"Not Found", content_type="text/plain")
+        return
+    method, handler = route
+    if scope["method"] != method:
+        await send_response(send, 405, b"Method Not Allowed", content_type="text/plain",
+                            headers=[("Allow", method)])
+        return
+    if not dashboard.PROMETHEUS_ENABLED:
+        await handler(Request(scope, receive), send)
+        return
+
+    start = time.perf_counter()
+
+    async def instrumented_send(message):
+        if message["type"] == "http.response.start":
+            # Streaming responses are timed to the first byte
+            dashboard.REQUEST_SECONDS.observe(time.perf_counter() - start, path, method)
+            dashboard.REQUESTS.inc(path, method, str(message["status"]))
+        await send(message)
+
+    await handler(Request(scope, receive), instrumented_send)
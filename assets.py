@@ -0,0 +1,103 @@
+"""Precompressed, content-hashed static assets.
+
+Every file in static/ is read once, given a versioned URL containing a hash
+of its content (dashboard.css -> /static/dashboard.3f2a9c1b7e4d.css) and
+compressed ahead of time, so serving it is a dict lookup and a byte write.
+A versioned URL never changes content and can be cached forever; a new
+deploy changes the hash and therefore the URL.
+
+Brotli variants are built when the optional `brotli` package is installed;
+gzip and the uncompressed bytes are always available.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+from collections import namedtuple
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+# Cache-Control for versioned URLs and for URLs that must be revalidated
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+# Preferred content codings, best first
+CODINGS = ("br", "gzip")
+
+# representations maps a content coding ("identity", "gzip", "br") to (etag, bytes)
+Asset = namedtuple("Asset", ("name", "url", "content_type", "representations"))
+
+
+def content_type_for(name):
+    content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    if content_type.startswith("text/") or content_type in ("application/javascript", "application/json"):
+        content_type += "; charset=utf-8"
+    return content_type
+
+
+def encode_asset(name, url, content, content_type):
+    """Build an Asset with a strong ETag per representation.
+
+    Compressed variants are only kept when they are smaller than the
+    original.
+    """
+    digest = hashlib.sha256(content).hexdigest()[:12]
+    representations = {"identity": (f'"{digest}"', content)}
+    compressed = {"gzip": gzip.compress(content, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        compressed["br"] = brotli.compress(content, quality=11)
+    for coding, body in compressed.items():
+        if len(body) < len(content):
+            representations[coding] = (f'"{digest}-{coding}"', body)
+    return Asset(name, url, content_type, representations)
+
+
+def versioned_name(name, content):
+    """dashboard.css -> dashboard.<content hash>.css"""
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{hashlib.sha256(content).hexdigest()[:12]}{ext}"
+
+
+class AssetBundle:
+    """The files of a static directory, keyed by versioned and plain name.
+
+    Args:
+        static_dir: Directory whose top-level files are served
+        url_prefix: URL path the files are served under
+    """
+
+    def __init__(self, static_dir, url_prefix="/static/"):
+        self.url_prefix = url_prefix
+        self._versioned = {}
+        self._plain = {}
+        for name in sorted(os.listdir(static_dir)):
+            path = os.path.join(static_dir, name)
+            if name.startswith(".") or not os.path.isfile(path):
+                continue
+            with open(path, "rb") as f:
+                content = f.read()
+            filename = versioned_name(name, content)
+            asset = encode_asset(name, url_prefix + filename, content, content_type_for(name))
+            self._versioned[filename] = asset
+            self._plain[name] = asset
+
+    def url(self, name):
+        """Versioned URL of a static file, for use in templates."""
+        return self._plain[name].url
+
+    def get(self, filename):
+        """Return (asset, immutable) for a requested file name, or (None, False).
+
+        Versioned names are immutable; plain names still resolve (for old
+        bookmarks and hand-written links) but must be revalidated.
+        """
+        asset = self._versioned.get(filename)
+        if asset is not None:
+            return asset, True
+        return self._plain.get(filename), False
+
+    def __len__(self):
+        return len(self._plain)
@@ -0,0 +1,106 @@
+"""Asyncio-based Speedify CLI executor.
+
+Runs CLI commands with asyncio subprocesses so a slow CLI call parks a
+coroutine rather than a worker thread. The runner caps the number of
+concurrent CLI processes, shares one execution between concurrent callers
+of the same command, and kills the process on timeout or cancellation.
+"""
+import asyncio
+import logging
+import time
+
+from cli_parser import parse_sections
+
+logger = logging.getLogger(__name__)
+
+
+class CliTimeoutError(Exception):
+    """The CLI did not finish within the runner's timeout."""
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task):
+        self.task = task
+        self.waiters = 0
+
+
+class AsyncCliRunner:
+    """Runs speedify_cli commands on the event loop.
+
+    Args:
+        cli_path: Path to the speedify_cli executable
+        max_concurrency: Maximum CLI processes running at once
+        timeout: Seconds before a CLI process is killed
+        on_complete: Optional callback(args, seconds, returncode, timed_out)
+            called once per finished process
+    """
+
+    def __init__(self, cli_path, max_concurrency=4, timeout=10, on_complete=None):
+        self.cli_path = cli_path
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.on_complete = on_complete
+        self._semaphore = None
+        self._inflight = {}
+
+    async def run(self, args):
+        """Run a CLI command and return (returncode, stdout, stderr) as text.
+
+        Concurrent calls with the same args share one process. Cancelling a
+        caller does not cancel the process for the other callers; the process
+        is killed when its last caller goes away.
+        """
+        key = tuple(args)
+        flight = self._inflight.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(self._execute(list(args))))
+            self._inflight[key] = flight
+            flight.task.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if flight.waiters == 1 and not flight.task.done():
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+
+    async def _execute(self, args):
+        if self._semaphore is None:
+            # Created lazily so it binds to the running loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._semaphore:
+            start = time.perf_counter()
+            process = await asyncio.create_subprocess_exec(
+                self.cli_path, *args,
+                stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+            try:
+                stdout, stderr = await asyncio.wait_for(process.communicate(), self.timeout)
+            except asyncio.TimeoutError:
+                await self._kill(process)
+                self._complete(args, start, None, True)
+                raise CliTimeoutError(f"speedify_cli {' '.join(args)} timed out after {self.timeout}s")
+            except asyncio.CancelledError:
+                await self._kill(process)
+                raise
+            self._complete(args, start, process.returncode, False)
+            return process.returncode, stdout.decode(errors='replace'), stderr.decode(errors='replace')
+
+    def _complete(self, args, start, returncode, timed_out):
+        if self.on_complete is not None:
+            self.on_complete(args, time.perf_counter() - start, returncode, timed_out)
+
+    @staticmethod
+    async def _kill(process):
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+
+    async def sections(self, args):
+        """Run a multi-section command such as `stats 1` and return {section: data}."""
+        _, stdout, _ = await self.run(args)
+        return parse_sections(stdout)
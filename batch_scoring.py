@@ -0,0 +1,96 @@
+"""Vectorized health score and status level for many samples at once.
+
+Batch versions of app.calculate_health_score() and
+app.calculate_status_level() for re-scoring history (charts, reports)
+without a Python call per sample. Each branch of the scalar functions maps
+to one np.select() condition, evaluated in the same order and with the same
+arithmetic, so results match the scalar path exactly for finite inputs.
+
+Requires NumPy (optional dependency: pip install numpy).
+"""
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+STATUS_LEVELS = ("good", "warn", "bad")
+
+
+def _require_numpy():
+    if np is None:
+        raise RuntimeError("batch_scoring requires NumPy (pip install numpy)")
+
+
+def _pymax(a, b):
+    """Elementwise max(a, b) with Python's tie/NaN behaviour (a unless b > a)."""
+    return np.where(b > a, b, a)
+
+
+def _pymin(a, b):
+    """Elementwise min(a, b) with Python's tie/NaN behaviour (a unless b < a)."""
+    return np.where(b < a, b, a)
+
+
+def _arrays(*values):
+    return [np.asarray(v, dtype=np.float64) for v in values]
+
+
+def health_scores(latency, jitter, mos, loss_send, loss_receive):
+    """Vectorized calculate_health_score(); returns an int64 array of 0-100 scores."""
+    _require_numpy()
+    latency, jitter, mos, loss_send, loss_receive = _arrays(latency, jitter, mos, loss_send, loss_receive)
+
+    mos_score = np.select(
+        [mos >= 4.0, mos >= 3.5, mos >= 3.0, mos > 0],
+        [36 + (mos - 4.0) * 4,
+         28 + (mos - 3.5) * 16,
+         20 + (mos - 3.0) * 16,
+         _pymax(0, mos * 6.67)],
+        default=40)
+
+    latency_score = np.select(
+        [latency <= 50, latency <= 100, latency <= 200],
+        [22 + (50 - latency) / 50 * 3,
+         15 + (100 - latency) / 50 * 7,
+         5 + (200 - latency) / 100 * 10],
+        default=_pymax(0, 5 - (latency - 200) / 100 * 5))
+
+    jitter_score = np.select(
+        [jitter <= 10, jitter <= 30, jitter <= 50],
+        [18 + (10 - jitter) / 10 * 2,
+         10 + (30 - jitter) / 20 * 8,
+         5 + (50 - jitter) / 20 * 5],
+        default=_pymax(0, 5 - (jitter - 50) / 50 * 5))
+
+    total_loss = _pymax(loss_send, loss_receive) * 100
+    loss_score = np.select(
+        [total_loss == 0, total_loss < 0.5, total_loss < 1.0, total_loss < 5.0],
+        [15,
+         12 + (0.5 - total_loss) / 0.5 * 3,
+         8 + (1.0 - total_loss) / 0.5 * 4,
+         2 + (5.0 - total_loss) / 4.0 * 6],
+        default=_pymax(0, 2 - (total_loss - 5.0) / 5.0 * 2))
+
+    total_score = mos_score + latency_score + jitter_score + loss_score
+    # round() in Python rounds half to even, as does np.rint
+    return np.rint(_pymin(100, _pymax(0, total_score))).astype(np.int64)
+
+
+def status_codes(latency, jitter, mos, loss_send, loss_receive):
+    """Vectorized calculate_status_level() as codes: 0=good, 1=warn, 2=bad."""
+    _require_numpy()
+    latency, jitter, mos, loss_send, loss_receive = _arrays(latency, jitter, mos, loss_send, loss_receive)
+
+    issues = (np.select([latency > 100, latency > 50], [2, 1], default=0)
+              + np.select([jitter > 30, jitter > 10], [2, 1], default=0)
+              + np.select([mos < 3.5, mos < 4.0], [2, 1], default=0))
+    total_loss = _pymax(loss_send, loss_receive)
+    issues += np.select([total_loss >= 1.0, total_loss > 0], [2, 1], default=0)
+
+    return np.select([issues >= 4, issues >= 2], [2, 1], default=0).astype(np.int8)
+
+
+def status_levels(latency, jitter, mos, loss_send, loss_receive):
+    """Vectorized calculate_status_level(); returns an array of "good"/"warn"/"bad"."""
+    codes = status_codes(latency, jitter, mos, loss_send, loss_receive)
+    return np.asarray(STATUS_LEVELS)[codes]
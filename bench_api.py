@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""Load benchmark for the dashboard API against the fake Speedify CLI.
+
+Starts the app as a separate process with SPEEDIFY_CLI_PATH pointing at
+fake_speedify_cli.py, drives it with N concurrent keep-alive clients and
+prints machine-readable results: per-endpoint latency percentiles and
+histograms, requests/sec, CLI spawns per command and server RSS. Runs fully
+offline.
+
+Usage:
+    python3 bench_api.py                                   # 16 clients, 10s on /api/status
+    python3 bench_api.py --clients 64 --duration 30 --delay 0.5 --adapters 8
+    python3 bench_api.py --server asgi --no-collector      # needs uvicorn
+    python3 bench_api.py --server gunicorn --workers 1,2,4  # needs gunicorn; one run per worker count
+    python3 bench_api.py --output results.json --max-p99-ms 50 --min-rps 500
+
+With --max-p99-ms / --min-rps / --max-errors the exit status is 1 when a
+threshold is missed, so the run can gate a release.
+"""
+import argparse
+import http.client
+import json
+import math
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+FAKE_CLI = os.path.join(HERE, 'fake_speedify_cli.py')
+
+# Histogram bucket upper bounds in milliseconds
+HISTOGRAM_BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values), max(1, math.ceil(fraction * len(sorted_values)))) - 1
+    return sorted_values[index]
+
+
+def histogram(latencies_ms):
+    """Per-bucket (non-cumulative) counts keyed by upper bound in ms, plus "+Inf"."""
+    counts = Counter()
+    for value in latencies_ms:
+        for bound in HISTOGRAM_BOUNDS_MS:
+            if value <= bound:
+                counts[str(bound)] += 1
+                break
+        else:
+            counts["+Inf"] += 1
+    return {label: counts[label] for label in [str(b) for b in HISTOGRAM_BOUNDS_MS] + ["+Inf"]}
+
+
+def summarize(latencies_ms, statuses, errors, elapsed):
+    values = sorted(latencies_ms)
+    return {
+        "requests": len(values),
+        "errors": len(errors),
+        "error_types": dict(sorted(Counter(errors).items())),
+        "status_codes": dict(sorted(Counter(statuses).items())),
+        "rps": round(len(values) / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": {
+            "mean": round(sum(values) / len(values), 3) if values else None,
+            "p50": percentile(values, 0.50),
+            "p90": percentile(values, 0.90),
+            "p99": percentile(values, 0.99),
+            "max": values[-1] if values else None,
+        },
+        "histogram_ms": histogram(values),
+    }
+
+
+def read_rss_kb(pid):
+    """(VmRSS, VmHWM) of a process in KB from /proc, or (None, None)."""
+    rss = peak = None
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    rss = int(line.split()[1])
+                elif line.startswith("VmHWM:"):
+                    peak = int(line.split()[1])
+    except OSError:
+        pass
+    return rss, peak
+
+
+def descendant_pids(pid):
+    """PIDs of every process below pid, from the parent field of /proc/<n>/stat."""
+    children = {}
+    for name in os.listdir("/proc"):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{name}/stat") as f:
+                # The command name in parentheses may contain spaces; the parent PID follows the state
+                parent = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(parent, []).append(int(name))
+    found = []
+    pending = [pid]
+    while pending:
+        below = children.get(pending.pop(), [])
+        found.extend(below)
+        pending.extend(below)
+    return found
+
+
+def runs_fake_cli(pid):
+    try:
+        with open(f"/proc/{pid}/cmdline", "rb") as f:
+            return FAKE_CLI.encode() in f.read().split(b"\0")
+    except OSError:
+        return False
+
+
+def server_rss_kb(pid):
+    """(VmRSS, VmHWM) in KB summed over the server and its child processes.
+
+    Covers gunicorn's workers and snapshot broker. Fake CLI processes are
+    left out, as the real CLI is not part of the server. The peak is the
+    sum of per-process peaks, so an upper bound.
+    """
+    rss = peak = None
+    for process in [pid] + descendant_pids(pid):
+        if runs_fake_cli(process):
+            continue
+        process_rss, process_peak = read_rss_kb(process)
+        if process_rss is not None:
+            rss = (rss or 0) + process_rss
+        if process_peak is not None:
+            peak = (peak or 0) + process_peak
+    return rss, peak
+
+
+def count_spawns(spawn_log):
+    try:
+        with open(spawn_log) as f:
+            return Counter(line.strip() for line in f if line.strip())
+    except FileNotFoundError:
+        return Counter()
+
+
+class Server:
+    """The dashboard running in a child process on a free port."""
+
+    def __init__(self, kind, env, port, workers=1):
+        self.kind = kind
+        self.port = port
+        if kind == "flask":
+            cmd = [sys.executable, "app.py"]
+        elif kind == "gunicorn":
+            cmd = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--workers", str(workers),
+                   "--log-level", "warning", "wsgi:app"]
+        else:
+            cmd = [sys.executable, "-m", "uvicorn", "asgi:app", "--host", "127.0.0.1",
+                   "--port", str(port), "--log-level", "warning"]
+        self.log = tempfile.TemporaryFile()
+        self.process = subprocess.Popen(cmd, cwd=HERE, env=env, stdout=self.log, stderr=subprocess.STDOUT)
+
+    def wait_ready(self, timeout=15):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self.process.poll() is not None:
+                self.log.seek(0)
+                raise RuntimeError(f"{self.kind} server exited:\n{self.log.read().decode(errors='replace')}")
+            try:
+                conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=2)
+                conn.request("GET", "/api/status")
+                if conn.getresponse().status == 200:
+                    conn.close()
+                    return
+            except OSError:
+                time.sleep(0.1)
+        raise RuntimeError(f"{self.kind} server did not become ready on port {self.port}")
+
+    def stop(self):
+        self.process.terminate()
+        try:
+            self.process.wait(5)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        self.log.close()
+
+
+def client_loop(port, paths, duration, results, barrier):
+    """One keep-alive client issuing requests round-robin over paths for duration seconds."""
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    barrier.wait()
+    stop_at = time.perf_counter() + duration
+    i = 0
+    while time.perf_counter() < stop_at:
+        path = paths[i % len(paths)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            conn.request("GET", path)
+            response = conn.getresponse()
+            response.read()
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            results[path]["latencies"].append(round(elapsed_ms, 3))
+            results[path]["statuses"].append(response.status)
+            if response.getheader("Connection", "").lower() == "close" or response.version == 10:
+                conn.close()
+        except (OSError, http.client.HTTPException) as e:
+            results[path]["errors"].append(type(e).__name__)
+            conn.close()
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    conn.close()
+
+
+def run_load(port, paths, clients, duration):
+    # list.append is atomic, so clients share the result lists without a lock
+    results = {path: {"latencies": [], "statuses": [], "errors": []} for path in paths}
+    barrier = threading.Barrier(clients + 1)
+    threads = [threading.Thread(target=client_loop, args=(port, paths, duration, results, barrier), daemon=True)
+               for _ in range(clients)]
+    for t in threads:
+        t.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    return results, elapsed
+
+
+def run_benchmark(args, workers=1):
+    port = free_port()
+    workdir = tempfile.mkdtemp(prefix="bench_api_")
+    spawn_log = os.path.join(workdir, "spawns.log")
+    env = dict(os.environ,
+               SPEEDIFY_CLI_PATH=FAKE_CLI,
+               SPEEDIFY_COLLECTOR="true" if args.collector else "false",
+               METRICS_STORE="true" if args.store else "false",
+               METRICS_DB_PATH=os.path.join(workdir, "metrics.db"),
+               FAKE_SPEEDIFY_DELAY=str(args.delay),
+               FAKE_SPEEDIFY_INTERVAL=str(args.interval),
+               FAKE_SPEEDIFY_ADAPTERS=str(args.adapters),
+               FAKE_SPEEDIFY_PADDING=str(args.padding),
+               FAKE_SPEEDIFY_SPAWN_LOG=spawn_log,
+               SNAPSHOT_SOCKET=os.path.join(workdir, "snapshot.sock"),
+               USAGE_STATE_PATH=os.path.join(workdir, "usage.json"),
+               PORT=str(port),
+               FLASK_DEBUG="false")
+    if args.server != "gunicorn":
+        del env["SNAPSHOT_SOCKET"]
+
+    server = Server(args.server, env, port, workers)
+    try:
+        server.wait_ready()
+        if args.warmup:
+            run_load(port, args.paths, min(args.clients, 4), args.warmup)
+        spawns_before = count_spawns(spawn_log)
+        rss_before, _ = server_rss_kb(server.process.pid)
+
+        raw, elapsed = run_load(port, args.paths, args.clients, args.duration)
+
+        rss_after, rss_peak = server_rss_kb(server.process.pid)
+        spawns = count_spawns(spawn_log) - spawns_before
+    finally:
+        server.stop()
+
+    endpoints = {path: summarize(r["latencies"], r["statuses"], r["errors"], elapsed)
+                 for path, r in raw.items()}
+    all_latencies = [value for r in raw.values() for value in r["latencies"]]
+    total = summarize(all_latencies, [s for r in raw.values() for s in r["statuses"]],
+                      [e for r in raw.values() for e in r["errors"]], elapsed)
+    return {
+        "config": {
+            "server": args.server,
+            "workers": workers if args.server == "gunicorn" else 1,
+            "collector": args.collector,
+            "store": args.store,
+            "clients": args.clients,
+            "duration": args.duration,
+            "paths": args.paths,
+            "fake_cli": {"delay": args.delay, "interval": args.interval,
+                         "adapters": args.adapters, "padding": args.padding},
+        },
+        "elapsed": round(elapsed, 3),
+        "total": total,
+        "endpoints": endpoints,
+        "cli_spawns": {
+            "total": sum(spawns.values()),
+            "per_second": round(sum(spawns.values()) / elapsed, 2) if elapsed else 0.0,
+            "by_command": dict(sorted(spawns.items())),
+        },
+        "server_rss_kb": {"before": rss_before, "after": rss_after, "peak": rss_peak},
+    }
+
+
+def check_thresholds(results, args):
+    """Return a list of threshold failures (empty when the run passes)."""
+    failures = []
+    total = results["total"]
+    p99 = total["latency_ms"]["p99"]
+    if args.max_p99_ms is not None and (p99 is None or p99 > args.max_p99_ms):
+        failures.append(f"p99 {p99} ms > {args.max_p99_ms} ms")
+    if args.min_rps is not None and total["rps"] < args.min_rps:
+        failures.append(f"{total['rps']} req/s < {args.min_rps} req/s")
+    errors = total["errors"] + sum(n for code, n in total["status_codes"].items() if code >= 500)
+    if args.max_errors is not None and errors > args.max_errors:
+        failures.append(f"{errors} errors > {args.max_errors}")
+    return failures
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--server", choices=("flask", "asgi", "gunicorn"), default="flask")
+    parser.add_argument("--workers", default="1",
+                        help="gunicorn worker counts, comma-separated for one run each (e.g. 1,2,4)")
+    parser.add_argument("--clients", type=int, default=16, help="concurrent keep-alive clients")
+    parser.add_argument("--duration", type=float, default=10, help="seconds of measured load")
+    parser.add_argument("--warmup", type=float, default=1, help="seconds of unmeasured load first")
+    parser.add_argument("--path", dest="paths", action="append",
+                        help="endpoint to request, repeatable (default /api/status)")
+    parser.add_argument("--no-collector", dest="collector", action="store_false",
+                        help="disable the background stats collector")
+    parser.add_argument("--store", action="store_true", help="enable the on-disk metrics store")
+    parser.add_argument("--delay", type=float, default=0, help="fake CLI startup delay in seconds")
+    parser.add_argument("--interval", type=float, default=1, help="fake CLI stats interval in seconds")
+    parser.add_argument("--adapters", type=int, default=2, help="adapters reported by the fake CLI")
+    parser.add_argument("--padding", type=int, default=0, help="filler bytes per adapter entry")
+    parser.add_argument("--output", help="write JSON results to this file instead of stdout")
+    parser.add_argument("--max-p99-ms", type=float)
+    parser.add_argument("--min-rps", type=float)
+    parser.add_argument("--max-errors", type=int)
+    args = parser.parse_args(argv)
+    args.paths = args.paths or ["/api/status"]
+    try:
+        args.workers = [int(count) for count in args.workers.split(",")]
+    except ValueError:
+        parser.error("--workers must be comma-separated integers")
+    if args.server != "gunicorn" and args.workers != [1]:
+        parser.error("--workers needs --server gunicorn")
+    return args
+
+
+def main(argv):
+    args = parse_args(argv)
+    runs = []
+    for workers in args.workers:
+        results = run_benchmark(args, workers)
+        results["failures"] = check_thresholds(results, args)
+        runs.append(results)
+    failures = [failure for results in runs for failure in results["failures"]]
+
+    # One run keeps the single-result format; a worker sweep lists every run
+    text = json.dumps(runs[0] if len(runs) == 1 else {"runs": runs, "failures": failures}, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    for results in runs:
+        total = results["total"]
+        label = args.server
+        if args.server == "gunicorn":
+            label += f" x{results['config']['workers']}"
+        print(f"{label}: {total['requests']} requests, {total['rps']} req/s, "
+              f"p50 {total['latency_ms']['p50']} ms, p99 {total['latency_ms']['p99']} ms, "
+              f"{results['cli_spawns']['total']} CLI spawns, peak RSS {results['server_rss_kb']['peak']} KB",
+              file=sys.stderr)
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""Micro-benchmark: streaming raw_decode parser vs. the original line loop.
+
+Usage:
+    python3 bench_parser.py                      # synthetic outputs
+    python3 bench_parser.py recorded_stats.txt   # a recorded `speedify_cli stats N` output
+
+Record a real output on a Speedify box with:
+    /usr/share/speedify/speedify_cli stats 60 > recorded_stats.txt
+"""
+import io
+import json
+import sys
+import time
+
+from cli_parser import iter_sections, parse_sections
+
+
+def legacy_parse(raw_output):
+    """The blank-line/concatenate/retry loop run_speedify_cli() used before cli_parser."""
+    raw_output = raw_output.strip()
+    sections = {}
+    lines = raw_output.split('\n')
+    current_json = ""
+
+    for line in lines:
+        if line.strip():
+            current_json += line
+        else:
+            if current_json.strip():
+                try:
+                    parsed = json.loads(current_json)
+                    if isinstance(parsed, list) and len(parsed) >= 2:
+                        sections[parsed[0]] = parsed[1]
+                except json.JSONDecodeError:
+                    pass
+                current_json = ""
+
+    if current_json.strip():
+        try:
+            parsed = json.loads(current_json)
+            if isinstance(parsed, list) and len(parsed) >= 2:
+                sections[parsed[0]] = parsed[1]
+        except json.JSONDecodeError:
+            pass
+    return sections
+
+
+def synthetic_output(cycles, adapters):
+    """Build `stats <cycles>` style output with the given number of adapters."""
+    parts = []
+    for tick in range(cycles):
+        parts.append(json.dumps(["adapters", [
+            {"adapterID": f"adapter{i}", "name": f"wwan{i}", "state": "connected",
+             "dataUsage": {"usageDaily": tick * i, "usageMonthly": tick * i * 30}}
+            for i in range(adapters)
+        ]], indent=4))
+        parts.append(json.dumps(["connection_stats", {"connections": [
+            {"adapterID": f"adapter{i}", "connected": True, "latencyMs": 40 + i,
+             "jitterMs": 3.5, "mos": 4.2, "lossSend": 0, "lossReceive": 0,
+             "receiveBps": 1000 * i, "sendBps": 500 * i, "totalBps": 1500 * i}
+            for i in range(adapters)
+        ]}], indent=4))
+        parts.append(json.dumps(["state", {"state": "CONNECTED"}], indent=4))
+    return "\n\n".join(parts) + "\n"
+
+
+def best_of(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run_case(label, text, repeat=5):
+    data = text.encode()
+    assert legacy_parse(text) == parse_sections(text), "parsers disagree"
+    legacy = best_of(lambda: legacy_parse(text), repeat)
+    batch = best_of(lambda: parse_sections(text), repeat)
+    stream = best_of(lambda: list(iter_sections(io.BytesIO(data))), repeat)
+    print(f"{label:<28} {len(data) / 1024:>9.0f} KB  "
+          f"legacy {legacy * 1000:>8.2f} ms  parse_sections {batch * 1000:>8.2f} ms  "
+          f"iter_sections {stream * 1000:>8.2f} ms  speedup {legacy / batch:>5.1f}x")
+
+
+def main(argv):
+    if argv:
+        for path in argv:
+            with open(path) as f:
+                run_case(path, f.read())
+        return
+    for cycles, adapters in ((1, 4), (60, 4), (60, 64), (10, 1000)):
+        run_case(f"{cycles} cycles x {adapters} adapters", synthetic_output(cycles, adapters))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""Benchmark: scalar vs. vectorized health score / status level.
+
+Usage:
+    python3 bench_scoring.py [samples]    # default 1,000,000
+"""
+import sys
+import time
+
+import numpy as np
+
+from app import calculate_health_score, calculate_status_level
+from batch_scoring import health_scores, status_levels
+
+
+def synthetic_samples(n, seed=42):
+    rng = np.random.default_rng(seed)
+    latency = rng.gamma(2.0, 35.0, n)
+    jitter = rng.gamma(1.5, 6.0, n)
+    mos = np.clip(rng.normal(4.0, 0.4, n), 0, 5)
+    loss_send = np.where(rng.random(n) < 0.8, 0.0, rng.exponential(0.01, n))
+    loss_receive = np.where(rng.random(n) < 0.8, 0.0, rng.exponential(0.01, n))
+    return latency, jitter, mos, loss_send, loss_receive
+
+
+def main(argv):
+    n = int(argv[0]) if argv else 1_000_000
+    columns = synthetic_samples(n)
+    rows = list(zip(*(c.tolist() for c in columns)))
+
+    start = time.perf_counter()
+    scalar_scores = [calculate_health_score(*row) for row in rows]
+    scalar_levels = [calculate_status_level(*row) for row in rows]
+    scalar = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch_scores = health_scores(*columns)
+    batch_levels = status_levels(*columns)
+    batch = time.perf_counter() - start
+
+    assert batch_scores.tolist() == scalar_scores, "health scores differ"
+    assert batch_levels.tolist() == scalar_levels, "status levels differ"
+    print(f"{n:,} samples: scalar {scalar:.2f}s ({n / scalar:,.0f}/s), "
+          f"vectorized {batch:.3f}s ({n / batch:,.0f}/s), speedup {scalar / batch:.0f}x, results identical")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""Micro-benchmark: cost of the /metrics instrumentation on the hot path.
+
+Usage:
+    python3 bench_telemetry.py
+
+Measures a single histogram observation and counter increment, a full
+/metrics render, and the per-request cost of the Flask request hooks by
+serving cached /api/status requests with PROMETHEUS_ENABLED on and off.
+"""
+import os
+import time
+
+os.environ.setdefault('SPEEDIFY_COLLECTOR', 'false')
+os.environ.setdefault('SPEEDIFY_CLI_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                        'fake_speedify_cli.py'))
+
+import app as dashboard  # noqa: E402
+from telemetry import Registry  # noqa: E402
+
+
+def per_call(fn, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) / n
+
+
+def main():
+    registry = Registry()
+    histogram = registry.histogram("bench_seconds", "Benchmark", ("route",))
+    counter = registry.counter("bench", "Benchmark", ("route", "code"))
+    print(f"histogram.observe      {per_call(lambda: histogram.observe(0.003, '/api/status'), 200000) * 1e9:>8.0f} ns")
+    print(f"counter.inc            {per_call(lambda: counter.inc('/api/status', '200'), 200000) * 1e9:>8.0f} ns")
+
+    client = dashboard.app.test_client()
+    client.get('/api/status')  # Warm the CLI cache
+    client.get('/api/server')
+    print(f"/metrics render        {per_call(dashboard._registry.render, 1000) * 1e6:>8.1f} us")
+
+    results = {False: float('inf'), True: float('inf')}
+    for _ in range(5):
+        for enabled in (False, True):
+            dashboard.PROMETHEUS_ENABLED = enabled
+            # Keep the cached stats fresh so only request handling is measured
+            dashboard._cache.set("cli:stats:1", dashboard._cache.lookup("cli:stats:1", count=False)[1])
+            dashboard._cache.set("settings", dashboard._cache.lookup("settings", count=False)[1])
+            results[enabled] = min(results[enabled], per_call(lambda: client.get('/api/status'), 300))
+    overhead = results[True] - results[False]
+    print(f"/api/status, metrics off {results[False] * 1e6:>8.1f} us/request")
+    print(f"/api/status, metrics on  {results[True] * 1e6:>8.1f} us/request "
+          f"(+{overhead * 1e6:.1f} us, {overhead / results[False] * 100:+.1f}%)")
+
+
+if __name__ == "__main__":
+    main()
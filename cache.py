@@ -0,0 +1,253 @@
+"""Response cache and request coalescing for CLI calls.
+
+ResponseCache keeps CLI results under a per-key-class TTL policy with an
+LRU size cap, and a generation number that lets a write invalidate results
+of reads that were still running when it finished. SingleFlight makes
+concurrent callers that ask for the same key share one execution: the
+first caller runs the function, the others wait for its result. This
+keeps a cache expiry from turning into one CLI fork per waiting request.
+"""
+import logging
+import threading
+import time
+from collections import Counter, OrderedDict, namedtuple
+
+logger = logging.getLogger(__name__)
+
+
+# ttl: seconds a result is fresh; stale: further seconds it may be served while
+# refreshing; negative_ttl: seconds a failed fetch is served before retrying
+CachePolicy = namedtuple("CachePolicy", ("ttl", "stale", "negative_ttl"))
+
+# lookup() states
+FRESH = "fresh"
+STALE = "stale"
+NEGATIVE = "negative"
+MISS = "miss"
+
+
+class _Entry:
+    __slots__ = ("value", "stored_at", "negative")
+
+    def __init__(self, value, stored_at, negative):
+        self.value = value
+        self.stored_at = stored_at
+        self.negative = negative
+
+
+class ResponseCache:
+    """Thread-safe LRU cache with TTL policies per key class.
+
+    A key's class is the longest policy name that equals the key or is a
+    prefix of it followed by ':' (e.g. "cli:stats" covers "cli:stats:1").
+    Keys without a matching policy use the default policy.
+
+    Args:
+        policies: {class name: CachePolicy}
+        default: CachePolicy for unmatched keys
+        max_entries: Least recently used entries are evicted beyond this
+    """
+
+    def __init__(self, policies=None, default=CachePolicy(2, 10, 2), max_entries=256):
+        self.policies = dict(policies or {})
+        self.default = default
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = Counter()
+        self._classes = {}  # key -> class name, memoized
+        self._generation = 0
+        self._invalidated = {}  # class name -> generation of its last invalidation
+        self._cleared = 0  # Generation of the last clear()
+
+    def key_class(self, key):
+        """The policy class name for key ("default" if none matches)."""
+        name = self._classes.get(key)
+        if name is None:
+            name = "default"
+            for candidate in sorted(self.policies, key=len, reverse=True):
+                if key == candidate or key.startswith(candidate + ":"):
+                    name = candidate
+                    break
+            if len(self._classes) < 4 * self.max_entries:
+                self._classes[key] = name
+        return name
+
+    def policy(self, key):
+        return self.policies.get(self.key_class(key), self.default)
+
+    def lookup(self, key, now=None, count=True):
+        """Return (state, value) with state FRESH, STALE, NEGATIVE or MISS.
+
+        count=False skips the hit/miss counters, for re-checks of a key the
+        caller has already looked up.
+        """
+        now = time.time() if now is None else now
+        policy = self.policy(key)
+        name = self.key_class(key) if count else None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._counters[(name, "misses")] += 1
+                return MISS, None
+            age = now - entry.stored_at
+            if entry.negative:
+                state = NEGATIVE if age < policy.negative_ttl else None
+            elif age < policy.ttl:
+                state = FRESH
+            elif age < policy.ttl + policy.stale:
+                state = STALE
+            else:
+                state = None
+            if state is None:
+                # Too old to serve even while revalidating
+                del self._entries[key]
+                self._counters[(self.key_class(key), "expirations")] += 1
+                self._counters[(name, "misses")] += 1
+                return MISS, None
+            self._entries.move_to_end(key)
+            self._counters[(name, {FRESH: "hits", STALE: "stale_hits", NEGATIVE: "negative_hits"}[state])] += 1
+            return state, entry.value
+
+    def get(self, key):
+        """The value for key if it is fresh, else None."""
+        state, value = self.lookup(key)
+        return value if state == FRESH else None
+
+    @property
+    def generation(self):
+        """Incremented by every invalidate() and clear()."""
+        return self._generation
+
+    def set(self, key, value, now=None, generation=None):
+        """Store a successful result.
+
+        generation is the cache generation read before the value was
+        fetched. If the key's class has been invalidated since, the value
+        may predate a write and is discarded. Returns whether it was stored.
+        """
+        return self._store(key, _Entry(value, time.time() if now is None else now, False), generation)
+
+    def set_failure(self, key, value, now=None, generation=None):
+        """Store a failed result; it is served for the policy's negative_ttl."""
+        return self._store(key, _Entry(value, time.time() if now is None else now, True), generation)
+
+    def _store(self, key, entry, generation):
+        name = self.key_class(key)
+        with self._lock:
+            if generation is not None and generation < max(self._invalidated.get(name, 0), self._cleared):
+                self._counters[(name, "discards")] += 1
+                return False
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._counters[(name, "stores")] += 1
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                self._counters[(self.key_class(evicted), "evictions")] += 1
+        return True
+
+    def invalidate(self, *classes):
+        """Drop every entry whose key class is one of classes.
+
+        Results of those classes fetched before this call are no longer
+        stored (see set()).
+        """
+        classes = set(classes)
+        with self._lock:
+            self._generation += 1
+            for name in classes:
+                self._invalidated[name] = self._generation
+            keys = [key for key in self._entries if self.key_class(key) in classes]
+            for key in keys:
+                del self._entries[key]
+                self._counters[(self.key_class(key), "invalidations")] += 1
+        return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._cleared = self._generation
+            self._entries.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def stats(self):
+        """Counters per key class, e.g. {"settings": {"hits": 3, "misses": 1, ...}}."""
+        with self._lock:
+            counters = list(self._counters.items())
+            sizes = Counter(self.key_class(key) for key in self._entries)
+        result = {}
+        for name in sorted(set(self.policies) | {"default"}):
+            result[name] = dict.fromkeys(
+                ("hits", "stale_hits", "negative_hits", "misses", "stores",
+                 "expirations", "evictions", "invalidations", "discards"), 0)
+            result[name]["entries"] = sizes.get(name, 0)
+        for (name, counter), value in counters:
+            if name is not None:
+                result[name][counter] = value
+        return result
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Deduplicates concurrent calls by key."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        """Run fn() once for all concurrent callers of key and return its result.
+
+        If the leading call raises, every waiting caller gets the same exception.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def in_flight(self, key):
+        with self._lock:
+            return key in self._calls
+
+    def do_async(self, key, fn):
+        """Run fn() for key in a background thread unless a call is already in flight."""
+        if self.in_flight(key):
+            return
+
+        def run():
+            try:
+                self.do(key, fn)
+            except Exception as e:
+                logger.error(f"Background refresh of {key} failed: {e}")
+
+        threading.Thread(target=run, name=f"refresh-{key}", daemon=True).start()
@@ -0,0 +1,173 @@
+"""Incremental parser for multi-section Speedify CLI output.
+
+`speedify_cli stats` writes a sequence of top-level JSON arrays such as
+`["state", {...}]`, usually pretty-printed and separated by blank lines. The
+parser decodes each array with `json.JSONDecoder.raw_decode` as soon as it is
+complete, so a long-running stream can be consumed section by section.
+"""
+import codecs
+import json
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+READ_SIZE = 65536
+MAX_PENDING_CHARS = 16 * 1024 * 1024  # Drop a section that never completes past 16 MB
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = ' \t\n\r'
+# What may follow a decode error in a value that is merely cut off: a partial literal or number
+_PARTIAL_TOKEN = re.compile(r'[A-Za-z0-9.+\-]*')
+# Characters that can change the nesting state tracked by _Scanner
+_SCAN_TOKEN = re.compile(r'["\\\[\]{}\n]')
+
+
+def _section(parsed):
+    """Return (name, data) for a `["name", data]` array, else None."""
+    if isinstance(parsed, list) and len(parsed) >= 2:
+        return parsed[0], parsed[1]
+    return None
+
+
+def _skip_whitespace(buf, pos):
+    end = len(buf)
+    while pos < end and buf[pos] in _WHITESPACE:
+        pos += 1
+    return pos
+
+
+def _incomplete(buf, error):
+    """Whether a decode error only means the buffer ends inside a value.
+
+    That is the case when nothing but part of a string, literal or number
+    (`"Verizo`, `tru`, `0.`) follows the error position. Anything else
+    after it is a real syntax error.
+    """
+    if error.msg.startswith('Unterminated string'):
+        return True
+    return _PARTIAL_TOKEN.fullmatch(buf, error.pos) is not None
+
+
+class _Scanner:
+    """Tracks JSON nesting depth across reads so each character is scanned once.
+
+    JSON strings cannot contain a raw newline, so one always ends string
+    state; that also resyncs after a stray quote in non-JSON output.
+    """
+
+    def __init__(self):
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+
+    def feed(self, text, offset):
+        """Scan text, which starts at offset in the buffer.
+
+        Returns the buffer offset just past the last point where the depth
+        returned to zero (a top-level value closed), or -1 if it never did.
+        """
+        end = -1
+        pos = 0
+        if self.escaped and text:
+            self.escaped = False
+            pos = 1
+        while True:
+            match = _SCAN_TOKEN.search(text, pos)
+            if match is None:
+                return end
+            char = match.group()
+            pos = match.end()
+            if char == '\n':
+                self.in_string = False
+            elif self.in_string:
+                if char == '"':
+                    self.in_string = False
+                elif char == '\\':
+                    self.escaped = pos == len(text)
+                    pos += 1
+            elif char == '"':
+                self.in_string = True
+            elif char in '[{':
+                self.depth += 1
+            elif char in ']}':
+                self.depth = max(self.depth - 1, 0)
+                if self.depth == 0:
+                    end = offset + pos
+
+
+def _decode_available(buf, pos, final=False):
+    """Decode every complete value in buf starting at pos.
+
+    Returns (sections, pos) where pos is the offset of the first unconsumed
+    character. Incomplete trailing data is left in place unless final is set.
+    """
+    sections = []
+    while True:
+        pos = _skip_whitespace(buf, pos)
+        if pos >= len(buf):
+            break
+        try:
+            parsed, pos = _decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError as e:
+            if not final and _incomplete(buf, e):
+                break
+            # Not JSON (or a truncated section): resync at the next line
+            next_line = buf.find('\n', pos)
+            logger.debug(f"Skipping unparseable CLI output at offset {pos}: {e.msg}")
+            if next_line == -1:
+                pos = len(buf)
+                break
+            pos = next_line + 1
+            continue
+        section = _section(parsed)
+        if section is not None:
+            sections.append(section)
+    return sections, pos
+
+
+def iter_sections(stream, read_size=READ_SIZE):
+    """Yield (section_name, data) pairs from a CLI output stream as they complete.
+
+    Args:
+        stream: Binary or text file object, typically a subprocess stdout pipe.
+            Binary pipes opened with bufsize=0 return data as soon as it is
+            available, which keeps latency low for live `stats` streams.
+        read_size: Maximum number of bytes to read per call
+
+    Only new data is scanned for brackets, and decoding is only attempted on
+    the text up to where a top-level section closed, with consumed text
+    dropped from the buffer. A section spread over many reads is therefore
+    scanned once and decoded exactly once.
+    """
+    read = getattr(stream, 'read1', None) or stream.read
+    utf8 = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    scanner = _Scanner()
+    buf = ''
+    while True:
+        chunk = read(read_size)
+        if not chunk:
+            break
+        if isinstance(chunk, bytes):
+            chunk = utf8.decode(chunk)
+        end = scanner.feed(chunk, len(buf))
+        buf += chunk
+        if end == -1:
+            if len(buf) > MAX_PENDING_CHARS:
+                logger.warning("Dropping oversized incomplete CLI section")
+                scanner = _Scanner()
+                buf = ''
+            continue
+        sections, pos = _decode_available(buf[:end], 0)
+        buf = buf[pos:]
+        yield from sections
+
+    buf += utf8.decode(b'', final=True)
+    sections, _ = _decode_available(buf, 0, final=True)
+    yield from sections
+
+
+def parse_sections(text):
+    """Parse complete CLI output text into a dict of {section_name: data}."""
+    sections, _ = _decode_available(text, 0, final=True)
+    return dict(sections)
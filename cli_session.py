@@ -0,0 +1,74 @@
+"""One place that decides whether a speedify_cli command needs a process.
+
+speedify_cli takes its command on the command line and exits, so commands
+cannot be multiplexed over one long-lived process. What can be shared is
+the collector's persistent `stats` subscription: its stream already carries
+the answers to `stats`, `state` and `show adapters`, so those are served
+from the latest snapshot while it is fresh. Everything else still forks.
+
+CliSession counts both outcomes per command, alongside the stream's own
+spawn and exit accounting, so the fork rate can be checked at /api/cli.
+"""
+import threading
+from collections import Counter
+
+# Commands answered from the stats stream: args -> section (None = all sections)
+STREAMED_COMMANDS = {
+    ("stats", "1"): None,
+    ("state",): "state",
+    ("show", "adapters"): "adapters",
+}
+
+
+class CliSession:
+    """The stats stream shared by all readers, plus per-command spawn counts.
+
+    attach() the running StatsCollector; without one, streamed() always
+    returns None and every command forks.
+    """
+
+    def __init__(self):
+        self.stream = None
+        self._lock = threading.Lock()
+        self._spawns = Counter()
+        self._streamed = Counter()
+
+    def attach(self, collector):
+        self.stream = collector
+
+    def detach(self):
+        self.stream = None
+
+    def streamed(self, cmd_args, max_age, label=None):
+        """The stream's answer to cmd_args if it is younger than max_age, else None."""
+        key = tuple(cmd_args)
+        stream = self.stream
+        if stream is None or key not in STREAMED_COMMANDS:
+            return None
+        sections = stream.latest(max_age)
+        if sections is None:
+            return None
+        section = STREAMED_COMMANDS[key]
+        if section is not None:
+            if section not in sections:
+                return None
+            sections = sections[section]
+        with self._lock:
+            self._streamed[label or " ".join(cmd_args)] += 1
+        return sections
+
+    def record_spawn(self, label):
+        """Count one forked CLI process for a command."""
+        with self._lock:
+            self._spawns[label] += 1
+
+    def stats(self):
+        with self._lock:
+            spawns = dict(self._spawns)
+            streamed = dict(self._streamed)
+        stream = self.stream
+        return {
+            "spawns": {"total": sum(spawns.values()), "byCommand": spawns},
+            "streamed": {"total": sum(streamed.values()), "byCommand": streamed},
+            "stream": stream.stats() if stream is not None else None,
+        }
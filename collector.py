@@ -0,0 +1,257 @@
+"""Background collector that owns a long-running `speedify_cli stats` process.
+
+Instead of forking the CLI on every cache miss, a single thread keeps a
+`stats` subscription open, parses each section as soon as it arrives and
+publishes the newest set of sections. Request handlers read the published
+snapshot from memory.
+
+The collector counts the processes it spawns and why each one ended, and
+backs off when the CLI keeps failing, so a crash loop does not turn into a
+fork loop.
+"""
+import logging
+import subprocess
+import threading
+import time
+from collections import Counter
+
+from cli_parser import iter_sections
+
+logger = logging.getLogger(__name__)
+
+
+class StatsCollector:
+    """Runs `speedify_cli stats` continuously and keeps the latest sections.
+
+    Args:
+        cli_path: Path to the speedify_cli executable
+        args: Arguments for the subscription (default: stream forever)
+        restart_delay: Seconds to wait before restarting a CLI that exited
+        max_restart_delay: Cap of the delay, which doubles with every failed
+            run in a row (a run that published nothing and did not exit 0)
+    """
+
+    def __init__(self, cli_path, args=("stats",), restart_delay=1.0, max_restart_delay=30.0):
+        self.cli_path = cli_path
+        self.args = list(args)
+        self.restart_delay = restart_delay
+        self.max_restart_delay = max_restart_delay
+
+        self._lock = threading.Lock()
+        self._updated = threading.Condition(self._lock)
+        self._sections = {}
+        self._updated_at = 0.0
+        self._revision = 0
+
+        self._listeners = []
+
+        self._stop_event = threading.Event()
+        self._wake = threading.Event()  # Cuts the restart delay short
+        self._paused = False
+        self._reconfigured = False
+        self._thread = None
+        self._process = None
+
+        self.spawns = 0
+        self.exits = Counter()  # Why each CLI process ended
+        self.last_exit = None  # (reason, time)
+        self._failures = 0  # Failed runs in a row
+        self._started_at = None  # Start of the current CLI process
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def revision(self):
+        return self._revision
+
+    def start(self):
+        """Start the collector thread. Calling start() twice is a no-op."""
+        if self.running:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="stats-collector", daemon=True)
+        self._thread.start()
+        logger.info(f"Stats collector started: {self.cli_path} {' '.join(self.args)}")
+
+    def stop(self, timeout=5):
+        """Stop the collector thread and terminate the CLI process."""
+        self._stop_event.set()
+        self._wake.set()
+        self._terminate_process()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        logger.info("Stats collector stopped")
+
+    def configure(self, args, restart_delay):
+        """Switch to new CLI arguments and restart delay.
+
+        A running CLI process with different arguments is restarted with the
+        new ones right away. With one-shot arguments such as ("stats", "1")
+        the restart delay becomes the sampling interval; a shorter one cuts
+        a pending wait short.
+        """
+        args = list(args)
+        changed = args != self.args
+        shorter = restart_delay < self.restart_delay
+        self.args = args
+        self.restart_delay = restart_delay
+        if changed:
+            self._reconfigured = True
+            self._wake.set()
+            self._terminate_process()
+        elif shorter:
+            self._wake.set()
+
+    def pause(self):
+        """Stop sampling (terminate the CLI) until resume() is called."""
+        self._paused = True
+        self._terminate_process()
+
+    def resume(self):
+        """Start sampling again after pause()."""
+        if self._paused:
+            self._paused = False
+            self._wake.set()
+
+    @property
+    def paused(self):
+        return self._paused
+
+    def add_listener(self, callback):
+        """Call callback(section_name, data) for every new section.
+
+        Callbacks run on the collector thread and should return quickly.
+        """
+        self._listeners.append(callback)
+
+    def snapshot(self):
+        """Return (sections, updated_at) for the newest published snapshot.
+
+        The returned dict is never mutated after publication, so callers can
+        read it without holding the lock.
+        """
+        with self._lock:
+            return self._sections, self._updated_at
+
+    def latest(self, max_age):
+        """Return the newest sections if younger than max_age seconds, else None."""
+        sections, updated_at = self.snapshot()
+        if not sections or time.time() - updated_at > max_age:
+            return None
+        return sections
+
+    def wait_for_update(self, revision, timeout=None):
+        """Block until the revision differs from the one given, or timeout.
+
+        Returns the current revision, which equals revision on timeout.
+        """
+        with self._updated:
+            self._updated.wait_for(lambda: self._revision != revision, timeout)
+            return self._revision
+
+    def _publish(self, section_name, section_data):
+        with self._lock:
+            # Copy-on-write so readers holding the previous dict never see it change
+            sections = dict(self._sections)
+            sections[section_name] = section_data
+            self._sections = sections
+            self._updated_at = time.time()
+            self._revision += 1
+            self._updated.notify_all()
+
+    def _terminate_process(self):
+        process = self._process
+        if process is not None and process.poll() is None:
+            process.terminate()
+            try:
+                process.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    def stats(self):
+        """Process accounting: spawns, exit reasons and the current process's uptime."""
+        started_at = self._started_at
+        reason, at = self.last_exit or (None, None)
+        return {
+            "running": self.running,
+            "paused": self._paused,
+            "args": list(self.args),
+            "spawns": self.spawns,
+            "exits": dict(self.exits),
+            "lastExit": {"reason": reason, "time": at} if reason is not None else None,
+            "uptimeSeconds": round(time.time() - started_at, 1) if started_at is not None else None,
+        }
+
+    def _exit_reason(self, returncode):
+        # Stopping, pausing and reconfiguring terminate the CLI on purpose
+        if self._stop_event.is_set():
+            return "stopped"
+        if self._paused:
+            return "paused"
+        if self._reconfigured:
+            return "reconfigured"
+        if returncode == 0:
+            return "completed"  # One-shot arguments exit 0 by design
+        if returncode < 0:
+            return f"signal {-returncode}"
+        return f"exit {returncode}"
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            if self._paused:
+                self._wake.wait()
+                self._wake.clear()
+                continue
+            self._reconfigured = False
+            revision = self._revision
+            try:
+                self.spawns += 1
+                self._process = subprocess.Popen(
+                    [self.cli_path] + self.args,
+                    stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, bufsize=0)
+                self._started_at = time.time()
+                self._read_sections(self._process.stdout)
+                if self._paused:
+                    self._terminate_process()
+                reason = self._exit_reason(self._process.wait())
+            except Exception as e:
+                logger.error(f"Stats collector error: {e}")
+                reason = f"error {type(e).__name__}"
+            finally:
+                self._terminate_process()
+                self._process = None
+                self._started_at = None
+            self.exits[reason] += 1
+            self.last_exit = (reason, time.time())
+
+            failed = reason.startswith(("exit", "signal", "error"))
+            if failed and self._revision == revision:
+                self._failures += 1
+            else:
+                self._failures = 0
+            if failed and not self._stop_event.is_set():
+                logger.warning(f"Stats collector CLI ended ({reason}), restarting")
+            if not self._reconfigured:
+                self._wake.wait(self._next_delay())
+            self._wake.clear()
+
+    def _next_delay(self):
+        """Delay before the next restart, doubled per failed run in a row."""
+        if not self._failures:
+            return self.restart_delay
+        return min(self.restart_delay * 2 ** (self._failures - 1), max(self.max_restart_delay, self.restart_delay))
+
+    def _read_sections(self, stream):
+        """Publish each section from stream as soon as it is complete."""
+        for section_name, section_data in iter_sections(stream):
+            if self._stop_event.is_set() or self._paused:
+                return
+            self._publish(section_name, section_data)
+            for callback in self._listeners:
+                try:
+                    callback(section_name, section_data)
+                except Exception as e:
+                    logger.error(f"Stats collector listener error: {e}")
@@ -0,0 +1,201 @@
+"""Serialized execution of CLI commands that change Speedify's state.
+
+Reads (`stats`, `show ...`) run concurrently through the response cache.
+Writes (`mode <mode>`, and later connect, disconnect, adapter priority, ...)
+are submitted to one CommandQueue instead. Its worker thread runs them one
+at a time in submission order, and the HTTP request returns as soon as the
+job is accepted, with a job id to poll.
+
+When a write finishes, the cache classes it affects are invalidated. That
+bumps the cache generation, so a read that started before the write and
+finishes after it cannot store its pre-write result (see ResponseCache.set).
+"""
+import itertools
+import logging
+import queue
+import subprocess
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class QueueFull(Exception):
+    """Too many commands are waiting to run."""
+
+
+class Job:
+    """One submitted command and its outcome."""
+
+    __slots__ = ("id", "args", "invalidates", "message", "state", "submitted_at", "started_at",
+                 "finished_at", "error")
+
+    def __init__(self, job_id, args, invalidates, message):
+        self.id = job_id
+        self.args = list(args)
+        self.invalidates = tuple(invalidates)
+        self.message = message
+        self.state = QUEUED
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.error = None
+
+    @property
+    def done(self):
+        return self.state in (SUCCEEDED, FAILED)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "command": " ".join(self.args),
+            "state": self.state,
+            "success": self.state == SUCCEEDED if self.done else None,
+            "message": self.message if self.state == SUCCEEDED else None,
+            "error": self.error,
+            "submittedAt": self.submitted_at,
+            "startedAt": self.started_at,
+            "finishedAt": self.finished_at,
+        }
+
+
+class CommandQueue:
+    """Runs submitted commands one at a time on a worker thread.
+
+    The worker starts with the first submission.
+
+    Args:
+        execute: execute(args) -> CompletedProcess-like result with
+            returncode and stderr; may raise subprocess.TimeoutExpired
+        invalidate: invalidate(*cache_classes), called after each command
+        max_pending: Queued (not yet running) commands accepted at once
+        history: Finished jobs kept for polling
+    """
+
+    def __init__(self, execute, invalidate, max_pending=16, history=100):
+        self.execute = execute
+        self.invalidate = invalidate
+        self.max_pending = max_pending
+        self.history = history
+        self._ids = itertools.count(1)
+        self._jobs = OrderedDict()
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._finished = threading.Condition(self._lock)
+        self._thread = None
+
+    def submit(self, args, invalidates=(), message=None):
+        """Queue a command; returns its Job.
+
+        If the newest queued command is identical it is returned instead of
+        running the same write twice. An older identical command is not
+        reused, since the commands queued after it would then run last.
+        Raises QueueFull past max_pending.
+        """
+        with self._lock:
+            pending = [job for job in self._jobs.values() if job.state == QUEUED]
+            if pending and pending[-1].args == list(args):
+                return pending[-1]
+            if len(pending) >= self.max_pending:
+                raise QueueFull(f"{len(pending)} commands already waiting")
+            job = Job(next(self._ids), args, invalidates, message)
+            self._jobs[job.id] = job
+            self._trim()
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="command-queue", daemon=True)
+                self._thread.start()
+        self._queue.put(job)
+        return job
+
+    def get(self, job_id):
+        """The job with job_id as a dict, or None if unknown or forgotten."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job.to_dict() if job is not None else None
+
+    def wait(self, job_id, timeout=None):
+        """Block until the job has finished or timeout; returns its dict."""
+        with self._finished:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            self._finished.wait_for(lambda: job.done, timeout)
+            return job.to_dict()
+
+    def _trim(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.done]
+        for job_id in finished[:max(len(finished) - self.history, 0)]:
+            del self._jobs[job_id]
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            with self._lock:
+                job.state = RUNNING
+                job.started_at = time.time()
+            error = None
+            try:
+                result = self.execute(job.args)
+                if result.returncode != 0:
+                    error = f"CLI error: {result.stderr.strip()}"
+            except subprocess.TimeoutExpired:
+                error = "CLI timed out"
+            except Exception as e:
+                error = str(e) or type(e).__name__
+            # Even a failed write may have changed something
+            try:
+                self.invalidate(*job.invalidates)
+            except Exception as e:
+                logger.error(f"Cache invalidation after {' '.join(job.args)} failed: {e}")
+            with self._lock:
+                job.state = FAILED if error else SUCCEEDED
+                job.error = error
+                job.finished_at = time.time()
+                self._finished.notify_all()
+            if error:
+                logger.warning(f"Command {' '.join(job.args)} (job {job.id}) failed: {error}")
+            else:
+                logger.info(f"Command {' '.join(job.args)} (job {job.id}) done")
+
+
+class RemoteJob:
+    """The id and state of a job accepted by another process's queue."""
+
+    __slots__ = ("id", "state")
+
+    def __init__(self, job_id, state):
+        self.id = job_id
+        self.state = state
+
+
+class RemoteCommandQueue:
+    """CommandQueue interface forwarding to the queue in the snapshot broker.
+
+    Gunicorn workers use it so that commands stay serialized across
+    processes and a job can be polled through any worker.
+
+    Args:
+        request: request(op, **fields) -> reply dict (SnapshotClient.request);
+            raises OSError when the broker is unreachable
+    """
+
+    def __init__(self, request):
+        self.request = request
+
+    def submit(self, args, invalidates=(), message=None):
+        reply = self.request("submit", args=list(args), invalidates=list(invalidates), message=message)
+        if "full" in reply:
+            raise QueueFull(reply["full"])
+        if reply.get("job") is None:
+            raise OSError(reply.get("error", "Command was not accepted"))
+        return RemoteJob(reply["job"]["id"], reply["job"]["state"])
+
+    def get(self, job_id):
+        return self.request("job", id=job_id).get("job")
@@ -0,0 +1,2 @@
+# test_e2e.py runs against a live server (python3 test_e2e.py), not under pytest
+collect_ignore = ["test_e2e.py"]
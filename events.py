@@ -0,0 +1,362 @@
+"""Event detection over the live stats stream.
+
+Rules are evaluated incrementally as each parsed `stats` section arrives.
+Every rule keeps O(1) state per entity (adapter, session, ...), so a
+section costs O(rules x entities) no matter how much history exists.
+
+Rule types:
+
+    threshold  field above/below a value; resolves once it crosses back past
+               `clear` (hysteresis)
+    rate       field changing faster than `rate` per second (rising, or
+               falling with a negative rate); resolves below `clear`
+    state      field different from `expect` (e.g. adapter state not
+               "connected"), or the entity no longer reported at all;
+               resolves when it is back
+    increase   a counter went up (e.g. numFailovers); a one-shot event
+
+threshold, rate and state rules only fire after the condition has held for
+`for_seconds` (sustained), and only resolve after it has been clear for
+`clear_seconds`, so a flapping value does not flood the log.
+
+Rules read the raw CLI fields get_status() reads, from one of these sources:
+
+    connection  connection_stats.connections[], per adapterID
+    adapter     adapters[], per adapterID
+    session     session_stats.total
+    state       state
+"""
+import json
+import logging
+import queue
+import threading
+import time
+import urllib.request
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+SEVERITIES = ("info", "warning", "critical")
+
+# Section each source is read from, and how to split it into (entity, fields)
+SOURCES = {
+    "connection": ("connection_stats", lambda data: [
+        (conn.get("adapterID", "unknown"), conn) for conn in data.get("connections", [])]),
+    "adapter": ("adapters", lambda data: [
+        (adapter.get("adapterID", "unknown"), adapter) for adapter in data]),
+    "session": ("session_stats", lambda data: [("session", data.get("total", {}))]),
+    "state": ("state", lambda data: [("speedify", data)]),
+}
+
+DEFAULT_RULES = [
+    {"name": "adapter-down", "type": "state", "source": "adapter", "field": "state",
+     "expect": "connected", "for_seconds": 3, "severity": "critical"},
+    {"name": "disconnected", "type": "state", "source": "state", "field": "state",
+     "expect": "CONNECTED", "for_seconds": 5, "severity": "critical"},
+    {"name": "failover", "type": "increase", "source": "session", "field": "numFailovers",
+     "severity": "warning"},
+    {"name": "receive-loss-burst", "type": "threshold", "source": "connection", "field": "lossReceive",
+     "above": 0.05, "clear": 0.01, "for_seconds": 2, "clear_seconds": 10, "severity": "warning"},
+    {"name": "send-loss-burst", "type": "threshold", "source": "connection", "field": "lossSend",
+     "above": 0.05, "clear": 0.01, "for_seconds": 2, "clear_seconds": 10, "severity": "warning"},
+    {"name": "high-latency", "type": "threshold", "source": "connection", "field": "latencyMs",
+     "above": 200, "clear": 150, "for_seconds": 10, "clear_seconds": 10, "severity": "warning"},
+    {"name": "latency-spike", "type": "rate", "source": "connection", "field": "latencyMs",
+     "rate": 100, "clear": 20, "severity": "info"},
+]
+
+
+class Rule:
+    """One rule and its per-entity state.
+
+    Built from a dict such as DEFAULT_RULES entries; see the module
+    docstring for the rule types and their fields.
+    """
+
+    def __init__(self, spec):
+        self.name = spec["name"]
+        self.type = spec["type"]
+        self.source = spec["source"]
+        self.field = spec["field"]
+        self.severity = spec.get("severity", "warning")
+        self.for_seconds = spec.get("for_seconds", 0)
+        self.clear_seconds = spec.get("clear_seconds", 0)
+        if self.source not in SOURCES:
+            raise ValueError(f"Rule {self.name}: unknown source {self.source!r}")
+        if self.severity not in SEVERITIES:
+            raise ValueError(f"Rule {self.name}: unknown severity {self.severity!r}")
+
+        if self.type == "threshold":
+            if ("above" in spec) == ("below" in spec):
+                raise ValueError(f"Rule {self.name}: threshold rules need exactly one of above/below")
+            self.above = "above" in spec
+            self.limit = spec["above"] if self.above else spec["below"]
+            self.clear = spec.get("clear", self.limit)
+        elif self.type == "rate":
+            self.limit = spec["rate"]
+            self.clear = spec.get("clear", self.limit)
+            self.above = self.limit >= 0
+        elif self.type == "state":
+            self.limit = spec["expect"]
+        elif self.type != "increase":
+            raise ValueError(f"Rule {self.name}: unknown type {self.type!r}")
+
+        # entity -> [active, pending_since, clearing_since, last_value, last_time]
+        self._state = {}
+
+    def evaluate(self, entity, fields, now):
+        """Evaluate one entity's fields; returns an event dict or None."""
+        value = fields.get(self.field)
+        if value is None:
+            return None
+        if self.type != "state" and not isinstance(value, (int, float)):
+            return None  # A string or object where a number was expected
+        state = self._state.get(entity)
+        if state is None:
+            state = self._state[entity] = [False, None, None, None, None]
+        previous, previous_time = state[3], state[4]
+        state[3], state[4] = value, now
+
+        if self.type == "increase":
+            if previous is not None and value > previous:
+                return self._event("event", entity, value, now, f"{self.field} {previous} -> {value}")
+            return None
+
+        if self.type == "rate":
+            if previous is None or now <= previous_time:
+                return None
+            measured = (value - previous) / (now - previous_time)
+            triggered = measured >= self.limit if self.above else measured <= self.limit
+            cleared = measured < self.clear if self.above else measured > self.clear
+            return self._transition(state, entity, round(measured, 3), now, triggered, cleared)
+
+        if self.type == "state":
+            triggered = value != self.limit
+            return self._transition(state, entity, value, now, triggered, not triggered)
+
+        triggered = value > self.limit if self.above else value < self.limit
+        cleared = value <= self.clear if self.above else value >= self.clear
+        return self._transition(state, entity, value, now, triggered, cleared)
+
+    def forget(self, entities, now):
+        """Handle entities tracked by this rule but missing from entities.
+
+        A state rule treats a missing entity as failing its expectation, so
+        an adapter that disappears fires like one that goes down and
+        resolves when it is reported again. Other rules drop the entity,
+        resolving it if it was active. Returns the events.
+        """
+        events = []
+        for entity in [entity for entity in self._state if entity not in entities]:
+            if self.type == "state":
+                state = self._state[entity]
+                state[3], state[4] = None, now
+                event = self._transition(state, entity, None, now, True, False)
+            elif self._state.pop(entity)[0]:
+                event = self._event("resolved", entity, None, now, f"{entity} no longer reported")
+            else:
+                event = None
+            if event is not None:
+                events.append(event)
+        return events
+
+    def _transition(self, state, entity, value, now, triggered, cleared):
+        active, pending_since, clearing_since = state[0], state[1], state[2]
+        if not active:
+            if not triggered:
+                state[1] = None
+                return None
+            if pending_since is None:
+                pending_since = state[1] = now
+            if now - pending_since < self.for_seconds:
+                return None
+            state[0], state[1], state[2] = True, None, None
+            return self._event("triggered", entity, value, now, self._describe(value))
+        if not cleared:
+            state[2] = None
+            return None
+        if clearing_since is None:
+            clearing_since = state[2] = now
+        if now - clearing_since < self.clear_seconds:
+            return None
+        state[0], state[1], state[2] = False, None, None
+        return self._event("resolved", entity, value, now, f"{self.field} back to {value}")
+
+    def _describe(self, value):
+        if self.type == "state":
+            if value is None:
+                return f"not reported (expected {self.field} {self.limit})"
+            return f"{self.field} is {value} (expected {self.limit})"
+        if self.type == "rate":
+            return f"{self.field} changing {value}/s (limit {self.limit}/s)"
+        return f"{self.field} {value} {'above' if self.above else 'below'} {self.limit}"
+
+    def _event(self, kind, entity, value, now, message):
+        return {
+            "time": now,
+            "rule": self.name,
+            "kind": kind,
+            "severity": self.severity if kind != "resolved" else "info",
+            "source": self.source,
+            "entity": entity,
+            "field": self.field,
+            "value": value,
+            "message": message,
+        }
+
+    def active(self):
+        """Entities this rule is currently triggered for."""
+        return sorted(entity for entity, state in self._state.items() if state[0])
+
+
+class EventLog:
+    """Bounded in-memory event log with increasing ids."""
+
+    def __init__(self, size=500):
+        self._events = deque(maxlen=size)
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def append(self, event):
+        with self._lock:
+            event["id"] = self._next_id
+            self._next_id += 1
+            self._events.append(event)
+        return event
+
+    def query(self, since=None, severity=None, limit=100):
+        """Events newer than id since, oldest first, at most limit (the newest)."""
+        with self._lock:
+            events = list(self._events)
+        if since is not None:
+            events = [event for event in events if event["id"] > since]
+        if severity is not None:
+            minimum = SEVERITIES.index(severity)
+            events = [event for event in events if SEVERITIES.index(event["severity"]) >= minimum]
+        return events[-limit:] if limit else events
+
+    @property
+    def last_id(self):
+        return self._next_id - 1
+
+
+class EventEngine:
+    """Evaluates rules against stats sections and fans events out to sinks.
+
+    Sinks are callables taking one event dict. They run on their own thread,
+    so a slow webhook never holds up the collector.
+
+    Args:
+        rules: Rule specs (dicts), DEFAULT_RULES if None
+        log_size: Events kept in memory for /api/events
+        sinks: Callables receiving each event
+    """
+
+    def __init__(self, rules=None, log_size=500, sinks=()):
+        self.rules = [Rule(spec) for spec in (DEFAULT_RULES if rules is None else rules)]
+        names = [rule.name for rule in self.rules]
+        if len(set(names)) != len(names):
+            raise ValueError("Rule names must be unique")
+        self._by_section = {}
+        for rule in self.rules:
+            self._by_section.setdefault(SOURCES[rule.source][0], []).append(rule)
+        self.log = EventLog(log_size)
+        self.sinks = list(sinks)
+        self._queue = queue.Queue(maxsize=1000)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def observe(self, section_name, section_data, now=None):
+        """Collector listener: evaluate the rules that read this section."""
+        rules = self._by_section.get(section_name)
+        if not rules:
+            return []
+        now = time.time() if now is None else now
+        events = []
+        with self._lock:
+            for rule in rules:
+                seen = set()
+                for entity, fields in SOURCES[rule.source][1](section_data):
+                    seen.add(entity)
+                    event = rule.evaluate(entity, fields, now)
+                    if event is not None:
+                        events.append(self.log.append(event))
+                events.extend(self.log.append(event) for event in rule.forget(seen, now))
+        for event in events:
+            log = logger.warning if event["kind"] != "resolved" and event["severity"] != "info" else logger.info
+            log(f"Event {event['rule']} {event['kind']} for {event['entity']}: {event['message']}")
+            if self.sinks:
+                try:
+                    self._queue.put_nowait(event)
+                except queue.Full:
+                    logger.warning(f"Event sink queue full, dropping event {event['id']}")
+        return events
+
+    def active(self):
+        """{rule name: [entities]} for rules currently triggered."""
+        with self._lock:
+            return {rule.name: entities for rule in self.rules if (entities := rule.active())}
+
+    # Sink delivery
+
+    def start(self):
+        if self.sinks and self._thread is None:
+            self._thread = threading.Thread(target=self._deliver, name="event-sinks", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(5)
+            self._thread = None
+
+    def _deliver(self):
+        while True:
+            event = self._queue.get()
+            if event is None:
+                return
+            for sink in self.sinks:
+                try:
+                    sink(event)
+                except Exception as e:
+                    logger.warning(f"Event sink {sink!r} failed: {e}")
+
+
+class WebhookSink:
+    """POSTs each event as JSON to a URL."""
+
+    def __init__(self, url, timeout=5):
+        self.url = url
+        self.timeout = timeout
+
+    def __call__(self, event):
+        request = urllib.request.Request(
+            self.url, data=json.dumps(event).encode(), headers={"Content-Type": "application/json"}, method="POST")
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+    def __repr__(self):
+        return f"WebhookSink({self.url!r})"
+
+
+class FileSink:
+    """Appends each event as one JSON line to a file."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def __call__(self, event):
+        with open(self.path, "a") as f:
+            f.write(json.dumps(event) + "\n")
+
+    def __repr__(self):
+        return f"FileSink({self.path!r})"
+
+
+def load_rules(path):
+    """Read rule specs from a JSON file containing a list of rules."""
+    with open(path) as f:
+        rules = json.load(f)
+    if not isinstance(rules, list):
+        raise ValueError(f"{path}: expected a JSON list of rules")
+    return rules
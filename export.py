@@ -0,0 +1,129 @@
+"""Streaming CSV and columnar exports of stored history (/api/export).
+
+Rows come straight from a SQLite cursor (MetricsStore.iter_samples) and
+leave as encoded chunks, so memory use is one chunk plus, when
+aggregating, one bucket of samples, however long the range is.
+
+Two formats:
+    csv      A header row, then one line per row
+    columns  Newline-delimited JSON: a header object naming the columns,
+             then row groups of up to ROW_GROUP_ROWS rows as
+             {"rows": n, "columns": {name: [values, ...]}}, which load
+             column by column into pandas, numpy or a spreadsheet
+
+Parquet would need pyarrow; "columns" keeps the column-at-a-time layout
+without a dependency.
+"""
+import csv
+import io
+import itertools
+import json
+import math
+import operator
+
+CHUNK_BYTES = 64 * 1024  # CSV bytes buffered before a chunk is sent
+ROW_GROUP_ROWS = 4096  # Rows per "columns" row group
+AGGREGATES = ("min", "avg", "p95", "max")
+
+# format -> (content type, file extension)
+FORMATS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "columns": ("application/x-ndjson", "ndjson"),
+}
+
+
+def percentile(pairs, q):
+    """Weighted nearest-rank percentile of (value, weight) pairs."""
+    pairs = sorted(pairs)
+    rank = q * sum(weight for _, weight in pairs)
+    seen = 0
+    for value, weight in pairs:
+        seen += weight
+        if seen >= rank:
+            return value
+    return pairs[-1][0]
+
+
+def aggregate_columns(metrics, aggregates):
+    return ["adapter", "ts", "n"] + [f"{metric}_{name}" for metric in metrics for name in aggregates]
+
+
+def aggregate(rows, start, step, metrics, aggregates):
+    """Reduce (adapter, ts, n, *metrics) rows to one row per adapter and bucket.
+
+    rows must be ordered by adapter and ts. Buckets are step seconds wide,
+    aligned to start; n weights rows that are already averages of n raw
+    samples. Yields rows matching aggregate_columns().
+    """
+    def bucket_key(row):
+        return row[0], start + (row[1] - start) // step * step
+
+    for (adapter, bucket), group in itertools.groupby(rows, key=bucket_key):
+        group = list(group)
+        weights = [row[2] for row in group]
+        total = sum(weights)
+        values = [adapter, bucket, total]
+        for column in range(3, 3 + len(metrics)):
+            pairs = [(row[column], weight) for row, weight in zip(group, weights) if row[column] is not None]
+            for name in aggregates:
+                if not pairs:
+                    values.append(None)
+                elif name == "min":
+                    values.append(min(value for value, _ in pairs))
+                elif name == "max":
+                    values.append(max(value for value, _ in pairs))
+                elif name == "avg":
+                    values.append(round(sum(value * weight for value, weight in pairs)
+                                        / sum(weight for _, weight in pairs), 4))
+                else:
+                    values.append(percentile(pairs, int(name[1:]) / 100))
+        yield values
+
+
+def flatten(value, path=""):
+    """(path, scalar) pairs of nested JSON, e.g. ("total.bytesSent", 10)."""
+    if isinstance(value, dict):
+        for key, item in value.items():
+            yield from flatten(item, f"{path}.{key}" if path else str(key))
+    elif isinstance(value, list):
+        for index, item in enumerate(value):
+            yield from flatten(item, f"{path}[{index}]")
+    else:
+        yield path, value
+
+
+def csv_chunks(columns, rows, chunk_bytes=CHUNK_BYTES):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= chunk_bytes:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+def column_chunks(columns, rows, group_rows=ROW_GROUP_ROWS):
+    yield json.dumps({"columns": columns}).encode() + b"\n"
+    rows = iter(rows)
+    while True:
+        group = list(itertools.islice(rows, group_rows))
+        if not group:
+            return
+        data = {name: list(map(operator.itemgetter(i), group)) for i, name in enumerate(columns)}
+        yield json.dumps({"rows": len(group), "columns": data}, separators=(",", ":")).encode() + b"\n"
+
+
+def render(fmt, columns, rows):
+    """Encode rows as fmt (a FORMATS key), yielding bytes chunks."""
+    if fmt == "columns":
+        return column_chunks(columns, rows, ROW_GROUP_ROWS)
+    return csv_chunks(columns, rows, CHUNK_BYTES)
+
+
+def filename(dataset, fmt, start=None, end=None):
+    """Download name such as samples-1700000000-1700086400.csv."""
+    span = f"-{math.floor(start)}-{math.ceil(end)}" if start is not None else ""
+    return f"{dataset}{span}.{FORMATS[fmt][1]}"
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""Fake Speedify CLI for offline testing.
+
+Mimics the output format of /usr/share/speedify/speedify_cli closely enough
+for the dashboard to run without a Speedify install. Point the app at it with:
+
+    SPEEDIFY_CLI_PATH=./fake_speedify_cli.py python3 app.py
+
+Behaviour is tuned with environment variables:
+    FAKE_SPEEDIFY_DELAY      Seconds to sleep before producing output (default 0)
+    FAKE_SPEEDIFY_INTERVAL   Seconds between sections of a `stats` stream (default 1)
+    FAKE_SPEEDIFY_ADAPTERS   Number of adapters to report (default 2)
+    FAKE_SPEEDIFY_PADDING    Filler bytes added to each adapter entry, to grow
+                             the output size (default 0)
+    FAKE_SPEEDIFY_SPAWN_LOG  File to append one line to per invocation
+"""
+import json
+import os
+import random
+import sys
+import time
+
+DELAY = float(os.getenv('FAKE_SPEEDIFY_DELAY', '0'))
+INTERVAL = float(os.getenv('FAKE_SPEEDIFY_INTERVAL', '1'))
+ADAPTER_COUNT = int(os.getenv('FAKE_SPEEDIFY_ADAPTERS', '2'))
+PADDING = int(os.getenv('FAKE_SPEEDIFY_PADDING', '0'))
+SPAWN_LOG = os.getenv('FAKE_SPEEDIFY_SPAWN_LOG')
+
+ADAPTER_TYPES = ['Wi-Fi', 'Cellular', 'Ethernet']
+ISPS = ['Verizon Wireless', 'T-Mobile USA', 'Comcast Cable']
+
+
+def emit_section(name, data):
+    """Write one `["name", {...}]` section followed by a blank line."""
+    sys.stdout.write(json.dumps([name, data], indent=4))
+    sys.stdout.write('\n\n')
+    sys.stdout.flush()
+
+
+def build_adapters(tick):
+    adapters = []
+    for i in range(ADAPTER_COUNT):
+        adapters.append({
+            "adapterID": f"adapter{i}",
+            "name": f"wwan{i}",
+            "type": ADAPTER_TYPES[i % len(ADAPTER_TYPES)],
+            "isp": ISPS[i % len(ISPS)],
+            "state": "connected",
+            "workingPriority": "always",
+            "dataUsage": {
+                "usageDaily": 150000000 * (i + 1) + tick * 250000,
+                "usageDailyLimit": 0,
+                "usageMonthly": 4200000000 * (i + 1) + tick * 250000,
+                "usageMonthlyLimit": 0,
+                "usageMonthlyResetDay": 1
+            }
+        })
+        if PADDING:
+            adapters[-1]["description"] = "x" * PADDING
+    return adapters
+
+
+def build_connections(rng):
+    connections = []
+    for i in range(ADAPTER_COUNT):
+        connections.append({
+            "adapterID": f"adapter{i}",
+            "connected": True,
+            "protocol": "udp",
+            "latencyMs": round(rng.uniform(25, 90), 1),
+            "jitterMs": round(rng.uniform(1, 15), 1),
+            "mos": round(rng.uniform(3.8, 4.4), 2),
+            "lossSend": 0,
+            "lossReceive": round(rng.choice([0, 0, 0, 0.002]), 4),
+            "receiveBps": rng.randint(100000, 5000000),
+            "sendBps": rng.randint(50000, 1000000),
+            "totalBps": rng.randint(150000, 6000000)
+        })
+    return connections
+
+
+def emit_stats_cycle(tick, rng):
+    emit_section("adapters", build_adapters(tick))
+    emit_section("connection_stats", {"connections": build_connections(rng)})
+    emit_section("session_stats", {
+        "current": {},
+        "total": {
+            "bytesReceived": 52000000 + tick * 100000,
+            "bytesSent": 9000000 + tick * 20000,
+            "numFailovers": 0,
+            "totalConnectedMinutes": 42 + tick // 60,
+            "maxDownloadSpeed": 48.2,
+            "maxUploadSpeed": 11.7
+        }
+    })
+    emit_section("state", {"state": "CONNECTED"})
+    emit_section("streaming_stats", {
+        "bondingMode": "redundant",
+        "badCpu": False,
+        "badLatency": False,
+        "badLoss": False,
+        "badMemory": False
+    })
+
+
+def run_historic():
+    """`stats historic`: the session totals per period, once."""
+    periods = {}
+    for scale, period in enumerate(("day", "week", "month", "total"), start=1):
+        periods[period] = {
+            "bytesReceived": 52000000 * scale ** 2,
+            "bytesSent": 9000000 * scale ** 2,
+            "numFailovers": scale - 1,
+            "totalConnectedMinutes": 42 * scale ** 2,
+            "maxDownloadSpeed": 48.2,
+            "maxUploadSpeed": 11.7
+        }
+    emit_section("session_stats", periods)
+
+
+def run_stats(args):
+    if args[:1] == ['historic']:
+        run_historic()
+        return
+    rng = random.Random(1234)
+    # `stats` with no duration streams forever, like the real CLI
+    duration = int(args[0]) if args and args[0].isdigit() else None
+    tick = 0
+    while duration is None or tick < duration:
+        emit_stats_cycle(tick, rng)
+        tick += 1
+        if duration is None or tick < duration:
+            time.sleep(INTERVAL)
+
+
+def main(argv):
+    if SPAWN_LOG:
+        with open(SPAWN_LOG, 'a') as f:
+            f.write(' '.join(argv) + '\n')
+    if DELAY:
+        time.sleep(DELAY)
+
+    if not argv:
+        sys.stderr.write("usage: speedify_cli <command>\n")
+        return 4
+
+    command = argv[0]
+    if command == 'stats':
+        run_stats(argv[1:])
+    elif argv[:2] == ['show', 'settings']:
+        print(json.dumps({"bondingMode": "redundant", "encrypted": True}, indent=4))
+    elif argv[:2] == ['show', 'currentserver']:
+        print(json.dumps({
+            "friendlyName": "United States - Chicago #12",
+            "publicIP": ["203.0.113.10"]
+        }, indent=4))
+    elif argv[:2] == ['show', 'adapters']:
+        print(json.dumps(build_adapters(0), indent=4))
+    elif argv[:2] == ['show', 'disconnect']:
+        print(json.dumps({"disconnectReason": "USER_INITIATED"}, indent=4))
+    elif argv[:2] == ['show', 'servers']:
+        print(json.dumps({"public": [
+            {"tag": "us-chicago-12", "country": "us", "city": "chicago", "num": 12, "isPrivate": False},
+            {"tag": "us-newark-3", "country": "us", "city": "newark", "num": 3, "isPrivate": False}
+        ], "private": []}, indent=4))
+    elif argv[:2] == ['captiveportal', 'check']:
+        print(json.dumps([], indent=4))
+    elif command == 'state':
+        print(json.dumps({"state": "CONNECTED"}, indent=4))
+    elif command == 'mode' and len(argv) > 1:
+        print(json.dumps({"bondingMode": argv[1]}, indent=4))
+    else:
+        sys.stderr.write(f"Unknown parameter: {command}\n")
+        return 4
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main(sys.argv[1:]))
+    except (BrokenPipeError, KeyboardInterrupt):
+        sys.exit(0)
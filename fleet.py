@@ -0,0 +1,253 @@
+"""Fleet mode: one dashboard aggregating the status of many peer dashboards.
+
+Each peer is polled by its own thread over a single keep-alive HTTP
+connection, asking for `/api/status?since=<revision>` so an unchanged peer
+answers 304 and a changed one a small merge-patch. A per-peer circuit
+breaker stops polling a node after repeated failures and probes it again
+later, and every request has a timeout, so a dead or hung node only ever
+delays its own thread. /api/fleet reads the latest node summaries and
+never waits on the network.
+"""
+import gzip
+import http.client
+import json
+import logging
+import threading
+import time
+from urllib.parse import urlsplit
+
+from status_delta import apply_merge_patch
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+def parse_peers(spec):
+    """Parse "name=http://host:port,http://host2:port" into [(name, url)].
+
+    The name defaults to host:port.
+    """
+    peers = []
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        name, sep, url = item.partition("=")
+        if not sep:
+            name, url = "", item
+        parts = urlsplit(url.strip())
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError(f"Invalid fleet peer URL: {url!r}")
+        peers.append((name.strip() or parts.netloc, url.strip().rstrip("/")))
+    return peers
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker.
+
+    Args:
+        failure_threshold: Failures in a row that open the circuit
+        retry_seconds: How long an open circuit rejects calls before a
+            single probe is allowed (half-open)
+    """
+
+    def __init__(self, failure_threshold=3, retry_seconds=30.0):
+        self.failure_threshold = failure_threshold
+        self.retry_seconds = retry_seconds
+        self.failures = 0
+        self.opened_at = None
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return CLOSED
+        if time.time() - self.opened_at >= self.retry_seconds:
+            return HALF_OPEN
+        return OPEN
+
+    def allow(self):
+        return self.state != OPEN
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        """Count a failure; returns True if this failure opened the circuit."""
+        self.failures += 1
+        was_closed = self.opened_at is None
+        if self.failures >= self.failure_threshold:
+            # A failed half-open probe restarts the wait
+            self.opened_at = time.time()
+            return was_closed
+        return False
+
+
+class Peer:
+    """One peer dashboard and the last status payload fetched from it."""
+
+    def __init__(self, name, url, timeout, breaker):
+        self.name = name
+        self.url = url
+        self.timeout = timeout
+        self.breaker = breaker
+        parts = urlsplit(url)
+        self._connection_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        self._host = parts.hostname
+        self._port = parts.port
+        self._base_path = parts.path.rstrip("/")
+        self._conn = None
+
+        self.payload = None
+        self.revision = None
+        self.summary = None
+        self.updated = None
+        self.error = None
+        self.requests = 0
+        self.failures = 0
+
+    def fetch(self):
+        """Fetch the peer's status; returns True if the payload changed.
+
+        Raises OSError, http.client.HTTPException or ValueError on failure.
+        """
+        path = self._base_path + "/api/status"
+        if self.payload is not None and self.revision is not None:
+            path += f"?since={self.revision}"
+        if self._conn is None:
+            self._conn = self._connection_class(self._host, self._port, timeout=self.timeout)
+        self.requests += 1
+        try:
+            self._conn.request("GET", path, headers={"Accept-Encoding": "gzip"})
+            response = self._conn.getresponse()
+            body = response.read()
+        except (OSError, http.client.HTTPException):
+            self.close()
+            raise
+        if response.will_close:
+            self.close()
+
+        if response.status == 304:
+            return False
+        if response.status != 200:
+            raise ValueError(f"HTTP {response.status}")
+        if response.getheader("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        data = json.loads(body)
+        if (response.getheader("Content-Type") or "").startswith("application/merge-patch+json"):
+            data = apply_merge_patch(self.payload, data)
+        revision = response.getheader("X-Status-Revision")
+        # Peers without revision support always return the full payload
+        self.revision = int(revision) if revision is not None else None
+        self.payload = data
+        return True
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+class FleetAggregator:
+    """Polls peer dashboards and merges them into one fleet view.
+
+    Args:
+        peers: [(name, url)] of peer dashboards
+        summarize: summarize(payload) -> dict of per-node fields (health
+            score, status, ...) computed once per changed payload
+        poll_interval: Seconds between polls of each peer
+        timeout: Connect and read timeout per request
+        failure_threshold: Failures in a row before a peer's circuit opens
+        retry_seconds: Seconds before an open circuit is probed again
+    """
+
+    def __init__(self, peers, summarize, poll_interval=2.0, timeout=2.0, failure_threshold=3, retry_seconds=30.0):
+        self.summarize = summarize
+        self.poll_interval = poll_interval
+        self.peers = [Peer(name, url, timeout, CircuitBreaker(failure_threshold, retry_seconds))
+                      for name, url in peers]
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._threads = []
+
+    def start(self):
+        self._stop_event.clear()
+        for peer in self.peers:
+            thread = threading.Thread(target=self._run, args=(peer,), name=f"fleet-{peer.name}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        self._stop_event.set()
+        for thread in self._threads:
+            thread.join(5)
+        self._threads = []
+        for peer in self.peers:
+            peer.close()
+
+    def _run(self, peer):
+        while not self._stop_event.is_set():
+            self.poll(peer)
+            self._stop_event.wait(self.poll_interval)
+
+    def poll(self, peer):
+        """Poll one peer unless its circuit is open."""
+        if not peer.breaker.allow():
+            return
+        try:
+            changed = peer.fetch()
+        except (OSError, http.client.HTTPException, ValueError) as e:
+            with self._lock:
+                peer.failures += 1
+                peer.error = str(e) or type(e).__name__
+                if peer.breaker.record_failure():
+                    logger.warning(f"Fleet peer {peer.name} unreachable, pausing polls: {peer.error}")
+            return
+        summary = self.summarize(peer.payload) if changed or peer.summary is None else peer.summary
+        with self._lock:
+            if peer.breaker.opened_at is not None:
+                logger.info(f"Fleet peer {peer.name} reachable again")
+            peer.breaker.record_success()
+            peer.summary = summary
+            peer.updated = time.time()
+            peer.error = None
+
+    def view(self, stale_seconds=None):
+        """The merged fleet view: per-node summaries plus fleet-wide totals."""
+        if stale_seconds is None:
+            stale_seconds = self.poll_interval * 3
+        now = time.time()
+        nodes = []
+        with self._lock:
+            for peer in self.peers:
+                age = round(now - peer.updated, 1) if peer.updated is not None else None
+                node = {
+                    "name": peer.name,
+                    "url": peer.url,
+                    "reachable": age is not None and age <= stale_seconds,
+                    "breaker": peer.breaker.state,
+                    "ageSeconds": age,
+                    "error": peer.error,
+                    "requests": peer.requests,
+                    "failures": peer.failures,
+                }
+                node.update(peer.summary or {})
+                nodes.append(node)
+
+        reachable = [node for node in nodes if node["reachable"]]
+        scores = [node["healthScore"] for node in reachable if "healthScore" in node]
+        worst = min(reachable, key=lambda node: node.get("healthScore", 100), default=None)
+        return {
+            "summary": {
+                "nodes": len(nodes),
+                "reachable": len(reachable),
+                "averageHealthScore": round(sum(scores) / len(scores)) if scores else None,
+                "minHealthScore": min(scores) if scores else None,
+                "worstNode": worst["name"] if worst is not None else None,
+            },
+            "nodes": nodes,
+        }
+
@@ -0,0 +1,103 @@
+"""Gunicorn settings for the production entry point (wsgi.py).
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+The master starts one snapshot broker process (snapshot_broker.py), which
+runs the stats collector, metrics store, event sinks and command queue,
+before forking the workers. Workers subscribe to the broker over a Unix
+socket, so adding workers adds request throughput without adding CLI
+processes. gthread workers keep idle keep-alive connections off the
+worker threads, but every open /api/status/stream holds one thread for as
+long as the page stays open. So each worker takes at most half its threads
+in streams (SSE_MAX_STREAMS); further pages get a 503 and poll
+/api/status instead, leaving threads for ordinary requests. A thread in
+the master restarts the broker if it exits; workers reconnect to the new
+one.
+
+Environment:
+    PORT              Listen port (default 5000)
+    WEB_CONCURRENCY   Worker processes (default 2)
+    GUNICORN_THREADS  Threads per worker (default 8)
+    SSE_MAX_STREAMS   Status streams per worker (default half the threads)
+    SNAPSHOT_SOCKET   Broker socket (default $RUNTIME_DIRECTORY or the
+                      temp dir, wifi-dashboard-<port>.sock)
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BROKER_START_SECONDS = 10
+BROKER_RESTART_SECONDS = (1, 30)  # Backoff between broker restarts, doubling while it keeps exiting
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', '2'))
+worker_class = "gthread"
+threads = int(os.getenv('GUNICORN_THREADS', '8'))
+chdir = HERE
+
+snapshot_socket = os.getenv('SNAPSHOT_SOCKET') or os.path.join(
+    os.getenv('RUNTIME_DIRECTORY', tempfile.gettempdir()), f"wifi-dashboard-{os.getenv('PORT', '5000')}.sock")
+raw_env = [
+    f"SNAPSHOT_SOCKET={snapshot_socket}",
+    f"SSE_MAX_STREAMS={os.getenv('SSE_MAX_STREAMS') or max(threads // 2, 1)}",
+]
+
+_broker = None
+_stopping = threading.Event()
+
+
+def start_broker(server):
+    """Start the broker and wait for its socket; returns whether it is listening."""
+    global _broker
+    if os.path.exists(snapshot_socket):
+        os.unlink(snapshot_socket)
+    _broker = subprocess.Popen([sys.executable, os.path.join(HERE, "snapshot_broker.py"), snapshot_socket],
+                               cwd=HERE)
+    deadline = time.time() + BROKER_START_SECONDS
+    while not os.path.exists(snapshot_socket):
+        if _broker.poll() is not None or time.time() > deadline:
+            # Workers still serve, falling back to direct CLI calls
+            server.log.error(f"Snapshot broker did not start on {snapshot_socket}")
+            return False
+        time.sleep(0.05)
+    server.log.info(f"Snapshot broker {_broker.pid} listening on {snapshot_socket}")
+    return True
+
+
+def supervise_broker(server):
+    """Restart the broker whenever it exits, until the master shuts down.
+
+    The arbiter reaps every child, so poll() may report 0 for a broker that
+    crashed; any exit outside shutdown counts as a failure.
+    """
+    delay = BROKER_RESTART_SECONDS[0]
+    while not _stopping.wait(1):
+        if _broker.poll() is None:
+            continue
+        server.log.error(f"Snapshot broker {_broker.pid} exited, restarting in {delay}s")
+        if _stopping.wait(delay):
+            return
+        if start_broker(server):
+            delay = BROKER_RESTART_SECONDS[0]
+        else:
+            delay = min(delay * 2, BROKER_RESTART_SECONDS[1])
+
+
+def on_starting(server):
+    """Start the broker before the workers, so they find it at once."""
+    start_broker(server)
+    threading.Thread(target=supervise_broker, args=(server,), name="broker-supervisor", daemon=True).start()
+
+
+def on_exit(server):
+    _stopping.set()
+    if _broker is not None and _broker.poll() is None:
+        _broker.terminate()
+        try:
+            _broker.wait(10)
+        except subprocess.TimeoutExpired:
+            _broker.kill()
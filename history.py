@@ -0,0 +1,186 @@
+"""Fixed-memory time series of per-connection metrics.
+
+Each adapter gets one preallocated ring of `capacity` slots (one slot per
+second by default), stored in `array` buffers: timestamps as doubles and
+metrics as 32-bit floats. Memory per adapter is fixed at creation and the
+number of adapters is capped, so total memory is bounded and predictable.
+"""
+import math
+import threading
+import time
+from array import array
+
+# Metric name -> field in the CLI's connection_stats connections
+METRIC_FIELDS = {
+    "latency": "latencyMs",
+    "jitter": "jitterMs",
+    "mos": "mos",
+    "lossSend": "lossSend",
+    "lossReceive": "lossReceive",
+    "sendBps": "sendBps",
+    "receiveBps": "receiveBps",
+}
+METRICS = tuple(METRIC_FIELDS)
+
+MAX_POINTS = 1000  # Default downsampling target when no step is given
+
+
+class AdapterSeries:
+    """Ring buffer of samples for one adapter."""
+
+    def __init__(self, capacity, resolution):
+        self.capacity = capacity
+        self.resolution = resolution
+        self.timestamps = array('d', bytes(8 * capacity))
+        self.values = {metric: array('f', bytes(4 * capacity)) for metric in METRICS}
+        self.start = 0  # Physical index of the oldest sample
+        self.count = 0
+        self.updated_at = 0.0
+
+    def memory_bytes(self):
+        return (self.timestamps.itemsize * self.capacity
+                + sum(a.itemsize * self.capacity for a in self.values.values()))
+
+    def append(self, timestamp, sample):
+        """Store one sample; a sample in the same resolution slot overwrites the last one."""
+        if self.count and timestamp - self.timestamps[self._physical(self.count - 1)] < self.resolution:
+            index = self._physical(self.count - 1)
+        elif self.count < self.capacity:
+            index = self._physical(self.count)
+            self.count += 1
+        else:
+            index = self.start
+            self.start = (self.start + 1) % self.capacity
+        self.timestamps[index] = timestamp
+        for metric, value in sample.items():
+            self.values[metric][index] = value
+        self.updated_at = timestamp
+
+    def _physical(self, logical):
+        return (self.start + logical) % self.capacity
+
+    def _bisect(self, timestamp):
+        """Logical index of the first sample at or after timestamp."""
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.timestamps[self._physical(mid)] < timestamp:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def window(self, start, end, metrics):
+        """Copies of the samples in [start, end) as (timestamps, {metric: values}).
+
+        The copies are contiguous arrays (a memcpy or two), so they can be
+        downsampled after the history lock is released.
+        """
+        lo, hi = self._bisect(start), self._bisect(end)
+        return self._slice(self.timestamps, lo, hi), {metric: self._slice(self.values[metric], lo, hi)
+                                                        for metric in metrics}
+
+    def _slice(self, data, lo, hi):
+        first, n = self._physical(lo), hi - lo
+        if first + n <= self.capacity:
+            return data[first:first + n]
+        return data[first:] + data[:first + n - self.capacity]
+
+
+def downsample(timestamps, values, start, step):
+    """Average values in buckets of step seconds aligned to start.
+
+    timestamps must be ascending. Returns a list of [bucket_start, value]
+    for buckets that hold samples.
+    """
+    points = []
+    bucket = None
+    total = 0.0
+    n = 0
+    for timestamp, value in zip(timestamps, values):
+        b = start + math.floor((timestamp - start) / step) * step
+        if b != bucket:
+            if n:
+                points.append([bucket, round(total / n, 4)])
+            bucket, total, n = b, 0.0, 0
+        total += value
+        n += 1
+    if n:
+        points.append([bucket, round(total / n, 4)])
+    return points
+
+
+class MetricHistory:
+    """Per-adapter metric history fed from parsed connection_stats.
+
+    Args:
+        capacity: Slots per adapter (86400 = 24h at 1s resolution)
+        resolution: Seconds per slot
+        max_adapters: Adapters tracked at once; the least recently updated
+            one is dropped when a new adapter appears
+    """
+
+    def __init__(self, capacity=86400, resolution=1.0, max_adapters=8):
+        self.capacity = capacity
+        self.resolution = resolution
+        self.max_adapters = max_adapters
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def record(self, connection_stats, timestamp=None):
+        """Append one sample per connection from a connection_stats section."""
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            for conn in connection_stats.get("connections", []):
+                adapter_id = conn.get("adapterID")
+                if adapter_id is None:
+                    continue
+                sample = {metric: float(conn.get(field, 0) or 0) for metric, field in METRIC_FIELDS.items()}
+                self._get_series(adapter_id).append(timestamp, sample)
+
+    def _get_series(self, adapter_id):
+        series = self._series.get(adapter_id)
+        if series is None:
+            if len(self._series) >= self.max_adapters:
+                oldest = min(self._series, key=lambda a: self._series[a].updated_at)
+                del self._series[oldest]
+            series = AdapterSeries(self.capacity, self.resolution)
+            self._series[adapter_id] = series
+        return series
+
+    def adapters(self):
+        with self._lock:
+            return list(self._series)
+
+    def oldest_timestamp(self):
+        """Timestamp of the oldest sample held for any adapter, or None."""
+        with self._lock:
+            oldest = [series.timestamps[series.start] for series in self._series.values() if series.count]
+        return min(oldest) if oldest else None
+
+    def memory_bytes(self):
+        with self._lock:
+            return sum(series.memory_bytes() for series in self._series.values())
+
+    def query(self, start, end, step=None, adapters=None, metrics=None):
+        """Downsampled series as {adapterID: {metric: [[t, value], ...]}}.
+
+        Args:
+            start, end: Unix time range [start, end)
+            step: Bucket size in seconds (default: fit into MAX_POINTS buckets)
+            adapters: Adapter IDs to include (default: all)
+            metrics: Metric names to include (default: all)
+        """
+        if step is None:
+            step = max(self.resolution, (end - start) / MAX_POINTS)
+        metrics = metrics or METRICS
+        # Copy the windows under the lock and downsample outside it, so a long
+        # query does not hold up record() on the collector thread
+        with self._lock:
+            windows = {adapter_id: series.window(start, end, metrics)
+                       for adapter_id, series in self._series.items()
+                       if adapters is None or adapter_id in adapters}
+        result = {}
+        for adapter_id, (timestamps, values) in windows.items():
+            result[adapter_id] = {metric: downsample(timestamps, values[metric], start, step) for metric in metrics}
+        return result, step
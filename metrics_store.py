@@ -0,0 +1,293 @@
+"""Persistent on-disk store for sampled connection and session stats.
+
+Samples are kept in a local SQLite database (no external services) so
+history survives restarts and power cycles. SQLite's memory-mapped I/O
+serves reads straight from the page cache, and every tier is a WITHOUT ROWID
+table clustered on (adapter, ts), so a range query only touches the pages
+for that adapter and window.
+
+Three tiers keep a week of data cheap to query:
+    samples_1s  raw samples, one row per adapter per second
+    samples_1m  per-minute averages rolled up from samples_1s
+    samples_1h  per-hour averages rolled up from samples_1m
+
+Writes are buffered in memory and flushed by a background thread in one
+transaction every few seconds; the same thread runs compaction.
+"""
+import itertools
+import logging
+import math
+import operator
+import sqlite3
+import threading
+import time
+
+from history import METRIC_FIELDS, METRICS
+
+logger = logging.getLogger(__name__)
+
+# Tier table -> (seconds per row, default retention in seconds)
+TIERS = {
+    "samples_1s": (1, 7 * 86400),
+    "samples_1m": (60, 90 * 86400),
+    "samples_1h": (3600, 2 * 365 * 86400),
+}
+MMAP_SIZE = 256 * 1024 * 1024
+
+_METRIC_COLUMNS = ", ".join(f"{metric} REAL" for metric in METRICS)
+
+
+class MetricsStore:
+    """SQLite-backed metrics store with tiered compaction.
+
+    Args:
+        path: Database file path
+        flush_interval: Seconds between batched writes
+        compact_interval: Seconds between roll-ups / retention passes
+        retention: Optional {tier: seconds} overrides for TIERS
+    """
+
+    def __init__(self, path, flush_interval=5.0, compact_interval=60.0, retention=None):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.compact_interval = compact_interval
+        self.retention = {tier: seconds for tier, (_, seconds) in TIERS.items()}
+        self.retention.update(retention or {})
+
+        self._pending_samples = {}  # (adapter, ts) -> row, so one row per second survives
+        self._pending_sessions = {}
+        self._pending_lock = threading.Lock()
+        self._local = threading.local()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._last_compaction = 0.0
+
+        self._create_schema()
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+            self._local.conn = conn
+        return conn
+
+    def _create_schema(self):
+        conn = self._connect()
+        with conn:
+            conn.execute(f"""CREATE TABLE IF NOT EXISTS samples_1s (
+                adapter TEXT NOT NULL, ts INTEGER NOT NULL, {_METRIC_COLUMNS},
+                PRIMARY KEY (adapter, ts)) WITHOUT ROWID""")
+            for tier in ("samples_1m", "samples_1h"):
+                conn.execute(f"""CREATE TABLE IF NOT EXISTS {tier} (
+                    adapter TEXT NOT NULL, ts INTEGER NOT NULL, {_METRIC_COLUMNS}, n INTEGER NOT NULL,
+                    PRIMARY KEY (adapter, ts)) WITHOUT ROWID""")
+            for tier in TIERS:
+                # Roll-ups and retention scan by time across all adapters
+                conn.execute(f"CREATE INDEX IF NOT EXISTS {tier}_ts ON {tier} (ts)")
+            conn.execute("""CREATE TABLE IF NOT EXISTS session_stats (
+                ts INTEGER PRIMARY KEY, bytes_received INTEGER, bytes_sent INTEGER,
+                failovers INTEGER, connected_minutes INTEGER)""")
+            conn.execute("""CREATE TABLE IF NOT EXISTS compaction (
+                tier TEXT PRIMARY KEY, rolled_until INTEGER NOT NULL)""")
+
+    # Lifecycle
+
+    def start(self):
+        """Start the background flush/compaction thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="metrics-store", daemon=True)
+        self._thread.start()
+        logger.info(f"Metrics store writing to {self.path}")
+
+    def stop(self, timeout=5):
+        """Flush pending samples and stop the background thread."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        while not self._stop_event.wait(self.flush_interval):
+            try:
+                self.flush()
+                if time.time() - self._last_compaction >= self.compact_interval:
+                    self.compact()
+            except sqlite3.Error as e:
+                logger.error(f"Metrics store error: {e}")
+
+    # Writes
+
+    def record(self, section_name, section_data, timestamp=None):
+        """Buffer a connection_stats or session_stats section (collector listener)."""
+        ts = int(time.time() if timestamp is None else timestamp)
+        if section_name == "connection_stats":
+            with self._pending_lock:
+                for conn in section_data.get("connections", []):
+                    adapter_id = conn.get("adapterID")
+                    if adapter_id is not None:
+                        self._pending_samples[(adapter_id, ts)] = tuple(
+                            float(conn.get(field, 0) or 0) for field in METRIC_FIELDS.values())
+        elif section_name == "session_stats":
+            total = section_data.get("total", {})
+            with self._pending_lock:
+                self._pending_sessions[ts] = (
+                    total.get("bytesReceived", 0), total.get("bytesSent", 0),
+                    total.get("numFailovers", 0), total.get("totalConnectedMinutes", 0))
+
+    def flush(self):
+        """Write buffered samples in a single transaction."""
+        with self._pending_lock:
+            samples, self._pending_samples = self._pending_samples, {}
+            sessions, self._pending_sessions = self._pending_sessions, {}
+        if not samples and not sessions:
+            return
+        placeholders = ", ".join("?" * (len(METRICS) + 2))
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO samples_1s VALUES ({placeholders})",
+                ((adapter, ts) + values for (adapter, ts), values in samples.items()))
+            conn.executemany(
+                "INSERT OR REPLACE INTO session_stats VALUES (?, ?, ?, ?, ?)",
+                ((ts,) + values for ts, values in sessions.items()))
+
+    # Compaction
+
+    def compact(self, now=None):
+        """Roll complete minutes/hours up into coarser tiers and apply retention."""
+        now = int(time.time() if now is None else now)
+        conn = self._connect()
+        with conn:
+            self._roll_up(conn, "samples_1s", "samples_1m", 60, now, weight="1")
+            self._roll_up(conn, "samples_1m", "samples_1h", 3600, now, weight="n")
+            for tier, seconds in self.retention.items():
+                conn.execute(f"DELETE FROM {tier} WHERE ts < ?", (now - seconds,))
+            conn.execute("DELETE FROM session_stats WHERE ts < ?", (now - self.retention["samples_1s"],))
+        # Keep planner statistics current so range queries use the primary key
+        conn.execute("PRAGMA optimize")
+        self._last_compaction = time.time()
+
+    def _roll_up(self, conn, source, target, period, now, weight):
+        row = conn.execute("SELECT rolled_until FROM compaction WHERE tier = ?", (target,)).fetchone()
+        if row is not None:
+            since = row[0]
+        else:
+            oldest = conn.execute(f"SELECT min(ts) FROM {source}").fetchone()[0]
+            if oldest is None:
+                return
+            since = oldest - oldest % period
+        until = now - now % period  # Only roll up periods that are complete
+        if until <= since:
+            return
+        averages = ", ".join(f"sum({m} * {weight}) / sum({weight})" for m in METRICS)
+        conn.execute(f"""INSERT OR REPLACE INTO {target}
+            SELECT adapter, ts - ts % {period}, {averages}, sum({weight})
+            FROM {source} WHERE ts >= ? AND ts < ?
+            GROUP BY adapter, ts - ts % {period}""", (since, until))
+        conn.execute("INSERT OR REPLACE INTO compaction VALUES (?, ?)", (target, until))
+
+    # Reads
+
+    def query(self, start, end, step=None, adapters=None, metrics=None):
+        """Downsampled series as {adapterID: {metric: [[t, value], ...]}}.
+
+        Reads the coarsest tier whose resolution fits step, so a week at
+        one-minute steps scans ~10k rows per adapter instead of ~600k.
+        """
+        # Rows are keyed by whole seconds; round end up so the current second is included
+        start, end = int(start), math.ceil(end)
+        step = max(1, int(step if step is not None else (end - start) / 1000))
+        metrics = list(metrics or METRICS)
+
+        tier = self._tier(start, step)
+        step = max(step, TIERS[tier][0])
+        weight = "1" if tier == "samples_1s" else "n"
+
+        where = "ts >= ? AND ts < ?"
+        params = [start, end]
+        if adapters is not None:
+            where += f" AND adapter IN ({', '.join('?' * len(adapters))})"
+            params.extend(adapters)
+        if step == TIERS[tier][0] and start % step == 0:
+            # Buckets line up with stored rows: a plain primary-key range scan
+            rows = self._connect().execute(f"""
+                SELECT adapter, ts, {', '.join(f"round({m}, 4)" for m in metrics)}
+                FROM {tier} WHERE {where} ORDER BY adapter, ts""", params)
+        else:
+            averages = ", ".join(f"round(sum({m} * {weight}) / sum({weight}), 4)" for m in metrics)
+            rows = self._connect().execute(f"""
+                SELECT adapter, ? + ((ts - ?) / {step}) * {step} AS bucket, {averages}
+                FROM {tier} WHERE {where}
+                GROUP BY adapter, bucket ORDER BY adapter, bucket""", [start, start] + params)
+
+        result = {}
+        for adapter_id, group in itertools.groupby(rows, key=operator.itemgetter(0)):
+            group = list(group)
+            timestamps = [row[1] for row in group]
+            result[adapter_id] = {
+                metric: [[t, row[column]] for t, row in zip(timestamps, group)]
+                for column, metric in enumerate(metrics, start=2)
+            }
+        return result, step
+
+    def _tier(self, start, step):
+        """Coarsest tier that still resolves step, moving coarser if start is past its retention."""
+        tiers = list(TIERS)
+        index = max(i for i, tier in enumerate(tiers) if TIERS[tier][0] <= step)
+        while index < len(tiers) - 1 and start < time.time() - self.retention[tiers[index]]:
+            index += 1
+        return tiers[index]
+
+    def iter_samples(self, start, end, adapters=None, metrics=None):
+        """Stream stored samples for an export.
+
+        Reads the finest tier that still covers start. Returns (resolution,
+        rows): resolution is the tier's seconds per row and rows iterates
+        (adapter, ts, n, *metrics) ordered by adapter and ts, where n is the
+        number of raw samples a row averages (1 for raw samples).
+        """
+        start, end = int(start), math.ceil(end)
+        metrics = list(metrics or METRICS)
+        tier = self._tier(start, 1)
+        where = "ts >= ? AND ts < ?"
+        params = [start, end]
+        if adapters is not None:
+            where += f" AND adapter IN ({', '.join('?' * len(adapters))})"
+            params.extend(adapters)
+        weight = "1" if tier == "samples_1s" else "n"
+        sql = f"""SELECT adapter, ts, {weight}, {', '.join(f"round({m}, 4)" for m in metrics)}
+            FROM {tier} WHERE {where} ORDER BY adapter, ts"""
+        return TIERS[tier][0], self._stream(sql, params)
+
+    def iter_sessions(self, start, end):
+        """Stream stored session_stats rows (ts, bytes_received, bytes_sent, failovers, connected_minutes)."""
+        return self._stream("SELECT * FROM session_stats WHERE ts >= ? AND ts < ? ORDER BY ts",
+                            [int(start), math.ceil(end)])
+
+    def _stream(self, sql, params, batch=1000):
+        """Iterate a query's rows in batches over a connection of its own.
+
+        A download can outlive the request thread's turn (an ASGI server
+        reads it from worker threads), so it does not use the thread-local
+        connection. In WAL mode the open read does not block flushes.
+        """
+        conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+        try:
+            cursor = conn.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(batch)
+                if not rows:
+                    return
+                yield from rows
+        finally:
+            conn.close()
+
+    def oldest_timestamp(self):
+        """Timestamp of the oldest raw sample, or None if empty."""
+        return self._connect().execute("SELECT min(ts) FROM samples_1s").fetchone()[0]
@@ -96,8 +96,8 @@ fi
 echo -e "${GREEN}OK${NC}"
 
 # --- Step 5: Install Flask ---
-echo -e "${YELLOW}[5/7] Installing Flask...${NC}"
-$SUDO apt install -y python3-flask
+echo -e "${YELLOW}[5/7] Installing Flask and Gunicorn...${NC}"
+$SUDO apt install -y python3-flask gunicorn
 echo -e "${GREEN}OK${NC}"
 
 # --- Step 6: Configure WiFi Access Point ---
@@ -131,7 +131,7 @@ fi
 echo -e "${YELLOW}[7/7] Installing systemd service...${NC}"
 if ! command -v systemctl &>/dev/null; then
     echo -e "${YELLOW}systemd not found - skipping service install${NC}"
-    echo "To start manually: cd $INSTALL_DIR && python3 app.py"
+    echo "To start manually: cd $INSTALL_DIR && python3 -m gunicorn -c gunicorn.conf.py wsgi:app"
 else
     $SUDO cp "$INSTALL_DIR/wifi-dashboard.service" /etc/systemd/system/
     $SUDO sed -i "s|/home/wifi|$HOME|g" /etc/systemd/system/wifi-dashboard.service
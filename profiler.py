@@ -0,0 +1,114 @@
+"""Wall-clock sampling profiler and per-phase timings for /debug/profile.
+
+sample() snapshots every thread's stack with sys._current_frames() at a
+fixed interval and counts identical stacks. The result renders as
+collapsed stacks ("thread;file:function;... count"), the input format of
+flamegraph.pl, speedscope and similar tools. Nothing is traced between
+samples, so the cost is one stack walk per thread per interval and only
+while a profile is running.
+
+PhaseTimings accumulates how long named phases of request handling took
+(CLI spawn, reading its output, parsing, ...), so a profile can also say
+where the time went in numbers.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+
+class _PhaseTimer:
+    __slots__ = ("timings", "phase", "start")
+
+    def __init__(self, timings, phase):
+        self.timings = timings
+        self.phase = phase
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timings.record(self.phase, time.perf_counter() - self.start)
+
+
+class PhaseTimings:
+    """Count, total and maximum seconds per named phase."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._phases = {}
+
+    def record(self, phase, seconds):
+        with self._lock:
+            state = self._phases.get(phase)
+            if state is None:
+                state = self._phases[phase] = [0, 0.0, 0.0]
+            state[0] += 1
+            state[1] += seconds
+            if seconds > state[2]:
+                state[2] = seconds
+
+    def time(self, phase):
+        """Context manager that records the elapsed time of its block."""
+        return _PhaseTimer(self, phase)
+
+    def snapshot(self):
+        """{phase: (count, total seconds, max seconds)}"""
+        with self._lock:
+            return {phase: tuple(state) for phase, state in self._phases.items()}
+
+
+def phase_delta(before, after):
+    """Per-phase count, total and mean milliseconds between two snapshots."""
+    delta = {}
+    for phase, (count, total, _) in after.items():
+        previous_count, previous_total, _ = before.get(phase, (0, 0.0, 0.0))
+        count -= previous_count
+        if count:
+            total = (total - previous_total) * 1000
+            delta[phase] = {"count": count, "total_ms": round(total, 3), "mean_ms": round(total / count, 3)}
+    return delta
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+def collapse(frame, thread_name):
+    """One stack as "thread;outermost;...;innermost"."""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.append(thread_name.replace(";", ":").replace(" ", "_"))
+    return ";".join(reversed(labels))
+
+
+def sample(duration, interval=0.005):
+    """Sample every other thread's stack for duration seconds.
+
+    Returns (stacks, samples): a Counter of collapsed stacks and the number
+    of sampling rounds taken.
+    """
+    own = threading.get_ident()
+    stacks = Counter()
+    samples = 0
+    deadline = time.perf_counter() + duration
+    while True:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident != own:
+                stacks[collapse(frame, names.get(ident, f"thread-{ident}"))] += 1
+        samples += 1
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            return stacks, samples
+        time.sleep(min(interval, remaining))
+
+
+def render_collapsed(stacks):
+    """Collapsed-stack text, most frequent stack first."""
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
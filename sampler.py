@@ -0,0 +1,178 @@
+"""Adaptive sampling for the stats collector.
+
+Picks how often `speedify_cli` is sampled from link conditions and client
+demand:
+
+    fast  the continuous `stats` stream, while any connection is warn/bad
+          or a failover just happened
+    slow  a one-shot `stats 1` every slow_interval seconds, once every
+          connection has been good for calm_seconds
+    idle  no client has asked for status in idle_seconds: no sampling at
+          all, or one `stats 1` every idle_interval seconds when set; the
+          next request resumes sampling
+
+Fewer CLI runs mean fewer CPU wakeups on battery-powered kits, while
+trouble still switches straight back to the stream.
+"""
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+FAST = "fast"
+SLOW = "slow"
+IDLE = "idle"
+
+
+class AdaptiveSampler:
+    """Drives a StatsCollector's arguments from the sections it publishes.
+
+    Args:
+        collector: StatsCollector to reconfigure
+        classify: calculate_status_level(latency, jitter, mos, loss_send,
+            loss_receive) -> "good" / "warn" / "bad"
+        slow_interval: Seconds between one-shot samples in slow mode
+        calm_seconds: All-good time before backing off to slow mode
+        idle_seconds: Time without client demand before sampling stops
+            (0 keeps sampling forever)
+        idle_interval: Seconds between one-shot samples while idle, for
+            consumers that need data without clients (0 stops sampling)
+    """
+
+    def __init__(self, collector, classify, slow_interval=10.0, calm_seconds=120.0, idle_seconds=300.0,
+                 idle_interval=0.0):
+        self.collector = collector
+        self.classify = classify
+        self.slow_interval = slow_interval
+        self.calm_seconds = calm_seconds
+        self.idle_seconds = idle_seconds
+        self.idle_interval = idle_interval
+
+        self._lock = threading.Lock()
+        self._mode = FAST
+        self._active_mode = FAST  # Mode to return to when waking from idle
+        self._last_demand = time.time()
+        self._good_since = None
+        self._failovers = None
+        self._mode_changes = 0
+
+        self._changed = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @property
+    def mode(self):
+        return self._mode
+
+    @property
+    def mode_changes(self):
+        return self._mode_changes
+
+    def max_age(self):
+        """How old the collector's snapshot may be and still count as current."""
+        if self._mode == SLOW:
+            return self.slow_interval + 5
+        return None
+
+    # Lifecycle
+
+    def start(self):
+        """Apply the initial mode and start the idle watchdog thread."""
+        self._apply(self._mode)
+        if self.idle_seconds:
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name="adaptive-sampler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self._changed.set()
+        if self._thread is not None:
+            self._thread.join(5)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            with self._lock:
+                now = time.time()
+                deadline = self._last_demand + self.idle_seconds
+                if self._mode != IDLE and now >= deadline:
+                    self._set_mode(IDLE, "no client demand")
+                timeout = None if self._mode == IDLE else max(1.0, deadline - now)
+            self._changed.wait(timeout)
+            self._changed.clear()
+
+    # Inputs
+
+    def touch(self):
+        """Record client demand; resumes sampling if it was idle."""
+        self._last_demand = time.time()
+        if self._mode == IDLE:
+            with self._lock:
+                if self._mode == IDLE:
+                    self._set_mode(self._active_mode, "client demand")
+            self._changed.set()
+
+    def observe(self, section_name, section_data):
+        """Collector listener: switch modes on link conditions."""
+        if section_name == "connection_stats":
+            self._observe_connections(section_data.get("connections", []))
+        elif section_name == "session_stats":
+            failovers = section_data.get("total", {}).get("numFailovers")
+            if failovers is None:
+                return
+            with self._lock:
+                previous, self._failovers = self._failovers, failovers
+                if previous is not None and failovers > previous:
+                    self._trouble("failover")
+
+    def _observe_connections(self, connections):
+        levels = [
+            self.classify(conn.get("latencyMs", 0), max(conn.get("jitterMs", 0), 0), conn.get("mos", 0),
+                          conn.get("lossSend", 0), conn.get("lossReceive", 0))
+            for conn in connections
+            if conn.get("connected", False) and conn.get("latencyMs", 0) > 0
+        ]
+        with self._lock:
+            if any(level != "good" for level in levels):
+                self._trouble("link degraded")
+                return
+            now = time.time()
+            if self._good_since is None:
+                self._good_since = now
+            elif self._mode == FAST and now - self._good_since >= self.calm_seconds:
+                self._set_mode(SLOW, "link stable")
+
+    # Mode changes (called with the lock held)
+
+    def _trouble(self, reason):
+        self._good_since = None
+        if self._mode == SLOW:
+            self._set_mode(FAST, reason)
+        elif self._mode == IDLE:
+            self._active_mode = FAST
+
+    def _set_mode(self, mode, reason):
+        if mode == self._mode:
+            return
+        logger.info(f"Sampling {self._mode} -> {mode} ({reason})")
+        self._mode = mode
+        self._mode_changes += 1
+        if mode != IDLE:
+            self._active_mode = mode
+        if mode == FAST:
+            self._good_since = None
+        self._apply(mode)
+
+    def _apply(self, mode):
+        if mode == IDLE and not self.idle_interval:
+            self.collector.pause()
+            return
+        if mode == FAST:
+            self.collector.configure(("stats",), restart_delay=1.0)
+        elif mode == IDLE:
+            self.collector.configure(("stats", "1"), restart_delay=self.idle_interval)
+        else:
+            self.collector.configure(("stats", "1"), restart_delay=self.slow_interval)
+        self.collector.resume()
@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""Shares one stats collector between server worker processes.
+
+Under gunicorn every worker is a separate process with its own cache, so
+each would otherwise run its own `speedify_cli stats` subscription. Instead
+one broker process runs the collector (plus the adaptive sampler, metrics
+store, event rules, usage rates and command queue) and pushes every section
+to the workers over a local Unix socket. Each worker keeps the newest
+sections in a SnapshotClient, which stands in for StatsCollector, so
+request handling is the same as with one process and the CLI load does not
+grow with the number of workers. Workers ask the broker for anything that
+must agree between them: status payloads and their revisions, events and
+usage.
+
+The protocol is one JSON object per line. The broker sends:
+
+    {"type": "section", "name": ..., "data": ..., "maxAge": ...}
+    {"type": "invalidate", "classes": [...]}   cache classes a command changed
+    {"type": "reply", "ref": n, ...}           answer to a request
+
+and workers send {"op": ..., "ref": n, ...} requests. The broker hands them
+to the handler registered for the op on a shared thread pool, so a slow
+handler delays neither the worker's other requests nor the other workers;
+"demand" carries no ref and gets no reply.
+
+Run by gunicorn.conf.py as:
+
+    python3 snapshot_broker.py /run/wifi-dashboard/snapshot.sock
+"""
+import itertools
+import json
+import logging
+import os
+import queue
+import signal
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from collector import StatsCollector
+
+logger = logging.getLogger(__name__)
+
+CLIENT_QUEUE_SIZE = 256  # Messages buffered per worker before it is dropped (it reconnects and resyncs)
+HANDLER_THREADS = 8  # Worker requests handled at once
+
+
+def encode(message):
+    return json.dumps(message, separators=(",", ":")).encode() + b"\n"
+
+
+class _Client:
+    __slots__ = ("conn", "queue")
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.queue = queue.Queue(maxsize=CLIENT_QUEUE_SIZE)
+
+
+class SnapshotBroker:
+    """Serves a collector's sections and request handlers on a Unix socket.
+
+    Args:
+        path: Socket path (an existing file there is replaced)
+        collector: StatsCollector whose sections are shared, or None
+        handlers: {op: handler(message) -> reply dict or None}
+        max_age: Optional callable giving the snapshot age workers should
+            still accept (the sampler's interval)
+    """
+
+    def __init__(self, path, collector=None, handlers=None, max_age=None):
+        self.path = path
+        self.collector = collector
+        self.handlers = dict(handlers or {})
+        self.max_age = max_age
+        self._clients = []
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+        self._listening = False
+        self._pool = None
+
+    def start(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(self.path)
+        os.chmod(self.path, 0o600)
+        self._server.listen(64)
+        if self.collector is not None and not self._listening:
+            self.collector.add_listener(self.publish)
+            self._listening = True
+        self._pool = ThreadPoolExecutor(max_workers=HANDLER_THREADS, thread_name_prefix="snapshot-handler")
+        self._thread = threading.Thread(target=self._accept, name="snapshot-broker", daemon=True)
+        self._thread.start()
+        logger.info(f"Snapshot broker listening on {self.path}")
+
+    def stop(self):
+        server, self._server = self._server, None
+        if server is not None:
+            server.close()
+        with self._lock:
+            clients, self._clients = self._clients, []
+        for client in clients:
+            self._drop(client)
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+    @property
+    def clients(self):
+        with self._lock:
+            return len(self._clients)
+
+    def _section_message(self, name, data):
+        return {"type": "section", "name": name, "data": data,
+                "maxAge": self.max_age() if self.max_age is not None else None}
+
+    def publish(self, section_name, section_data):
+        """Collector listener: push one section to every worker."""
+        self.broadcast(self._section_message(section_name, section_data))
+
+    def broadcast(self, message):
+        line = encode(message)
+        with self._lock:
+            clients = list(self._clients)
+        for client in clients:
+            try:
+                client.queue.put_nowait(line)
+            except queue.Full:
+                logger.warning("Snapshot broker dropping a worker that stopped reading")
+                self._drop(client)
+
+    def _drop(self, client):
+        with self._lock:
+            if client in self._clients:
+                self._clients.remove(client)
+        try:
+            client.conn.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        try:
+            client.queue.put_nowait(None)
+        except queue.Full:
+            pass
+
+    def _accept(self):
+        while self._server is not None:
+            try:
+                conn, _ = self._server.accept()
+            except OSError:
+                return
+            client = _Client(conn)
+            with self._lock:
+                # Everything published from now on follows the initial snapshot
+                sections = self.collector.snapshot()[0] if self.collector is not None else {}
+                for name, data in sections.items():
+                    client.queue.put_nowait(encode(self._section_message(name, data)))
+                self._clients.append(client)
+            threading.Thread(target=self._write, args=(client,), name="snapshot-writer", daemon=True).start()
+            threading.Thread(target=self._read, args=(client,), name="snapshot-reader", daemon=True).start()
+
+    def _write(self, client):
+        try:
+            while True:
+                line = client.queue.get()
+                if line is None:
+                    break
+                client.conn.sendall(line)
+        except OSError:
+            pass
+        finally:
+            self._drop(client)
+            client.conn.close()
+
+    def _read(self, client):
+        pool = self._pool
+        try:
+            for line in client.conn.makefile("rb"):
+                pool.submit(self._handle, client, json.loads(line))
+        except (OSError, ValueError, RuntimeError):  # RuntimeError: the pool was shut down by stop()
+            pass
+        finally:
+            self._drop(client)
+
+    def _handle(self, client, message):
+        handler = self.handlers.get(message.get("op"))
+        try:
+            reply = handler(message) if handler is not None else {"error": f"Unknown op {message.get('op')!r}"}
+        except Exception as e:
+            logger.error(f"Snapshot broker handler {message.get('op')} failed: {e}")
+            reply = {"error": str(e)}
+        if reply is not None and "ref" in message:
+            try:
+                client.queue.put_nowait(encode(dict(reply, type="reply", ref=message["ref"])))
+            except queue.Full:
+                self._drop(client)
+
+
+class SnapshotClient(StatsCollector):
+    """A worker's view of the broker's collector.
+
+    Offers the StatsCollector interface (snapshot, latest, revision,
+    wait_for_update, add_listener, start/stop, stats) over sections pushed
+    by a SnapshotBroker, reconnecting after reconnect_delay if the
+    connection drops, and sends requests to the broker.
+
+    Args:
+        path: Broker socket path
+        on_invalidate: Callback(*cache_classes) for the broker's invalidations
+        reconnect_delay: Seconds between connection attempts
+        timeout: Seconds to wait for a reply to request()
+        touch_interval: Minimum seconds between forwarded demand notices
+    """
+
+    def __init__(self, path, on_invalidate=None, reconnect_delay=1.0, timeout=5.0, touch_interval=1.0):
+        super().__init__(path, args=(), restart_delay=reconnect_delay, max_restart_delay=reconnect_delay)
+        self.on_invalidate = on_invalidate
+        self.timeout = timeout
+        self.touch_interval = touch_interval
+        self.max_age = None  # Sent by the broker with each section
+        self._sock = None
+        self._send_lock = threading.Lock()
+        self._refs = itertools.count(1)
+        self._replies = {}  # ref -> [Event, reply]
+        self._touched_at = 0.0
+
+    def request(self, op, **fields):
+        """Send a request to the broker and return its reply.
+
+        Raises OSError if the broker is unreachable or does not answer.
+        """
+        ref = next(self._refs)
+        waiter = self._replies[ref] = [threading.Event(), None]
+        try:
+            self._send(dict(fields, op=op, ref=ref))
+            if not waiter[0].wait(self.timeout):
+                raise OSError(f"Snapshot broker did not answer {op}")
+            return waiter[1]
+        finally:
+            self._replies.pop(ref, None)
+
+    def touch(self):
+        """Tell the broker a client wants current data (resumes idle sampling)."""
+        now = time.time()
+        if now - self._touched_at < self.touch_interval:
+            return
+        self._touched_at = now
+        try:
+            self._send({"op": "demand"})
+        except OSError:
+            pass
+
+    def _send(self, message):
+        sock = self._sock
+        if sock is None:
+            raise OSError("Not connected to the snapshot broker")
+        with self._send_lock:
+            sock.sendall(encode(message))
+
+    def stats(self):
+        stats = super().stats()
+        stats["broker"] = self.cli_path
+        stats["connected"] = self._sock is not None
+        stats["spawns"] = 0  # The broker runs the CLI
+        return stats
+
+    def _terminate_process(self):
+        sock = self._sock
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            revision = self._revision
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                sock.connect(self.cli_path)
+                self._sock = sock
+                self._started_at = time.time()
+                for line in sock.makefile("rb"):
+                    self._dispatch(json.loads(line))
+                reason = "stopped" if self._stop_event.is_set() else "disconnected"
+            except (OSError, ValueError) as e:
+                reason = f"error {type(e).__name__}"
+            finally:
+                self._sock = None
+                self._started_at = None
+                sock.close()
+            self.exits[reason] += 1
+            self.last_exit = (reason, time.time())
+            if reason != "stopped":
+                if self._revision != revision:
+                    logger.warning(f"Lost the snapshot broker at {self.cli_path} ({reason}), reconnecting")
+                self._wake.wait(self.restart_delay)
+
+    def _dispatch(self, message):
+        kind = message.get("type")
+        if kind == "section":
+            self.max_age = message.get("maxAge")
+            self._publish(message["name"], message["data"])
+            for callback in self._listeners:
+                try:
+                    callback(message["name"], message["data"])
+                except Exception as e:
+                    logger.error(f"Snapshot listener error: {e}")
+        elif kind == "invalidate":
+            if self.on_invalidate is not None:
+                self.on_invalidate(*message["classes"])
+        elif kind == "reply":
+            waiter = self._replies.get(message.get("ref"))
+            if waiter is not None:
+                waiter[1] = message
+                waiter[0].set()
+
+
+def main(argv):
+    path = argv[0] if argv else os.environ.get("SNAPSHOT_SOCKET")
+    if not path:
+        print("usage: snapshot_broker.py <socket path>", file=sys.stderr)
+        return 2
+    # The broker is the snapshot's source, not one of its subscribers
+    os.environ.pop("SNAPSHOT_SOCKET", None)
+    import app as dashboard
+
+    stopping = threading.Event()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *_: stopping.set())
+    broker = dashboard.start_broker(path)
+    while not stopping.wait(1):
+        pass
+    broker.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,504 @@
+// Track previous health score for trend calculation
+let previousHealthScore = null;
+
+// Track connection state for error banner
+let consecutiveErrors = 0;
+const MAX_ERRORS_BEFORE_BANNER = 2;
+
+// Debounce flag for mode changes
+let modeChangeInProgress = false;
+const JOB_POLL_MS = 300;
+
+// Fallback polling timer, active only while the status stream is down
+let statusPollTimer = null;
+
+// Last full status payload; stream and poll deltas are applied to it
+let currentStatus = null;
+
+// Toast notification system
+function showToast(type, title, message, duration = 4000) {
+    const container = document.getElementById('toast-container');
+    const toast = document.createElement('div');
+    toast.className = `toast ${type}`;
+
+    const icons = {
+        success: '&#10004;',
+        error: '&#10006;',
+        warning: '&#9888;',
+        info: '&#8505;'
+    };
+
+    toast.innerHTML = `
+        <span class="toast-icon">${icons[type] || icons.info}</span>
+        <div class="toast-content">
+            <div class="toast-title">${title}</div>
+            ${message ? `<div class="toast-message">${message}</div>` : ''}
+        </div>
+        <button class="toast-close" onclick="this.parentElement.remove()">&times;</button>
+    `;
+
+    container.appendChild(toast);
+
+    // Auto-remove after duration
+    setTimeout(() => {
+        toast.classList.add('hiding');
+        setTimeout(() => toast.remove(), 300);
+    }, duration);
+}
+
+// Show/hide connection error banner
+function setConnectionError(hasError) {
+    const banner = document.getElementById('connection-error-banner');
+    if (hasError) {
+        consecutiveErrors++;
+        if (consecutiveErrors >= MAX_ERRORS_BEFORE_BANNER) {
+            banner.classList.add('visible');
+        }
+    } else {
+        if (consecutiveErrors >= MAX_ERRORS_BEFORE_BANNER) {
+            banner.classList.remove('visible');
+            showToast('success', 'Connection Restored', 'Dashboard is receiving data again');
+        }
+        consecutiveErrors = 0;
+    }
+}
+
+function updateHealthWidget(score, status) {
+    const healthScore = document.getElementById('health-score');
+    const healthStatus = document.getElementById('health-status');
+    const healthRing = document.getElementById('health-ring');
+    const healthTrendArrow = document.getElementById('health-trend-arrow');
+    const healthTrendText = document.getElementById('health-trend-text');
+
+    // Determine color based on score
+    let color, rgb, statusText;
+    if (score >= 80) {
+        color = '#00ff88';
+        rgb = '0, 255, 136';
+        statusText = 'Excellent';
+    } else if (score >= 60) {
+        color = '#88ff00';
+        rgb = '136, 255, 0';
+        statusText = 'Good';
+    } else if (score >= 40) {
+        color = '#ffaa00';
+        rgb = '255, 170, 0';
+        statusText = 'Fair';
+    } else if (score >= 20) {
+        color = '#ff6600';
+        rgb = '255, 102, 0';
+        statusText = 'Poor';
+    } else {
+        color = '#ff4444';
+        rgb = '255, 68, 68';
+        statusText = 'Critical';
+    }
+
+    // Update score and colors
+    healthScore.textContent = score;
+    healthScore.style.color = color;
+    healthStatus.textContent = statusText;
+    healthStatus.style.color = color;
+
+    // Update ring gradient
+    healthRing.style.setProperty('--health-color', color);
+    healthRing.style.setProperty('--health-rgb', rgb);
+    healthRing.style.setProperty('--health-percent', score);
+    healthRing.style.background = `conic-gradient(${color} ${score * 3.6}deg, rgba(255, 255, 255, 0.1) 0deg)`;
+
+    // Calculate trend
+    if (previousHealthScore !== null) {
+        const diff = score - previousHealthScore;
+        if (diff > 2) {
+            healthTrendArrow.textContent = '↑';
+            healthTrendArrow.className = 'health-trend-arrow up';
+            healthTrendText.textContent = 'Improving';
+        } else if (diff < -2) {
+            healthTrendArrow.textContent = '↓';
+            healthTrendArrow.className = 'health-trend-arrow down';
+            healthTrendText.textContent = 'Degrading';
+        } else {
+            healthTrendArrow.textContent = '→';
+            healthTrendArrow.className = 'health-trend-arrow stable';
+            healthTrendText.textContent = 'Stable';
+        }
+    }
+    previousHealthScore = score;
+}
+
+function getStatusClass(value, type) {
+    if (value === 'N/A' || value === 0) return 'good';
+
+    switch(type) {
+        case 'latency':
+            if (value <= 50) return 'good';
+            if (value <= 100) return 'warn';
+            return 'bad';
+        case 'jitter':
+            if (value <= 10) return 'good';
+            if (value <= 30) return 'warn';
+            return 'bad';
+        case 'mos':
+            if (value >= 4.0) return 'good';
+            if (value >= 3.5) return 'warn';
+            return 'bad';
+        case 'loss':
+            if (value === 0) return 'good';
+            if (value < 1.0) return 'warn';
+            return 'bad';
+        default:
+            return 'good';
+    }
+}
+
+function updateServerInfo() {
+    fetch("/api/server")
+        .then(response => response.json())
+        .then(data => {
+            document.getElementById("server-location").textContent = data.location;
+            document.getElementById("server-ip").textContent = data.publicIP;
+        })
+        .catch(error => {
+            console.error("Error fetching server info:", error);
+            document.getElementById("server-location").textContent = "Error";
+            document.getElementById("server-ip").textContent = "Error";
+        });
+}
+
+function renderStatus(data) {
+    // Clear connection error state on successful update
+    setConnectionError(false);
+
+    // Update overall status in status bar
+    const overallDot = document.getElementById("overall-dot");
+    const overallState = document.getElementById("overall-state");
+    const bondingMode = document.getElementById("bonding-mode");
+
+    overallDot.className = `status-dot ${data.overall.status}`;
+    overallState.textContent = data.overall.state;
+    overallState.className = `status-bar-value ${data.overall.status}`;
+    bondingMode.textContent = data.overall.bondingMode.toUpperCase();
+
+    // Update mode buttons
+    updateModeButtons(data.overall.bondingMode);
+
+    // Update health widget
+    updateHealthWidget(data.overall.healthScore, data.overall.status);
+
+    // Update performance metrics in status hero
+    const perf = data.performance;
+
+    // Update latency tile
+    const latencyStatus = getStatusClass(perf.latency, 'latency');
+    document.getElementById("tile-latency").className = `metric-tile ${latencyStatus}`;
+    document.getElementById("perf-latency").innerHTML = `${perf.latency}<span class="metric-unit">ms</span>`;
+    document.getElementById("perf-latency").className = `metric-value ${latencyStatus}`;
+
+    // Update jitter tile
+    const jitterStatus = getStatusClass(perf.jitter, 'jitter');
+    document.getElementById("tile-jitter").className = `metric-tile ${jitterStatus}`;
+    document.getElementById("perf-jitter").innerHTML = `${perf.jitter}<span class="metric-unit">ms</span>`;
+    document.getElementById("perf-jitter").className = `metric-value ${jitterStatus}`;
+
+    // Update MOS tile
+    const mosStatus = getStatusClass(perf.mos, 'mos');
+    document.getElementById("tile-mos").className = `metric-tile ${mosStatus}`;
+    document.getElementById("perf-mos").innerHTML = `${perf.mos}<span class="metric-unit">/5</span>`;
+    document.getElementById("perf-mos").className = `metric-value ${mosStatus}`;
+
+    // Update packet loss tile
+    const maxLoss = Math.max(perf.lossSend, perf.lossReceive);
+    const lossStatus = getStatusClass(maxLoss, 'loss');
+    document.getElementById("tile-loss").className = `metric-tile ${lossStatus}`;
+    document.getElementById("perf-loss").innerHTML = `${maxLoss.toFixed(2)}<span class="metric-unit">%</span>`;
+    document.getElementById("perf-loss").className = `metric-value ${lossStatus}`;
+
+    // Update warning indicators
+    const warningContainer = document.getElementById("warning-indicators");
+    warningContainer.innerHTML = '';
+
+    const warnings = [];
+    if (data.overall.badIndicators.badCpu) warnings.push('High CPU');
+    if (data.overall.badIndicators.badLatency) warnings.push('High Latency');
+    if (data.overall.badIndicators.badLoss) warnings.push('Packet Loss');
+    if (data.overall.badIndicators.badMemory) warnings.push('Memory Issues');
+
+    warnings.forEach(warning => {
+        const badge = document.createElement('div');
+        badge.className = 'warning-badge';
+        badge.textContent = warning;
+        warningContainer.appendChild(badge);
+    });
+
+    // Update session statistics
+    const session = data.session;
+    document.getElementById("session-uptime").textContent = session.uptime;
+    document.getElementById("session-received").textContent = session.bytesReceived;
+    document.getElementById("session-sent").textContent = session.bytesSent;
+    document.getElementById("session-failovers").textContent = session.failovers;
+    document.getElementById("session-max-down").textContent = `${session.maxDownloadSpeed} Mbps`;
+    document.getElementById("session-max-up").textContent = `${session.maxUploadSpeed} Mbps`;
+
+    // Update adapters
+    const adaptersContainer = document.getElementById("adapters-container");
+    if (data.adapters && data.adapters.length > 0) {
+        adaptersContainer.innerHTML = "";
+        data.adapters.forEach(adapter => {
+            const adapterCard = document.createElement("div");
+            adapterCard.className = `adapter-card ${adapter.status}`;
+
+            let connectionStatsHTML = '';
+            if (adapter.connectionStats) {
+                const conn = adapter.connectionStats;
+                connectionStatsHTML = `
+                    <div class="adapter-detail">
+                        <span class="detail-label">Latency</span>
+                        <span class="detail-value" style="color: ${getStatusColor(getStatusClass(conn.latency, 'latency'))}">${conn.latency}ms</span>
+                    </div>
+                    <div class="adapter-detail">
+                        <span class="detail-label">Jitter</span>
+                        <span class="detail-value">${conn.jitter}ms</span>
+                    </div>
+                    <div class="adapter-detail">
+                        <span class="detail-label">MOS</span>
+                        <span class="detail-value" style="color: ${getStatusColor(getStatusClass(conn.mos, 'mos'))}">${conn.mos.toFixed(2)}</span>
+                    </div>
+                    <div class="adapter-detail">
+                        <span class="detail-label">Speed</span>
+                        <span class="detail-value">${formatSpeed(conn.totalBps)}</span>
+                    </div>
+                `;
+            }
+
+            adapterCard.innerHTML = `
+                <div class="adapter-status ${adapter.status}"></div>
+                <div class="adapter-header">
+                    <div class="adapter-name">${adapter.name}</div>
+                    <div class="adapter-type">${adapter.type}</div>
+                </div>
+                <div class="adapter-details">
+                    <div class="adapter-detail">
+                        <span class="detail-label">ISP</span>
+                        <span class="detail-value">${adapter.isp}</span>
+                    </div>
+                    <div class="adapter-detail">
+                        <span class="detail-label">State</span>
+                        <span class="detail-value">${adapter.state}</span>
+                    </div>
+                    <div class="adapter-detail">
+                        <span class="detail-label">Priority</span>
+                        <span class="detail-value">${adapter.workingPriority}</span>
+                    </div>
+                    <div class="adapter-detail">
+                        <span class="detail-label">Daily Usage</span>
+                        <span class="detail-value">${adapter.dataUsage.daily}</span>
+                    </div>
+                    ${connectionStatsHTML}
+                </div>
+            `;
+            adaptersContainer.appendChild(adapterCard);
+        });
+    } else {
+        adaptersContainer.innerHTML = '<p style="text-align: center; color: #666; padding: 20px;">No adapters available</p>';
+    }
+}
+
+// Apply an RFC 7396 JSON merge-patch (arrays are replaced whole)
+function applyMergePatch(target, patch) {
+    if (patch === null || typeof patch !== 'object' || Array.isArray(patch)) {
+        return patch;
+    }
+    const result = (target && typeof target === 'object' && !Array.isArray(target))
+        ? Object.assign({}, target) : {};
+    Object.keys(patch).forEach(key => {
+        if (patch[key] === null) {
+            delete result[key];
+        } else {
+            result[key] = applyMergePatch(result[key], patch[key]);
+        }
+    });
+    return result;
+}
+
+function setStatus(data) {
+    currentStatus = data;
+    renderStatus(data);
+}
+
+function updateStatus() {
+    // Only ask for what changed since the revision we already have
+    const url = currentStatus ? `/api/status?since=${currentStatus.revision}` : "/api/status";
+    fetch(url)
+        .then(response => {
+            if (response.status === 304) {
+                setConnectionError(false);
+                return null;
+            }
+            const isPatch = (response.headers.get('Content-Type') || '').includes('merge-patch');
+            return response.json().then(data => isPatch ? applyMergePatch(currentStatus, data) : data);
+        })
+        .then(data => {
+            if (data) setStatus(data);
+        })
+        .catch(error => {
+            console.error("Error fetching status:", error);
+            // Track connection errors and show banner if persistent
+            setConnectionError(true);
+        });
+}
+
+function getStatusColor(status) {
+    switch(status) {
+        case 'good': return '#00ff88';
+        case 'warn': return '#ffaa00';
+        case 'bad': return '#ff4444';
+        default: return '#fff';
+    }
+}
+
+function updateModeButtons(currentMode) {
+    const buttons = ['streaming', 'speed', 'redundant'];
+    buttons.forEach(mode => {
+        const button = document.getElementById(`mode-${mode}`);
+        if (button) {
+            if (mode === currentMode) {
+                button.classList.add('active');
+                button.classList.remove('disabled');
+            } else {
+                button.classList.remove('active');
+                button.classList.remove('disabled');
+            }
+        }
+    });
+}
+
+// Poll a queued command (see /api/jobs) until it has finished
+function waitForJob(url, timeoutMs = 15000) {
+    const deadline = Date.now() + timeoutMs;
+    return fetch(url)
+        .then(response => response.json())
+        .then(job => {
+            if (job.state === 'succeeded' || job.state === 'failed' || job.success === false) {
+                return job;
+            }
+            if (Date.now() > deadline) {
+                return { success: false, error: 'Timed out waiting for the command' };
+            }
+            return new Promise(resolve => setTimeout(resolve, JOB_POLL_MS))
+                .then(() => waitForJob(url, deadline - Date.now()));
+        });
+}
+
+function changeMode(mode) {
+    const button = document.getElementById(`mode-${mode}`);
+
+    // Don't change if already active or disabled
+    if (button.classList.contains('active') || button.classList.contains('disabled')) {
+        return;
+    }
+
+    // Debounce: prevent rapid clicks during mode change
+    if (modeChangeInProgress) {
+        showToast('warning', 'Please Wait', 'Mode change already in progress');
+        return;
+    }
+    modeChangeInProgress = true;
+
+    // Set loading state
+    button.classList.add('loading');
+    button.textContent = '';
+
+    fetch('/api/change-mode', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({ mode: mode })
+    })
+    .then(response => response.json())
+    // The change is queued; wait for its job to finish
+    .then(data => data.success && data.jobId ? waitForJob(`/api/jobs/${data.jobId}`) : data)
+    .then(data => {
+        if (data.success) {
+            // Update UI immediately to show the change
+            updateModeButtons(mode);
+            document.getElementById("bonding-mode").textContent = mode.toUpperCase();
+            showToast('success', 'Mode Changed', `Switched to ${mode} mode`);
+
+            // Refresh data after a short delay to get updated status
+            setTimeout(() => {
+                updateStatus();
+            }, 1000);
+        } else {
+            console.error('Mode change failed:', data.error);
+            showToast('error', 'Mode Change Failed', data.error);
+        }
+    })
+    .catch(error => {
+        console.error('Error changing mode:', error);
+        showToast('error', 'Connection Error', 'Could not reach the server');
+    })
+    .finally(() => {
+        // Remove loading state and restore text
+        button.classList.remove('loading');
+        button.textContent = mode.charAt(0).toUpperCase() + mode.slice(1);
+        modeChangeInProgress = false;
+    });
+}
+
+function formatSpeed(bps) {
+    if (bps === 0) return '0 bps';
+    if (bps >= 1000000) return `${(bps / 1000000).toFixed(1)} Mbps`;
+    if (bps >= 1000) return `${(bps / 1000).toFixed(1)} Kbps`;
+    return `${bps} bps`;
+}
+
+// Poll status every 3 seconds while the live stream is unavailable
+function startStatusPolling() {
+    if (statusPollTimer === null) {
+        updateStatus();
+        statusPollTimer = setInterval(updateStatus, 3000);
+    }
+}
+
+function stopStatusPolling() {
+    if (statusPollTimer !== null) {
+        clearInterval(statusPollTimer);
+        statusPollTimer = null;
+    }
+}
+
+// Subscribe to pushed status updates, falling back to polling if the stream drops
+function subscribeStatus() {
+    if (!window.EventSource) {
+        startStatusPolling();
+        return;
+    }
+
+    const source = new EventSource("/api/status/stream");
+    source.addEventListener('status', event => {
+        stopStatusPolling();
+        setStatus(JSON.parse(event.data));
+    });
+    source.addEventListener('patch', event => {
+        stopStatusPolling();
+        setStatus(applyMergePatch(currentStatus, JSON.parse(event.data)));
+    });
+    source.onerror = () => {
+        // EventSource retries on its own; keep the page fresh meanwhile
+        startStatusPolling();
+        if (source.readyState === EventSource.CLOSED) {
+            setTimeout(subscribeStatus, 5000);
+        }
+    };
+}
+
+// Initial load
+updateServerInfo();
+updateStatus();
+
+// Live status updates pushed by the server
+subscribeStatus();
+
+// Server info updates every 30 seconds (rarely changes)
+setInterval(updateServerInfo, 30000);
@@ -0,0 +1,152 @@
+"""Revisioned status payloads and JSON merge-patch (RFC 7396) deltas.
+
+Every distinct /api/status payload gets a monotonically increasing revision.
+A short history of recent payloads lets clients that already hold revision N
+fetch only what changed since then. Each revision is also kept pre-encoded
+(plain and gzip bytes with strong ETags) so full responses are a byte write.
+"""
+import gzip
+import json
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+_MISSING = object()
+
+# The newest payload serialized once for every full response
+EncodedStatus = namedtuple("EncodedStatus", ("revision", "etag", "body", "gzip_etag", "gzip_body"))
+
+
+def merge_patch(old, new):
+    """Return the RFC 7396 merge patch that turns old into new.
+
+    Objects are diffed key by key; arrays and scalars are replaced whole.
+    Keys missing from new are set to None (null) in the patch.
+    """
+    if not isinstance(old, dict) or not isinstance(new, dict):
+        return new
+    patch = {}
+    for key, value in new.items():
+        previous = old.get(key, _MISSING)
+        if previous is _MISSING:
+            patch[key] = value
+        elif isinstance(previous, dict) and isinstance(value, dict):
+            child = merge_patch(previous, value)
+            if child:
+                patch[key] = child
+        elif previous != value:
+            patch[key] = value
+    for key in old:
+        if key not in new:
+            patch[key] = None
+    return patch
+
+
+def apply_merge_patch(target, patch):
+    """Apply an RFC 7396 merge patch, returning a new value."""
+    if not isinstance(patch, dict):
+        return patch
+    result = dict(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = apply_merge_patch(result.get(key), value)
+    return result
+
+
+def encode_status(revision, json_text):
+    """Serialize a revisioned payload to plain and gzip bytes.
+
+    Revisions are unique per content (and seeded from the clock), so they
+    double as strong ETags; the gzip bytes are a different representation
+    and get their own tag.
+    """
+    body = json_text.encode()
+    return EncodedStatus(revision, f'"{revision}"', body,
+                         f'"{revision}-gzip"', gzip.compress(body, compresslevel=6, mtime=0))
+
+
+class StatusRevisions:
+    """Assigns revisions to status payloads and keeps a bounded history.
+
+    Args:
+        history: Number of past payloads kept for computing deltas
+    """
+
+    def __init__(self, history=64):
+        self.history = history
+        self._lock = threading.Lock()
+        # Seed from the clock so revisions keep increasing across restarts
+        self._revision = int(time.time() * 1000)
+        self._body = None
+        self._current = None
+        self._encoded = None
+        self._payloads = OrderedDict()
+
+    def publish(self, payload):
+        """Record a freshly built payload.
+
+        Returns (revision, payload, json_text) where payload carries a
+        "revision" field. The revision only advances if the content changed.
+        """
+        body = json.dumps(payload, separators=(",", ":"), sort_keys=True)
+        with self._lock:
+            if body == self._body:
+                return self._current
+            self._revision += 1
+            return self._install(self._revision, dict(payload, revision=self._revision), body)
+
+    def adopt(self, revision, payload):
+        """Record a payload another process published, under its revision.
+
+        Gunicorn workers take the broker's payloads this way, so revisions,
+        ETags and deltas mean the same in every worker. A later publish()
+        continues from the clock, above the revisions the broker hands out
+        (they advance once per change, far slower than the clock).
+        """
+        with self._lock:
+            if self._current is not None and self._current[0] == revision:
+                return self._current
+            self._revision = max(self._revision, revision, int(time.time() * 1000))
+            body = json.dumps({key: value for key, value in payload.items() if key != "revision"},
+                              separators=(",", ":"), sort_keys=True)
+            return self._install(revision, dict(payload, revision=revision), body)
+
+    def _install(self, revision, revisioned, body):
+        json_text = json.dumps(revisioned, separators=(",", ":"), sort_keys=True)
+        self._body = body
+        self._current = (revision, revisioned, json_text)
+        self._encoded = encode_status(revision, json_text)
+        self._payloads[revision] = revisioned
+        self._payloads.move_to_end(revision)
+        while len(self._payloads) > self.history:
+            self._payloads.popitem(last=False)
+        return self._current
+
+    def current(self):
+        """Return (revision, payload, json_text) for the newest payload, or None."""
+        with self._lock:
+            return self._current
+
+    def encoded(self):
+        """Return the EncodedStatus for the newest payload, or None."""
+        with self._lock:
+            return self._encoded
+
+    def delta(self, since):
+        """Return (revision, patch) from revision since to the newest payload.
+
+        patch is {} if since is already the newest revision and None if since
+        is not in the history (the caller should send the full payload).
+        """
+        with self._lock:
+            if self._current is None:
+                return None, None
+            revision, newest, _ = self._current
+            if since == revision:
+                return revision, {}
+            previous = self._payloads.get(since)
+        if previous is None:
+            return revision, None
+        return revision, merge_patch(previous, newest)
@@ -0,0 +1,324 @@
+"""Compact binary status for small displays (CBOR, optionally MessagePack).
+
+/api/status is verbose JSON with preformatted strings ("1.23 GB"), which is
+slow to parse on e-ink and microcontroller displays. compact_status() turns
+the same revision into positional arrays of raw numbers instead:
+
+    [version, revision, updated, state, status, healthScore, bondingMode,
+     latency, jitter, mos, lossSend, lossReceive, activeConnections,
+     uptimeMinutes, bytesReceived, bytesSent, failovers, adapters]
+
+where adapters is a list of
+
+    [adapterID, name, state, status, usageDaily, usageMonthly,
+     latency, jitter, lossSend, lossReceive, receiveBps, sendBps]
+
+Bytes and bits per second are integers, latency and jitter are integers
+in tenths of a millisecond, mos is in hundredths and loss in hundredths
+of a percent. status is 0 (good), 1 (warn) or 2 (bad). New fields are
+only ever appended, so a display can index fields by position and ignore
+any extras; version changes if that ever has to break.
+
+The encoding is CBOR (RFC 8949), written here with the standard library,
+or MessagePack when the msgpack package is installed. StatusBroadcaster
+sends the CBOR bytes as one UDP datagram per interval, normally to a
+multicast group, so every display on the LAN updates from one packet.
+"""
+import logging
+import socket
+import struct
+import threading
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+
+STATUS_FIELDS = (
+    "version", "revision", "updated", "state", "status", "healthScore", "bondingMode",
+    "latency", "jitter", "mos", "lossSend", "lossReceive", "activeConnections",
+    "uptimeMinutes", "bytesReceived", "bytesSent", "failovers", "adapters",
+)
+ADAPTER_FIELDS = (
+    "adapterID", "name", "state", "status", "usageDaily", "usageMonthly",
+    "latency", "jitter", "lossSend", "lossReceive", "receiveBps", "sendBps",
+)
+STATUS_LEVELS = {"good": 0, "warn": 1, "bad": 2}
+
+CBOR = "application/cbor"
+MSGPACK = "application/msgpack"
+
+# Largest UDP payload that fits one Ethernet frame without IP fragmentation
+MAX_PACKET_BYTES = 1472
+
+
+def _fixed(value, scale):
+    return round((value or 0) * scale)
+
+
+def compact_status(revision, payload, stats_data, updated):
+    """The compact form of one status revision.
+
+    payload is the built /api/status payload and stats_data the parsed
+    stats sections it was built from (for the unformatted byte counters).
+    updated is the epoch second the revision was built.
+    """
+    overall = payload["overall"]
+    performance = payload["performance"]
+    session_total = stats_data.get("session_stats", {}).get("total", {})
+    usage_by_adapter = {adapter.get("adapterID"): adapter.get("dataUsage") or {}
+                        for adapter in stats_data.get("adapters", [])}
+
+    adapters = []
+    for adapter in payload["adapters"]:
+        connection = adapter["connectionStats"] or {}
+        usage = usage_by_adapter.get(adapter["adapterID"], {})
+        fields = {
+            "adapterID": adapter["adapterID"],
+            "name": adapter["name"],
+            "state": adapter["state"],
+            "status": STATUS_LEVELS.get(adapter["status"]),
+            "usageDaily": int(usage.get("usageDaily", 0)),
+            "usageMonthly": int(usage.get("usageMonthly", 0)),
+            "latency": _fixed(connection.get("latency"), 10),
+            "jitter": _fixed(connection.get("jitter"), 10),
+            "lossSend": _fixed(connection.get("loss_send"), 10000),
+            "lossReceive": _fixed(connection.get("loss_receive"), 10000),
+            "receiveBps": _fixed(connection.get("receiveBps"), 1),
+            "sendBps": _fixed(connection.get("sendBps"), 1),
+        }
+        adapters.append([fields[name] for name in ADAPTER_FIELDS])
+
+    fields = {
+        "version": FORMAT_VERSION,
+        "revision": revision,
+        "updated": int(updated),
+        "state": overall["state"],
+        "status": STATUS_LEVELS.get(overall["status"]),
+        "healthScore": overall["healthScore"],
+        "bondingMode": overall["bondingMode"],
+        "latency": _fixed(performance["latency"], 10),
+        "jitter": _fixed(performance["jitter"], 10),
+        "mos": _fixed(performance["mos"], 100),
+        "lossSend": _fixed(performance["lossSend"], 100),  # Already a percentage
+        "lossReceive": _fixed(performance["lossReceive"], 100),
+        "activeConnections": performance["activeConnections"],
+        "uptimeMinutes": int(session_total.get("totalConnectedMinutes", 0)),
+        "bytesReceived": int(session_total.get("bytesReceived", 0)),
+        "bytesSent": int(session_total.get("bytesSent", 0)),
+        "failovers": session_total.get("numFailovers", 0),
+        "adapters": adapters,
+    }
+    return [fields[name] for name in STATUS_FIELDS]
+
+
+def media_types():
+    """Binary media types this process can encode, preferred first."""
+    return (CBOR, MSGPACK) if msgpack is not None else (CBOR,)
+
+
+def encode(value, media_type):
+    """Encode a compact status as media_type (one of media_types())."""
+    if media_type == MSGPACK and msgpack is not None:
+        return msgpack.packb(value)
+    if media_type == CBOR:
+        return cbor_dumps(value)
+    raise ValueError(f"Unsupported media type {media_type!r}")
+
+
+# CBOR (RFC 8949): the definite-length subset compact_status() produces
+
+def _cbor_head(major, length, out):
+    if length < 24:
+        out.append(major << 5 | length)
+    elif length < 0x100:
+        out += bytes((major << 5 | 24, length))
+    elif length < 0x10000:
+        out.append(major << 5 | 25)
+        out += length.to_bytes(2, "big")
+    elif length < 0x100000000:
+        out.append(major << 5 | 26)
+        out += length.to_bytes(4, "big")
+    elif length < 0x10000000000000000:
+        out.append(major << 5 | 27)
+        out += length.to_bytes(8, "big")
+    else:
+        raise ValueError(f"Integer {length} does not fit CBOR")
+
+
+def _cbor_encode(value, out):
+    if value is None:
+        out.append(0xf6)
+    elif value is True:
+        out.append(0xf5)
+    elif value is False:
+        out.append(0xf4)
+    elif isinstance(value, int):
+        if value >= 0:
+            _cbor_head(0, value, out)
+        else:
+            _cbor_head(1, -1 - value, out)
+    elif isinstance(value, float):
+        out.append(0xfb)
+        out += struct.pack(">d", value)
+    elif isinstance(value, str):
+        data = value.encode()
+        _cbor_head(3, len(data), out)
+        out += data
+    elif isinstance(value, (bytes, bytearray)):
+        _cbor_head(2, len(value), out)
+        out += value
+    elif isinstance(value, (list, tuple)):
+        _cbor_head(4, len(value), out)
+        for item in value:
+            _cbor_encode(item, out)
+    elif isinstance(value, dict):
+        _cbor_head(5, len(value), out)
+        for key, item in value.items():
+            _cbor_encode(key, out)
+            _cbor_encode(item, out)
+    else:
+        raise TypeError(f"Cannot encode {type(value).__name__} as CBOR")
+
+
+def cbor_dumps(value):
+    """Encode None, bools, ints, floats, str, bytes, lists and dicts as CBOR."""
+    out = bytearray()
+    _cbor_encode(value, out)
+    return bytes(out)
+
+
+def _cbor_decode(data, offset):
+    initial = data[offset]
+    major, info = initial >> 5, initial & 0x1f
+    offset += 1
+    if major == 7:
+        if info in (20, 21, 22):
+            return (False, True, None)[info - 20], offset
+        formats = {25: ">e", 26: ">f", 27: ">d"}
+        if info not in formats:
+            raise ValueError(f"Unsupported CBOR simple value {info}")
+        size = struct.calcsize(formats[info])
+        return struct.unpack_from(formats[info], data, offset)[0], offset + size
+    if info < 24:
+        length = info
+    elif info <= 27:
+        size = 1 << (info - 24)
+        length = int.from_bytes(data[offset:offset + size], "big")
+        offset += size
+    else:
+        raise ValueError("Indefinite-length CBOR items are not supported")
+    if major == 0:
+        return length, offset
+    if major == 1:
+        return -1 - length, offset
+    if major in (2, 3):
+        chunk = bytes(data[offset:offset + length])
+        if len(chunk) != length:
+            raise ValueError("Truncated CBOR string")
+        return (chunk if major == 2 else chunk.decode()), offset + length
+    if major == 4:
+        items = []
+        for _ in range(length):
+            item, offset = _cbor_decode(data, offset)
+            items.append(item)
+        return items, offset
+    if major == 5:
+        items = {}
+        for _ in range(length):
+            key, offset = _cbor_decode(data, offset)
+            items[key], offset = _cbor_decode(data, offset)
+        return items, offset
+    raise ValueError("CBOR tags are not supported")
+
+
+def cbor_loads(data):
+    """Decode what cbor_dumps() writes; raises ValueError on anything else."""
+    try:
+        value, offset = _cbor_decode(data, 0)
+    except (IndexError, struct.error) as e:
+        raise ValueError(f"Truncated CBOR: {e}") from None
+    if offset != len(data):
+        raise ValueError(f"{len(data) - offset} bytes after the CBOR item")
+    return value
+
+
+def parse_address(address):
+    """Parse "host:port" into (host, port); raises ValueError."""
+    host, _, port = address.strip().rpartition(":")
+    if not host or not port.isdigit():
+        raise ValueError(f"Expected host:port, got {address!r}")
+    return host, int(port)
+
+
+class StatusBroadcaster:
+    """Sends a status packet to a UDP address every interval seconds.
+
+    The address is normally a multicast group (e.g. 239.255.77.77:5077)
+    that displays join, but a unicast or broadcast address works too.
+
+    Args:
+        packet: packet() -> bytes to send, or None to skip this round
+        address: (host, port)
+        interval: Seconds between packets
+        ttl: Multicast hops; 1 keeps packets on the local network
+    """
+
+    def __init__(self, packet, address, interval=1.0, ttl=1):
+        self.packet = packet
+        self.address = address
+        self.interval = interval
+        self.ttl = ttl
+        self.packets = 0
+        self._sock = None
+        self._thread = None
+        self._stop_event = threading.Event()
+        self._failing = False
+        self._warned_size = False
+
+    def start(self):
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, self.ttl)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="status-broadcast", daemon=True)
+        self._thread.start()
+        logger.info(f"Broadcasting binary status to {self.address[0]}:{self.address[1]} every {self.interval}s")
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def send_once(self):
+        """Build and send one packet; returns whether one was sent."""
+        try:
+            data = self.packet()
+            if data is None:
+                return False
+            if len(data) > MAX_PACKET_BYTES and not self._warned_size:
+                logger.warning(f"Status packet is {len(data)} bytes and will be fragmented")
+                self._warned_size = True
+            self._sock.sendto(data, self.address)
+        except Exception as e:
+            if not self._failing:
+                logger.warning(f"Status broadcast to {self.address[0]}:{self.address[1]} failed: {e}")
+                self._failing = True
+            return False
+        self._failing = False
+        self.packets += 1
+        return True
+
+    def _run(self):
+        while True:
+            self.send_once()
+            if self._stop_event.wait(self.interval):
+                return
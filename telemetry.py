@@ -0,0 +1,188 @@
+"""Minimal Prometheus metrics: counters, gauges and histograms with labels.
+
+Renders the Prometheus text exposition format (version 0.0.4) without the
+prometheus_client dependency. Recording is a dict lookup plus a few integer
+updates under a lock, cheap enough to leave on in request handlers; values
+that already live elsewhere (cache counters, live connection stats) are
+read by collector callbacks only when /metrics is scraped.
+"""
+import bisect
+import math
+import threading
+import time
+from collections import namedtuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# A scrape-time metric family: samples are (sample name, {label: value}, value)
+MetricFamily = namedtuple("MetricFamily", ("name", "type", "help", "samples"))
+
+
+def _escape_help(text):
+    # HELP text escapes only backslash and newline
+    return str(text).replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _escape_label(value):
+    return _escape_help(value).replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label(value)}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _labels(self, labelvalues):
+        return dict(zip(self.labelnames, labelvalues))
+
+
+class Counter(_Metric):
+    """Monotonically increasing count per label set."""
+    type = "counter"
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def value(self, *labelvalues):
+        return self._values.get(labelvalues, 0)
+
+    def collect(self):
+        with self._lock:
+            items = list(self._values.items())
+        return MetricFamily(self.name, self.type, self.help, [
+            (self.name + "_total", self._labels(labels), value) for labels, value in items])
+
+
+class Gauge(_Metric):
+    """Current value per label set."""
+    type = "gauge"
+
+    def set(self, value, *labelvalues):
+        with self._lock:
+            self._values[labelvalues] = value
+
+    def collect(self):
+        with self._lock:
+            items = list(self._values.items())
+        return MetricFamily(self.name, self.type, self.help, [
+            (self.name, self._labels(labels), value) for labels, value in items])
+
+
+class _Timer:
+    __slots__ = ("histogram", "labelvalues", "start")
+
+    def __init__(self, histogram, labelvalues):
+        self.histogram = histogram
+        self.labelvalues = labelvalues
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labelvalues)
+
+
+class Histogram(_Metric):
+    """Bucketed distribution (seconds by default) per label set."""
+    type = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, *labelvalues):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labelvalues)
+            if state is None:
+                # [per-bucket counts..., +Inf count], sum
+                state = self._values[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    def time(self, *labelvalues):
+        """Context manager that observes the elapsed wall time of its block."""
+        return _Timer(self, labelvalues)
+
+    def count(self, *labelvalues):
+        state = self._values.get(labelvalues)
+        return sum(state[0]) if state else 0
+
+    def collect(self):
+        with self._lock:
+            items = [(labels, list(counts), total) for labels, (counts, total) in self._values.items()]
+        samples = []
+        for labelvalues, counts, total in items:
+            labels = self._labels(labelvalues)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                samples.append((self.name + "_bucket", dict(labels, le=_format_value(float(bound))), cumulative))
+            samples.append((self.name + "_sum", labels, total))
+            samples.append((self.name + "_count", labels, cumulative))
+        return MetricFamily(self.name, self.type, self.help, samples)
+
+
+class Registry:
+    """A set of metrics and scrape-time collector callbacks rendered together."""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self.register(Counter(name, help, labelnames))
+
+    def gauge(self, name, help, labelnames=()):
+        return self.register(Gauge(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def add_collector(self, collect):
+        """Register collect(), returning MetricFamily objects, to be called on each scrape."""
+        self._collectors.append(collect)
+
+    def render(self):
+        """Text exposition format for every metric and collector."""
+        families = [metric.collect() for metric in self._metrics]
+        for collect in self._collectors:
+            families.extend(collect())
+        lines = []
+        for family in families:
+            # The 0.0.4 text format names counter families by their _total sample
+            name = family.name + "_total" if family.type == "counter" else family.name
+            lines.append(f"# HELP {name} {_escape_help(family.help)}")
+            lines.append(f"# TYPE {name} {family.type}")
+            for name, labels, value in family.samples:
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,690 @@
+"""Unit tests for the Flask API, run against fake_speedify_cli.py."""
+import gzip
+import json
+import os
+import subprocess
+import threading
+import time
+
+import pytest
+
+import app as dashboard
+from events import EventEngine
+from metrics_store import MetricsStore
+from sampler import IDLE
+from snapshot_broker import SnapshotBroker, SnapshotClient
+from status_delta import apply_merge_patch
+from status_feed import CBOR, STATUS_FIELDS, cbor_loads
+from usage import UsageTracker
+
+FAKE_CLI = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fake_speedify_cli.py')
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    monkeypatch.setattr(dashboard, 'SPEEDIFY_CLI_PATH', FAKE_CLI)
+    monkeypatch.setattr(dashboard, 'METRICS_DB_PATH', str(tmp_path / 'metrics.db'))
+    monkeypatch.setenv('FAKE_SPEEDIFY_INTERVAL', '0.05')
+    dashboard.clear_cache()
+    yield dashboard.app.test_client()
+    dashboard.stop_collector()
+    dashboard.clear_cache()
+
+
+@pytest.fixture
+def collector(client, monkeypatch):
+    monkeypatch.setattr(dashboard, 'COLLECTOR_ENABLED', True)
+    collector = dashboard.start_collector()
+    deadline = time.time() + 5
+    while len(collector.snapshot()[0]) < 5 and time.time() < deadline:
+        time.sleep(0.02)
+    return collector
+
+
+def read_events(response, count, timeout=5):
+    """Read count SSE events from a streaming response, applying patch events."""
+    events = []
+    buffer = ''
+    deadline = time.time() + timeout
+    for chunk in response.response:
+        buffer += chunk.decode() if isinstance(chunk, bytes) else chunk
+        while '\n\n' in buffer:
+            block, buffer = buffer.split('\n\n', 1)
+            lines = block.split('\n')
+            data = next((line[len('data: '):] for line in lines if line.startswith('data: ')), None)
+            if 'event: status' in lines:
+                events.append(json.loads(data))
+            elif 'event: patch' in lines:
+                events.append(apply_merge_patch(events[-1], json.loads(data)))
+        if len(events) >= count or time.time() > deadline:
+            break
+    return events
+
+
+def test_status_without_collector(client):
+    r = client.get('/api/status')
+    assert r.status_code == 200
+    data = r.get_json()
+    assert data["overall"]["state"] == "CONNECTED"
+    assert data["performance"]["activeConnections"] == 2
+    assert [a["adapterID"] for a in data["adapters"]] == ["adapter0", "adapter1"]
+
+
+def test_status_reads_collector_snapshot(collector, client):
+    r = client.get('/api/status')
+    assert r.status_code == 200
+    assert r.get_json()["overall"]["bondingMode"] == "redundant"
+
+
+def test_status_payload_built_once_per_revision(collector, monkeypatch):
+    calls = []
+    original = dashboard.build_status
+    monkeypatch.setattr(dashboard, 'build_status', lambda *args: calls.append(1) or original(*args))
+    collector.stop()
+    dashboard.get_status_payload()
+    dashboard.get_status_payload()
+    assert len(calls) == 1
+
+
+def test_status_payload_reused_for_cached_cli_results(client, monkeypatch):
+    calls = []
+    original = dashboard.build_status
+    monkeypatch.setattr(dashboard, 'build_status', lambda *args: calls.append(1) or original(*args))
+    first = client.get('/api/status')
+    second = client.get('/api/status')
+    assert len(calls) == 1
+    assert first.data == second.data
+
+
+def test_status_etag_and_gzip(client):
+    plain = client.get('/api/status')
+    assert plain.headers['Cache-Control'] == 'no-cache'
+    assert plain.headers['Vary'] == 'Accept, Accept-Encoding'
+    assert 'Content-Encoding' not in plain.headers
+    etag = plain.headers['ETag']
+    assert etag == f'"{plain.get_json()["revision"]}"'
+
+    compressed = client.get('/api/status', headers={'Accept-Encoding': 'br, gzip;q=0.8'})
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert compressed.headers['ETag'] != etag
+    assert gzip.decompress(compressed.data) == plain.data
+
+    assert client.get('/api/status', headers={'Accept-Encoding': 'gzip;q=0'}).data == plain.data
+    for tag in (etag, compressed.headers['ETag'], f'"0", W/{etag}'):
+        r = client.get('/api/status', headers={'If-None-Match': tag})
+        assert r.status_code == 304
+        assert r.data == b''
+        assert r.headers['ETag'] == etag
+    assert client.get('/api/status', headers={'If-None-Match': '"0"'}).status_code == 200
+
+
+def test_status_in_cbor_when_accepted(client):
+    data = client.get('/api/status').get_json()
+    r = client.get('/api/status', headers={'Accept': 'application/cbor, application/json;q=0.5'})
+    assert r.status_code == 200
+    assert r.headers['Content-Type'] == 'application/cbor'
+    assert r.headers['Vary'] == 'Accept, Accept-Encoding'
+    compact = dict(zip(STATUS_FIELDS, cbor_loads(r.data)))
+    assert compact['revision'] == data['revision'] == int(r.headers['X-Status-Revision'])
+    assert compact['healthScore'] == data['overall']['healthScore']
+    assert len(compact['adapters']) == len(data['adapters'])
+    assert r.headers['ETag'] == f'"{data["revision"]}-cbor"'
+    assert len(r.data) < len(client.get('/api/status').data) / 2
+
+    assert client.get('/api/status', headers={'Accept': 'application/cbor',
+                                              'If-None-Match': r.headers['ETag']}).status_code == 304
+    # The JSON ETag does not match the CBOR representation, nor the other way round
+    assert client.get('/api/status', headers={'Accept': 'application/cbor',
+                                              'If-None-Match': f'"{data["revision"]}"'}).status_code == 200
+    assert client.get('/api/status', headers={'If-None-Match': r.headers['ETag']}).status_code == 200
+    for accept in ('*/*', 'text/html,application/xhtml+xml,*/*;q=0.8', 'application/cbor;q=0, */*', 'image/png'):
+        assert client.get('/api/status', headers={'Accept': accept}).headers['Content-Type'] == 'application/json'
+
+
+def test_status_broadcast_packet(client, monkeypatch):
+    monkeypatch.setattr(dashboard, 'STATUS_MULTICAST', '')
+    assert dashboard.start_status_broadcast() is None
+    compact = cbor_loads(dashboard.status_packet())
+    assert compact[STATUS_FIELDS.index('revision')] == client.get('/api/status').get_json()['revision']
+    assert dashboard.status_packet() is dashboard.binary_status(CBOR)[1]
+
+
+def test_worker_serves_the_brokers_revisions_events_and_usage(client, monkeypatch, tmp_path):
+    built = client.get('/api/status').get_json()
+    revision = built["revision"] + 1000
+    compact = [1, revision]
+    asked = []
+
+    def status(message):
+        asked.append(message.get("since"))
+        if message.get("since") == revision:
+            return {"revision": revision}
+        return {"revision": revision, "payload": dict(built, revision=revision), "compact": compact}
+
+    broker = SnapshotBroker(str(tmp_path / "snapshot.sock"), handlers={
+        "status": status,
+        "events": lambda message: {"body": {"events": [], "lastId": 42, "active": {}}, "status": 200},
+        "usage": lambda message: {"body": {"adapters": [], "warnings": []}},
+    })
+    broker.start()
+    worker = SnapshotClient(broker.path, reconnect_delay=0.05)
+    worker.start()
+    monkeypatch.setattr(dashboard, '_snapshot_client', worker)
+    try:
+        deadline = time.time() + 5
+        while not worker.stats()["connected"] and time.time() < deadline:
+            time.sleep(0.02)
+        r = client.get('/api/status')
+        assert r.get_json()["revision"] == revision
+        assert r.headers['ETag'] == f'"{revision}"'
+        assert client.get(f'/api/status?since={revision}').status_code == 304
+        assert asked == [built["revision"], revision]
+        assert cbor_loads(client.get('/api/status', headers={'Accept': CBOR}).data) == compact
+        assert client.get('/api/events').get_json()["lastId"] == 42
+        assert client.get('/api/usage').get_json() == {"adapters": [], "warnings": []}
+
+        worker.stop()
+        assert client.get('/api/events').status_code == 503
+        # Built locally now, but the same content keeps the broker's revision
+        assert client.get('/api/status').get_json()["revision"] == revision
+    finally:
+        worker.stop()
+        broker.stop()
+
+
+def test_broker_status_never_waits_out_a_slow_cli(client, monkeypatch):
+    published = client.get('/api/status').get_json()["revision"]
+    dashboard.clear_cache()
+    monkeypatch.setenv('FAKE_SPEEDIFY_DELAY', '1')
+    monkeypatch.setattr(dashboard, 'BROKER_STATUS_WAIT_SECONDS', 0.1)
+    start = time.time()
+    reply = dashboard.serve_broker_status({})
+    assert reply["revision"] == published  # The newest published status while the CLI runs
+    assert dashboard.serve_broker_status({"since": published}) == {"revision": published}
+    assert time.time() - start < 0.9
+    assert dashboard.refresh_status() is dashboard.refresh_status()  # One shared CLI fallback
+    dashboard.refresh_status().result(5)
+
+
+def test_adapters_matched_to_first_connection():
+    def connection(adapter, latency):
+        return {"adapterID": adapter, "connected": True, "latencyMs": latency}
+
+    stats = {
+        "adapters": [{"adapterID": "wlan0"}, {"adapterID": "eth0"}, {"adapterID": "usb0"}],
+        "connection_stats": {"connections": [
+            connection("eth0", 20), connection("wlan0", 30), connection("wlan0", 40)]},
+    }
+    adapters = dashboard.build_status(stats, {})["adapters"]
+    assert [a["connectionStats"] and a["connectionStats"]["latency"] for a in adapters] == [30, 20, None]
+
+
+def test_index_is_precompressed_with_versioned_assets(client):
+    bundle, _ = dashboard.get_assets()
+    page = client.get('/', headers={'Accept-Encoding': 'gzip'})
+    assert page.status_code == 200
+    assert page.mimetype == 'text/html'
+    assert page.headers['Content-Encoding'] == 'gzip'
+    assert page.headers['Cache-Control'] == 'no-cache'
+    html = gzip.decompress(page.data).decode()
+    assert '<style>' not in html and '<script>' not in html
+    assert bundle.url('dashboard.css') in html and bundle.url('dashboard.js') in html
+
+    r = client.get('/', headers={'If-None-Match': page.headers['ETag']})
+    assert r.status_code == 304
+    assert r.data == b''
+
+
+def test_static_assets_cache_forever_by_version(client):
+    bundle, _ = dashboard.get_assets()
+    url = bundle.url('dashboard.js')
+    r = client.get(url)
+    assert r.status_code == 200
+    assert r.headers['Cache-Control'] == 'public, max-age=31536000, immutable'
+    assert r.mimetype in ('application/javascript', 'text/javascript')
+    assert b'subscribeStatus' in r.data
+
+    assert client.get('/static/dashboard.js').headers['Cache-Control'] == 'no-cache'
+    assert client.get('/static/nope.js').status_code == 404
+
+
+def test_events_endpoint(client, monkeypatch):
+    monkeypatch.setattr(dashboard, '_events', EventEngine())
+    dashboard._events.observe("adapters", [{"adapterID": "adapter0", "state": "connected"}], now=0)
+    dashboard._events.observe("adapters", [{"adapterID": "adapter0", "state": "disconnected"}], now=1)
+    dashboard._events.observe("adapters", [{"adapterID": "adapter0", "state": "disconnected"}], now=5)
+
+    data = client.get('/api/events').get_json()
+    assert [(e["rule"], e["entity"]) for e in data["events"]] == [("adapter-down", "adapter0")]
+    assert data["active"] == {"adapter-down": ["adapter0"]}
+    assert client.get(f'/api/events?since={data["lastId"]}').get_json()["events"] == []
+    assert client.get('/api/events?severity=bogus').status_code == 400
+    assert client.get('/api/events?limit=0').status_code == 400
+    assert client.get('/api/events?since=x').status_code == 400
+
+
+def test_events_fed_from_cli_stats(client, monkeypatch):
+    monkeypatch.setattr(dashboard, '_events', EventEngine())
+    calls = []
+    monkeypatch.setattr(dashboard._events, 'observe', lambda name, data: calls.append(name))
+    client.get('/api/status')
+    assert {"adapters", "connection_stats", "session_stats", "state"} <= set(calls)
+
+
+def test_usage_endpoint(client, monkeypatch):
+    monkeypatch.setattr(dashboard, '_usage', UsageTracker())
+    client.get('/api/status')
+    data = client.get('/api/usage').get_json()
+    assert [a["adapterID"] for a in data["adapters"]] == ["adapter0", "adapter1"]
+    assert data["adapters"][0]["monthly"]["used"] == 4200000000
+    assert data["warnings"] == []
+
+    dashboard._usage.record("adapters", [{"adapterID": "adapter0", "name": "wwan0", "dataUsage": {
+        "usageDaily": 0, "usageMonthly": 950, "usageMonthlyLimit": 1000}}], now=time.time() + 1)
+    warnings = client.get('/api/usage').get_json()["warnings"]
+    assert [(w["adapterID"], w["period"]) for w in warnings] == [("adapter0", "monthly")]
+
+
+def test_status_stream_pushes_changes(collector, client):
+    r = client.get('/api/status/stream', buffered=False)
+    assert r.status_code == 200
+    assert r.mimetype == 'text/event-stream'
+    events = read_events(r, 2)
+    r.close()
+    assert len(events) == 2
+    assert events[1]["revision"] > events[0]["revision"]
+    assert events[1]["overall"]["state"] == "CONNECTED"
+
+
+def test_status_streams_past_the_limit_poll_instead(collector, client, monkeypatch):
+    monkeypatch.setattr(dashboard, '_stream_slots', threading.BoundedSemaphore(1))
+    first = client.get('/api/status/stream', buffered=False)
+    assert first.status_code == 200
+    overflow = client.get('/api/status/stream', buffered=False)
+    assert overflow.status_code == 503
+    assert overflow.headers['Retry-After'] == '5'
+    first.close()
+    again = client.get('/api/status/stream', buffered=False)
+    assert again.status_code == 200
+    again.close()
+
+
+def test_status_since_returns_patch_or_304(collector, client):
+    first = client.get('/api/status')
+    revision = int(first.headers['X-Status-Revision'])
+    assert first.get_json()["revision"] == revision
+
+    assert client.get(f'/api/status?since={revision}').status_code in (200, 304)
+    collector.wait_for_update(collector.revision, timeout=2)
+    deadline = time.time() + 5
+    while time.time() < deadline:
+        r = client.get(f'/api/status?since={revision}')
+        if r.status_code == 200:
+            break
+        time.sleep(0.05)
+    assert r.mimetype == 'application/merge-patch+json'
+    assert apply_merge_patch(first.get_json(), r.get_json())["revision"] == int(r.headers['X-Status-Revision'])
+
+    collector.stop()
+    latest = int(client.get('/api/status').headers['X-Status-Revision'])
+    assert client.get(f'/api/status?since={latest}').status_code == 304
+
+
+def test_status_since_unknown_revision_returns_full_payload(client):
+    r = client.get('/api/status?since=1')
+    assert r.status_code == 200
+    assert r.mimetype == 'application/json'
+    assert "overall" in r.get_json()
+
+
+def test_sampler_reaches_idle_with_default_consumers(client, monkeypatch, tmp_path):
+    monkeypatch.setattr(dashboard, 'COLLECTOR_ENABLED', True)
+    monkeypatch.setattr(dashboard, 'SAMPLER_ENABLED', True)
+    monkeypatch.setattr(dashboard, 'SAMPLER_IDLE_SECONDS', 0.3)
+    # Defaults: METRICS_STORE=true and a usage file
+    monkeypatch.setattr(dashboard, 'METRICS_STORE_ENABLED', True)
+    monkeypatch.setattr(dashboard, 'USAGE_STATE_PATH', str(tmp_path / 'usage.json'))
+    assert dashboard.standing_demand() == ["metrics store", "usage tracking"]
+    collector = dashboard.start_collector()
+    deadline = time.time() + 5
+    while dashboard._sampler.mode != IDLE and time.time() < deadline:
+        time.sleep(0.02)
+    assert dashboard._sampler.mode == IDLE
+    # Still sampled hourly for the store and usage rates
+    assert not collector.paused
+    assert collector.args == ["stats", "1"]
+    assert collector.restart_delay == dashboard.SAMPLER_IDLE_INTERVAL_SECONDS
+
+    dashboard.collect_status_metrics()  # A /metrics scrape is demand too
+    assert dashboard._sampler.mode != IDLE
+    assert collector.restart_delay < dashboard.SAMPLER_IDLE_INTERVAL_SECONDS
+
+
+def test_sampler_pauses_when_idle_without_standing_consumers(client, monkeypatch):
+    monkeypatch.setattr(dashboard, 'COLLECTOR_ENABLED', True)
+    monkeypatch.setattr(dashboard, 'SAMPLER_ENABLED', True)
+    monkeypatch.setattr(dashboard, 'SAMPLER_IDLE_SECONDS', 300)
+    monkeypatch.setattr(dashboard, 'USAGE_STATE_PATH', '')
+    monkeypatch.setattr(dashboard._events, 'sinks', [])
+    monkeypatch.setattr(dashboard, 'METRICS_STORE_ENABLED', False)
+    assert dashboard.standing_demand() == []
+    dashboard.start_collector()
+    assert dashboard._sampler.idle_seconds == 300
+    assert dashboard._sampler.idle_interval == 0
+
+
+def test_history_fed_from_collector(collector, client):
+    deadline = time.time() + 5
+    while time.time() < deadline and not dashboard._history.adapters():
+        time.sleep(0.05)
+    r = client.get('/api/history?adapter=adapter0&metric=latency&step=1')
+    assert r.status_code == 200
+    data = r.get_json()
+    assert list(data["series"]) == ["adapter0"]
+    assert list(data["series"]["adapter0"]) == ["latency"]
+    assert data["series"]["adapter0"]["latency"]
+
+
+def test_history_rejects_bad_parameters(client):
+    assert client.get('/api/history?metric=bogus').status_code == 400
+    assert client.get('/api/history?from=abc').status_code == 400
+    assert client.get('/api/history?from=10&to=5').status_code == 400
+
+
+@pytest.fixture
+def stored(client, monkeypatch, tmp_path):
+    """A metrics store holding two minutes of samples for two adapters."""
+    store = MetricsStore(str(tmp_path / 'export.db'), retention={'samples_1s': 10**9})
+    start = 1_700_000_000 - 1_700_000_000 % 60
+    for t in range(120):
+        for adapter, latency in (('adapter0', t), ('adapter1', 100 + t)):
+            store.record('connection_stats', {'connections': [
+                {'adapterID': adapter, 'latencyMs': latency, 'mos': 4.0}]}, timestamp=start + t)
+        store.record('session_stats', {'total': {'bytesReceived': 1000 * t}}, timestamp=start + t)
+    monkeypatch.setattr(dashboard, '_store', store)
+    yield start
+    store.stop()
+
+
+def test_export_streams_csv(client, stored):
+    r = client.get(f'/api/export?from={stored}&to={stored + 120}&adapter=adapter1&metric=latency,mos')
+    assert r.status_code == 200
+    assert r.is_streamed
+    assert r.headers['Content-Type'] == 'text/csv; charset=utf-8'
+    assert r.headers['Content-Disposition'] == f'attachment; filename="samples-{stored}-{stored + 120}.csv"'
+    lines = r.data.decode().splitlines()
+    assert lines[0] == 'adapter,ts,n,latency,mos'
+    assert lines[1] == f'adapter1,{stored},1,100.0,4.0'
+    assert len(lines) == 121
+
+    sessions = client.get(f'/api/export?dataset=sessions&from={stored}&to={stored + 2}').data.decode()
+    assert sessions.splitlines() == ['ts,bytesReceived,bytesSent,failovers,connectedMinutes',
+                                     f'{stored},0,0,0,0', f'{stored + 1},1000,0,0,0']
+
+
+def test_export_aggregates_buckets_as_columns(client, stored):
+    r = client.get(f'/api/export?from={stored}&to={stored + 120}&step=60&metric=latency&format=columns')
+    assert r.headers['Content-Type'] == 'application/x-ndjson'
+    header, group = [json.loads(line) for line in r.data.splitlines()]
+    assert header['columns'] == ['adapter', 'ts', 'n', 'latency_min', 'latency_avg', 'latency_p95', 'latency_max']
+    assert group['rows'] == 4
+    columns = group['columns']
+    assert columns['adapter'] == ['adapter0', 'adapter0', 'adapter1', 'adapter1']
+    assert columns['ts'] == [stored, stored + 60] * 2
+    assert columns['n'] == [60] * 4
+    assert columns['latency_min'][:2] == [0, 60]
+    assert columns['latency_avg'][:2] == [29.5, 89.5]
+    assert columns['latency_p95'][:2] == [56, 116]
+    assert columns['latency_max'][3] == 219
+
+    r = client.get(f'/api/export?from={stored}&to={stored + 60}&step=30&agg=max')
+    assert r.data.decode().splitlines()[:2] == ['adapter,ts,n,' + ','.join(
+        f'{metric}_max' for metric in dashboard.METRICS), f'adapter0,{stored},30,29.0,0.0,4.0,0.0,0.0,0.0,0.0']
+
+
+def test_export_historic_stats(client):
+    r = client.get('/api/export?dataset=historic')
+    assert r.headers['Content-Disposition'] == 'attachment; filename="historic.csv"'
+    lines = r.data.decode().splitlines()
+    assert lines[0] == 'section,key,value'
+    assert 'session_stats,week.bytesReceived,208000000' in lines
+
+
+def test_export_rejects_bad_parameters(client, stored, monkeypatch):
+    for query in ('format=xlsx', 'dataset=bogus', 'metric=latency,bogus', 'from=abc', f'from={stored}&to=1',
+                  'step=0', 'agg=max', 'step=60&agg=median', 'dataset=sessions&step=60'):
+        r = client.get(f'/api/export?{query}')
+        assert r.status_code == 400, query
+        assert r.get_json()['success'] is False
+    monkeypatch.setattr(dashboard, '_store', None)
+    assert client.get('/api/export').status_code == 503
+
+
+def spawned_commands(spawn_log):
+    return spawn_log.read_text().splitlines() if spawn_log.exists() else []
+
+
+def test_concurrent_requests_spawn_cli_once(client, monkeypatch, tmp_path):
+    spawn_log = tmp_path / 'spawns.log'
+    monkeypatch.setenv('FAKE_SPEEDIFY_SPAWN_LOG', str(spawn_log))
+    monkeypatch.setenv('FAKE_SPEEDIFY_DELAY', '0.5')
+    barrier = threading.Barrier(50)
+    codes = []
+
+    def request_status():
+        barrier.wait()
+        codes.append(dashboard.app.test_client().get('/api/status').status_code)
+
+    threads = [threading.Thread(target=request_status) for _ in range(50)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert codes == [200] * 50
+    assert sorted(spawned_commands(spawn_log)) == ['show settings', 'stats 1']
+
+
+def test_expired_result_served_stale_while_refreshing(client, monkeypatch, tmp_path):
+    spawn_log = tmp_path / 'spawns.log'
+    monkeypatch.setenv('FAKE_SPEEDIFY_SPAWN_LOG', str(spawn_log))
+    stale = {"location": "Old Server", "publicIP": "198.51.100.1"}
+    dashboard._cache.set("server", stale, now=time.time() - dashboard.CACHE_POLICIES["server"].ttl - 1)
+
+    start = time.time()
+    assert client.get('/api/server').get_json() == stale
+    assert time.time() - start < 0.5
+
+    deadline = time.time() + 5
+    while time.time() < deadline and dashboard.get_cached_result("server") is None:
+        time.sleep(0.02)
+    assert client.get('/api/server').get_json()["location"] == "United States - Chicago #12"
+    assert spawned_commands(spawn_log) == ['show currentserver']
+
+
+def test_change_mode_invalidates_only_settings_and_stats(client):
+    dashboard._cache.set("server", {"location": "Cached", "publicIP": "198.51.100.1"})
+    dashboard._cache.set("settings", {"bondingMode": "redundant"})
+    dashboard._cache.set("cli:stats:1", {})
+    before = client.get('/api/cache').get_json()["classes"]
+
+    r = client.post('/api/change-mode', json={"mode": "speed"})
+    assert r.status_code == 202
+    assert dashboard._commands.wait(r.get_json()["jobId"], timeout=10)["state"] == "succeeded"
+    assert dashboard.get_cached_result("settings") is None
+    assert dashboard.get_cached_result("cli:stats:1") is None
+    assert client.get('/api/server').get_json()["location"] == "Cached"
+
+    classes = client.get('/api/cache').get_json()["classes"]
+    assert classes["settings"]["invalidations"] == before["settings"]["invalidations"] + 1
+    assert classes["server"]["hits"] == before["server"]["hits"] + 1
+
+
+def test_change_mode_returns_a_job_to_poll(client):
+    r = client.post('/api/change-mode', json={"mode": "streaming"})
+    assert r.status_code == 202
+    data = r.get_json()
+    assert data["success"] is True and data["mode"] == "streaming"
+    assert r.headers["Location"] == f"/api/jobs/{data['jobId']}"
+
+    dashboard._commands.wait(data["jobId"], timeout=10)
+    job = client.get(r.headers["Location"]).get_json()
+    assert job["state"] == "succeeded"
+    assert job["success"] is True
+    assert job["command"] == "mode streaming"
+    assert job["message"] == "Mode changed to streaming"
+
+    r = client.get('/api/jobs/999999')
+    assert r.status_code == 404
+    assert r.get_json()["success"] is False
+
+
+def test_read_racing_a_mode_change_is_not_cached(client, monkeypatch):
+    started, release = threading.Event(), threading.Event()
+    original = dashboard.run_cli
+
+    def slow_settings(cmd_args, timeout=10):
+        if cmd_args == ['show', 'settings']:
+            result = original(cmd_args, timeout)
+            started.set()
+            release.wait(5)  # The mode change finishes while this read is in flight
+            return result
+        return original(cmd_args, timeout)
+
+    monkeypatch.setattr(dashboard, 'run_cli', slow_settings)
+    reader = threading.Thread(target=dashboard.get_speedify_settings)
+    reader.start()
+    assert started.wait(5)
+    job_id = client.post('/api/change-mode', json={"mode": "speed"}).get_json()["jobId"]
+    assert dashboard._commands.wait(job_id, timeout=10)["state"] == "succeeded"
+    release.set()
+    reader.join(5)
+    assert dashboard.get_cached_result("settings") is None
+    assert dashboard._cache.stats()["settings"]["discards"] >= 1
+
+
+def test_cli_failure_is_negatively_cached(client, monkeypatch):
+    calls = []
+
+    def failing_run(*args, **kwargs):
+        calls.append(args[0])
+        raise subprocess.TimeoutExpired(args[0], 10)
+
+    before = dashboard._cache.stats()["server"]["negative_hits"]
+    monkeypatch.setattr(dashboard.subprocess, 'run', failing_run)
+    for _ in range(5):
+        assert client.get('/api/server').get_json()["location"] == "Error"
+    assert len(calls) == 1
+    assert dashboard._cache.stats()["server"]["negative_hits"] == before + 4
+
+
+def test_metrics_exposition(collector, client):
+    client.get('/api/status')
+    client.get('/api/server')
+    r = client.get('/metrics')
+    assert r.status_code == 200
+    assert r.content_type.startswith("text/plain; version=0.0.4")
+    text = r.get_data(as_text=True)
+    assert 'speedify_cli_duration_seconds_count{command="show currentserver"} ' in text
+    assert 'speedify_cli_parse_seconds_count{command="show currentserver"} ' in text
+    assert 'dashboard_request_duration_seconds_count{route="/api/status",method="GET"} ' in text
+    assert 'dashboard_requests_total{route="/api/server",method="GET",code="200"} ' in text
+    assert 'dashboard_cache_events_total{class="server",event="misses"} ' in text
+    assert "# TYPE dashboard_cache_events_total counter\n" in text
+    assert 'speedify_connection_latency_ms{adapter="adapter0"} ' in text
+    assert 'speedify_connection_mos{adapter="adapter1"} ' in text
+    assert 'dashboard_sampling_mode{mode="fast"} 1' in text
+
+
+def test_metrics_count_cli_timeouts(client, monkeypatch):
+    def timing_out_run(*args, **kwargs):
+        raise subprocess.TimeoutExpired(args[0], 10)
+
+    before = dashboard.CLI_TIMEOUTS.value("show settings")
+    monkeypatch.setattr(dashboard.subprocess, 'run', timing_out_run)
+    dashboard.get_speedify_settings()
+    assert dashboard.CLI_TIMEOUTS.value("show settings") == before + 1
+
+
+def test_profile_disabled_by_default(client):
+    assert client.get('/debug/profile').status_code == 404
+
+
+def test_profile_samples_threads_and_phases(client, monkeypatch):
+    monkeypatch.setattr(dashboard, 'PROFILING_ENABLED', True)
+    assert client.get('/debug/profile?seconds=0').status_code == 400
+    assert client.get('/debug/profile?format=svg').status_code == 400
+
+    def load():
+        dashboard.clear_cache()
+        dashboard.get_status_payload()
+
+    thread = threading.Timer(0.05, load)
+    thread.start()
+    r = client.get('/debug/profile?seconds=0.5&interval_ms=2&format=json')
+    thread.join()
+    assert r.status_code == 200
+    data = r.get_json()
+    assert data["samples"] > 10
+    assert {"cli.spawn", "cli.read", "parse", "aggregate", "serialize"} <= set(data["phases"])
+    assert data["stacks"]
+
+    text = client.get('/debug/profile?seconds=0.05').get_data(as_text=True)
+    assert all(line.rsplit(' ', 1)[1].isdigit() for line in text.splitlines())
+
+
+def test_snapshot_runs_commands_concurrently(client, monkeypatch, tmp_path):
+    spawn_log = tmp_path / 'spawns.log'
+    monkeypatch.setenv('FAKE_SPEEDIFY_SPAWN_LOG', str(spawn_log))
+    monkeypatch.setenv('FAKE_SPEEDIFY_DELAY', '0.5')
+
+    start = time.time()
+    r = client.get('/api/snapshot?include=state,adapters,server,settings')
+    elapsed = time.time() - start
+    assert r.status_code == 200
+    data = r.get_json()
+    assert data["state"] == {"state": "CONNECTED"}
+    assert data["adapters"][0]["adapterID"] == "adapter0"
+    assert data["server"]["location"] == "United States - Chicago #12"
+    assert data["settings"]["bondingMode"] == "redundant"
+    # Four 0.5s commands in parallel, not in sequence
+    assert elapsed < 1.5
+
+    # Served from the cache the second time
+    client.get('/api/snapshot?include=server,settings')
+    assert sorted(spawned_commands(spawn_log)) == [
+        'show adapters', 'show currentserver', 'show settings', 'state']
+
+
+def test_stream_backed_commands_do_not_spawn(collector, client, monkeypatch, tmp_path):
+    spawn_log = tmp_path / 'spawns.log'
+    monkeypatch.setenv('FAKE_SPEEDIFY_SPAWN_LOG', str(spawn_log))
+    before = client.get('/api/cli').get_json()
+
+    for _ in range(3):
+        data = client.get('/api/snapshot?include=state,adapters').get_json()
+        assert data["state"] == {"state": "CONNECTED"}
+        assert data["adapters"][0]["adapterID"] == "adapter0"
+    assert spawned_commands(spawn_log) == []
+
+    stats = client.get('/api/cli').get_json()
+    streamed = stats["streamed"]["byCommand"]
+    assert streamed["state"] - before["streamed"]["byCommand"].get("state", 0) == 3
+    assert streamed["show adapters"] - before["streamed"]["byCommand"].get("show adapters", 0) == 3
+    assert stats["spawns"] == before["spawns"]
+    assert stats["stream"]["spawns"] == 1
+    assert stats["stream"]["running"] is True
+
+
+def test_cli_spawns_are_counted(client):
+    before = client.get('/api/cli').get_json()["spawns"]["byCommand"].get("show settings", 0)
+    client.get('/api/snapshot?include=settings')
+    stats = client.get('/api/cli').get_json()
+    assert stats["spawns"]["byCommand"]["show settings"] == before + 1
+    assert stats["stream"] is None
+
+
+def test_snapshot_rejects_unknown_include(client):
+    r = client.get('/api/snapshot?include=state,bogus')
+    assert r.status_code == 400
+    assert r.get_json()["success"] is False
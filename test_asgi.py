@@ -0,0 +1,347 @@
+"""Unit tests for the ASGI entry point, run against fake_speedify_cli.py."""
+import asyncio
+import gzip
+import json
+import os
+import socket
+import threading
+import time
+
+import pytest
+
+import app as dashboard
+import asgi
+import export
+from metrics_store import MetricsStore
+from snapshot_broker import SnapshotBroker
+from status_delta import apply_merge_patch
+from status_feed import STATUS_FIELDS, cbor_loads
+
+FAKE_CLI = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fake_speedify_cli.py')
+
+
+@pytest.fixture(autouse=True)
+def fake_cli(monkeypatch, tmp_path):
+    monkeypatch.setattr(dashboard, 'SPEEDIFY_CLI_PATH', FAKE_CLI)
+    monkeypatch.setattr(dashboard, 'METRICS_DB_PATH', str(tmp_path / 'metrics.db'))
+    monkeypatch.setattr(dashboard, 'COLLECTOR_ENABLED', False)
+    monkeypatch.setenv('FAKE_SPEEDIFY_INTERVAL', '0.05')
+    dashboard.clear_cache()
+    yield
+    dashboard.stop_collector()
+    dashboard.clear_cache()
+
+
+async def call(method, path, query=b"", body=b"", headers=()):
+    """Run one request through the ASGI app; returns (status, headers, body)."""
+    sent = []
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": method, "path": path, "query_string": query,
+             "headers": [(name.encode(), value.encode()) for name, value in headers]}
+    await asgi.app(scope, receive, send)
+    start = sent[0]
+    response_headers = {name.decode(): value.decode() for name, value in start["headers"]}
+    return start["status"], response_headers, b"".join(m.get("body", b"") for m in sent[1:])
+
+
+def request(method, path, **kwargs):
+    return asyncio.run(call(method, path, **kwargs))
+
+
+def test_status_and_since():
+    status, headers, body = request("GET", "/api/status")
+    assert status == 200
+    data = json.loads(body)
+    assert data["overall"]["state"] == "CONNECTED"
+    revision = headers["x-status-revision"]
+    assert data["revision"] == int(revision)
+
+    status, headers, body = request("GET", "/api/status", query=f"since={revision}".encode())
+    assert status == 304
+    assert body == b""
+
+
+def test_status_etag_and_gzip():
+    status, headers, body = request("GET", "/api/status", headers=[("accept-encoding", "gzip")])
+    assert status == 200
+    assert headers["content-encoding"] == "gzip"
+    assert json.loads(gzip.decompress(body))["revision"] == int(headers["x-status-revision"])
+
+    status, headers, body = request("GET", "/api/status", headers=[("if-none-match", headers["etag"])])
+    assert status == 304
+    assert body == b""
+    assert "content-type" not in headers
+
+
+def test_status_in_cbor_when_accepted():
+    status, headers, body = request("GET", "/api/status", headers=[("accept", "application/cbor")])
+    assert status == 200
+    assert headers["content-type"] == "application/cbor"
+    compact = dict(zip(STATUS_FIELDS, cbor_loads(body)))
+    assert compact["revision"] == int(headers["x-status-revision"])
+    assert compact["state"] == "CONNECTED"
+
+    status, _, body = request("GET", "/api/status", headers=[("accept", "application/cbor"),
+                                                             ("if-none-match", headers["etag"])])
+    assert status == 304
+    assert body == b""
+
+
+def test_lifespan_starts_and_stops_the_status_broadcast(monkeypatch):
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind(("127.0.0.1", 0))
+    receiver.settimeout(5)
+    monkeypatch.setattr(dashboard, 'STATUS_MULTICAST', f'127.0.0.1:{receiver.getsockname()[1]}')
+    monkeypatch.setattr(dashboard, 'STATUS_MULTICAST_INTERVAL', 0.05)
+    monkeypatch.setattr(dashboard, 'USAGE_STATE_PATH', '')
+
+    async def main():
+        messages = asyncio.Queue()
+        sent = asyncio.Queue()
+        lifespan = asyncio.ensure_future(asgi.app({"type": "lifespan"}, messages.get, sent.put))
+        await messages.put({"type": "lifespan.startup"})
+        assert (await sent.get())["type"] == "lifespan.startup.complete"
+        packet = await asyncio.to_thread(receiver.recv, 2048)
+        assert dict(zip(STATUS_FIELDS, cbor_loads(packet)))["state"] == "CONNECTED"
+        await messages.put({"type": "lifespan.shutdown"})
+        assert (await sent.get())["type"] == "lifespan.shutdown.complete"
+        await lifespan
+
+    try:
+        asyncio.run(main())
+    finally:
+        receiver.close()
+        dashboard.stop_status_broadcast()
+    assert dashboard._broadcaster is None
+
+
+def test_lifespan_makes_a_broker_client_with_snapshot_socket(monkeypatch, tmp_path):
+    revision = int(time.time() * 1000) + 10 ** 6
+    built = json.loads(request("GET", "/api/status")[2])
+    broker = SnapshotBroker(str(tmp_path / "snapshot.sock"), handlers={
+        "status": lambda message: {"revision": revision, "payload": dict(built, revision=revision)},
+    })
+    broker.start()
+    monkeypatch.setattr(dashboard, 'SNAPSHOT_SOCKET', broker.path)
+    monkeypatch.setattr(dashboard, 'COLLECTOR_ENABLED', True)
+    monkeypatch.setattr(dashboard, '_commands', dashboard._commands)  # Replaced by the broker's queue
+    monkeypatch.setattr(dashboard._events, 'sinks', dashboard._events.sinks)
+    started = []
+    monkeypatch.setattr(dashboard._events, 'start', lambda: started.append("events"))
+
+    async def main():
+        messages = asyncio.Queue()
+        sent = asyncio.Queue()
+        lifespan = asyncio.ensure_future(asgi.app({"type": "lifespan"}, messages.get, sent.put))
+        await messages.put({"type": "lifespan.startup"})
+        assert (await sent.get())["type"] == "lifespan.startup.complete"
+        assert dashboard._snapshot_client is not None
+        deadline = time.time() + 5
+        while not dashboard._snapshot_client.stats()["connected"] and time.time() < deadline:
+            await asyncio.sleep(0.02)
+        status, headers, body = await call("GET", "/api/status")
+        await messages.put({"type": "lifespan.shutdown"})
+        assert (await sent.get())["type"] == "lifespan.shutdown.complete"
+        await lifespan
+        return status, headers, body
+
+    try:
+        status, headers, body = asyncio.run(main())
+    finally:
+        broker.stop()
+    assert status == 200
+    assert headers["x-status-revision"] == str(revision)  # Numbered by the broker
+    assert started == []  # The broker runs the event rules
+    assert dashboard._snapshot_client is None
+
+
+def test_server_and_index():
+    status, _, body = request("GET", "/api/server")
+    assert status == 200
+    assert json.loads(body)["location"] == "United States - Chicago #12"
+
+    status, headers, body = request("GET", "/")
+    assert status == 200
+    assert headers["content-type"].startswith("text/html")
+
+    url = dashboard.get_assets()[0].url("dashboard.css")
+    status, headers, body = request("GET", url, headers=[("accept-encoding", "gzip")])
+    assert status == 200
+    assert headers["cache-control"] == "public, max-age=31536000, immutable"
+    assert headers["content-encoding"] == "gzip"
+    assert request("GET", "/static/nope.css")[0] == 404
+
+
+def test_change_mode():
+    status, headers, body = request("POST", "/api/change-mode", body=b'{"mode": "speed"}')
+    assert status == 202
+    data = json.loads(body)
+    assert data["success"] is True and data["mode"] == "speed"
+    assert headers["location"] == f"/api/jobs/{data['jobId']}"
+    dashboard._commands.wait(data["jobId"], timeout=10)
+    status, _, body = request("GET", headers["location"])
+    assert status == 200
+    assert json.loads(body)["message"] == "Mode changed to speed"
+    assert request("GET", "/api/jobs/nope")[0] == 404
+
+    status, _, body = request("POST", "/api/change-mode", body=b'not json')
+    assert status == 400
+    assert json.loads(body)["error"] == "Request body must be valid JSON"
+
+    status, _, body = request("POST", "/api/change-mode", body=b'{"mode": "turbo"}')
+    assert status == 400
+
+
+def test_queue_and_metrics_calls_run_off_the_event_loop(monkeypatch):
+    threads = []
+    submit, render = dashboard._commands.submit, dashboard._registry.render
+
+    def record(function):
+        def wrapper(*args, **kwargs):
+            threads.append(threading.current_thread())
+            return function(*args, **kwargs)
+        return wrapper
+
+    monkeypatch.setattr(dashboard._commands, 'submit', record(submit))
+    monkeypatch.setattr(dashboard._commands, 'get', record(dashboard._commands.get))
+    monkeypatch.setattr(dashboard._registry, 'render', record(render))
+    status, headers, _ = request("POST", "/api/change-mode", body=b'{"mode": "streaming"}')
+    assert status == 202
+    assert request("GET", headers["location"])[0] == 200
+    assert request("GET", "/metrics")[0] == 200
+    dashboard._commands.wait(int(headers["location"].rpartition("/")[2]), timeout=10)
+    assert len(threads) == 3 and threading.main_thread() not in threads
+
+
+def test_history_rejects_bad_parameters():
+    status, _, body = request("GET", "/api/history", query=b"metric=nope")
+    assert status == 400
+    assert json.loads(body)["success"] is False
+
+
+def test_export_streams_chunks(monkeypatch, tmp_path):
+    store = MetricsStore(str(tmp_path / "export.db"), retention={"samples_1s": 10**9})
+    for t in range(3000):
+        store.record("connection_stats", {"connections": [{"adapterID": "wlan0", "latencyMs": t}]},
+                     timestamp=1_700_000_000 + t)
+    monkeypatch.setattr(dashboard, "_store", store)
+    monkeypatch.setattr(export, "CHUNK_BYTES", 4096)
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    request_ = asgi.Request({"type": "http", "method": "GET", "path": "/api/export",
+                             "query_string": b"from=1700000000&to=1700003000&metric=latency"}, None)
+    asyncio.run(asgi.export_history(request_, send))
+    store.stop()
+    headers = dict(sent[0]["headers"])
+    assert headers[b"content-type"] == b"text/csv; charset=utf-8"
+    assert b"content-length" not in headers
+    bodies = [message["body"] for message in sent[1:]]
+    assert len(bodies) > 5
+    lines = b"".join(bodies).decode().splitlines()
+    assert lines[:2] == ["adapter,ts,n,latency", "wlan0,1700000000,1,0.0"]
+    assert len(lines) == 3001
+
+    status, _, body = request("GET", "/api/export", query=b"format=xml")
+    assert status == 400
+
+
+def test_unknown_route_and_method():
+    assert request("GET", "/nope")[0] == 404
+    status, headers, _ = request("GET", "/api/change-mode")
+    assert status == 405
+    assert headers["allow"] == "POST"
+
+
+def test_concurrent_status_requests_share_cli_calls(monkeypatch, tmp_path):
+    spawn_log = tmp_path / 'spawns.log'
+    monkeypatch.setenv('FAKE_SPEEDIFY_SPAWN_LOG', str(spawn_log))
+    monkeypatch.setenv('FAKE_SPEEDIFY_DELAY', '0.3')
+
+    async def main():
+        return await asyncio.gather(*(call("GET", "/api/status") for _ in range(100)))
+
+    responses = asyncio.run(main())
+    assert [status for status, _, _ in responses] == [200] * 100
+    assert sorted(spawn_log.read_text().splitlines()) == ['show settings', 'stats 1']
+
+
+def test_stream_pushes_collector_updates(monkeypatch):
+    monkeypatch.setattr(dashboard, 'COLLECTOR_ENABLED', True)
+    monkeypatch.setattr(dashboard, 'SSE_MIN_INTERVAL_SECONDS', 0.01)
+
+    async def main():
+        await asyncio.to_thread(dashboard.start_collector)
+        deadline = time.time() + 5
+        while len(dashboard._collector.snapshot()[0]) < 5 and time.time() < deadline:
+            await asyncio.sleep(0.02)
+
+        chunks = asyncio.Queue()
+        disconnect = asyncio.Event()
+
+        async def receive():
+            await disconnect.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            await chunks.put(message)
+
+        scope = {"type": "http", "method": "GET", "path": "/api/status/stream",
+                 "query_string": b"", "headers": []}
+        stream = asyncio.ensure_future(asgi.app(scope, receive, send))
+        start = await chunks.get()
+        assert start["status"] == 200
+
+        events = []
+        buffer = ""
+        while len(events) < 3:
+            message = await asyncio.wait_for(chunks.get(), 5)
+            buffer += message["body"].decode()
+            while "\n\n" in buffer:
+                block, buffer = buffer.split("\n\n", 1)
+                lines = block.split("\n")
+                data = next((line[len("data: "):] for line in lines if line.startswith("data: ")), None)
+                if "event: status" in lines:
+                    events.append(json.loads(data))
+                elif "event: patch" in lines:
+                    events.append(apply_merge_patch(events[-1], json.loads(data)))
+
+        disconnect.set()
+        await asyncio.wait_for(stream, 5)
+        await asyncio.to_thread(dashboard.stop_collector)
+        return events
+
+    events = asyncio.run(main())
+    assert events[0]["overall"]["state"] == "CONNECTED"
+    assert events[0]["revision"] < events[1]["revision"] < events[2]["revision"]
+
+
+def test_snapshot():
+    status, _, body = request("GET", "/api/snapshot", query=b"include=state,servers,captiveportal")
+    assert status == 200
+    data = json.loads(body)
+    assert data["state"] == {"state": "CONNECTED"}
+    assert data["servers"]["public"][0]["tag"] == "us-chicago-12"
+    assert data["captiveportal"] == []
+
+    assert request("GET", "/api/snapshot", query=b"include=nope")[0] == 400
+
+
+def test_cli_stats_count_runner_spawns():
+    before = json.loads(request("GET", "/api/cli")[2])["spawns"]["byCommand"].get("show servers", 0)
+    request("GET", "/api/snapshot", query=b"include=servers")
+    status, _, body = request("GET", "/api/cli")
+    assert status == 200
+    assert json.loads(body)["spawns"]["byCommand"]["show servers"] == before + 1
@@ -0,0 +1,38 @@
+"""Unit tests for precompressed, content-hashed static assets."""
+import gzip
+
+from assets import IMMUTABLE, AssetBundle, encode_asset, versioned_name
+
+
+def test_versioned_name_follows_content():
+    assert versioned_name("app.js", b"a") != versioned_name("app.js", b"b")
+    assert versioned_name("app.js", b"a").startswith("app.")
+    assert versioned_name("app.js", b"a").endswith(".js")
+
+
+def test_compressed_variants_only_when_smaller():
+    big = encode_asset("big.css", "/big.css", b"body { margin: 0; }\n" * 200, "text/css")
+    assert gzip.decompress(big.representations["gzip"][1]) == b"body { margin: 0; }\n" * 200
+    etags = {etag for etag, _ in big.representations.values()}
+    assert len(etags) == len(big.representations)
+
+    tiny = encode_asset("tiny.css", "/tiny.css", b"a", "text/css")
+    assert list(tiny.representations) == ["identity"]
+
+
+def test_bundle_serves_versioned_and_plain_names(tmp_path):
+    (tmp_path / "site.css").write_text("h1 { color: red; }\n")
+    (tmp_path / "site.js").write_text("console.log('hi');\n")
+    (tmp_path / ".hidden").write_text("x")
+    bundle = AssetBundle(str(tmp_path))
+    assert len(bundle) == 2
+
+    url = bundle.url("site.css")
+    assert url.startswith("/static/site.") and url.endswith(".css")
+    asset, immutable = bundle.get(url[len("/static/"):])
+    assert immutable and asset.representations["identity"][1] == b"h1 { color: red; }\n"
+    assert asset.content_type == "text/css; charset=utf-8"
+
+    assert bundle.get("site.css") == (asset, False)
+    assert bundle.get("missing.css") == (None, False)
+    assert IMMUTABLE.startswith("public")
@@ -0,0 +1,87 @@
+"""Unit tests for the asyncio CLI runner, run against fake_speedify_cli.py."""
+import asyncio
+import os
+import time
+
+import pytest
+
+from async_cli import AsyncCliRunner, CliTimeoutError
+
+FAKE_CLI = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fake_speedify_cli.py')
+
+
+def spawned_commands(spawn_log):
+    return spawn_log.read_text().splitlines() if spawn_log.exists() else []
+
+
+def test_run_returns_output():
+    returncode, stdout, _ = asyncio.run(AsyncCliRunner(FAKE_CLI).run(["show", "settings"]))
+    assert returncode == 0
+    assert '"bondingMode"' in stdout
+
+
+def test_sections_parses_stats():
+    sections = asyncio.run(AsyncCliRunner(FAKE_CLI).sections(["stats", "1"]))
+    assert {"state", "connection_stats", "session_stats"} <= set(sections)
+
+
+def test_concurrent_calls_share_one_process(monkeypatch, tmp_path):
+    spawn_log = tmp_path / 'spawns.log'
+    monkeypatch.setenv('FAKE_SPEEDIFY_SPAWN_LOG', str(spawn_log))
+    monkeypatch.setenv('FAKE_SPEEDIFY_DELAY', '0.3')
+    runner = AsyncCliRunner(FAKE_CLI)
+
+    async def main():
+        return await asyncio.gather(*(runner.run(["show", "currentserver"]) for _ in range(20)),
+                                    runner.run(["show", "settings"]))
+
+    results = asyncio.run(main())
+    assert all(returncode == 0 for returncode, _, _ in results)
+    assert sorted(spawned_commands(spawn_log)) == ['show currentserver', 'show settings']
+
+
+def test_concurrency_limit(monkeypatch):
+    monkeypatch.setenv('FAKE_SPEEDIFY_DELAY', '0.3')
+    runner = AsyncCliRunner(FAKE_CLI, max_concurrency=2)
+
+    async def main():
+        start = time.monotonic()
+        await asyncio.gather(*(runner.run(["mode", mode]) for mode in ("speed", "streaming", "redundant")))
+        return time.monotonic() - start
+
+    # Three distinct commands with two slots take two rounds
+    assert asyncio.run(main()) >= 0.6
+
+
+def test_timeout_kills_process(monkeypatch):
+    monkeypatch.setenv('FAKE_SPEEDIFY_DELAY', '5')
+    runner = AsyncCliRunner(FAKE_CLI, timeout=0.2)
+    start = time.monotonic()
+    with pytest.raises(CliTimeoutError):
+        asyncio.run(runner.run(["state"]))
+    assert time.monotonic() - start < 2
+
+
+def test_cancel_last_waiter_cancels_process(monkeypatch):
+    monkeypatch.setenv('FAKE_SPEEDIFY_DELAY', '5')
+    runner = AsyncCliRunner(FAKE_CLI)
+
+    async def main():
+        first = asyncio.ensure_future(runner.run(["state"]))
+        second = asyncio.ensure_future(runner.run(["state"]))
+        await asyncio.sleep(0.2)
+        flight = runner._inflight[("state",)]
+
+        first.cancel()
+        await asyncio.sleep(0.05)
+        assert not flight.task.done()  # The other caller is still waiting
+
+        second.cancel()
+        await asyncio.gather(first, second, return_exceptions=True)
+        await asyncio.sleep(0.05)
+        return flight.task
+
+    start = time.monotonic()
+    task = asyncio.run(main())
+    assert task.cancelled()
+    assert time.monotonic() - start < 2
@@ -0,0 +1,54 @@
+"""Property tests: vectorized scoring must match the scalar functions exactly."""
+import itertools
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from app import calculate_health_score, calculate_status_level
+from batch_scoring import health_scores, status_codes, status_levels
+
+# Values on and around every threshold used by the scalar functions
+LATENCIES = [0, 1, 49.999, 50, 50.001, 99.9, 100, 100.1, 199.9, 200, 200.1, 300, 350, 1000]
+JITTERS = [0, 5, 9.99, 10, 10.01, 29.9, 30, 30.1, 49.9, 50, 50.1, 100, 250]
+MOS_VALUES = [-1, 0, 0.5, 2.99, 3.0, 3.01, 3.49, 3.5, 3.51, 3.99, 4.0, 4.01, 4.5, 5]
+LOSSES = [0, 0.001, 0.004999, 0.005, 0.00999, 0.01, 0.0499, 0.05, 0.051, 0.2, 0.5, 0.99, 1.0, 1.5]
+
+
+def assert_agree(samples):
+    columns = [np.array(column, dtype=np.float64) for column in zip(*samples)]
+    scores = health_scores(*columns)
+    levels = status_levels(*columns)
+    for i, sample in enumerate(samples):
+        assert scores[i] == calculate_health_score(*sample), sample
+        assert levels[i] == calculate_status_level(*sample), sample
+
+
+def test_threshold_boundaries_agree():
+    samples = list(itertools.product(LATENCIES, JITTERS, MOS_VALUES, LOSSES[:5], LOSSES[::3]))
+    assert_agree(samples)
+
+
+def test_random_samples_agree():
+    rng = random.Random(20260119)
+    samples = [
+        (rng.uniform(0, 600), rng.uniform(0, 150), rng.uniform(-0.5, 5),
+         rng.choice([0, rng.uniform(0, 0.1), rng.uniform(0, 2)]),
+         rng.choice([0, rng.uniform(0, 0.1), rng.uniform(0, 2)]))
+        for _ in range(20000)
+    ]
+    assert_agree(samples)
+
+
+def test_integer_inputs_agree():
+    rng = random.Random(7)
+    samples = [(rng.randint(0, 400), rng.randint(0, 80), rng.randint(0, 5), rng.randint(0, 2), rng.randint(0, 2))
+               for _ in range(2000)]
+    assert_agree(samples)
+
+
+def test_status_codes_and_scalar_inputs():
+    assert status_codes(40, 5, 4.2, 0, 0).tolist() == 0
+    assert status_codes([40, 80, 250], [5, 20, 60], [4.2, 4.1, 3.0], [0, 0, 2], [0, 0, 0]).tolist() == [0, 1, 2]
+    assert health_scores([40], [5], [4.2], [0], [0]).dtype == np.int64
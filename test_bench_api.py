@@ -0,0 +1,93 @@
+"""Unit tests for the API benchmark harness."""
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import bench_api
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 101))
+    assert bench_api.percentile(values, 0.50) == 50
+    assert bench_api.percentile(values, 0.99) == 99
+    assert bench_api.percentile([7], 0.99) == 7
+    assert bench_api.percentile([], 0.5) is None
+
+
+def test_histogram_buckets():
+    buckets = bench_api.histogram([0.5, 1, 1.5, 30, 20000])
+    assert buckets["1"] == 2
+    assert buckets["2"] == 1
+    assert buckets["50"] == 1
+    assert buckets["+Inf"] == 1
+    assert sum(buckets.values()) == 5
+
+
+def test_thresholds():
+    args = bench_api.parse_args(["--max-p99-ms", "10", "--min-rps", "200", "--max-errors", "0"])
+    latencies = [5.0] * 98 + [50.0, 60.0]
+    results = {"total": bench_api.summarize(latencies, [200] * 99 + [500], ["ConnectionResetError"], 1.0)}
+    assert bench_api.check_thresholds(results, args) == [
+        "p99 50.0 ms > 10.0 ms",
+        "100.0 req/s < 200.0 req/s",
+        "2 errors > 0",
+    ]
+
+    args = bench_api.parse_args(["--max-p99-ms", "100", "--min-rps", "50"])
+    assert bench_api.check_thresholds(results, args) == []
+
+
+def test_short_run_against_fake_cli(tmp_path):
+    output = tmp_path / 'results.json'
+    code = bench_api.main(["--clients", "2", "--duration", "0.5", "--warmup", "0",
+                           "--path", "/api/status", "--path", "/api/server",
+                           "--output", str(output), "--max-errors", "0"])
+    results = json.loads(output.read_text())
+    assert code == 0
+    assert results["failures"] == []
+    assert set(results["endpoints"]) == {"/api/status", "/api/server"}
+    assert results["total"]["requests"] > 0
+    assert results["total"]["status_codes"] == {"200": results["total"]["requests"]}
+    assert results["server_rss_kb"]["peak"] > 0
+
+
+def test_server_rss_covers_child_processes():
+    child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(5)"])
+    try:
+        assert child.pid in bench_api.descendant_pids(os.getpid())
+        own, _ = bench_api.read_rss_kb(os.getpid())
+        child_rss, _ = bench_api.read_rss_kb(child.pid)
+        total, peak = bench_api.server_rss_kb(os.getpid())
+        assert total - own > child_rss // 2
+        assert peak >= total
+    finally:
+        child.kill()
+        child.wait()
+
+
+def test_worker_counts_need_gunicorn():
+    assert bench_api.parse_args(["--server", "gunicorn", "--workers", "1,2,4"]).workers == [1, 2, 4]
+    with pytest.raises(SystemExit):
+        bench_api.parse_args(["--workers", "2"])
+    with pytest.raises(SystemExit):
+        bench_api.parse_args(["--server", "gunicorn", "--workers", "two"])
+
+
+def test_gunicorn_workers_share_one_collector(tmp_path):
+    pytest.importorskip("gunicorn")
+    output = tmp_path / 'results.json'
+    code = bench_api.main(["--server", "gunicorn", "--workers", "1,2", "--clients", "2", "--duration", "0.5",
+                           "--output", str(output), "--max-errors", "0"])
+    results = json.loads(output.read_text())
+    assert code == 0
+    assert [run["config"]["workers"] for run in results["runs"]] == [1, 2]
+    for run in results["runs"]:
+        assert run["total"]["status_codes"] == {"200": run["total"]["requests"]}
+        # Status comes from the broker's stream, not from per-worker `stats 1` calls
+        assert "stats 1" not in run["cli_spawns"]["by_command"]
+    # Memory of every worker and the broker, not just the gunicorn master
+    one, two = (run["server_rss_kb"]["after"] for run in results["runs"])
+    assert two > one
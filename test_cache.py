@@ -0,0 +1,148 @@
+"""Unit tests for request coalescing."""
+import threading
+import time
+
+from cache import FRESH, MISS, NEGATIVE, STALE, CachePolicy, ResponseCache, SingleFlight
+
+
+def run_concurrently(n, target):
+    barrier = threading.Barrier(n)
+    results = [None] * n
+
+    def worker(i):
+        barrier.wait()
+        try:
+            results[i] = target()
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def test_concurrent_callers_share_one_execution():
+    flight = SingleFlight()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.2)
+        return "value"
+
+    results = run_concurrently(50, lambda: flight.do("key", slow))
+    assert results == ["value"] * 50
+    assert len(calls) == 1
+    assert not flight.in_flight("key")
+
+
+def test_different_keys_run_independently():
+    flight = SingleFlight()
+    assert flight.do("a", lambda: 1) == 1
+    assert flight.do("b", lambda: 2) == 2
+
+
+def test_error_is_shared_and_key_released():
+    flight = SingleFlight()
+
+    def failing():
+        time.sleep(0.1)
+        raise ValueError("boom")
+
+    results = run_concurrently(10, lambda: flight.do("key", failing))
+    assert all(isinstance(r, ValueError) for r in results)
+    assert flight.do("key", lambda: "recovered") == "recovered"
+
+
+def test_do_async_skips_when_in_flight():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def blocking():
+        calls.append(1)
+        started.set()
+        release.wait(2)
+
+    flight.do_async("key", blocking)
+    assert started.wait(2)
+    flight.do_async("key", blocking)
+    release.set()
+    deadline = time.time() + 2
+    while flight.in_flight("key") and time.time() < deadline:
+        time.sleep(0.01)
+    assert calls == [1]
+
+
+def test_response_cache_policy_classes():
+    cache = ResponseCache({"cli:stats": CachePolicy(2, 10, 1), "settings": CachePolicy(30, 0, 5)})
+    assert cache.key_class("cli:stats:1") == "cli:stats"
+    assert cache.key_class("settings") == "settings"
+    assert cache.key_class("cli:statsx") == "default"
+    assert cache.key_class("server") == "default"
+
+
+def test_response_cache_ttl_states():
+    cache = ResponseCache({"settings": CachePolicy(30, 60, 5)})
+    cache.set("settings", {"bondingMode": "speed"}, now=1000)
+    assert cache.lookup("settings", now=1029) == (FRESH, {"bondingMode": "speed"})
+    assert cache.lookup("settings", now=1031) == (STALE, {"bondingMode": "speed"})
+    assert cache.lookup("settings", now=1091) == (MISS, None)
+    assert len(cache) == 0
+
+
+def test_response_cache_negative_entries():
+    cache = ResponseCache(default=CachePolicy(2, 10, 5))
+    cache.set_failure("server", {"location": "CLI Error"}, now=1000)
+    assert cache.lookup("server", now=1004) == (NEGATIVE, {"location": "CLI Error"})
+    assert cache.lookup("server", now=1005) == (MISS, None)
+
+
+def test_response_cache_lru_eviction():
+    cache = ResponseCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")  # b is now least recently used
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["default"]["evictions"] == 1
+
+
+def test_response_cache_invalidate_and_counters():
+    cache = ResponseCache({"cli:stats": CachePolicy(2, 10, 1), "settings": CachePolicy(30, 0, 5),
+                           "server": CachePolicy(60, 0, 5)})
+    cache.set("cli:stats:1", {})
+    cache.set("settings", {})
+    cache.set("server", {})
+    assert cache.invalidate("settings", "cli:stats") == 2
+    assert cache.get("server") == {}
+    assert cache.get("settings") is None
+
+    stats = cache.stats()
+    assert stats["server"]["hits"] == 1
+    assert stats["settings"]["misses"] == 1
+    assert stats["settings"]["invalidations"] == 1
+    assert stats["cli:stats"]["entries"] == 0
+
+
+def test_response_cache_discards_results_fetched_before_an_invalidation():
+    cache = ResponseCache({"settings": CachePolicy(30, 0, 5), "server": CachePolicy(60, 0, 5)})
+    generation = cache.generation
+    cache.invalidate("settings")  # A write finished while the reads were running
+    assert cache.set("settings", {"bondingMode": "old"}, generation=generation) is False
+    assert cache.set("server", {}, generation=generation) is True
+    assert cache.get("settings") is None
+
+    assert cache.set("settings", {"bondingMode": "new"}, generation=cache.generation) is True
+    assert cache.get("settings") == {"bondingMode": "new"}
+
+    generation = cache.generation
+    cache.clear()
+    assert cache.set_failure("server", {}, generation=generation) is False
+    assert cache.stats()["settings"]["discards"] == 1
+    assert cache.stats()["server"]["discards"] == 1
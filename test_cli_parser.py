@@ -0,0 +1,125 @@
+"""Unit tests for the incremental CLI output parser."""
+import io
+import json
+
+import cli_parser
+from cli_parser import iter_sections, parse_sections
+
+STATS_OUTPUT = (
+    json.dumps(["state", {"state": "CONNECTED"}], indent=4) + "\n\n"
+    + json.dumps(["connection_stats", {"connections": [{"adapterID": "wlan0", "latencyMs": 42}]}], indent=4)
+    + "\n\n"
+    + json.dumps(["session_stats", {"total": {"numFailovers": 1}}], indent=4) + "\n"
+)
+
+
+class TrickleStream:
+    """Binary stream that returns at most n bytes per read, like a slow pipe."""
+
+    def __init__(self, data, n):
+        self._data = data
+        self._n = n
+        self._pos = 0
+        self.reads = 0
+
+    def read(self, size):
+        self.reads += 1
+        chunk = self._data[self._pos:self._pos + min(size, self._n)]
+        self._pos += len(chunk)
+        return chunk
+
+
+def test_parse_sections_returns_every_section():
+    sections = parse_sections(STATS_OUTPUT)
+    assert sections["state"] == {"state": "CONNECTED"}
+    assert sections["connection_stats"]["connections"][0]["latencyMs"] == 42
+    assert sections["session_stats"]["total"]["numFailovers"] == 1
+
+
+def test_parse_sections_without_blank_line_separators():
+    text = '["state",{"state":"CONNECTED"}]["adapters",[]]'
+    assert parse_sections(text) == {"state": {"state": "CONNECTED"}, "adapters": []}
+
+
+def test_parse_sections_skips_garbage_lines():
+    text = "Warning: daemon is starting\n" + STATS_OUTPUT + "\n[not json\n"
+    assert set(parse_sections(text)) == {"state", "connection_stats", "session_stats"}
+
+
+def test_parse_sections_ignores_non_section_values():
+    assert parse_sections('{"bondingMode": "speed"}\n["state", {}]') == {"state": {}}
+    assert parse_sections('') == {}
+
+
+def test_iter_sections_handles_chunks_split_mid_token():
+    data = STATS_OUTPUT.encode()
+    for n in (1, 7, 64):
+        sections = list(iter_sections(TrickleStream(data, n)))
+        assert [name for name, _ in sections] == ["state", "connection_stats", "session_stats"]
+
+
+def test_iter_sections_yields_before_stream_ends():
+    first = json.dumps(["state", {"state": "CONNECTED"}]).encode() + b"\n\n"
+
+    def chunks():
+        yield first
+        raise AssertionError("parser read past the first complete section")
+
+    gen = chunks()
+    stream = type("Pipe", (), {"read": lambda self, size: next(gen)})()
+    assert next(iter_sections(stream)) == ("state", {"state": "CONNECTED"})
+
+
+def test_iter_sections_decodes_multibyte_characters_across_reads():
+    data = json.dumps(["adapters", [{"isp": "Télécom ✓"}]], ensure_ascii=False).encode()
+    sections = list(iter_sections(TrickleStream(data, 1)))
+    assert sections == [("adapters", [{"isp": "Télécom ✓"}])]
+
+
+def test_iter_sections_accepts_text_streams():
+    assert len(list(iter_sections(io.StringIO(STATS_OUTPUT)))) == 3
+
+
+class ChunkStream:
+    """Binary stream that returns the given chunks one per read."""
+
+    def __init__(self, *chunks):
+        self._chunks = list(chunks)
+
+    def read(self, size):
+        return self._chunks.pop(0) if self._chunks else b""
+
+
+def test_iter_sections_waits_for_literals_and_numbers_split_across_reads():
+    first = b'["state", {"state": "CONNECTED"}]\n'
+    second = json.dumps(["connection_stats", {"connections": [
+        {"connected": True, "lossSend": False, "mos": 4.25, "lossReceive": 0.0, "jitterMs": -1e-3, "isp": None}]}],
+        indent=4).encode()
+    # Every cut leaves a closing bracket of the first section in the same read
+    for cut in range(len(second)):
+        sections = list(iter_sections(ChunkStream(first + second[:cut], second[cut:] + b"\n")))
+        assert [name for name, _ in sections] == ["state", "connection_stats"], second[:cut]
+        assert sections[1][1]["connections"][0]["mos"] == 4.25
+
+
+def test_iter_sections_resyncs_after_a_syntax_error_followed_by_data():
+    stream = ChunkStream(b'["state", {}]\n["broken", tru', b'x]\n["adapters", []]\n')
+    assert list(iter_sections(stream)) == [("state", {}), ("adapters", [])]
+
+
+def test_iter_sections_decodes_a_section_trickled_in_small_reads_once(monkeypatch):
+    decoded = []
+    decoder = json.JSONDecoder()
+
+    class CountingDecoder:
+        def raw_decode(self, s, idx=0):
+            decoded.append(len(s) - idx)
+            return decoder.raw_decode(s, idx)
+
+    monkeypatch.setattr(cli_parser, "_decoder", CountingDecoder())
+    # Nested arrays put a closing bracket in almost every read
+    rows = [[i, "a\\\"]b", [i * 0.5]] for i in range(5000)]
+    data = json.dumps(["connection_stats", {"connections": rows}], indent=2).encode() + b"\n"
+    sections = list(iter_sections(TrickleStream(data, 64)))
+    assert sections == [("connection_stats", {"connections": rows})]
+    assert sum(decoded) <= len(data)
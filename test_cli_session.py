@@ -0,0 +1,58 @@
+"""Unit tests for CliSession: stream-backed answers and spawn counts."""
+import time
+
+from cli_session import CliSession
+
+
+class FakeStream:
+    def __init__(self, sections, updated_at=None):
+        self.sections = sections
+        self.updated_at = time.time() if updated_at is None else updated_at
+
+    def latest(self, max_age):
+        if time.time() - self.updated_at > max_age:
+            return None
+        return self.sections
+
+    def stats(self):
+        return {"spawns": 1, "exits": {}}
+
+
+SECTIONS = {
+    "state": {"state": "CONNECTED"},
+    "adapters": [{"adapterID": "adapter0"}],
+}
+
+
+def test_streamed_commands_read_the_stream():
+    session = CliSession()
+    session.attach(FakeStream(SECTIONS))
+    assert session.streamed(["state"], 5) == {"state": "CONNECTED"}
+    assert session.streamed(["show", "adapters"], 5) == [{"adapterID": "adapter0"}]
+    assert session.streamed(["stats", "1"], 5, "stats") is SECTIONS
+    assert session.stats()["streamed"] == {
+        "total": 3, "byCommand": {"state": 1, "show adapters": 1, "stats": 1}}
+
+
+def test_other_commands_and_stale_streams_need_a_process():
+    session = CliSession()
+    assert session.streamed(["state"], 5) is None  # No stream attached
+
+    session.attach(FakeStream(SECTIONS, updated_at=time.time() - 60))
+    assert session.streamed(["state"], 5) is None
+    session.attach(FakeStream({"state": {"state": "CONNECTED"}}))
+    assert session.streamed(["show", "settings"], 5) is None
+    assert session.streamed(["show", "adapters"], 5) is None  # Section not streamed yet
+    assert session.stats()["streamed"]["total"] == 0
+
+
+def test_spawn_counts():
+    session = CliSession()
+    session.record_spawn("show settings")
+    session.record_spawn("show settings")
+    session.record_spawn("mode")
+    stats = session.stats()
+    assert stats["spawns"] == {"total": 3, "byCommand": {"show settings": 2, "mode": 1}}
+    assert stats["stream"] is None
+    session.attach(FakeStream(SECTIONS))
+    assert session.stats()["stream"]["spawns"] == 1
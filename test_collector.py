@@ -0,0 +1,159 @@
+"""Unit tests for the background stats collector, driven by fake_speedify_cli.py."""
+import os
+import sys
+import time
+
+import pytest
+
+from collector import StatsCollector
+
+FAKE_CLI = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fake_speedify_cli.py')
+
+
+def wait_for(predicate, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+@pytest.fixture
+def fake_cli_env(monkeypatch, tmp_path):
+    spawn_log = tmp_path / "spawns.log"
+    monkeypatch.setenv('FAKE_SPEEDIFY_INTERVAL', '0.05')
+    monkeypatch.setenv('FAKE_SPEEDIFY_SPAWN_LOG', str(spawn_log))
+    return spawn_log
+
+
+def test_collector_publishes_all_sections(fake_cli_env):
+    collector = StatsCollector(sys.executable, args=[FAKE_CLI, 'stats'])
+    collector.start()
+    try:
+        assert wait_for(lambda: len(collector.snapshot()[0]) == 5)
+        sections = collector.latest(max_age=5)
+        assert sections["state"]["state"] == "CONNECTED"
+        assert len(sections["connection_stats"]["connections"]) == 2
+        assert {a["adapterID"] for a in sections["adapters"]} == {"adapter0", "adapter1"}
+    finally:
+        collector.stop()
+    assert not collector.running
+
+
+def test_collector_keeps_updating_from_one_process(fake_cli_env):
+    collector = StatsCollector(sys.executable, args=[FAKE_CLI, 'stats'])
+    collector.start()
+    try:
+        assert wait_for(lambda: collector.revision >= 25)
+    finally:
+        collector.stop()
+    assert fake_cli_env.read_text().splitlines() == ['stats']
+
+
+def test_collector_restarts_exited_cli(fake_cli_env):
+    collector = StatsCollector(sys.executable, args=[FAKE_CLI, 'stats', '1'], restart_delay=0.05)
+    collector.start()
+    try:
+        assert wait_for(lambda: len(fake_cli_env.read_text().splitlines()) >= 2
+                        if fake_cli_env.exists() else False)
+    finally:
+        collector.stop()
+
+
+def test_latest_returns_none_when_stale(fake_cli_env):
+    collector = StatsCollector(sys.executable, args=[FAKE_CLI, 'stats', '1'], restart_delay=60)
+    collector.start()
+    try:
+        assert wait_for(lambda: collector.revision >= 5)
+        assert collector.latest(max_age=5) is not None
+        assert collector.latest(max_age=-1) is None
+    finally:
+        collector.stop()
+
+
+def test_snapshot_is_not_mutated_after_publication(fake_cli_env):
+    collector = StatsCollector(sys.executable, args=[FAKE_CLI, 'stats'])
+    collector.start()
+    try:
+        assert wait_for(lambda: collector.revision >= 1)
+        first, _ = collector.snapshot()
+        keys = set(first)
+        assert wait_for(lambda: collector.revision >= 10)
+        assert set(first) == keys
+    finally:
+        collector.stop()
+
+
+def spawned(spawn_log):
+    return spawn_log.read_text().splitlines() if spawn_log.exists() else []
+
+
+def test_configure_switches_to_periodic_one_shot_samples(fake_cli_env):
+    collector = StatsCollector(FAKE_CLI)
+    collector.start()
+    try:
+        assert wait_for(lambda: collector.latest(max_age=5) is not None)
+        collector.configure(("stats", "1"), restart_delay=0.1)
+        assert wait_for(lambda: spawned(fake_cli_env).count("stats 1") >= 3)
+        assert spawned(fake_cli_env)[0] == "stats"
+    finally:
+        collector.stop()
+
+
+def test_shorter_interval_cuts_a_long_wait_short(fake_cli_env):
+    collector = StatsCollector(FAKE_CLI, args=("stats", "1"), restart_delay=3600)
+    collector.start()
+    try:
+        assert wait_for(lambda: spawned(fake_cli_env) == ["stats 1"])
+        assert wait_for(lambda: collector.stats()["exits"].get("completed"))
+        collector.configure(("stats", "1"), restart_delay=0.1)
+        assert wait_for(lambda: len(spawned(fake_cli_env)) >= 3)
+    finally:
+        collector.stop()
+
+
+def test_pause_stops_sampling_until_resume(fake_cli_env):
+    collector = StatsCollector(FAKE_CLI, args=("stats", "1"), restart_delay=0.05)
+    collector.start()
+    try:
+        assert wait_for(lambda: len(spawned(fake_cli_env)) >= 2)
+        collector.pause()
+        time.sleep(0.3)
+        spawns = len(spawned(fake_cli_env))
+        revision = collector.revision
+        time.sleep(0.3)
+        assert len(spawned(fake_cli_env)) == spawns
+        assert collector.revision == revision
+
+        collector.resume()
+        assert wait_for(lambda: len(spawned(fake_cli_env)) > spawns)
+    finally:
+        collector.stop()
+
+
+def test_collector_counts_spawns_and_exit_reasons(fake_cli_env):
+    collector = StatsCollector(FAKE_CLI, args=("stats", "1"), restart_delay=0.05)
+    collector.start()
+    try:
+        assert wait_for(lambda: collector.exits["completed"] >= 2)
+        collector.configure(("bogus",), restart_delay=0.05)
+        assert wait_for(lambda: collector.exits["exit 4"] >= 1)
+    finally:
+        collector.stop()
+    stats = collector.stats()
+    assert stats["spawns"] == len(spawned(fake_cli_env))
+    assert stats["exits"].get("reconfigured", 0) <= 1
+    assert stats["lastExit"]["reason"] in ("exit 4", "stopped")
+    assert not stats["running"]
+
+
+def test_collector_backs_off_while_the_cli_keeps_failing(tmp_path):
+    collector = StatsCollector(str(tmp_path / "missing_cli"), restart_delay=0.01, max_restart_delay=0.08)
+    collector.start()
+    try:
+        assert wait_for(lambda: collector.spawns >= 6)
+        assert collector.exits["error FileNotFoundError"] >= 5
+        assert collector._next_delay() == 0.08
+    finally:
+        collector.stop()
@@ -0,0 +1,94 @@
+"""Unit tests for the serialized command queue."""
+import subprocess
+import threading
+import time
+
+import pytest
+
+from commands import FAILED, QUEUED, SUCCEEDED, CommandQueue, QueueFull
+
+
+class Recorder:
+    """execute() stand-in that records overlap between commands."""
+
+    def __init__(self, delay=0.05, returncode=0):
+        self.delay = delay
+        self.returncode = returncode
+        self.running = 0
+        self.max_running = 0
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def __call__(self, args):
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+            self.calls.append(" ".join(args))
+        time.sleep(self.delay)
+        with self.lock:
+            self.running -= 1
+        return subprocess.CompletedProcess(args, self.returncode, "", "no such mode\n")
+
+
+def test_commands_run_one_at_a_time_in_order():
+    execute, invalidated = Recorder(), []
+    commands = CommandQueue(execute, lambda *classes: invalidated.append(classes))
+    jobs = [commands.submit(["mode", mode], invalidates=("settings",)) for mode in ("speed", "redundant", "streaming")]
+    for job in jobs:
+        assert commands.wait(job.id, timeout=5)["state"] == SUCCEEDED
+    assert execute.calls == ["mode speed", "mode redundant", "mode streaming"]
+    assert execute.max_running == 1
+    assert invalidated == [("settings",)] * 3
+
+
+def test_failed_and_timed_out_commands():
+    commands = CommandQueue(Recorder(delay=0, returncode=4), lambda *classes: None)
+    job = commands.wait(commands.submit(["mode", "turbo"]).id, timeout=5)
+    assert job["state"] == FAILED
+    assert job["success"] is False
+    assert job["error"] == "CLI error: no such mode"
+
+    def timeout(args):
+        raise subprocess.TimeoutExpired(args, 10)
+
+    commands = CommandQueue(timeout, lambda *classes: None)
+    assert commands.wait(commands.submit(["mode", "speed"]).id, timeout=5)["error"] == "CLI timed out"
+
+
+def test_queued_duplicates_are_merged_and_the_queue_is_bounded():
+    release = threading.Event()
+    commands = CommandQueue(lambda args: release.wait(5) and subprocess.CompletedProcess(args, 0, "", ""),
+                            lambda *classes: None, max_pending=2)
+    running = commands.submit(["mode", "speed"])
+    while commands.get(running.id)["state"] == QUEUED:
+        time.sleep(0.01)
+    first = commands.submit(["mode", "redundant"])
+    assert commands.submit(["mode", "redundant"]) is first
+    commands.submit(["mode", "streaming"])
+    with pytest.raises(QueueFull):
+        commands.submit(["mode", "speed"])
+    release.set()
+    assert commands.wait(first.id, timeout=5)["state"] == SUCCEEDED
+    assert commands.get(12345) is None
+
+
+def test_a_command_queued_after_others_is_not_merged_into_an_older_one():
+    release = threading.Event()
+    ran = []
+
+    def run(args):
+        release.wait(5)
+        ran.append(args[1])
+        return subprocess.CompletedProcess(args, 0, "", "")
+
+    commands = CommandQueue(run, lambda *classes: None)
+    running = commands.submit(["mode", "speed"])
+    while commands.get(running.id)["state"] == QUEUED:
+        time.sleep(0.01)
+    first = commands.submit(["mode", "redundant"])
+    commands.submit(["mode", "streaming"])
+    last = commands.submit(["mode", "redundant"])
+    assert last is not first
+    release.set()
+    commands.wait(last.id, timeout=5)
+    assert ran == ["speed", "redundant", "streaming", "redundant"]  # The last write wins
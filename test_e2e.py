@@ -1,5 +1,7 @@
 #!/usr/bin/env python3
 """Comprehensive E2E tests for Speedify Dashboard API."""
+import json
+import re
 import requests
 import time
 import sys
@@ -30,7 +32,12 @@ def test_main_page():
         test("GET / returns HTML", "text/html" in r.headers.get("Content-Type", ""))
         test("Response contains dashboard title", "Speedify Dashboard" in r.text)
         test("Response contains status-hero element", "status-hero" in r.text)
-        test("Response contains JavaScript", "<script>" in r.text)
+        scripts = re.findall(r'<script src="(/static/[^"]+\.js)"', r.text)
+        test("Response references versioned JavaScript", len(scripts) == 1)
+        if scripts:
+            js = requests.get(f"{BASE_URL}{scripts[0]}", timeout=10)
+            test("Versioned JavaScript returns 200", js.status_code == 200)
+            test("Versioned JavaScript is cached long-term", "immutable" in js.headers.get("Cache-Control", ""))
     except Exception as e:
         test("GET / request succeeded", False, str(e))
 
@@ -90,6 +97,47 @@ def test_status_api():
         test("GET /api/status request succeeded", False, str(e))
 
 
+def test_status_stream():
+    """Test GET /api/status/stream pushes status events."""
+    print("\n=== Status Stream Tests ===")
+    try:
+        r = requests.get(f"{BASE_URL}/api/status/stream", stream=True, timeout=10)
+        test("GET /api/status/stream returns 200", r.status_code == 200)
+        test("Response is event stream", "text/event-stream" in r.headers.get("Content-Type", ""))
+
+        data = None
+        for line in r.iter_lines(decode_unicode=True):
+            if line and line.startswith("data: "):
+                data = json.loads(line[len("data: "):])
+                break
+        r.close()
+
+        test("Stream delivered a status event", data is not None)
+        if data is not None:
+            test("Streamed status has 'overall' section", "overall" in data)
+            test("Streamed status has 'adapters' section", "adapters" in data)
+
+    except Exception as e:
+        test("GET /api/status/stream request succeeded", False, str(e))
+
+
+def test_history_api():
+    """Test GET /api/history returns downsampled metric series."""
+    print("\n=== History API Tests ===")
+    try:
+        r = requests.get(f"{BASE_URL}/api/history", params={"metric": "latency"}, timeout=10)
+        test("GET /api/history returns 200", r.status_code == 200)
+        data = r.json()
+        test("Response has 'series'", isinstance(data.get("series"), dict))
+        test("Response has 'step'", isinstance(data.get("step"), (int, float)))
+
+        r = requests.get(f"{BASE_URL}/api/history", params={"metric": "invalid"}, timeout=10)
+        test("Invalid metric returns 400", r.status_code == 400)
+
+    except Exception as e:
+        test("GET /api/history request succeeded", False, str(e))
+
+
 def test_server_api():
     """Test GET /api/server returns valid server data."""
     print("\n=== Server API Tests ===")
@@ -154,10 +202,20 @@ def test_change_mode_api():
         r = requests.post(f"{BASE_URL}/api/change-mode",
                          json={"mode": "redundant"},
                          timeout=10)
-        test("POST with valid mode returns 200", r.status_code == 200)
+        test("POST with valid mode returns 202", r.status_code == 202)
         data = r.json()
         test("Response has success=True", data.get("success") is True)
         test("Response has mode field", "mode" in data)
+        test("Response has a job to poll", r.headers.get("Location") == f"/api/jobs/{data.get('jobId')}")
+
+        job = {}
+        deadline = time.time() + 15
+        while time.time() < deadline:
+            job = requests.get(f"{BASE_URL}{r.headers['Location']}", timeout=10).json()
+            if job.get("state") in ("succeeded", "failed"):
+                break
+            time.sleep(0.2)
+        test("Mode change job succeeds", job.get("state") == "succeeded", job.get("error", ""))
     except Exception as e:
         test("POST with valid mode handled", False, str(e))
 
@@ -219,9 +277,9 @@ def test_caching():
         elapsed = time.time() - start
 
         test("Request after cache expiry succeeded", r.status_code == 200)
-        # After expiry, should take longer (CLI call needed)
-        test("Cache expired (fresh data fetched)", elapsed > 0.05,
-             f"Elapsed: {elapsed:.3f}s (expected >0.05s for CLI call)")
+        # Expired entries are served immediately while a background refresh runs
+        test("Expired cache served without blocking (stale-while-revalidate)", elapsed < 1.0,
+             f"Elapsed: {elapsed:.3f}s (expected <1s, no CLI wait)")
 
     except Exception as e:
         test("Cache expiry test completed", False, str(e))
@@ -373,6 +431,8 @@ def main():
     # Run all tests
     test_main_page()
     test_status_api()
+    test_status_stream()
+    test_history_api()
     test_server_api()
     test_change_mode_api()
     test_caching()
@@ -0,0 +1,161 @@
+"""Unit tests for the stats event rule engine."""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from events import EventEngine, FileSink, Rule, WebhookSink
+
+
+def connections(**fields):
+    return {"connections": [dict({"adapterID": "wlan0", "connected": True}, **fields)]}
+
+
+def test_threshold_sustained_with_hysteresis():
+    engine = EventEngine([{"name": "loss", "type": "threshold", "source": "connection", "field": "lossReceive",
+                           "above": 0.05, "clear": 0.01, "for_seconds": 2}])
+    assert engine.observe("connection_stats", connections(lossReceive=0.1), now=0) == []
+    assert engine.observe("connection_stats", connections(lossReceive=0.1), now=1) == []
+    [event] = engine.observe("connection_stats", connections(lossReceive=0.2), now=2)
+    assert (event["rule"], event["kind"], event["entity"], event["value"]) == ("loss", "triggered", "wlan0", 0.2)
+    assert engine.active() == {"loss": ["wlan0"]}
+
+    # Between clear and the threshold: still active, no flapping
+    assert engine.observe("connection_stats", connections(lossReceive=0.03), now=3) == []
+    assert engine.observe("connection_stats", connections(lossReceive=0.08), now=4) == []
+    [event] = engine.observe("connection_stats", connections(lossReceive=0.0), now=5)
+    assert event["kind"] == "resolved" and event["severity"] == "info"
+    assert engine.active() == {}
+
+
+def test_brief_spike_shorter_than_for_seconds_does_not_fire():
+    engine = EventEngine([{"name": "latency", "type": "threshold", "source": "connection", "field": "latencyMs",
+                           "above": 200, "for_seconds": 5}])
+    engine.observe("connection_stats", connections(latencyMs=300), now=0)
+    engine.observe("connection_stats", connections(latencyMs=50), now=1)
+    assert engine.observe("connection_stats", connections(latencyMs=300), now=5) == []
+    assert engine.observe("connection_stats", connections(latencyMs=300), now=10)[0]["kind"] == "triggered"
+
+
+def test_clear_seconds_delays_resolution():
+    engine = EventEngine([{"name": "latency", "type": "threshold", "source": "connection", "field": "latencyMs",
+                           "below": 10, "clear_seconds": 3}])
+    engine.observe("connection_stats", connections(latencyMs=5), now=0)
+    assert engine.observe("connection_stats", connections(latencyMs=50), now=1) == []
+    assert engine.observe("connection_stats", connections(latencyMs=5), now=2) == []  # Clearing restarts
+    assert engine.observe("connection_stats", connections(latencyMs=50), now=3) == []
+    assert engine.observe("connection_stats", connections(latencyMs=50), now=6)[0]["kind"] == "resolved"
+
+
+def test_rate_of_change():
+    engine = EventEngine([{"name": "spike", "type": "rate", "source": "connection", "field": "latencyMs",
+                           "rate": 100, "clear": 20}])
+    assert engine.observe("connection_stats", connections(latencyMs=40), now=0) == []
+    [event] = engine.observe("connection_stats", connections(latencyMs=240), now=1)
+    assert event["kind"] == "triggered" and event["value"] == 200
+    [event] = engine.observe("connection_stats", connections(latencyMs=245), now=2)
+    assert event["kind"] == "resolved"
+
+
+def test_default_rules_detect_adapter_drop_and_failover():
+    engine = EventEngine()
+    adapters = [{"adapterID": "wlan0", "state": "connected"}, {"adapterID": "wwan0", "state": "connected"}]
+    engine.observe("adapters", adapters, now=0)
+    adapters[1] = {"adapterID": "wwan0", "state": "connecting"}
+    assert engine.observe("adapters", adapters, now=1) == []
+    [event] = engine.observe("adapters", adapters, now=4)
+    assert (event["rule"], event["entity"], event["severity"]) == ("adapter-down", "wwan0", "critical")
+
+    engine.observe("session_stats", {"total": {"numFailovers": 2}}, now=0)
+    [event] = engine.observe("session_stats", {"total": {"numFailovers": 3}}, now=1)
+    assert (event["rule"], event["kind"]) == ("failover", "event")
+    assert engine.observe("session_stats", {"total": {"numFailovers": 3}}, now=2) == []
+    assert engine.observe("streaming_stats", {}, now=3) == []
+
+
+def test_disappearing_adapter_fires_state_rules_and_clears_others():
+    engine = EventEngine([
+        {"name": "down", "type": "state", "source": "adapter", "field": "state", "expect": "connected",
+         "for_seconds": 2},
+        {"name": "latency", "type": "threshold", "source": "connection", "field": "latencyMs", "above": 200},
+    ])
+    engine.observe("adapters", [{"adapterID": "wlan0", "state": "connected"}], now=0)
+    assert engine.observe("adapters", [], now=1) == []
+    [event] = engine.observe("adapters", [], now=3)
+    assert (event["rule"], event["kind"], event["entity"], event["value"]) == ("down", "triggered", "wlan0", None)
+    assert event["message"] == "not reported (expected state connected)"
+    [event] = engine.observe("adapters", [{"adapterID": "wlan0", "state": "connected"}], now=4)
+    assert event["kind"] == "resolved"
+
+    engine.observe("connection_stats", connections(latencyMs=300), now=5)
+    assert engine.active() == {"latency": ["wlan0"]}
+    [event] = engine.observe("connection_stats", {"connections": []}, now=6)
+    assert (event["rule"], event["kind"], event["entity"]) == ("latency", "resolved", "wlan0")
+    assert engine.active() == {}
+
+
+def test_non_numeric_values_are_skipped_by_numeric_rules():
+    engine = EventEngine([
+        {"name": "latency", "type": "threshold", "source": "connection", "field": "latencyMs", "above": 200},
+        {"name": "spike", "type": "rate", "source": "connection", "field": "latencyMs", "rate": 100},
+        {"name": "failover", "type": "increase", "source": "session", "field": "numFailovers"},
+    ])
+    assert engine.observe("connection_stats", connections(latencyMs="n/a"), now=0) == []
+    assert engine.observe("connection_stats", connections(latencyMs={"avg": 300}), now=1) == []
+    assert engine.observe("session_stats", {"total": {"numFailovers": "2"}}, now=0) == []
+    assert engine.observe("connection_stats", connections(latencyMs=300), now=2)[0]["rule"] == "latency"
+
+
+def test_log_query_since_severity_and_limit():
+    engine = EventEngine([{"name": "down", "type": "state", "source": "state", "field": "state",
+                           "expect": "CONNECTED", "severity": "critical"}], log_size=3)
+    for now in range(4):
+        engine.observe("state", {"state": "CONNECTED" if now % 2 else "LOGGED_IN"}, now=now)
+    events = engine.log.query()
+    assert [event["id"] for event in events] == [2, 3, 4]
+    assert [event["kind"] for event in engine.log.query(since=2)] == ["triggered", "resolved"]
+    assert [event["id"] for event in engine.log.query(severity="critical")] == [3]
+    assert [event["id"] for event in engine.log.query(limit=1)] == [4]
+
+
+def test_invalid_rules_rejected():
+    with pytest.raises(ValueError):
+        Rule({"name": "x", "type": "threshold", "source": "connection", "field": "latencyMs"})
+    with pytest.raises(ValueError):
+        Rule({"name": "x", "type": "nope", "source": "connection", "field": "latencyMs"})
+    with pytest.raises(ValueError):
+        Rule({"name": "x", "type": "increase", "source": "nowhere", "field": "latencyMs"})
+    with pytest.raises(ValueError):
+        EventEngine([{"name": "x", "type": "increase", "source": "session", "field": "numFailovers"}] * 2)
+
+
+def test_sinks_receive_events_off_the_caller_thread(tmp_path):
+    received = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            received.append(json.loads(self.rfile.read(int(self.headers["Content-Length"]))))
+            self.send_response(204)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    path = tmp_path / "events.jsonl"
+
+    def failing(event):
+        raise RuntimeError("a broken sink must not stop the others")
+
+    engine = EventEngine([{"name": "failover", "type": "increase", "source": "session", "field": "numFailovers"}],
+                         sinks=[failing, WebhookSink(f"http://127.0.0.1:{server.server_port}/hook"), FileSink(str(path))])
+    engine.start()
+    engine.observe("session_stats", {"total": {"numFailovers": 0}}, now=0)
+    engine.observe("session_stats", {"total": {"numFailovers": 1}}, now=1)
+    engine.stop()
+    server.shutdown()
+
+    assert [event["rule"] for event in received] == ["failover"]
+    assert [json.loads(line)["id"] for line in path.read_text().splitlines()] == [received[0]["id"]]
@@ -0,0 +1,56 @@
+"""Unit tests for the streaming export encoders and bucket aggregation."""
+import csv
+import io
+import json
+
+from export import aggregate, aggregate_columns, column_chunks, csv_chunks, flatten, percentile
+
+
+def test_percentile_is_weighted_nearest_rank():
+    values = [(v, 1) for v in range(1, 101)]
+    assert percentile(values, 0.95) == 95
+    assert percentile(values, 1.0) == 100
+    # A row averaging 98 samples outweighs two single samples
+    assert percentile([(10, 98), (500, 1), (900, 1)], 0.95) == 10
+
+
+def test_aggregate_per_adapter_and_bucket():
+    rows = [("a", 100 + t, 1, float(t), 0.0) for t in range(20)]
+    rows += [("b", 100, 1, 7.0, None), ("b", 125, 1, 9.0, None)]
+    aggregates = ["min", "avg", "p95", "max"]
+    result = list(aggregate(iter(rows), 100, 10, ["latency", "mos"], aggregates))
+    assert aggregate_columns(["latency"], ["min", "max"]) == ["adapter", "ts", "n", "latency_min", "latency_max"]
+    assert [row[:3] for row in result] == [["a", 100, 10], ["a", 110, 10], ["b", 100, 1], ["b", 120, 1]]
+    assert result[0][3:7] == [0.0, 4.5, 9.0, 9.0]
+    assert result[1][3:7] == [10.0, 14.5, 19.0, 19.0]
+    assert result[2][7:] == [None, None, None, None]  # No values for the metric in that bucket
+
+
+def test_aggregate_weights_rolled_up_rows():
+    rows = [("a", 0, 60, 10.0), ("a", 60, 20, 50.0)]
+    [row] = aggregate(rows, 0, 3600, ["latency"], ["avg", "min"])
+    assert row == ["a", 0, 80, 20.0, 10.0]
+
+
+def test_flatten_nested_sections():
+    assert list(flatten({"total": {"bytes": 1, "speeds": [2.5, {"max": 3}]}, "ok": True})) == [
+        ("total.bytes", 1), ("total.speeds[0]", 2.5), ("total.speeds[1].max", 3), ("ok", True)]
+
+
+def test_csv_chunks_are_bounded():
+    rows = ([f"adapter{i % 3}", i, None] for i in range(5000))
+    chunks = list(csv_chunks(["adapter", "ts", "value"], rows, chunk_bytes=4096))
+    assert len(chunks) > 10
+    assert all(len(chunk) < 4096 + 100 for chunk in chunks)
+    parsed = list(csv.reader(io.StringIO(b"".join(chunks).decode())))
+    assert parsed[0] == ["adapter", "ts", "value"]
+    assert parsed[1] == ["adapter0", "0", ""]
+    assert len(parsed) == 5001
+
+
+def test_column_chunks_are_row_groups():
+    rows = (("a", t, t / 2) for t in range(10))
+    header, *groups = [json.loads(line) for line in column_chunks(["adapter", "ts", "latency"], rows, group_rows=4)]
+    assert header == {"columns": ["adapter", "ts", "latency"]}
+    assert [group["rows"] for group in groups] == [4, 4, 2]
+    assert groups[2]["columns"] == {"adapter": ["a", "a"], "ts": [8, 9], "latency": [4.0, 4.5]}
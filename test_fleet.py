@@ -0,0 +1,137 @@
+"""Unit tests for fleet mode, with peers served by the app itself on local ports."""
+import os
+import socket
+import threading
+import time
+
+import pytest
+from werkzeug.serving import make_server
+
+import app as dashboard
+from fleet import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, FleetAggregator, parse_peers
+
+FAKE_CLI = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fake_speedify_cli.py')
+
+
+@pytest.fixture
+def peer_url(monkeypatch, tmp_path):
+    """A dashboard backed by the fake CLI, served on a free local port."""
+    monkeypatch.setattr(dashboard, 'SPEEDIFY_CLI_PATH', FAKE_CLI)
+    monkeypatch.setattr(dashboard, 'METRICS_DB_PATH', str(tmp_path / 'metrics.db'))
+    dashboard.clear_cache()
+    server = make_server("127.0.0.1", 0, dashboard.app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    dashboard.clear_cache()
+
+
+@pytest.fixture
+def dead_url():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    return f"http://127.0.0.1:{port}"
+
+
+@pytest.fixture
+def hung_url():
+    """Accepts connections but never answers."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        s.listen(8)
+        yield f"http://127.0.0.1:{s.getsockname()[1]}"
+
+
+def test_parse_peers():
+    assert parse_peers("") == []
+    assert parse_peers("hall=http://10.0.0.2:5000/, http://10.0.0.3:5000") == [
+        ("hall", "http://10.0.0.2:5000"), ("10.0.0.3:5000", "http://10.0.0.3:5000")]
+    with pytest.raises(ValueError):
+        parse_peers("10.0.0.2:5000")
+
+
+def test_breaker_opens_then_half_opens(monkeypatch):
+    breaker = CircuitBreaker(failure_threshold=2, retry_seconds=30)
+    assert not breaker.record_failure()
+    assert breaker.state == CLOSED
+    assert breaker.record_failure()
+    assert breaker.state == OPEN and not breaker.allow()
+
+    now = time.time()
+    monkeypatch.setattr(time, 'time', lambda: now + 31)
+    assert breaker.state == HALF_OPEN and breaker.allow()
+    assert not breaker.record_failure()  # Failed probe: open again
+    assert breaker.state == OPEN
+    breaker.record_success()
+    assert breaker.state == CLOSED
+
+
+def test_poll_fetches_full_payload_then_deltas(peer_url):
+    fleet = FleetAggregator([("a", peer_url)], dashboard.summarize_fleet_node)
+    peer = fleet.peers[0]
+    fleet.poll(peer)
+    assert peer.payload["overall"]["state"] == "CONNECTED"
+    assert peer.revision == peer.payload["revision"]
+    conn = peer._conn
+
+    fleet.poll(peer)
+    assert peer._conn is conn  # Keep-alive connection reused
+    assert peer.requests == 2 and peer.failures == 0
+
+    node = fleet.view()["nodes"][0]
+    assert node["reachable"] and node["breaker"] == CLOSED
+    assert node["state"] == "CONNECTED"
+    assert node["activeConnections"] == 2
+    assert 0 < node["healthScore"] <= 100
+    fleet.stop()
+
+
+def test_dead_and_hung_peers_open_their_circuits(peer_url, dead_url, hung_url):
+    fleet = FleetAggregator([("up", peer_url), ("dead", dead_url), ("hung", hung_url)],
+                            dashboard.summarize_fleet_node, failure_threshold=2, retry_seconds=60)
+    fleet.peers[2].timeout = 0.2  # Only the hung peer needs to time out
+    # Polled in rounds on this thread, so the outcome depends on breaker state only;
+    # the third round is skipped by the open circuits
+    for _ in range(3):
+        for peer in fleet.peers:
+            fleet.poll(peer)
+    nodes = {node["name"]: node for node in fleet.view()["nodes"]}
+    fleet.stop()
+
+    assert nodes["up"]["reachable"] and nodes["up"]["breaker"] == CLOSED
+    for name in ("dead", "hung"):
+        assert not nodes[name]["reachable"]
+        assert nodes[name]["breaker"] == OPEN
+        assert nodes[name]["failures"] == 2
+        assert nodes[name]["error"]
+    summary = fleet.view()["summary"]
+    assert summary["nodes"] == 3 and summary["reachable"] == 1
+    assert summary["worstNode"] == "up"
+
+
+def test_summarize_scores_nodes_without_connections_as_bad():
+    node = dashboard.summarize_fleet_node({"overall": {"state": "LOGGED_IN"}, "performance": {}})
+    assert node["healthScore"] == 0 and node["status"] == "bad"
+
+
+def test_fleet_route(peer_url, monkeypatch):
+    client = dashboard.app.test_client()
+    assert client.get('/api/fleet').status_code == 404
+
+    monkeypatch.setattr(dashboard, 'FLEET_PEERS', f"self={peer_url}")
+    monkeypatch.setattr(dashboard, 'FLEET_POLL_SECONDS', 0.05)
+    dashboard.start_fleet()
+    try:
+        deadline = time.time() + 5
+        while time.time() < deadline:
+            data = client.get('/api/fleet').get_json()
+            if data["summary"]["reachable"]:
+                break
+            time.sleep(0.05)
+        assert data["nodes"][0]["name"] == "self"
+        assert data["summary"]["minHealthScore"] == data["nodes"][0]["healthScore"]
+        assert 'dashboard_fleet_node_up{node="self"} 1' in client.get('/metrics').get_data(as_text=True)
+    finally:
+        dashboard.stop_fleet()
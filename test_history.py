@@ -0,0 +1,101 @@
+"""Unit tests for the per-adapter metric ring buffers."""
+import pytest
+
+import history as history_module
+from history import METRICS, MetricHistory
+
+
+def connection_stats(*latencies, adapter="wlan0"):
+    return {"connections": [
+        {"adapterID": adapter, "latencyMs": latency, "jitterMs": 2, "mos": 4.2,
+         "lossSend": 0, "lossReceive": 0.01, "sendBps": 1000, "receiveBps": 5000}
+        for latency in latencies
+    ]}
+
+
+def test_query_returns_recorded_samples():
+    history = MetricHistory(capacity=10)
+    for t in range(5):
+        history.record(connection_stats(40 + t), timestamp=1000 + t)
+    series, step = history.query(1000, 1005, step=1)
+    assert step == 1
+    assert series["wlan0"]["latency"] == [[1000, 40], [1001, 41], [1002, 42], [1003, 43], [1004, 44]]
+    assert set(series["wlan0"]) == set(METRICS)
+
+
+def test_samples_within_one_slot_overwrite():
+    history = MetricHistory(capacity=10)
+    history.record(connection_stats(40), timestamp=1000.0)
+    history.record(connection_stats(50), timestamp=1000.5)
+    series, _ = history.query(1000, 1001, step=1, metrics=["latency"])
+    assert series["wlan0"]["latency"] == [[1000, 50]]
+
+
+def test_ring_overwrites_oldest_and_keeps_memory_fixed():
+    history = MetricHistory(capacity=4)
+    history.record(connection_stats(0), timestamp=0)
+    size = history.memory_bytes()
+    for t in range(1, 10):
+        history.record(connection_stats(t), timestamp=t)
+    assert history.memory_bytes() == size
+    series, _ = history.query(0, 100, step=1, metrics=["latency"])
+    assert [t for t, _ in series["wlan0"]["latency"]] == [6, 7, 8, 9]
+
+
+def test_downsample_averages_each_bucket():
+    history = MetricHistory(capacity=100)
+    for t in range(10):
+        history.record(connection_stats(t * 10), timestamp=t)
+    series, _ = history.query(0, 10, step=5, metrics=["latency"])
+    assert series["wlan0"]["latency"] == [[0, 20], [5, 70]]
+
+
+def test_query_filters_adapters_and_range():
+    history = MetricHistory(capacity=100)
+    for t in range(10):
+        history.record(connection_stats(1, adapter="wlan0"), timestamp=t)
+        history.record(connection_stats(2, adapter="wwan0"), timestamp=t)
+    series, _ = history.query(3, 6, step=1, adapters=["wwan0"], metrics=["latency"])
+    assert list(series) == ["wwan0"]
+    assert [t for t, _ in series["wwan0"]["latency"]] == [3, 4, 5]
+
+
+def test_adapter_count_is_bounded():
+    history = MetricHistory(capacity=4, max_adapters=2)
+    for i, adapter in enumerate(["a", "b", "c"]):
+        history.record(connection_stats(1, adapter=adapter), timestamp=i)
+    assert sorted(history.adapters()) == ["b", "c"]
+
+
+def test_default_step_limits_points():
+    history = MetricHistory(capacity=5000)
+    for t in range(5000):
+        history.record(connection_stats(t), timestamp=t)
+    series, step = history.query(0, 5000, metrics=["latency"])
+    assert step == pytest.approx(5)
+    assert len(series["wlan0"]["latency"]) == 1000
+
+
+def test_ring_window_wraps_around():
+    history = MetricHistory(capacity=4)
+    for t in range(6):
+        history.record(connection_stats(t), timestamp=t)
+    series, _ = history.query(3, 100, step=1, metrics=["latency"])
+    assert series["wlan0"]["latency"] == [[3, 3], [4, 4], [5, 5]]
+
+
+def test_query_downsamples_without_holding_the_lock(monkeypatch):
+    history = MetricHistory(capacity=100)
+    for t in range(10):
+        history.record(connection_stats(t), timestamp=t)
+    original = history_module.downsample
+    locked = []
+
+    def downsample(*args):
+        locked.append(history._lock.locked())
+        return original(*args)
+
+    monkeypatch.setattr(history_module, "downsample", downsample)
+    series, _ = history.query(0, 10, step=5)
+    assert locked == [False] * len(METRICS)
+    assert series["wlan0"]["latency"] == [[0, 2], [5, 7]]
@@ -0,0 +1,113 @@
+"""Unit tests for the SQLite-backed metrics store."""
+import pytest
+
+from metrics_store import MetricsStore
+
+T0 = 1_700_000_000 - 1_700_000_000 % 3600  # Hour-aligned base timestamp
+
+
+def connection_stats(latency, adapter="wlan0"):
+    return {"connections": [{"adapterID": adapter, "latencyMs": latency, "jitterMs": 1, "mos": 4.0,
+                             "lossSend": 0, "lossReceive": 0, "sendBps": 100, "receiveBps": 200}]}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = MetricsStore(str(tmp_path / "metrics.db"), retention={"samples_1s": 10**9, "samples_1m": 10**9})
+    yield store
+    store.stop()
+
+
+def test_samples_survive_reopen(tmp_path):
+    path = str(tmp_path / "metrics.db")
+    store = MetricsStore(path, retention={"samples_1s": 10**9})
+    for t in range(3):
+        store.record("connection_stats", connection_stats(40 + t), timestamp=T0 + t)
+    store.record("session_stats", {"total": {"bytesReceived": 10, "numFailovers": 1}}, timestamp=T0)
+    store.stop()
+
+    reopened = MetricsStore(path, retention={"samples_1s": 10**9})
+    series, step = reopened.query(T0, T0 + 3, step=1, metrics=["latency"])
+    assert step == 1
+    assert series == {"wlan0": {"latency": [[T0, 40], [T0 + 1, 41], [T0 + 2, 42]]}}
+    assert reopened.oldest_timestamp() == T0
+    reopened.stop()
+
+
+def test_one_row_per_adapter_per_second(store):
+    store.record("connection_stats", connection_stats(10), timestamp=T0 + 0.1)
+    store.record("connection_stats", connection_stats(20), timestamp=T0 + 0.9)
+    store.flush()
+    series, _ = store.query(T0, T0 + 1, step=1, metrics=["latency"])
+    assert series["wlan0"]["latency"] == [[T0, 20]]
+
+
+def test_compaction_rolls_up_minutes_and_hours(store):
+    for t in range(7200):
+        store.record("connection_stats", connection_stats(t // 60), timestamp=T0 + t)
+    store.flush()
+    store.compact(now=T0 + 7200)
+
+    minutes, step = store.query(T0, T0 + 7200, step=60, metrics=["latency"])
+    assert step == 60
+    assert minutes["wlan0"]["latency"][:3] == [[T0, 0], [T0 + 60, 1], [T0 + 120, 2]]
+    assert len(minutes["wlan0"]["latency"]) == 120
+
+    hours, step = store.query(T0, T0 + 7200, step=3600, metrics=["latency"])
+    assert step == 3600
+    assert hours["wlan0"]["latency"] == [[T0, 29.5], [T0 + 3600, 89.5]]
+
+
+def test_compaction_only_rolls_complete_periods(store):
+    for t in range(90):
+        store.record("connection_stats", connection_stats(1), timestamp=T0 + t)
+    store.flush()
+    store.compact(now=T0 + 90)
+    series, _ = store.query(T0, T0 + 120, step=60, metrics=["latency"])
+    assert [t for t, _ in series["wlan0"]["latency"]] == [T0]
+
+
+def test_retention_drops_old_raw_samples(tmp_path):
+    store = MetricsStore(str(tmp_path / "metrics.db"), retention={"samples_1s": 60})
+    store.record("connection_stats", connection_stats(1), timestamp=T0)
+    store.record("connection_stats", connection_stats(2), timestamp=T0 + 100)
+    store.flush()
+    store.compact(now=T0 + 120)
+    assert store.oldest_timestamp() == T0 + 100
+    store.stop()
+
+
+def test_query_filters_adapters(store):
+    store.record("connection_stats", connection_stats(1, adapter="a"), timestamp=T0)
+    store.record("connection_stats", connection_stats(2, adapter="b"), timestamp=T0)
+    store.flush()
+    series, _ = store.query(T0, T0 + 1, step=1, adapters=["b"])
+    assert list(series) == ["b"]
+
+
+def test_iter_samples_streams_rows_in_order(store):
+    for t in range(5):
+        store.record("connection_stats", connection_stats(40 + t, adapter="wwan0"), timestamp=T0 + t)
+        store.record("connection_stats", connection_stats(10 + t), timestamp=T0 + t)
+    store.record("session_stats", {"total": {"bytesReceived": 10, "bytesSent": 5}}, timestamp=T0)
+    store.flush()
+
+    resolution, rows = store.iter_samples(T0 + 1, T0 + 3, metrics=["latency", "mos"])
+    assert resolution == 1
+    assert list(rows) == [("wlan0", T0 + 1, 1, 11.0, 4.0), ("wlan0", T0 + 2, 1, 12.0, 4.0),
+                          ("wwan0", T0 + 1, 1, 41.0, 4.0), ("wwan0", T0 + 2, 1, 42.0, 4.0)]
+    _, rows = store.iter_samples(T0, T0 + 5, adapters=["wwan0"], metrics=["latency"])
+    assert [row[3] for row in rows] == [40, 41, 42, 43, 44]
+    assert list(store.iter_sessions(T0, T0 + 5)) == [(T0, 10, 5, 0, 0)]
+
+
+def test_iter_samples_falls_back_to_rolled_up_tier(tmp_path):
+    store = MetricsStore(str(tmp_path / "metrics.db"), retention={"samples_1s": 600, "samples_1m": 10**9})
+    for t in range(180):
+        store.record("connection_stats", connection_stats(t // 60), timestamp=T0 + t)
+    store.flush()
+    store.compact(now=T0 + 180)
+    resolution, rows = store.iter_samples(T0, T0 + 180, metrics=["latency"])
+    assert resolution == 60
+    assert list(rows) == [("wlan0", T0, 60, 0), ("wlan0", T0 + 60, 60, 1), ("wlan0", T0 + 120, 60, 2)]
+    store.stop()
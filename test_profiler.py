@@ -0,0 +1,42 @@
+"""Unit tests for the sampling profiler and phase timings."""
+import threading
+import time
+
+from profiler import PhaseTimings, phase_delta, render_collapsed, sample
+
+
+def busy_wait_in_marker(stop):
+    while not stop.is_set():
+        time.sleep(0.001)
+
+
+def test_sample_collapses_other_threads_stacks():
+    stop = threading.Event()
+    thread = threading.Thread(target=busy_wait_in_marker, args=(stop,), name="worker 1")
+    thread.start()
+    try:
+        stacks, samples = sample(0.1, interval=0.005)
+    finally:
+        stop.set()
+        thread.join()
+    assert samples >= 5
+    marker = [stack for stack in stacks if "test_profiler.py:busy_wait_in_marker" in stack]
+    assert marker and all(stack.startswith("worker_1;") for stack in marker)
+    assert not any("profiler.py:sample" in stack for stack in stacks)  # The sampling thread itself
+
+    text = render_collapsed(stacks)
+    first_stack, count = text.splitlines()[0].rsplit(" ", 1)
+    assert int(count) == max(stacks.values())
+
+
+def test_phase_timings_and_delta():
+    timings = PhaseTimings()
+    timings.record("parse", 0.002)
+    before = timings.snapshot()
+    with timings.time("parse"):
+        time.sleep(0.01)
+    timings.record("cli.spawn", 0.004)
+    delta = phase_delta(before, timings.snapshot())
+    assert delta["parse"]["count"] == 1 and delta["parse"]["total_ms"] >= 10
+    assert delta["cli.spawn"] == {"count": 1, "total_ms": 4.0, "mean_ms": 4.0}
+    assert timings.snapshot()["parse"][0] == 2
@@ -0,0 +1,116 @@
+"""Unit tests for the adaptive sampling scheduler."""
+import time
+
+from app import calculate_status_level
+from sampler import FAST, IDLE, SLOW, AdaptiveSampler
+
+
+class FakeCollector:
+    def __init__(self):
+        self.args = ("stats",)
+        self.restart_delay = 1.0
+        self.paused = False
+
+    def configure(self, args, restart_delay):
+        self.args = tuple(args)
+        self.restart_delay = restart_delay
+
+    def pause(self):
+        self.paused = True
+
+    def resume(self):
+        self.paused = False
+
+
+def connections(latency=40, loss=0):
+    return {"connections": [
+        {"adapterID": "adapter0", "connected": True, "latencyMs": latency, "jitterMs": 3, "mos": 4.3,
+         "lossSend": 0, "lossReceive": loss},
+        {"adapterID": "adapter1", "connected": True, "latencyMs": 45, "jitterMs": 2, "mos": 4.2,
+         "lossSend": 0, "lossReceive": 0},
+    ]}
+
+
+def make_sampler(**kwargs):
+    collector = FakeCollector()
+    options = dict(slow_interval=10, calm_seconds=0, idle_seconds=0)
+    options.update(kwargs)
+    return collector, AdaptiveSampler(collector, calculate_status_level, **options)
+
+
+def test_backs_off_to_slow_after_calm_period():
+    collector, sampler = make_sampler()
+    sampler.start()
+    sampler.observe("connection_stats", connections())
+    assert sampler.mode == FAST
+    sampler.observe("connection_stats", connections())
+    assert sampler.mode == SLOW
+    assert collector.args == ("stats", "1")
+    assert collector.restart_delay == 10
+    assert sampler.max_age() == 15
+
+
+def test_degraded_link_returns_to_fast():
+    collector, sampler = make_sampler()
+    sampler.start()
+    sampler.observe("connection_stats", connections())
+    sampler.observe("connection_stats", connections())
+    assert sampler.mode == SLOW
+
+    sampler.observe("connection_stats", connections(latency=180))
+    assert sampler.mode == FAST
+    assert collector.args == ("stats",)
+    # The calm period starts over
+    sampler.observe("connection_stats", connections())
+    assert sampler.mode == FAST
+
+
+def test_failover_returns_to_fast():
+    _, sampler = make_sampler()
+    sampler.start()
+    sampler.observe("session_stats", {"total": {"numFailovers": 2}})
+    sampler.observe("connection_stats", connections())
+    sampler.observe("connection_stats", connections())
+    assert sampler.mode == SLOW
+    sampler.observe("session_stats", {"total": {"numFailovers": 2}})
+    assert sampler.mode == SLOW
+    sampler.observe("session_stats", {"total": {"numFailovers": 3}})
+    assert sampler.mode == FAST
+
+
+def test_idle_without_demand_and_resume_on_touch():
+    collector, sampler = make_sampler(idle_seconds=0.2)
+    sampler.start()
+    try:
+        sampler.observe("connection_stats", connections())
+        sampler.observe("connection_stats", connections())
+        deadline = time.time() + 5
+        while sampler.mode != IDLE and time.time() < deadline:
+            time.sleep(0.02)
+        assert sampler.mode == IDLE
+        assert collector.paused
+
+        sampler.touch()
+        assert sampler.mode == SLOW
+        assert not collector.paused
+    finally:
+        sampler.stop()
+
+
+def test_idle_interval_keeps_one_shot_samples_while_idle():
+    collector, sampler = make_sampler(idle_seconds=0.2, idle_interval=3600)
+    sampler.start()
+    try:
+        deadline = time.time() + 5
+        while sampler.mode != IDLE and time.time() < deadline:
+            time.sleep(0.02)
+        assert sampler.mode == IDLE
+        assert not collector.paused
+        assert collector.args == ("stats", "1")
+        assert collector.restart_delay == 3600
+
+        sampler.touch()
+        assert sampler.mode == FAST
+        assert collector.args == ("stats",)
+    finally:
+        sampler.stop()
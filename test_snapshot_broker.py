@@ -0,0 +1,111 @@
+"""Unit tests for the snapshot broker and its worker-side client."""
+import os
+import threading
+import time
+
+import pytest
+
+from collector import StatsCollector
+from commands import QueueFull, RemoteCommandQueue
+from snapshot_broker import SnapshotBroker, SnapshotClient
+
+FAKE_CLI = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fake_speedify_cli.py')
+
+
+def wait_for(predicate, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+@pytest.fixture
+def broker(monkeypatch, tmp_path):
+    monkeypatch.setenv('FAKE_SPEEDIFY_INTERVAL', '0.05')
+    collector = StatsCollector(FAKE_CLI)
+    collector.start()
+    demands = []
+    broker = SnapshotBroker(str(tmp_path / "snapshot.sock"), collector, max_age=lambda: 12, handlers={
+        "demand": lambda message: demands.append(message),
+        "echo": lambda message: {"value": message["value"]},
+        "submit": lambda message: {"full": "16 commands already waiting"},
+    })
+    broker.demands = demands
+    broker.start()
+    yield broker
+    broker.stop()
+    collector.stop()
+
+
+@pytest.fixture
+def client(broker):
+    invalidated = []
+    client = SnapshotClient(broker.path, on_invalidate=lambda *classes: invalidated.append(classes),
+                            reconnect_delay=0.05, touch_interval=0)
+    client.invalidated = invalidated
+    client.start()
+    yield client
+    client.stop()
+
+
+def test_client_mirrors_the_collector(broker, client):
+    sections = []
+    client.add_listener(lambda name, data: sections.append(name))
+    assert wait_for(lambda: len(client.snapshot()[0]) == 5)
+    latest = client.latest(max_age=5)
+    assert latest["state"] == {"state": "CONNECTED"}
+    assert {a["adapterID"] for a in latest["adapters"]} == {"adapter0", "adapter1"}
+    assert client.max_age == 12
+
+    revision = client.revision
+    assert client.wait_for_update(revision, timeout=5) != revision
+    assert "connection_stats" in sections
+    assert client.stats()["connected"] is True
+    assert client.stats()["spawns"] == 0
+
+
+def test_requests_demand_and_invalidations(broker, client):
+    assert wait_for(lambda: broker.clients == 1)
+    assert wait_for(lambda: client.stats()["connected"])
+    assert client.request("echo", value=[1, 2])["value"] == [1, 2]
+    assert "error" in client.request("bogus")
+
+    client.touch()
+    assert wait_for(lambda: broker.demands)
+
+    broker.broadcast({"type": "invalidate", "classes": ["settings", "cli:stats"]})
+    assert wait_for(lambda: client.invalidated == [("settings", "cli:stats")])
+
+    with pytest.raises(QueueFull):
+        RemoteCommandQueue(client.request).submit(["mode", "speed"])
+
+
+def test_a_slow_request_does_not_hold_up_the_next(broker, client):
+    release = threading.Event()
+    broker.handlers["slow"] = lambda message: {"done": release.wait(5)}
+    assert wait_for(lambda: client.stats()["connected"])
+    replies = []
+    thread = threading.Thread(target=lambda: replies.append(client.request("slow")))
+    thread.start()
+    try:
+        assert client.request("echo", value=1)["value"] == 1
+        assert replies == []
+    finally:
+        release.set()
+        thread.join()
+    assert replies[0]["done"] is True
+
+
+def test_client_reconnects_after_a_broker_restart(broker, client):
+    assert wait_for(lambda: broker.clients == 1)
+    broker.stop()
+    assert wait_for(lambda: client.exits["disconnected"] == 1)
+    with pytest.raises(OSError):
+        client.request("echo", value=1)
+
+    broker.start()
+    assert wait_for(lambda: broker.clients == 1)
+    revision = client.revision
+    assert client.wait_for_update(revision, timeout=5) != revision
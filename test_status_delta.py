@@ -0,0 +1,93 @@
+"""Unit tests for revisioned status payloads and merge-patch deltas."""
+import gzip
+import time
+
+from status_delta import StatusRevisions, apply_merge_patch, merge_patch
+
+OLD = {
+    "overall": {"state": "CONNECTED", "healthScore": 90},
+    "performance": {"latency": 40.0, "jitter": 2.1},
+    "adapters": [{"adapterID": "wlan0", "connectionStats": None}],
+    "legacy": True,
+}
+NEW = {
+    "overall": {"state": "CONNECTED", "healthScore": 88},
+    "performance": {"latency": 52.5, "jitter": 2.1},
+    "adapters": [{"adapterID": "wlan0", "connectionStats": None}],
+}
+
+
+def test_merge_patch_contains_only_changes():
+    assert merge_patch(OLD, NEW) == {
+        "overall": {"healthScore": 88},
+        "performance": {"latency": 52.5},
+        "legacy": None,
+    }
+
+
+def test_merge_patch_round_trips():
+    assert apply_merge_patch(OLD, merge_patch(OLD, NEW)) == NEW
+    assert merge_patch(NEW, NEW) == {}
+
+
+def test_arrays_are_replaced_whole():
+    old = {"connections": [{"latency": 1}, {"latency": 2}]}
+    new = {"connections": [{"latency": 1}, {"latency": 3}]}
+    assert merge_patch(old, new) == new
+
+
+def test_revision_only_advances_on_change():
+    revisions = StatusRevisions()
+    first, payload, _ = revisions.publish(OLD)
+    assert payload["revision"] == first
+    assert revisions.publish(dict(OLD))[0] == first
+    second, _, _ = revisions.publish(NEW)
+    assert second == first + 1
+
+
+def test_delta_since_known_and_unknown_revisions():
+    revisions = StatusRevisions()
+    first, _, _ = revisions.publish(OLD)
+    second, _, _ = revisions.publish(NEW)
+    assert revisions.delta(second) == (second, {})
+    revision, patch = revisions.delta(first)
+    assert revision == second
+    assert patch["revision"] == second
+    assert patch["performance"] == {"latency": 52.5}
+    assert revisions.delta(first - 100) == (second, None)
+
+
+def test_history_is_bounded():
+    revisions = StatusRevisions(history=3)
+    first, _, _ = revisions.publish({"n": 0})
+    for n in range(1, 5):
+        revisions.publish({"n": n})
+    assert revisions.delta(first)[1] is None
+
+
+def test_encoded_bytes_follow_the_newest_revision():
+    revisions = StatusRevisions()
+    assert revisions.encoded() is None
+    revision, _, json_text = revisions.publish(OLD)
+    encoded = revisions.encoded()
+    assert encoded.revision == revision
+    assert encoded.body == json_text.encode()
+    assert gzip.decompress(encoded.gzip_body) == encoded.body
+    assert encoded.etag == f'"{revision}"' != encoded.gzip_etag
+    revisions.publish(dict(OLD))
+    assert revisions.encoded() is encoded
+    revisions.publish(NEW)
+    assert revisions.encoded().revision == revision + 1
+
+
+def test_adopted_revisions_match_the_publisher():
+    broker, worker = StatusRevisions(), StatusRevisions()
+    first, payload, json_text = broker.publish(OLD)
+    assert worker.adopt(first, payload) == (first, payload, json_text)
+    assert worker.encoded().etag == broker.encoded().etag
+    second, payload, _ = broker.publish(NEW)
+    adopted_at = int(time.time() * 1000)
+    worker.adopt(second, payload)
+    assert worker.delta(first) == broker.delta(first)
+    # Local revisions continue from the clock, which the broker's stay behind
+    assert worker.publish({"local": True})[0] > max(second, adopted_at)
@@ -0,0 +1,103 @@
+"""Unit tests for the compact binary status and its UDP broadcast."""
+import socket
+
+import pytest
+
+import app as dashboard
+from status_feed import (ADAPTER_FIELDS, FORMAT_VERSION, STATUS_FIELDS, StatusBroadcaster, cbor_dumps,
+                         cbor_loads, compact_status, parse_address)
+
+STATS = {
+    "state": {"state": "CONNECTED"},
+    "connection_stats": {"connections": [
+        {"adapterID": "wlan0", "connected": True, "latencyMs": 42.37, "jitterMs": 3.1, "mos": 4.21,
+         "lossSend": 0.0015, "lossReceive": 0, "receiveBps": 2500000.4, "sendBps": 800000, "totalBps": 3300000},
+    ]},
+    "session_stats": {"total": {"totalConnectedMinutes": 75, "bytesReceived": 5368709120,
+                                "bytesSent": 1073741824, "numFailovers": 2}},
+    "adapters": [
+        {"adapterID": "wlan0", "name": "wlan0", "state": "connected",
+         "dataUsage": {"usageDaily": 123456789, "usageMonthly": 9876543210}},
+        {"adapterID": "wwan0", "name": "wwan0", "state": "disconnected"},
+    ],
+}
+
+
+def test_cbor_matches_rfc_examples():
+    # RFC 8949 appendix A
+    examples = [
+        (0, "00"), (23, "17"), (24, "1818"), (1000000, "1a000f4240"), (18446744073709551615, "1bffffffffffffffff"),
+        (-1, "20"), (-1000, "3903e7"), (1.1, "fb3ff199999999999a"), (False, "f4"), (None, "f6"),
+        ("", "60"), ("IETF", "6449455446"), ("ü", "62c3bc"), (b"\x01\x02", "420102"),
+        ([1, [2, 3], [4, 5]], "8301820203820405"),
+    ]
+    for value, expected in examples:
+        assert cbor_dumps(value).hex() == expected
+        assert cbor_loads(bytes.fromhex(expected)) == value
+    assert cbor_loads(bytes.fromhex("a26161016162820203")) == {"a": 1, "b": [2, 3]}
+    assert cbor_loads(bytes.fromhex("f93c00")) == 1.0
+
+
+def test_cbor_round_trip_and_errors():
+    value = [1, -500, 2 ** 40, 0.25, "café", b"raw", None, True, [], {"k": [1, {"n": None}]}]
+    assert cbor_loads(cbor_dumps(value)) == value
+    with pytest.raises(ValueError):
+        cbor_loads(cbor_dumps([1, 2])[:-1])
+    with pytest.raises(ValueError):
+        cbor_loads(cbor_dumps(1) + b"\x00")
+    with pytest.raises(TypeError):
+        cbor_dumps({1, 2})
+
+
+def test_compact_status_has_raw_numbers_in_field_order():
+    payload = dashboard.build_status(STATS, {"bondingMode": "speed"})
+    compact = compact_status(7, payload, STATS, 1700000000.9)
+    assert len(compact) == len(STATUS_FIELDS)
+    fields = dict(zip(STATUS_FIELDS, compact))
+    assert fields["version"] == FORMAT_VERSION
+    assert fields["revision"] == 7
+    assert fields["updated"] == 1700000000
+    assert fields["state"] == "CONNECTED"
+    assert fields["bondingMode"] == "speed"
+    assert fields["latency"] == 424  # Tenths of a millisecond
+    assert fields["mos"] == 421
+    assert fields["lossSend"] == 15  # Hundredths of a percent
+    assert fields["bytesReceived"] == 5368709120
+    assert fields["failovers"] == 2
+
+    wlan0, wwan0 = (dict(zip(ADAPTER_FIELDS, adapter)) for adapter in fields["adapters"])
+    assert wlan0["status"] == 0
+    assert wlan0["usageMonthly"] == 9876543210
+    assert wlan0["latency"] == 424
+    assert wlan0["lossSend"] == 15
+    assert wlan0["receiveBps"] == 2500000
+    assert wwan0["status"] == 2
+    assert wwan0["usageDaily"] == 0
+    assert wwan0["latency"] == 0
+
+    # Fixed-size numbers instead of formatted strings keep it well under one datagram
+    assert len(cbor_dumps(compact)) < len(str(payload)) / 3
+    assert cbor_loads(cbor_dumps(compact)) == compact
+
+
+def test_parse_address():
+    assert parse_address("239.255.77.77:5077") == ("239.255.77.77", 5077)
+    for address in ("239.255.77.77", ":5077", "host:port"):
+        with pytest.raises(ValueError):
+            parse_address(address)
+
+
+def test_broadcaster_sends_one_datagram_per_interval():
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind(("127.0.0.1", 0))
+    receiver.settimeout(5)
+    packets = iter([b"first", None, b"second"])
+    broadcaster = StatusBroadcaster(lambda: next(packets, b"more"), receiver.getsockname(), interval=0.01)
+    broadcaster.start()
+    try:
+        assert receiver.recv(2048) == b"first"
+        assert receiver.recv(2048) == b"second"  # None skips a round
+    finally:
+        broadcaster.stop()
+        receiver.close()
+    assert broadcaster.packets >= 2
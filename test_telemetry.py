@@ -0,0 +1,62 @@
+"""Unit tests for the Prometheus exposition helpers."""
+from telemetry import Registry
+
+
+def test_counter_and_gauge_render():
+    registry = Registry()
+    requests = registry.counter("requests", "Requests served", ("route",))
+    temperature = registry.gauge("temperature", "Current temperature")
+    requests.inc("/api/status")
+    requests.inc("/api/status", amount=2)
+    temperature.set(21.5)
+
+    text = registry.render()
+    assert "# HELP requests_total Requests served\n# TYPE requests_total counter\n" in text
+    assert 'requests_total{route="/api/status"} 3\n' in text
+    assert "temperature 21.5\n" in text
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = Registry()
+    latency = registry.histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1))
+    for value in (0.05, 0.1, 0.5, 3):
+        latency.observe(value, "/")
+
+    lines = registry.render().splitlines()
+    assert 'latency_seconds_bucket{route="/",le="0.1"} 2' in lines
+    assert 'latency_seconds_bucket{route="/",le="1"} 3' in lines
+    assert 'latency_seconds_bucket{route="/",le="+Inf"} 4' in lines
+    assert 'latency_seconds_sum{route="/"} 3.65' in lines
+    assert 'latency_seconds_count{route="/"} 4' in lines
+    assert latency.count("/") == 4
+
+
+def test_histogram_timer_and_label_escaping():
+    registry = Registry()
+    parse = registry.histogram("parse_seconds", "Parse time", ("command",))
+    with parse.time('say "hi"\n'):
+        pass
+    assert 'parse_seconds_count{command="say \\"hi\\"\\n"} 1' in registry.render()
+
+
+def test_collectors_run_at_scrape_time():
+    registry = Registry()
+    calls = []
+
+    def collect():
+        from telemetry import MetricFamily
+        calls.append(1)
+        return [MetricFamily("live", "gauge", "Live value", [("live", {"adapter": "a0"}, 42)])]
+
+    registry.add_collector(collect)
+    assert calls == []
+    assert 'live{adapter="a0"} 42' in registry.render()
+    assert calls == [1]
+
+
+def test_help_and_label_escaping():
+    registry = Registry()
+    registry.counter("quoted", 'Says "hi"\nand C:\\path', ("path",)).inc('a "b"\\c')
+    text = registry.render()
+    assert '# HELP quoted_total Says "hi"\\nand C:\\\\path\n' in text
+    assert 'quoted_total{path="a \\"b\\"\\\\c"} 1\n' in text
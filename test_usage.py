@@ -0,0 +1,112 @@
+"""Unit tests for data usage accounting."""
+import datetime
+import json
+
+import pytest
+
+from usage import UsageTracker, next_daily_reset, next_monthly_reset
+
+GB = 1_000_000_000
+
+
+def adapters(daily, monthly, daily_limit=0, monthly_limit=0, reset_day=1):
+    return [{"adapterID": "wwan0", "name": "wwan0", "isp": "Carrier", "dataUsage": {
+        "usageDaily": daily, "usageDailyLimit": daily_limit,
+        "usageMonthly": monthly, "usageMonthlyLimit": monthly_limit,
+        "usageMonthlyResetDay": reset_day}}]
+
+
+def test_rate_is_time_weighted_average():
+    tracker = UsageTracker(time_constant=60)
+    tracker.record("adapters", adapters(0, 0), now=1000)
+    assert tracker.report(now=1000)[0]["bytesPerSecond"] is None
+
+    tracker.record("adapters", adapters(1000, 1000), now=1001)
+    assert tracker.report(now=1001)[0]["bytesPerSecond"] == 1000
+    # Steady 2000 B/s for ten minutes converges on it regardless of spacing
+    daily = 1000
+    for now in range(1003, 1601, 2):
+        daily += 4000
+        tracker.record("adapters", adapters(daily, daily), now=now)
+    report = tracker.report(now=1601)[0]
+    assert report["bytesPerSecond"] == pytest.approx(2000, rel=0.01)
+    assert report["rateBps"] == pytest.approx(16000, rel=0.01)
+
+
+def test_counter_resets_and_gaps():
+    tracker = UsageTracker(time_constant=60, max_gap=100)
+    tracker.record("adapters", adapters(5000, 90000), now=0)
+    # Daily counter reset at midnight: the monthly delta still counts
+    tracker.record("adapters", adapters(100, 91000), now=10)
+    assert tracker.report(now=10)[0]["bytesPerSecond"] == 100
+    # Both reset (new month): the reading only re-bases the counters
+    tracker.record("adapters", adapters(0, 0), now=20)
+    assert tracker.report(now=20)[0]["bytesPerSecond"] == 100
+    # A gap longer than max_gap restarts the measurement
+    tracker.record("adapters", adapters(10 ** 9, 10 ** 9), now=500)
+    assert tracker.report(now=500)[0]["bytesPerSecond"] is None
+    # Readings that are not newer are ignored
+    tracker.record("adapters", adapters(1, 1), now=400)
+    assert tracker.report(now=500)[0]["daily"]["used"] == 10 ** 9
+
+
+def test_null_counters_of_a_never_connected_adapter():
+    tracker = UsageTracker(time_constant=60)
+    tracker.record("adapters", adapters(None, None, None, None, None), now=0)
+    tracker.record("adapters", adapters(None, 500), now=10)
+    [report] = tracker.report(now=10)
+    assert report["daily"]["used"] == 0
+    assert report["monthly"]["used"] == 500
+
+
+def test_projection_against_limits():
+    now = datetime.datetime(2026, 3, 10, 12).timestamp()
+    tracker = UsageTracker()
+    tracker.record("adapters", adapters(0, 4 * GB, daily_limit=2 * GB, monthly_limit=5 * GB), now=now - 100)
+    tracker.record("adapters", adapters(GB // 10, 4 * GB + GB // 10, daily_limit=2 * GB, monthly_limit=5 * GB),
+                   now=now)
+    report = tracker.report(now=now)[0]  # 1 MB/s
+    monthly = report["monthly"]
+    assert monthly["remaining"] == 9 * GB // 10
+    assert monthly["percentUsed"] == 82.0
+    assert monthly["secondsToLimit"] == 900
+    assert monthly["projectedExhaustion"] == round(now) + 900
+    assert monthly["exhaustsBeforeReset"] is True
+    daily = report["daily"]
+    assert daily["resetsAt"] == round(datetime.datetime(2026, 3, 11).timestamp())
+    assert daily["projectedAtReset"] == GB // 10 + 12 * 3600 * 10 ** 6
+    assert daily["exhaustsBeforeReset"] is True  # 1.9 GB left at 1 MB/s is ~32 minutes
+
+    unlimited = UsageTracker()
+    unlimited.record("adapters", adapters(1, 1), now=now)
+    assert unlimited.report(now=now)[0]["monthly"]["limit"] is None
+    assert "exhaustsBeforeReset" not in unlimited.report(now=now)[0]["monthly"]
+
+
+def test_reset_dates():
+    now = datetime.datetime(2026, 1, 31, 8).timestamp()
+    assert next_daily_reset(now) == datetime.datetime(2026, 2, 1).timestamp()
+    assert next_monthly_reset(now, 15) == datetime.datetime(2026, 2, 15).timestamp()
+    assert next_monthly_reset(now, 31) == datetime.datetime(2026, 2, 28).timestamp()
+    assert next_monthly_reset(datetime.datetime(2026, 12, 20).timestamp(), 1) == datetime.datetime(2027, 1, 1).timestamp()
+
+
+def test_state_survives_restart(tmp_path):
+    path = str(tmp_path / "usage.json")
+    tracker = UsageTracker(save_interval=60)
+    tracker.load(path)
+    tracker.record("adapters", adapters(0, 0), now=1000)
+    tracker.record("adapters", adapters(500, 500), now=1001)
+    tracker.save()
+    assert json.loads(open(path).read())["adapters"]["wwan0"]["rate"] == 500
+
+    restored = UsageTracker()
+    restored.load(path)
+    assert restored.report(now=1001)[0]["bytesPerSecond"] == 500
+    restored.record("adapters", adapters(2500, 2500), now=1003)
+    assert 500 < restored.report(now=1003)[0]["bytesPerSecond"] < 1000
+
+    (tmp_path / "bad.json").write_text("{not json")
+    broken = UsageTracker()
+    broken.load(str(tmp_path / "bad.json"))
+    assert broken.report() == []
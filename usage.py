@@ -0,0 +1,231 @@
+"""Per-adapter data usage accounting with projected plan exhaustion.
+
+The CLI reports cumulative usageDaily / usageMonthly counters and optional
+limits for each adapter. UsageTracker turns successive readings into an
+exponentially weighted byte rate per adapter (time-weighted, so irregular
+sample spacing is fine) and projects when each limit will be reached and
+how much will have been used by the next reset.
+
+Each reading is O(1) per adapter, so the tracker can listen to the
+collector at full rate. Its state is a few numbers per adapter, saved to a
+small JSON file every save_interval seconds and on stop, so rates survive
+restarts.
+"""
+import calendar
+import datetime
+import json
+import logging
+import math
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def next_daily_reset(now):
+    """Timestamp of the next local midnight."""
+    today = datetime.datetime.fromtimestamp(now).date()
+    return datetime.datetime.combine(today + datetime.timedelta(days=1), datetime.time()).timestamp()
+
+
+def next_monthly_reset(now, reset_day):
+    """Timestamp of the next local midnight on reset_day (clamped to the month's length)."""
+    current = datetime.datetime.fromtimestamp(now)
+    year, month = current.year, current.month
+    while True:
+        # This month's reset if still ahead, otherwise next month's
+        day = min(max(reset_day, 1), calendar.monthrange(year, month)[1])
+        reset = datetime.datetime(year, month, day).timestamp()
+        if reset > now:
+            return reset
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+class _Adapter:
+    __slots__ = ("name", "isp", "daily", "monthly", "daily_limit", "monthly_limit", "reset_day",
+                 "rate", "timestamp")
+
+    def __init__(self):
+        self.name = None
+        self.isp = None
+        self.daily = None
+        self.monthly = None
+        self.daily_limit = 0
+        self.monthly_limit = 0
+        self.reset_day = 1
+        self.rate = None  # bytes per second
+        self.timestamp = None
+
+    def to_dict(self):
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data):
+        adapter = cls()
+        for slot in cls.__slots__:
+            if slot in data:
+                setattr(adapter, slot, data[slot])
+        return adapter
+
+
+class UsageTracker:
+    """Tracks per-adapter usage counters and their rates.
+
+    State is kept in memory until load() names the file it persists to.
+
+    Args:
+        time_constant: Seconds over which the rate average decays (EWMA)
+        save_interval: Minimum seconds between saves while recording
+        max_gap: Readings further apart than this (e.g. across downtime)
+            restart the rate measurement instead of updating it
+    """
+
+    def __init__(self, time_constant=300.0, save_interval=60.0, max_gap=3600.0):
+        self.path = None
+        self.time_constant = time_constant
+        self.save_interval = save_interval
+        self.max_gap = max_gap
+        self._adapters = {}
+        self._lock = threading.Lock()
+        self._saved_at = time.time()
+        self._dirty = False
+
+    def record(self, section_name, section_data, now=None):
+        """Collector listener: account the adapters section."""
+        if section_name != "adapters":
+            return
+        now = time.time() if now is None else now
+        with self._lock:
+            for adapter in section_data:
+                self._update(adapter, now)
+            self._dirty = True
+            save = self.path and now - self._saved_at >= self.save_interval
+        if save:
+            self.save(now)
+
+    def _update(self, data, now):
+        adapter_id = data.get("adapterID")
+        usage = data.get("dataUsage")
+        if adapter_id is None or not usage:
+            return
+        state = self._adapters.get(adapter_id)
+        if state is None:
+            state = self._adapters[adapter_id] = _Adapter()
+        # Null for adapters that have never connected
+        daily = usage.get("usageDaily") or 0
+        monthly = usage.get("usageMonthly") or 0
+
+        if state.timestamp is not None and now > state.timestamp:
+            elapsed = now - state.timestamp
+            if elapsed > self.max_gap:
+                state.rate = None
+            else:
+                # Counters reset at the start of each period; use whichever did not
+                if monthly >= state.monthly:
+                    consumed = monthly - state.monthly
+                elif daily >= state.daily:
+                    consumed = daily - state.daily
+                else:
+                    consumed = None
+                if consumed is not None:
+                    sample = consumed / elapsed
+                    if state.rate is None:
+                        state.rate = sample
+                    else:
+                        weight = 1 - math.exp(-elapsed / self.time_constant)
+                        state.rate += weight * (sample - state.rate)
+        elif state.timestamp is not None:
+            return  # Out of order or duplicate reading
+
+        state.name = data.get("name", state.name)
+        state.isp = data.get("isp", state.isp)
+        state.daily = daily
+        state.monthly = monthly
+        state.daily_limit = usage.get("usageDailyLimit", 0) or 0
+        state.monthly_limit = usage.get("usageMonthlyLimit", 0) or 0
+        state.reset_day = usage.get("usageMonthlyResetDay", 1) or 1
+        state.timestamp = now
+
+    def report(self, now=None):
+        """Usage, rate and projections per adapter, sorted by adapter ID."""
+        now = time.time() if now is None else now
+        with self._lock:
+            adapters = sorted((adapter_id, _Adapter.from_dict(state.to_dict()))
+                              for adapter_id, state in self._adapters.items())
+        return [self._project(adapter_id, state, now) for adapter_id, state in adapters]
+
+    @staticmethod
+    def _project(adapter_id, state, now):
+        rate = state.rate
+        periods = {}
+        for period, used, limit, reset in (
+                ("daily", state.daily, state.daily_limit, next_daily_reset(now)),
+                ("monthly", state.monthly, state.monthly_limit, next_monthly_reset(now, state.reset_day))):
+            entry = {
+                "used": used,
+                "limit": limit or None,
+                "resetsAt": round(reset),
+                "projectedAtReset": round(used + rate * (reset - now)) if rate is not None else None,
+            }
+            if limit:
+                remaining = max(limit - used, 0)
+                seconds = remaining / rate if rate else None
+                entry.update({
+                    "remaining": remaining,
+                    "percentUsed": round(used / limit * 100, 1),
+                    "secondsToLimit": round(seconds) if seconds is not None else None,
+                    "projectedExhaustion": round(now + seconds) if seconds is not None else None,
+                    "exhaustsBeforeReset": remaining == 0 or (seconds is not None and now + seconds < reset),
+                })
+            periods[period] = entry
+        return {
+            "adapterID": adapter_id,
+            "name": state.name,
+            "isp": state.isp,
+            "rateBps": round(rate * 8) if rate is not None else None,
+            "bytesPerSecond": round(rate, 1) if rate is not None else None,
+            "updated": state.timestamp,
+            **periods,
+        }
+
+    # Persistence
+
+    def save(self, now=None):
+        """Write the state to path atomically (no-op without a path)."""
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {adapter_id: state.to_dict() for adapter_id, state in self._adapters.items()}
+            self._dirty = False
+            self._saved_at = time.time() if now is None else now
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump({"version": 1, "adapters": data}, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Could not save usage state to {self.path}: {e}")
+
+    def load(self, path, persist=True):
+        """Restore state saved at path and, with persist, keep saving there.
+
+        A missing or unreadable file starts from empty state. persist=False
+        is for readers of a file another process writes.
+        """
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            adapters = {adapter_id: _Adapter.from_dict(state)
+                        for adapter_id, state in data.get("adapters", {}).items()}
+        except FileNotFoundError:
+            adapters = {}
+        except (OSError, ValueError, AttributeError) as e:
+            logger.warning(f"Ignoring unreadable usage state {path}: {e}")
+            adapters = {}
+        with self._lock:
+            self.path = path if persist else None
+            self._adapters = adapters
+            self._saved_at = time.time()
@@ -0,0 +1,14 @@
+"""Production WSGI entry point.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+gunicorn.conf.py starts the snapshot broker and points every worker at it
+(SNAPSHOT_SOCKET), so the workers share one `speedify_cli stats` collector.
+Importing this module in any other WSGI server runs a single process that
+owns its collector, like `python3 app.py`.
+"""
+import app as dashboard
+
+dashboard.start_services()
+
+app = dashboard.app